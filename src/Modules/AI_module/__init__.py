@@ -13,6 +13,7 @@ from .ai_logic import (
     # Main manager
     AIManager,
     get_ai_manager,
+    create_ai_manager,
     
     # Enums
     AIProvider,
@@ -38,6 +39,7 @@ __all__ = [
     # Main
     'AIManager',
     'get_ai_manager',
+    'create_ai_manager',
     
     # Enums
     'AIProvider',
@@ -18,12 +18,14 @@ Usage:
 
 import os
 import json
+import hashlib
 import logging
+import threading
 import requests
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from datetime import datetime
 from pathlib import Path
 
@@ -556,12 +558,19 @@ class AIManager:
     
     _instance = None
     
-    def __new__(cls):
+    def __new__(cls, shared: bool = True):
+        """
+        Args:
+            shared: False - separate instance outside the singleton (e.g. for
+                background jobs that must not reconfigure the UI instance)
+        """
+        if not shared:
+            return super().__new__(cls)
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self):
+    def __init__(self, shared: bool = True):
         if not hasattr(self, '_initialized'):
             self.logger = logging.getLogger("AIManager")
             self._current_provider: Optional[BaseAIProvider] = None
@@ -664,10 +673,56 @@ class AIManager:
         """Get currently configured provider"""
         return self._config.provider if self._config else None
     
-    def transcribe_audio(self, audio_file_path: str, language: str = "pl") -> str:
+    def transcribe_audio(
+        self,
+        audio_file_path: str,
+        language: str = "pl",
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> str:
         """
         Transkrybuj plik audio używając skonfigurowanego AI providera.
         
+        Nagrania dłuższe niż MAX_CHUNK_SECONDS są dzielone w ciszy na części
+        wysyłane równolegle (chunked_transcription.py). Gotowe części są
+        zapisywane w AI_CACHE_DIR/transcription_jobs, więc ponowne wywołanie
+        po błędzie wysyła tylko brakujące części.
+        
+        Args:
+            audio_file_path: Ścieżka do pliku audio
+            language: Kod języka (domyślnie "pl" dla polskiego)
+            progress_callback: Callback(gotowe części, wszystkie części)
+            
+        Returns:
+            Transkrybowany tekst (przy wielu częściach - ze znacznikami czasu)
+        """
+        from .chunked_transcription import ChunkedTranscriber
+        
+        audio_path = Path(audio_file_path)
+        if not audio_path.exists():
+            raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+        
+        # Brak providera lub provider bez transkrypcji - błąd jak dla całego pliku
+        if self._config is None or self._config.provider not in (AIProvider.GEMINI, AIProvider.OPENAI):
+            return self._transcribe_file(audio_file_path, language)
+        
+        # Wyniki części są ważne tylko dla tego pliku, dostawcy, modelu i języka
+        file_stat = audio_path.stat()
+        job_key = hashlib.sha256(
+            f"{audio_path.resolve()}|{file_stat.st_size}|{file_stat.st_mtime_ns}|"
+            f"{self._config.provider.value}|{self._config.model}|{language}".encode('utf-8')
+        ).hexdigest()[:32]
+        
+        transcriber = ChunkedTranscriber(
+            lambda chunk_path: self._transcribe_file(chunk_path, language),
+            state_dir=Path(AI_CACHE_DIR) / "transcription_jobs",
+            request_slots=provider_request_slots(self._config.provider.value)
+        )
+        return transcriber.transcribe(audio_file_path, job_key, progress_callback)
+    
+    def _transcribe_file(self, audio_file_path: str, language: str = "pl") -> str:
+        """
+        Transkrybuj jeden plik audio jednym zapytaniem do providera.
+        
         Obsługiwane providery:
         - Google Gemini (gemini-1.5-pro, gemini-1.5-flash)
         - OpenAI Whisper
@@ -1112,6 +1167,41 @@ def get_ai_manager() -> AIManager:
     return _ai_manager_instance
 
 
+def create_ai_manager(provider: AIProvider, api_key: str, model: Optional[str] = None) -> AIManager:
+    """
+    Create a standalone AI Manager (outside the singleton).
+    
+    Background jobs running concurrently with different providers must not
+    reconfigure the shared instance used by the UI.
+    """
+    manager = AIManager(shared=False)
+    manager.set_provider(provider=provider, api_key=api_key, model=model)
+    return manager
+
+
+# ==================== PROVIDER CONCURRENCY ====================
+
+# Limit of concurrent requests to one provider, shared by the whole process
+# (CallCryptor job queue, chunks of long transcriptions)
+PROVIDER_CONCURRENCY = {'gemini': 3, 'openai': 3}
+DEFAULT_PROVIDER_CONCURRENCY = 2
+
+_provider_slots: Dict[str, threading.BoundedSemaphore] = {}
+_provider_slots_lock = threading.Lock()
+
+
+def provider_request_slots(provider_key: Optional[str]) -> threading.BoundedSemaphore:
+    """Semaphore guarding requests to the provider (one per provider)"""
+    with _provider_slots_lock:
+        slots = _provider_slots.get(provider_key)
+        if slots is None:
+            slots = threading.BoundedSemaphore(
+                PROVIDER_CONCURRENCY.get(provider_key, DEFAULT_PROVIDER_CONCURRENCY)
+            )
+            _provider_slots[provider_key] = slots
+        return slots
+
+
 def load_ai_settings() -> Dict[str, Any]:
     """Load persisted AI settings from disk."""
     if AI_SETTINGS_FILE.exists():
@@ -0,0 +1,275 @@
+"""
+Transkrypcja długich nagrań w częściach
+
+Funkcjonalność:
+- Podział nagrania na części do MAX_CHUNK_SECONDS, cięte w najcichszym
+  miejscu przed limitem (energia RMS liczona strumieniowo - soundfile/numpy)
+- Części wysyłane równolegle, z limitem jednoczesnych zapytań i ponowieniami
+- Wynik każdej części zapisywany na dysk - przerwana transkrypcja jest
+  wznawiana od brakujących części
+- Tekst części sklejany ze znacznikami czasu początku części
+- Bez soundfile/numpy lub dla nieobsługiwanego formatu (np. m4a) - jedno
+  zapytanie z całym plikiem, jak wcześniej
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+try:
+    import numpy as np
+    import soundfile as sf
+except (ImportError, OSError):  # Brak pakietów lub biblioteki libsndfile
+    np = None
+    sf = None
+
+logger = logging.getLogger(__name__)
+
+MAX_CHUNK_SECONDS = 600          # Górny limit długości części
+SILENCE_SEARCH_SECONDS = 90      # Cięcie szukane w tylu sekundach przed limitem
+ENERGY_WINDOW_SECONDS = 0.25     # Rozdzielczość szukania ciszy
+DEFAULT_MAX_CONCURRENCY = 3
+MAX_ATTEMPTS = 3                 # Próby na część (z rosnącym odstępem)
+COPY_BLOCK_FRAMES = 64 * 1024    # Kopiowanie części bez wczytywania całości
+
+
+@dataclass
+class AudioChunk:
+    """Fragment nagrania (w ramkach) i jego transkrypcja"""
+    index: int
+    start: int
+    end: int
+    text: Optional[str] = None
+
+
+def plan_chunks(
+    audio_path: str,
+    max_chunk_seconds: float = MAX_CHUNK_SECONDS,
+    search_seconds: float = SILENCE_SEARCH_SECONDS,
+    window_seconds: float = ENERGY_WINDOW_SECONDS
+) -> Optional[List[AudioChunk]]:
+    """
+    Podziel nagranie na części cięte w ciszy.
+
+    Returns:
+        Lista części albo None, gdy pliku nie da się odczytać przez soundfile
+    """
+    if sf is None:
+        return None
+    try:
+        info = sf.info(audio_path)
+    except RuntimeError:
+        return None
+
+    sample_rate = info.samplerate
+    max_frames = int(max_chunk_seconds * sample_rate)
+    if info.frames <= max_frames:
+        return [AudioChunk(0, 0, info.frames)]
+
+    # Energia okien 0.25 s - tablica ~14 tys. liczb na godzinę nagrania
+    window = max(1, int(window_seconds * sample_rate))
+    energies = np.fromiter(
+        (
+            float(np.sqrt(np.mean(np.square(block))))
+            for block in sf.blocks(audio_path, blocksize=window, dtype='float32', always_2d=True)
+        ),
+        dtype=np.float64
+    )
+
+    search_windows = max(1, int(search_seconds / window_seconds))
+    chunks = []
+    start = 0
+    while info.frames - start > max_frames:
+        last_window = (start + max_frames) // window
+        first_window = max(start // window + 1, last_window - search_windows)
+        # Najcichsze okno - przy remisie najpóźniejsze, żeby części były jak najdłuższe
+        candidates = energies[first_window:last_window][::-1]
+        quietest = last_window - 1 - int(np.argmin(candidates))
+        cut = min(quietest * window + window // 2, start + max_frames)
+        chunks.append(AudioChunk(len(chunks), start, cut))
+        start = cut
+    chunks.append(AudioChunk(len(chunks), start, info.frames))
+    return chunks
+
+
+def export_chunk(audio_path: str, chunk: AudioChunk, target_path: str):
+    """Zapisz część nagrania jako FLAC (kopiowanie blokami, bez całości w pamięci)"""
+    info = sf.info(audio_path)
+    with sf.SoundFile(
+        target_path, 'w',
+        samplerate=info.samplerate, channels=info.channels,
+        format='FLAC', subtype='PCM_16'
+    ) as target:
+        for block in sf.blocks(
+            audio_path, blocksize=COPY_BLOCK_FRAMES,
+            start=chunk.start, stop=chunk.end, dtype='float32', always_2d=True
+        ):
+            target.write(block)
+
+
+def format_timestamp(seconds: float) -> str:
+    """Sekundy -> GG:MM:SS"""
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class ChunkedTranscriber:
+    """Transkrypcja nagrania w częściach, wznawialna po przerwaniu"""
+
+    def __init__(
+        self,
+        transcribe_file: Callable[[str], str],
+        state_dir: Path,
+        max_workers: int = DEFAULT_MAX_CONCURRENCY,
+        max_chunk_seconds: float = MAX_CHUNK_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS,
+        retry_delay: float = 2.0,
+        request_slots: Optional[threading.Semaphore] = None
+    ):
+        """
+        Args:
+            transcribe_file: Transkrypcja jednego pliku (np. AIManager._transcribe_file)
+            state_dir: Katalog stanu zadań (wyniki gotowych części)
+            max_workers: Limit jednoczesnych zapytań do dostawcy
+            max_chunk_seconds: Maksymalna długość części
+            max_attempts: Próby na część przed przerwaniem zadania
+            retry_delay: Odstęp przed drugą próbą (kolejne - dwukrotnie dłuższe)
+            request_slots: Semafor zapytań do dostawcy wspólny z innymi zadaniami
+                (ai_logic.provider_request_slots) - max_workers ogranicza
+                wtedy tylko części tego nagrania
+        """
+        self.transcribe_file = transcribe_file
+        self.state_dir = Path(state_dir)
+        self.max_workers = max_workers
+        self.max_chunk_seconds = max_chunk_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.request_slots = request_slots
+
+    def transcribe(
+        self,
+        audio_path: str,
+        job_key: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> str:
+        """
+        Transkrybuj nagranie.
+
+        Args:
+            audio_path: Ścieżka do pliku audio
+            job_key: Identyfikator zadania (plik + dostawca + model + język) -
+                pod nim zapisywane są wyniki gotowych części
+            progress_callback: Callback(gotowe części, wszystkie części)
+
+        Returns:
+            Tekst transkrypcji (przy wielu częściach - ze znacznikami czasu)
+        """
+        state_path = self.state_dir / f"{job_key}.json"
+        chunks = self._load_state(state_path)
+        if chunks is None:
+            chunks = plan_chunks(audio_path, self.max_chunk_seconds)
+            if chunks is None or len(chunks) == 1:
+                # Krótkie nagranie lub format nieczytelny dla soundfile
+                return self._request(audio_path)
+            self._save_state(state_path, chunks)
+
+        pending = [chunk for chunk in chunks if chunk.text is None]
+        done = len(chunks) - len(pending)
+        logger.info(
+            f"Chunked transcription of {Path(audio_path).name}: {len(chunks)} chunks, "
+            f"{done} already done, {self.max_workers} concurrent"
+        )
+        if progress_callback:
+            progress_callback(done, len(chunks))
+
+        failed = threading.Event()
+        errors = []
+        work_dir = tempfile.mkdtemp(prefix="transcription_")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcribe-chunk") as executor:
+                futures = {
+                    executor.submit(self._transcribe_chunk, audio_path, chunk, work_dir, failed): chunk
+                    for chunk in pending
+                }
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        chunk.text = future.result()
+                    except Exception as e:
+                        errors.append(f"chunk {chunk.index}: {e}")
+                        failed.set()  # Pozostałe części nie startują - wznowienie później
+                        continue
+                    self._save_state(state_path, chunks)
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, len(chunks))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if errors:
+            raise RuntimeError(
+                f"Transcription stopped after {done}/{len(chunks)} chunks "
+                f"(progress saved, next run resumes): {errors[0]}"
+            )
+
+        state_path.unlink(missing_ok=True)
+        return self._stitch(audio_path, chunks)
+
+    def _transcribe_chunk(self, audio_path: str, chunk: AudioChunk, work_dir: str, failed: threading.Event) -> str:
+        if failed.is_set():
+            raise RuntimeError("cancelled after another chunk failed")
+
+        chunk_path = os.path.join(work_dir, f"chunk_{chunk.index:04d}.flac")
+        export_chunk(audio_path, chunk, chunk_path)
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    return self._request(chunk_path)
+                except Exception as e:
+                    if attempt == self.max_attempts or failed.is_set():
+                        raise
+                    delay = self.retry_delay * 2 ** (attempt - 1)
+                    logger.warning(f"Chunk {chunk.index} attempt {attempt} failed ({e}), retrying in {delay:.0f}s")
+                    time.sleep(delay)
+        finally:
+            os.remove(chunk_path)
+
+    def _request(self, audio_path: str) -> str:
+        """Jedno zapytanie do dostawcy (w granicach wspólnego limitu)"""
+        with self.request_slots or nullcontext():
+            return self.transcribe_file(audio_path)
+
+    def _stitch(self, audio_path: str, chunks: List[AudioChunk]) -> str:
+        """Złącz części ze znacznikiem czasu początku każdej z nich"""
+        sample_rate = sf.info(audio_path).samplerate
+        return "\n\n".join(
+            f"[{format_timestamp(chunk.start / sample_rate)}] {chunk.text.strip()}"
+            for chunk in chunks
+        )
+
+    def _load_state(self, state_path: Path) -> Optional[List[AudioChunk]]:
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                return [AudioChunk(**chunk) for chunk in json.load(f)['chunks']]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as exc:
+            logger.warning(f"Ignoring damaged transcription state {state_path.name}: {exc}")
+            return None
+
+    def _save_state(self, state_path: Path, chunks: List[AudioChunk]):
+        """Zapis atomowy - przerwanie w trakcie zapisu nie psuje stanu"""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = state_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'chunks': [asdict(chunk) for chunk in chunks]}, f, ensure_ascii=False)
+        os.replace(temp_path, state_path)
@@ -6,6 +6,7 @@ Funkcjonalność:
 - Zarządzanie źródłami prawdy (kontekst dla AI)
 - Integracja z różnymi dostawcami AI (Gemini, OpenAI, etc.)
 - Przetwarzanie załączników jako kontekst (PDF, TXT, CSV, JSON)
+- Do promptu trafiają tylko fragmenty źródeł trafne dla emaila (TruthSourceIndex)
 
 Autor: PRO-Ka-Po_Kaizen_Freak
 Data: 2025-11-11
@@ -19,9 +20,11 @@ from datetime import datetime
 
 try:
     from ..AI_module.ai_logic import get_ai_manager, AIProvider, AIResponse, configure_ai_manager_from_settings
+    from ..AI_module.truth_source_index import TruthSourceIndex
 except ImportError:
     # Fallback dla testów
     from src.Modules.AI_module.ai_logic import get_ai_manager, AIProvider, AIResponse, configure_ai_manager_from_settings
+    from src.Modules.AI_module.truth_source_index import TruthSourceIndex
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +32,10 @@ logger = logging.getLogger(__name__)
 class ProMailAIConnector:
     """Konektor łączący AI z modułem ProMail"""
     
+    # Budżet kontekstu ze źródeł prawdy (szacowane tokeny) i limit fragmentów
+    TRUTH_TOKEN_BUDGET = 2000
+    TRUTH_TOP_K = 8
+    
     def __init__(self):
         """Inicjalizacja konektora AI"""
         # Konfiguruj AI manager z ustawień użytkownika
@@ -42,6 +49,7 @@ class ProMailAIConnector:
             logger.info(f"AI manager configured with provider: {settings.get('provider', 'unknown')}, model: {settings.get('models', {}).get(settings.get('provider', ''), 'default')}")
         
         self.default_prompts = self._load_default_prompts()
+        self.truth_index = TruthSourceIndex(self._read_truth_source)
         
     def _load_default_prompts(self) -> Dict[str, str]:
         """Wczytuje domyślne prompty dla różnych scenariuszy"""
@@ -164,7 +172,8 @@ prośby lub elementy wymagające działania. Przedstaw je w formie listy."""
         
         # Część 4: Źródła prawdy (jeśli są)
         if truth_sources:
-            truth_content = self._load_truth_sources(truth_sources)
+            query = f"{(email_context or {}).get('subject', '')}\n{email_content}"
+            truth_content = self._load_truth_sources(truth_sources, query)
             if truth_content:
                 prompt_parts.append("DODATKOWY KONTEKST (Źródła prawdy):")
                 prompt_parts.append(truth_content)
@@ -181,46 +190,37 @@ prośby lub elementy wymagające działania. Przedstaw je w formie listy."""
         
         return "\n".join(prompt_parts)
     
-    def _load_truth_sources(self, file_paths: List[str]) -> str:
+    def _load_truth_sources(self, file_paths: List[str], query: str = "") -> str:
         """
-        Wczytuje zawartość plików źródeł prawdy
+        Wybiera z plików źródeł prawdy fragmenty trafne dla zapytania
         
         Args:
             file_paths: Lista ścieżek do plików
+            query: Tekst emaila, względem którego rankowane są fragmenty
             
         Returns:
-            str: Skonkatenowana zawartość plików
+            str: Wybrane fragmenty (całe pliki, jeśli mieszczą się w budżecie)
         """
-        contents = []
-        
-        for file_path in file_paths:
-            try:
-                path = Path(file_path)
-                if not path.exists():
-                    logger.warning(f"Truth source file not found: {file_path}")
-                    continue
-                
-                # Obsługa różnych typów plików
-                if path.suffix.lower() in ['.txt', '.md']:
-                    content = self._read_text_file(path)
-                elif path.suffix.lower() == '.json':
-                    content = self._read_json_file(path)
-                elif path.suffix.lower() == '.csv':
-                    content = self._read_csv_file(path)
-                elif path.suffix.lower() == '.pdf':
-                    content = self._read_pdf_file(path)
-                else:
-                    logger.warning(f"Unsupported file type: {path.suffix}")
-                    continue
-                
-                if content:
-                    contents.append(f"\n--- Źródło: {path.name} ---\n{content}\n")
-                    
-            except Exception as e:
-                logger.error(f"Error reading truth source {file_path}: {e}")
-                continue
-        
-        return "\n".join(contents)
+        return self.truth_index.build_context(
+            file_paths,
+            query,
+            token_budget=self.TRUTH_TOKEN_BUDGET,
+            top_k=self.TRUTH_TOP_K,
+        )
+    
+    def _read_truth_source(self, path: Path) -> str:
+        """Wczytuje tekst pliku źródła prawdy wg rozszerzenia (wywoływane raz na wersję pliku)"""
+        suffix = path.suffix.lower()
+        if suffix in ['.txt', '.md']:
+            return self._read_text_file(path)
+        elif suffix == '.json':
+            return self._read_json_file(path)
+        elif suffix == '.csv':
+            return self._read_csv_file(path)
+        elif suffix == '.pdf':
+            return self._read_pdf_file(path)
+        logger.warning(f"Unsupported file type: {path.suffix}")
+        return ""
     
     def _read_text_file(self, path: Path) -> str:
         """Wczytuje plik tekstowy"""
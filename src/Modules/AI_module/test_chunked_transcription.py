@@ -0,0 +1,146 @@
+"""
+Test transkrypcji w częściach z lokalnym dostawcą-atrapą (bez sieci).
+
+Uruchomienie:
+    python src/Modules/AI_module/test_chunked_transcription.py
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+# Załaduj moduł bezpośrednio (ai_logic wymaga konfiguracji aplikacji)
+spec = spec_from_file_location(
+    "chunked_transcription_module",
+    Path(__file__).parent / "chunked_transcription.py",
+)
+if spec is None or spec.loader is None:
+    raise RuntimeError("Failed to create module spec for chunked_transcription.py")
+mod = module_from_spec(spec)
+spec.loader.exec_module(mod)
+
+SAMPLE_RATE = 8000
+SPEECH_SECONDS = 37
+PAUSE_SECONDS = 3
+SEGMENTS = 45  # 30 minut nagrania
+
+
+def make_recording(path: Path):
+    """Ton (mowa) przeplatany ciszą - zapis blokami"""
+    t = np.arange(SPEECH_SECONDS * SAMPLE_RATE) / SAMPLE_RATE
+    speech = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    pause = np.zeros(PAUSE_SECONDS * SAMPLE_RATE, dtype=np.float32)
+    with sf.SoundFile(str(path), 'w', samplerate=SAMPLE_RATE, channels=1, subtype='PCM_16') as f:
+        for _ in range(SEGMENTS):
+            f.write(speech)
+            f.write(pause)
+
+
+class StubProvider:
+    """Dostawca-atrapa: stałe opóźnienie, zlicza równoległe zapytania"""
+
+    def __init__(self, delay: float = 0.2, fail_chunks=()):
+        self.delay = delay
+        self.fail_chunks = set(fail_chunks)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, chunk_path: str) -> str:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            info = sf.info(chunk_path)
+            index = int(Path(chunk_path).stem.split('_')[1])
+            self.calls.append(index)
+            if index in self.fail_chunks:
+                raise ConnectionError("stub provider unavailable")
+            return f"chunk {index} ({info.frames / info.samplerate:.0f}s)"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def run_test():
+    work = Path(tempfile.mkdtemp(prefix="chunked_test_"))
+    audio_path = work / "call.wav"
+    make_recording(audio_path)
+    print("Recording:", audio_path, f"{sf.info(str(audio_path)).duration / 60:.0f} min")
+
+    # Cięcia w ciszy, części nie dłuższe niż limit
+    chunks = mod.plan_chunks(str(audio_path), max_chunk_seconds=120)
+    assert chunks[0].start == 0 and chunks[-1].end == sf.info(str(audio_path)).frames
+    data, _ = sf.read(str(audio_path), dtype='float32')
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.end == chunk.start
+        assert previous.end - previous.start <= 120 * SAMPLE_RATE
+        assert abs(data[chunk.start]) < 1e-3, f"cut at {chunk.start} is not in silence"
+    print("Chunks:", len(chunks), "- all cuts in silence")
+
+    # Czas zależy od limitu równoległości (opóźnienie dostawcy przeważa nad
+    # eksportem części, który obciąża procesor)
+    timings = {}
+    for workers in (1, 4):
+        provider = StubProvider(delay=0.4)
+        transcriber = mod.ChunkedTranscriber(provider, work / f"state_{workers}", max_workers=workers, max_chunk_seconds=120)
+        started = time.monotonic()
+        text = transcriber.transcribe(str(audio_path), "job")
+        timings[workers] = time.monotonic() - started
+        assert provider.max_active <= workers
+        assert text.startswith("[00:00:00] chunk 0")
+        print(f"{workers} worker(s): {timings[workers]:.2f}s, max concurrent {provider.max_active}")
+    assert timings[4] < timings[1] / 2.5
+
+    # Wspólny semafor dostawcy ogranicza zapytania kilku transkrypcji naraz
+    provider = StubProvider(delay=0.05)
+    slots = threading.BoundedSemaphore(2)
+    jobs = [
+        threading.Thread(target=mod.ChunkedTranscriber(
+            provider, work / f"state_shared_{n}", max_workers=4, max_chunk_seconds=120, request_slots=slots
+        ).transcribe, args=(str(audio_path), f"shared_{n}"))
+        for n in range(3)
+    ]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+    assert len(provider.calls) == 3 * len(chunks)
+    assert provider.max_active <= 2, provider.max_active
+    print(f"Shared slots: {len(jobs)} transcriptions, max concurrent {provider.max_active}")
+
+    # Błąd części przerywa zadanie, ale gotowe części są zachowane
+    state_dir = work / "state_resume"
+    failing = StubProvider(fail_chunks={5})
+    transcriber = mod.ChunkedTranscriber(failing, state_dir, max_workers=2, max_chunk_seconds=120, retry_delay=0.01)
+    try:
+        transcriber.transcribe(str(audio_path), "resume")
+        raise AssertionError("expected failure")
+    except RuntimeError as e:
+        print("First run failed as expected:", e)
+    assert (state_dir / "resume.json").exists()
+
+    healthy = StubProvider()
+    transcriber = mod.ChunkedTranscriber(healthy, state_dir, max_workers=2, max_chunk_seconds=120)
+    text = transcriber.transcribe(str(audio_path), "resume")
+    done_before = set(failing.calls) - {5}
+    assert not done_before & set(healthy.calls), "finished chunks were sent again"
+    assert not (state_dir / "resume.json").exists()
+    assert text.count("] chunk ") == len(chunks)
+    print(f"Resumed: {len(healthy.calls)} of {len(chunks)} chunks sent again")
+
+    shutil.rmtree(work, ignore_errors=True)
+
+    print("\nAll chunked transcription checks passed")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,239 @@
+"""
+Indeks źródeł prawdy dla ProMail AI
+
+Funkcjonalność:
+- Każdy plik jest parsowany raz (także ekstrakcja tekstu z PDF), ponownie
+  dopiero po zmianie mtime lub rozmiaru
+- Tekst dzielony na fragmenty (akapity łączone do CHUNK_CHARS znaków)
+- Ranking fragmentów BM25 względem treści emaila
+- Do promptu trafiają tylko najlepsze fragmenty w budżecie tokenów
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokeny do rankingu: małe litery, bez jednoznakowych.
+
+    Tokeny są skracane do STEM_LENGTH znaków - prymitywny stemming, który
+    łączy polskie formy fleksyjne (faktura/faktury/fakturze).
+    """
+    return [
+        token[:TruthSourceIndex.STEM_LENGTH]
+        for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1
+    ]
+
+
+def estimate_tokens(text: str) -> int:
+    """Przybliżona liczba tokenów modelu (~4 znaki na token)"""
+    return len(text) // 4 + 1
+
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """Dzieli tekst na fragmenty: akapity łączone do max_chars, długie akapity cięte po słowach"""
+    pieces: List[str] = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        # Za długi akapit (np. strona PDF bez pustych linii) - tnij po liniach/słowach
+        current = ""
+        for word in re.split(r"(?<=\s)", paragraph):
+            if current and len(current) + len(word) > max_chars:
+                pieces.append(current.strip())
+                current = ""
+            current += word
+        if current.strip():
+            pieces.append(current.strip())
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class IndexedSource:
+    """Sparsowany plik: fragmenty i ich statystyki termów"""
+    path: str
+    name: str
+    mtime_ns: int
+    size: int
+    chunks: List[str] = field(default_factory=list)
+    term_counts: List[Counter] = field(default_factory=list)
+    lengths: List[int] = field(default_factory=list)
+
+
+class TruthSourceIndex:
+    """
+    Indeks fragmentów źródeł prawdy z rankingiem BM25.
+
+    Args:
+        reader: Funkcja zwracająca tekst pliku (Path -> str)
+    """
+
+    CHUNK_CHARS = 1200
+    STEM_LENGTH = 6
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+
+    def __init__(self, reader: Callable[[Path], str]):
+        self.reader = reader
+        self._sources: Dict[str, IndexedSource] = {}
+        self._lock = threading.Lock()
+
+    def _source(self, file_path: str) -> Optional[IndexedSource]:
+        """Zwraca zaindeksowany plik, parsując go tylko po zmianie (mtime, rozmiar)"""
+        path = Path(file_path)
+        try:
+            stat = path.stat()
+        except OSError:
+            logger.warning(f"Truth source file not found: {file_path}")
+            return None
+
+        key = str(path.resolve())
+        with self._lock:
+            cached = self._sources.get(key)
+        if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+            return cached
+
+        text = self.reader(path) or ""
+        source = IndexedSource(key, path.name, stat.st_mtime_ns, stat.st_size)
+        for chunk in split_into_chunks(text, self.CHUNK_CHARS):
+            tokens = tokenize(chunk)
+            source.chunks.append(chunk)
+            source.term_counts.append(Counter(tokens))
+            source.lengths.append(len(tokens))
+
+        with self._lock:
+            self._sources[key] = source
+        logger.info(f"Indexed truth source {path.name}: {len(source.chunks)} chunks")
+        return source
+
+    def _rank(self, sources: List[IndexedSource], query: str) -> List[Tuple[float, int, int]]:
+        """BM25 fragmentów z podanych plików: [(wynik, nr pliku, nr fragmentu)] malejąco"""
+        query_terms = set(tokenize(query))
+        total_chunks = sum(len(source.chunks) for source in sources)
+        if not query_terms or not total_chunks:
+            return []
+
+        document_frequency: Counter = Counter()
+        for source in sources:
+            for counts in source.term_counts:
+                document_frequency.update(query_terms.intersection(counts))
+        if not document_frequency:
+            return []
+
+        avg_length = sum(sum(source.lengths) for source in sources) / total_chunks or 1.0
+        idf = {
+            term: math.log(1 + (total_chunks - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+        k1, b = self.BM25_K1, self.BM25_B
+        ranked: List[Tuple[float, int, int]] = []
+        for source_index, source in enumerate(sources):
+            for chunk_index, counts in enumerate(source.term_counts):
+                norm = k1 * (1 - b + b * source.lengths[chunk_index] / avg_length)
+                score = 0.0
+                for term, weight in idf.items():
+                    tf = counts.get(term)
+                    if tf:
+                        score += weight * tf * (k1 + 1) / (tf + norm)
+                if score > 0:
+                    ranked.append((score, source_index, chunk_index))
+        ranked.sort(key=lambda item: (-item[0], item[1], item[2]))
+        return ranked
+
+    def build_context(
+        self,
+        file_paths: List[str],
+        query: str,
+        token_budget: int = 2000,
+        top_k: int = 8,
+    ) -> str:
+        """
+        Buduje kontekst promptu z najtrafniejszych fragmentów źródeł
+
+        Args:
+            file_paths: Pliki źródeł prawdy
+            query: Tekst zapytania (temat i treść emaila)
+            token_budget: Maksymalna (szacowana) liczba tokenów kontekstu
+            top_k: Maksymalna liczba fragmentów
+
+        Returns:
+            str: Fragmenty pogrupowane wg źródła, w kolejności z pliku
+        """
+        sources: List[IndexedSource] = []
+        for file_path in file_paths:
+            try:
+                source = self._source(file_path)
+            except Exception as e:
+                logger.error(f"Error indexing truth source {file_path}: {e}")
+                continue
+            if source and source.chunks:
+                sources.append(source)
+        if not sources:
+            return ""
+
+        all_chunks = [(s, c) for s, source in enumerate(sources) for c in range(len(source.chunks))]
+        total_tokens = sum(estimate_tokens(sources[s].chunks[c]) for s, c in all_chunks)
+        if total_tokens <= token_budget:
+            # Małe źródła mieszczą się w całości - bez wyboru fragmentów
+            selected = all_chunks
+        else:
+            candidates = [(s, c) for _, s, c in self._rank(sources, query)]
+            if not candidates:
+                # Brak wspólnych słów z emailem - początki plików
+                candidates = [(s, 0) for s in range(len(sources))]
+            selected = []
+            used_tokens = 0
+            for s, c in candidates:
+                if len(selected) >= top_k:
+                    break
+                cost = estimate_tokens(sources[s].chunks[c])
+                if used_tokens + cost > token_budget:
+                    continue
+                selected.append((s, c))
+                used_tokens += cost
+
+        parts = []
+        by_source: Dict[int, List[int]] = {}
+        for s, c in selected:
+            by_source.setdefault(s, []).append(c)
+        for s in sorted(by_source):
+            source = sources[s]
+            fragments = "\n[...]\n".join(source.chunks[c] for c in sorted(by_source[s]))
+            parts.append(f"\n--- Źródło: {source.name} ---\n{fragments}\n")
+        return "\n".join(parts)
+
+    def invalidate(self, file_path: Optional[str] = None):
+        """Usuwa plik (lub wszystkie pliki) z indeksu"""
+        with self._lock:
+            if file_path is None:
+                self._sources.clear()
+            else:
+                self._sources.pop(str(Path(file_path).resolve()), None)
@@ -0,0 +1,148 @@
+"""
+CallCryptor Audio Metadata
+==========================
+
+Parametry audio nagrań (czas trwania, częstotliwość próbkowania, kanały, kodek).
+
+Features:
+- Odczyt tylko nagłówków pliku (soundfile, fallback: moduł wave dla WAV)
+- Wątek w tle niezależny od skanowania - skaner dodaje nagrania bez czytania audio
+- Pula wątków do odczytu plików, zapis do bazy partiami
+- Cache po hashu/odcisku pliku (audio_metadata_cache) - plik nie jest sprawdzany dwa razy
+"""
+
+import os
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from loguru import logger
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):  # Brak pakietu lub biblioteki libsndfile
+    sf = None
+
+
+def probe_audio(file_path: str) -> Optional[Dict]:
+    """
+    Odczytaj parametry audio z nagłówka pliku.
+
+    Returns:
+        {'duration': float (sekundy), 'sample_rate': int, 'channels': int,
+         'codec': str} albo None, jeśli format nie jest obsługiwany
+    """
+    if sf is not None:
+        try:
+            info = sf.info(file_path)
+            return {
+                'duration': info.frames / info.samplerate if info.samplerate else None,
+                'sample_rate': info.samplerate,
+                'channels': info.channels,
+                'codec': f"{info.format}/{info.subtype}"
+            }
+        except RuntimeError:
+            pass  # Format nieobsługiwany przez libsndfile (np. m4a)
+
+    if os.path.splitext(file_path)[1].lower() == '.wav':
+        try:
+            with wave.open(file_path, 'rb') as wav_file:
+                sample_rate = wav_file.getframerate()
+                return {
+                    'duration': wav_file.getnframes() / sample_rate if sample_rate else None,
+                    'sample_rate': sample_rate,
+                    'channels': wav_file.getnchannels(),
+                    'codec': f"WAV/PCM_{wav_file.getsampwidth() * 8}"
+                }
+        except (wave.Error, EOFError):
+            pass
+
+    return None
+
+
+class AudioMetadataWorker(QThread):
+    """Wątek uzupełniający parametry audio nagrań użytkownika"""
+
+    batch_saved = pyqtSignal(list)  # [{'id': str, 'duration': int | None}]
+    finished_probing = pyqtSignal(int)  # liczba uzupełnionych nagrań
+
+    def __init__(self, db_path: str, user_id: str, batch_size: int = 200, max_workers: Optional[int] = None):
+        """
+        Args:
+            db_path: Ścieżka do bazy CallCryptor
+            user_id: ID użytkownika
+            batch_size: Liczba nagrań zapisywanych w jednej transakcji
+            max_workers: Liczba wątków odczytu (domyślnie liczba rdzeni, maks. 4)
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.max_workers = max_workers or min(4, os.cpu_count() or 2)
+        self.should_stop = False
+
+    def stop(self):
+        """Zatrzymaj po bieżącej partii"""
+        self.should_stop = True
+
+    def run(self):
+        # Połączenie z bazą tworzone w wątku roboczym
+        from .callcryptor_database import CallCryptorDatabase
+        db_manager = CallCryptorDatabase(self.db_path)
+        total = 0
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="callcryptor-probe") as executor:
+                while not self.should_stop:
+                    # Najpierw pliki znane z cache - bez otwierania plików
+                    total += db_manager.apply_cached_audio_metadata(self.user_id)
+
+                    pending = db_manager.get_recordings_pending_metadata(self.user_id, self.batch_size)
+                    if not pending:
+                        break
+
+                    results = self._probe_batch(executor, pending)
+                    db_manager.save_audio_metadata(results)
+                    total += len(results)
+                    self.batch_saved.emit([
+                        {'id': recording_id, 'duration': self._rounded_duration(metadata)}
+                        for recording_id, _, metadata in results
+                    ])
+        except Exception as e:
+            logger.error(f"[AudioMetadata] Probing failed: {e}")
+        finally:
+            db_manager.close()
+
+        logger.info(f"[AudioMetadata] Metadata filled for {total} recordings")
+        self.finished_probing.emit(total)
+
+    def _probe_batch(self, executor: ThreadPoolExecutor, pending: List[Dict]) -> List[tuple]:
+        """Sprawdź partię nagrań - plik o tym samym hashu jest czytany raz"""
+        paths_by_key = {}
+        for recording in pending:
+            key = recording['cache_key'] or recording['id']
+            if recording['file_path'] and os.path.exists(recording['file_path']):
+                paths_by_key.setdefault(key, recording['file_path'])
+
+        keys = list(paths_by_key)
+        probed = dict(zip(keys, executor.map(self._safe_probe, (paths_by_key[key] for key in keys))))
+
+        return [
+            (recording['id'], recording['cache_key'], probed.get(recording['cache_key'] or recording['id']))
+            for recording in pending
+        ]
+
+    @staticmethod
+    def _rounded_duration(metadata: Optional[Dict]) -> Optional[int]:
+        if metadata and metadata['duration'] is not None:
+            return round(metadata['duration'])
+        return None
+
+    @staticmethod
+    def _safe_probe(file_path: str) -> Optional[Dict]:
+        try:
+            return probe_audio(file_path)
+        except Exception as e:
+            logger.warning(f"[AudioMetadata] Cannot read {file_path}: {e}")
+            return None
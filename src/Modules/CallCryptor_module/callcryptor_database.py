@@ -8,15 +8,18 @@ Tabele:
 - recording_sources: Źródła nagrań (foldery lokalne, konta e-mail)
 - recordings: Nagrania z metadanymi, transkrypcją i AI summary
 - recording_tags: Tagi dla organizacji nagrań
+- recording_tag_links: Tagi przypisane do nagrań (z recordings.tags, utrzymywane triggerami)
+- folder_scan_manifest: Stan plików źródeł folderowych z ostatniego skanowania
 
 Features:
 - CRUD operations dla wszystkich tabel
-- Sync support (is_synced, server_id)
+- Sync support (is_synced, server_id, version - śledzone triggerem)
 - Deduplication (file_hash)
 - Foreign key constraints
 - Indeksy dla wydajności
 """
 
+import os
 import sqlite3
 import uuid
 from datetime import datetime
@@ -78,6 +81,160 @@ class CallCryptorDatabase:
             logger.info("[CallCryptorDB] Adding ai_summary_tasks column to recordings...")
             cursor.execute("ALTER TABLE recordings ADD COLUMN ai_summary_tasks TEXT")  # JSON array
             self.conn.commit()
+        
+        if 'file_fingerprint' not in recording_columns:
+            logger.info("[CallCryptorDB] Adding file_fingerprint column to recordings...")
+            cursor.execute("ALTER TABLE recordings ADD COLUMN file_fingerprint TEXT")
+            self.conn.commit()
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_recordings_fingerprint
+            ON recordings(user_id, file_fingerprint)
+        """)
+        
+        for column, column_type in (
+            ('sample_rate', 'INTEGER'),
+            ('channels', 'INTEGER'),
+            ('audio_codec', 'TEXT'),
+            ('metadata_probed_at', 'TEXT')
+        ):
+            if column not in recording_columns:
+                logger.info(f"[CallCryptorDB] Adding {column} column to recordings...")
+                cursor.execute(f"ALTER TABLE recordings ADD COLUMN {column} {column_type}")
+                self.conn.commit()
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_recordings_metadata_pending
+            ON recordings(user_id)
+            WHERE metadata_probed_at IS NULL
+        """)
+        
+        # Lista nagrań stronicowana po (data, id) - indeksy zgodne z
+        # sortowaniem query_recordings
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_recordings_user_list
+            ON recordings(user_id, is_archived, {self._RECORDING_SORT_KEY}, id)
+        """)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_recordings_source_list
+            ON recordings(source_id, is_archived, {self._RECORDING_SORT_KEY}, id)
+        """)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_recordings_user_favorites
+            ON recordings(user_id, is_archived, {self._RECORDING_SORT_KEY}, id)
+            WHERE is_favorite = 1
+        """)
+        
+        # Triggery utrzymujące recording_tag_links; przy pierwszym utworzeniu
+        # tabela jest wypełniana z istniejących nagrań
+        cursor.execute("""
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'trigger' AND name = 'trg_recordings_tags_insert'
+        """)
+        if cursor.fetchone() is None:
+            logger.info("[CallCryptorDB] Creating recording tag links...")
+            link_tags = """
+                INSERT OR IGNORE INTO recording_tag_links (recording_id, tag_name, user_id)
+                SELECT NEW.id, tag.value, NEW.user_id
+                FROM json_each(CASE WHEN json_valid(NEW.tags) THEN NEW.tags ELSE '[]' END) AS tag
+                WHERE tag.type = 'text' AND tag.value != '';
+            """
+            cursor.execute(f"""
+                CREATE TRIGGER trg_recordings_tags_insert
+                AFTER INSERT ON recordings
+                WHEN NEW.tags IS NOT NULL
+                BEGIN
+                    {link_tags}
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER trg_recordings_tags_update
+                AFTER UPDATE OF tags ON recordings
+                BEGIN
+                    DELETE FROM recording_tag_links WHERE recording_id = NEW.id;
+                    {link_tags}
+                END
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO recording_tag_links (recording_id, tag_name, user_id)
+                SELECT r.id, tag.value, r.user_id
+                FROM recordings AS r, json_each(r.tags) AS tag
+                WHERE r.tags IS NOT NULL AND json_valid(r.tags)
+                  AND tag.type = 'text' AND tag.value != ''
+            """)
+        
+        # Śledzenie zmian dla synchronizacji: każda zmiana synchronizowanej kolumny
+        # podbija version, odświeża updated_at i oznacza nagranie jako brudne.
+        # Zapisy synchronizacji (ustawiające synced_at) nie są liczone jako zmiany.
+        changed = ' OR '.join(
+            f"NEW.{column} IS NOT OLD.{column}" for column in self._SYNCED_RECORDING_COLUMNS
+        )
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_recordings_change_tracking
+            AFTER UPDATE OF {', '.join(self._SYNCED_RECORDING_COLUMNS)} ON recordings
+            WHEN NEW.synced_at IS OLD.synced_at AND ({changed})
+            BEGIN
+                UPDATE recordings
+                SET version = COALESCE(OLD.version, 1) + 1,
+                    is_synced = 0,
+                    updated_at = CASE
+                        WHEN NEW.updated_at IS OLD.updated_at
+                        THEN strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+                        ELSE NEW.updated_at
+                    END
+                WHERE id = NEW.id;
+            END
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_recordings_dirty
+            ON recordings(user_id, updated_at, id)
+            WHERE is_synced = 0
+        """)
+        
+        # Deduplikacja wymuszana przez bazę: nagrania z pełnym hashem - po hashu,
+        # nagrania z samym odciskiem - po odcisku (przy kolizji odcisków skaner
+        # liczy pełne hashe obu plików, więc wypadają one z drugiego indeksu)
+        self._recording_conflict_targets = [
+            (columns, where)
+            for name, columns, where in self._RECORDING_UNIQUE_INDEXES
+            if self._create_unique_index(cursor, name, columns, where)
+        ]
+        
+        self.conn.commit()
+    
+    def _create_unique_index(self, cursor, name: str, columns: str, where: str) -> bool:
+        """
+        Utwórz unikalny indeks częściowy na recordings, jeśli istniejące dane
+        go spełniają (nagrań nie usuwamy automatycznie).
+        
+        Returns:
+            True jeśli indeks istnieje
+        """
+        cursor.execute("""
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'index' AND name = ?
+        """, (name,))
+        if cursor.fetchone() is not None:
+            return True
+        
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM recordings
+                WHERE {where}
+                GROUP BY {columns}
+                HAVING COUNT(*) > 1
+            )
+        """)
+        duplicate_groups = cursor.fetchone()[0]
+        if duplicate_groups:
+            logger.warning(
+                f"[CallCryptorDB] {duplicate_groups} duplicated ({columns}) values - "
+                f"unique index {name} not created"
+            )
+            return False
+        
+        cursor.execute(f"CREATE UNIQUE INDEX {name} ON recordings({columns}) WHERE {where}")
+        return True
     
     def _create_tables(self):
         """Utwórz tabele jeśli nie istnieją"""
@@ -152,6 +309,7 @@ class CallCryptorDatabase:
                 file_path TEXT,
                 file_size INTEGER,                  -- W bajtach
                 file_hash TEXT,                     -- MD5/SHA256 dla deduplication
+                file_fingerprint TEXT,              -- Rozmiar + hash początku/środka/końca (file_hasher)
                 
                 -- Info z e-mail (jeśli applicable)
                 email_message_id TEXT,
@@ -164,6 +322,12 @@ class CallCryptorDatabase:
                 duration INTEGER,                   -- Czas trwania w sekundach
                 recording_date TEXT,
                 
+                -- Parametry audio (audio_metadata.AudioMetadataWorker, w tle po skanowaniu)
+                sample_rate INTEGER,
+                channels INTEGER,
+                audio_codec TEXT,
+                metadata_probed_at TEXT,            -- NULL = plik jeszcze nie sprawdzony
+                
                 -- Organizacja
                 tags TEXT,                          -- JSON: ["tag1", "tag2"]
                 notes TEXT,
@@ -264,6 +428,129 @@ class CallCryptorDatabase:
             ON recording_tags(user_id)
         """)
         
+        # Tagi nagrań jako wiersze - filtr po tagu bez parsowania JSON każdego nagrania.
+        # Źródłem prawdy pozostaje recordings.tags (synchronizacja z serwerem),
+        # tabelę uzupełniają triggery (_migrate_database)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS recording_tag_links (
+                recording_id TEXT NOT NULL,
+                tag_name TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                
+                PRIMARY KEY (recording_id, tag_name),
+                FOREIGN KEY (recording_id) REFERENCES recordings(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tag_links_user_tag
+            ON recording_tag_links(user_id, tag_name, recording_id)
+        """)
+        
+        # ==================== EMAIL SCANNED MESSAGES ====================
+        # Wiadomości już przetworzone przez EmailScanner (po Message-ID),
+        # żeby nie pobierać ponownie całych wiadomości z załącznikami
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS email_scanned_messages (
+                source_id TEXT NOT NULL,
+                message_key TEXT NOT NULL,
+                scanned_at TEXT NOT NULL,
+                
+                PRIMARY KEY (source_id, message_key),
+                FOREIGN KEY (source_id) REFERENCES recording_sources(id) ON DELETE CASCADE
+            )
+        """)
+        
+        # ==================== FOLDER SCAN MANIFEST ====================
+        # Pliki widziane przy ostatnim skanowaniu źródła folderowego - plik
+        # o niezmienionym rozmiarze, mtime i inode nie jest ponownie hashowany
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS folder_scan_manifest (
+                source_id TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                file_size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER,
+                file_fingerprint TEXT,                   -- Odcisk: rozmiar + hashe 3 bloków
+                file_hash TEXT,                          -- Pełny SHA-256 (jeśli był liczony)
+                scanned_at TEXT NOT NULL,
+                
+                PRIMARY KEY (source_id, file_path),
+                FOREIGN KEY (source_id) REFERENCES recording_sources(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        
+        # ==================== AUDIO METADATA CACHE ====================
+        # Parametry audio po hashu pliku (lub odcisku, gdy pełny hash nie był
+        # liczony) - ten sam plik w innym źródle nie jest sprawdzany ponownie
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS audio_metadata_cache (
+                cache_key TEXT PRIMARY KEY,
+                duration REAL,
+                sample_rate INTEGER,
+                channels INTEGER,
+                audio_codec TEXT,
+                probed_at TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        
+        # ==================== PROCESSING JOBS ====================
+        # Trwała kolejka transkrypcji i podsumowań (job_queue.JobQueueExecutor)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS processing_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                recording_id TEXT NOT NULL,
+                action TEXT NOT NULL CHECK(action IN ('transcribe', 'summarize')),
+                status TEXT NOT NULL DEFAULT 'queued'
+                    CHECK(status IN ('queued', 'running', 'completed', 'failed', 'cancelled')),
+                priority INTEGER NOT NULL DEFAULT 0,     -- Większa = wcześniej
+                provider TEXT,                           -- Limit równoległości per provider
+                depends_on INTEGER,                      -- Np. podsumowanie po transkrypcji
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                next_attempt_at TEXT,                    -- Backoff po błędzie (NULL = od razu)
+                force_refresh BOOLEAN NOT NULL DEFAULT 0, -- Pomiń cache wyników AI
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                
+                FOREIGN KEY (recording_id) REFERENCES recordings(id) ON DELETE CASCADE,
+                FOREIGN KEY (depends_on) REFERENCES processing_jobs(id) ON DELETE SET NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_jobs_pending
+            ON processing_jobs(user_id, priority DESC, id)
+            WHERE status IN ('queued', 'running')
+        """)
+        # Jedno aktywne zadanie danego typu na nagranie
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_unique
+            ON processing_jobs(recording_id, action)
+            WHERE status IN ('queued', 'running')
+        """)
+        
+        # ==================== AI RESULTS CACHE ====================
+        # Transkrypcje i podsumowania po treści pliku - duplikaty i ponowne
+        # importy tego samego nagrania nie wysyłają zapytań do AI
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ai_results_cache (
+                kind TEXT NOT NULL CHECK(kind IN ('transcription', 'summary')),
+                file_hash TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL DEFAULT '',
+                language TEXT NOT NULL DEFAULT '',
+                prompt_version INTEGER NOT NULL,
+                input_hash TEXT NOT NULL DEFAULT '',     -- Podsumowanie: hash transkrypcji
+                result_text TEXT NOT NULL,
+                result_tasks TEXT,                       -- JSON array (podsumowania)
+                created_at TEXT NOT NULL,
+                
+                PRIMARY KEY (kind, file_hash, provider, model, language, prompt_version, input_hash)
+            ) WITHOUT ROWID
+        """)
+        
         self.conn.commit()
         logger.info("[CallCryptorDB] Tables created successfully")
     
@@ -470,6 +757,7 @@ class CallCryptorDatabase:
                 'file_path': str (optional),
                 'file_size': int (optional),
                 'file_hash': str (optional),
+                'file_fingerprint': str (optional),
                 'contact_name': str (optional),
                 'contact_phone': str (optional),
                 'duration': int (optional),
@@ -487,8 +775,120 @@ class CallCryptorDatabase:
             ID utworzonego nagrania
         """
         recording_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
+        params = self._recording_insert_params(recording_id, recording_data, user_id, datetime.now().isoformat())
+        
+        cursor = self.conn.cursor()
+        cursor.execute(f"INSERT INTO recordings ({self._RECORDING_INSERT_COLUMNS}) VALUES ({self._RECORDING_INSERT_PLACEHOLDERS})", params)
+        
+        self.conn.commit()
+        logger.info(f"[CallCryptorDB] Recording added: {recording_id}")
+        return recording_id
+    
+    def add_recordings_bulk(
+        self,
+        recordings: List[Dict],
+        user_id: str,
+        chunk_size: int = 1000
+    ) -> List[str]:
+        """
+        Dodaj wiele nagrań (executemany, jedna transakcja na porcję).
+        
+        Nagranie, którego pełny hash użytkownik już ma (a bez pełnego hashu -
+        odcisk), jest pomijane przez ON CONFLICT na unikalnych indeksach
+        _RECORDING_UNIQUE_INDEXES. Indeks, którego migracja nie utworzyła
+        (baza z istniejącymi duplikatami), niczego nie pomija - wtedy
+        deduplikację zapewnia tylko wywołujący (get_dedupe_index). Nagrania
+        bez hashu i odcisku są zawsze dodawane. Inne naruszenie ograniczeń
+        (np. istniejące 'id') wycofuje porcję i zgłasza wyjątek.
         
+        Args:
+            recordings: Lista słowników jak w add_recording (opcjonalnie z 'id')
+            user_id: ID użytkownika
+            chunk_size: Liczba nagrań na transakcję
+            
+        Returns:
+            ID dodanych nagrań
+        """
+        now = datetime.now().isoformat()
+        added = []
+        cursor = self.conn.cursor()
+        on_conflict = "".join(
+            f" ON CONFLICT({columns}) WHERE {where} DO NOTHING"
+            for columns, where in self._recording_conflict_targets
+        )
+        
+        for start in range(0, len(recordings), chunk_size):
+            chunk = recordings[start:start + chunk_size]
+            params = [
+                self._recording_insert_params(data.get('id') or str(uuid.uuid4()), data, user_id, now)
+                for data in chunk
+            ]
+            ids = [row[0] for row in params]
+            try:
+                cursor.executemany(
+                    f"INSERT INTO recordings ({self._RECORDING_INSERT_COLUMNS}) "
+                    f"VALUES ({self._RECORDING_INSERT_PLACEHOLDERS}){on_conflict}",
+                    params
+                )
+                cursor.execute(
+                    "SELECT id FROM recordings WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(ids),)
+                )
+                inserted = {row[0] for row in cursor.fetchall()}
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            added.extend(recording_id for recording_id in ids if recording_id in inserted)
+        
+        logger.info(f"[CallCryptorDB] Recordings added: {len(added)}/{len(recordings)}")
+        return added
+    
+    # Unikalne indeksy częściowe deduplikacji: (nazwa, kolumny, warunek)
+    _RECORDING_UNIQUE_INDEXES = (
+        ('idx_recordings_user_hash_unique', 'user_id, file_hash',
+         'file_hash IS NOT NULL'),
+        ('idx_recordings_user_fingerprint_unique', 'user_id, file_fingerprint',
+         'file_hash IS NULL AND file_fingerprint IS NOT NULL'),
+    )
+    
+    # Klucz sortowania listy nagrań (nagrania bez daty rozmowy - data dodania)
+    _RECORDING_SORT_KEY = "COALESCE(recording_date, created_at)"
+    
+    # Kolumny wysyłane na serwer (RecordingsSyncManager) - zmiana którejkolwiek
+    # oznacza nagranie do synchronizacji (trg_recordings_change_tracking)
+    _SYNCED_RECORDING_COLUMNS = (
+        'source_id', 'file_name', 'file_hash', 'file_size',
+        'email_message_id', 'email_subject', 'email_sender',
+        'contact_name', 'contact_phone', 'duration', 'recording_date', 'tags', 'notes',
+        'transcription_status', 'transcription_text', 'transcription_language',
+        'transcription_confidence', 'transcription_date', 'transcription_error',
+        'ai_summary_text', 'ai_summary_status', 'ai_summary_date', 'ai_summary_error',
+        'ai_summary_tasks', 'ai_key_points', 'ai_action_items',
+        'note_id', 'task_id', 'is_favorite', 'favorited_at',
+        'is_archived', 'archived_at', 'archive_reason'
+    )
+    
+    # Kolumny listy nagrań - bez treści transkrypcji i podsumowań
+    _RECORDING_LIST_COLUMNS = """
+        id, user_id, source_id, file_name, file_path,
+        contact_name, contact_phone, duration, recording_date, created_at, tags,
+        transcription_status, ai_summary_status, ai_summary_tasks,
+        note_id, task_id, is_favorite, is_archived
+    """
+    
+    _RECORDING_INSERT_COLUMNS = """
+        id, user_id, source_id,
+        file_name, file_path, file_size, file_hash, file_fingerprint,
+        email_message_id, email_subject, email_sender,
+        contact_name, contact_phone, duration, recording_date,
+        tags, notes,
+        created_at, updated_at
+    """
+    _RECORDING_INSERT_PLACEHOLDERS = ", ".join(["?"] * 19)
+    
+    def _recording_insert_params(self, recording_id: str, recording_data: Dict, user_id: str, now: str) -> tuple:
+        """Wartości kolumn _RECORDING_INSERT_COLUMNS dla nowego nagrania"""
         # Użyj daty z recording_data jeśli istnieje, w przeciwnym razie użyj now
         recording_date = recording_data.get('recording_date') or now
         
@@ -497,17 +897,7 @@ class CallCryptorDatabase:
         if isinstance(tags, list):
             tags = json.dumps(tags)
         
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO recordings (
-                id, user_id, source_id,
-                file_name, file_path, file_size, file_hash,
-                email_message_id, email_subject, email_sender,
-                contact_name, contact_phone, duration, recording_date,
-                tags, notes,
-                created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        return (
             recording_id,
             user_id,
             recording_data['source_id'],
@@ -515,6 +905,7 @@ class CallCryptorDatabase:
             recording_data.get('file_path'),
             recording_data.get('file_size'),
             recording_data.get('file_hash'),
+            recording_data.get('file_fingerprint'),
             recording_data.get('email_message_id'),
             recording_data.get('email_subject'),
             recording_data.get('email_sender'),
@@ -526,11 +917,7 @@ class CallCryptorDatabase:
             recording_data.get('notes'),
             now,
             now
-        ))
-        
-        self.conn.commit()
-        logger.info(f"[CallCryptorDB] Recording added: {recording_id}")
-        return recording_id
+        )
     
     def get_recording(self, recording_id: str) -> Optional[Dict]:
         """Pobierz nagranie po ID"""
@@ -605,21 +992,121 @@ class CallCryptorDatabase:
         if not include_archived:
             query += " AND is_archived = 0"
         
+        # Filtruj po tagach jeśli podane
+        if tags:
+            query += f""" AND id IN (
+                SELECT recording_id FROM recording_tag_links
+                WHERE user_id = ? AND tag_name IN ({', '.join('?' * len(tags))})
+            )"""
+            params.extend([user_id, *tags])
+        
         query += " ORDER BY recording_date DESC"
         
         cursor.execute(query, params)
         rows = cursor.fetchall()
         
-        recordings = [self._parse_recording_row(row) for row in rows]
+        return [self._parse_recording_row(row) for row in rows]
+    
+    def query_recordings(
+        self,
+        user_id: str,
+        filters: Optional[Dict] = None,
+        limit: int = 200,
+        after: Optional[Tuple[str, str]] = None
+    ) -> List[Dict]:
+        """
+        Pobierz stronę listy nagrań (od najnowszych).
         
-        # Filtruj po tagach jeśli podane
-        if tags:
-            recordings = [
-                r for r in recordings
-                if r.get('tags') and any(tag in r['tags'] for tag in tags)
-            ]
+        Stronicowanie keyset: kolejna strona zaczyna się za ostatnim wierszem
+        poprzedniej, więc koszt nie rośnie z numerem strony (jak przy OFFSET).
         
-        return recordings
+        Args:
+            user_id: ID użytkownika
+            filters: Filtry (wszystkie opcjonalne): source_id, tag, favorite (bool),
+                archived (bool, domyślnie False; None = wszystkie), date_from,
+                date_to (ISO, date_to wyłącznie), transcription_status, text
+            limit: Liczba wierszy strony
+            after: (sort_key, id) ostatniego wiersza poprzedniej strony
+            
+        Returns:
+            Lista nagrań (_RECORDING_LIST_COLUMNS + 'sort_key'); tags jako tekst JSON
+        """
+        clauses, params = self._build_recording_filters(user_id, filters)
+        
+        if after is not None:
+            after_key, after_id = after
+            clauses.append(f"({self._RECORDING_SORT_KEY} < ? OR ({self._RECORDING_SORT_KEY} = ? AND id < ?))")
+            params.extend([after_key, after_key, after_id])
+        
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT {self._RECORDING_LIST_COLUMNS}, {self._RECORDING_SORT_KEY} AS sort_key
+            FROM recordings
+            WHERE {' AND '.join(clauses)}
+            ORDER BY sort_key DESC, id DESC
+            LIMIT ?
+        """, params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def count_recordings(self, user_id: str, filters: Optional[Dict] = None) -> int:
+        """Liczba nagrań spełniających filtry (jak w query_recordings)"""
+        clauses, params = self._build_recording_filters(user_id, filters)
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM recordings WHERE {' AND '.join(clauses)}", params)
+        return cursor.fetchone()[0]
+    
+    def _build_recording_filters(self, user_id: str, filters: Optional[Dict]) -> Tuple[List[str], List]:
+        """Klauzule WHERE dla query_recordings/count_recordings"""
+        filters = filters or {}
+        clauses = ["user_id = ?"]
+        params = [user_id]
+        
+        if filters.get('source_id'):
+            clauses.append("source_id = ?")
+            params.append(filters['source_id'])
+        
+        archived = filters.get('archived', False)
+        if archived is not None:
+            clauses.append("is_archived = ?")
+            params.append(1 if archived else 0)
+        
+        if filters.get('favorite') is not None:
+            # Stała w SQL (nie parametr) - pozwala użyć indeksu częściowego ulubionych
+            clauses.append("is_favorite = 1" if filters['favorite'] else "is_favorite = 0")
+        
+        if filters.get('tag'):
+            clauses.append("""
+                id IN (SELECT recording_id FROM recording_tag_links WHERE user_id = ? AND tag_name = ?)
+            """)
+            params.extend([user_id, filters['tag']])
+        
+        if filters.get('date_from'):
+            clauses.append(f"{self._RECORDING_SORT_KEY} >= ?")
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            clauses.append(f"{self._RECORDING_SORT_KEY} < ?")
+            params.append(filters['date_to'])
+        
+        if filters.get('transcription_status'):
+            clauses.append("transcription_status = ?")
+            params.append(filters['transcription_status'])
+        
+        if filters.get('text'):
+            pattern = f"%{filters['text']}%"
+            clauses.append("(contact_name LIKE ? OR contact_phone LIKE ? OR file_name LIKE ? OR email_subject LIKE ?)")
+            params.extend([pattern] * 4)
+        
+        return clauses, params
+    
+    def get_recording_tag_names(self, user_id: str) -> List[str]:
+        """Nazwy tagów przypisanych do nagrań użytkownika (alfabetycznie)"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT tag_name FROM recording_tag_links
+            WHERE user_id = ?
+            ORDER BY tag_name
+        """, (user_id,))
+        return [row[0] for row in cursor.fetchall()]
     
     def _parse_recording_row(self, row) -> Dict:
         """Pomocnicza funkcja do parsowania wiersza nagrania"""
@@ -741,6 +1228,460 @@ class CallCryptorDatabase:
         count = cursor.fetchone()[0]
         return count > 0
     
+    def get_dedupe_index(self, user_id: str) -> Tuple[Dict[str, List[Dict]], Dict[int, set]]:
+        """
+        Dane do deduplikacji nowych plików bez czytania ich w całości.
+        
+        Returns:
+            (odcisk -> [{'id', 'file_hash', 'file_path'}],
+             rozmiar -> {file_hash} dla nagrań bez odcisku, np. sprzed wprowadzenia odcisków)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id, file_size, file_hash, file_fingerprint, file_path
+            FROM recordings
+            WHERE user_id = ? AND (file_fingerprint IS NOT NULL OR file_hash IS NOT NULL)
+        """, (user_id,))
+        
+        by_fingerprint: Dict[str, List[Dict]] = {}
+        hashes_by_size: Dict[int, set] = {}
+        for row in cursor.fetchall():
+            if row['file_fingerprint']:
+                by_fingerprint.setdefault(row['file_fingerprint'], []).append({
+                    'id': row['id'],
+                    'file_hash': row['file_hash'],
+                    'file_path': row['file_path']
+                })
+            else:
+                hashes_by_size.setdefault(row['file_size'], set()).add(row['file_hash'])
+        return by_fingerprint, hashes_by_size
+    
+    def set_recording_hash(self, recording_id: str, file_hash: str):
+        """Uzupełnij pełny hash nagrania (liczony dopiero przy kolizji odcisków)"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("UPDATE recordings SET file_hash = ? WHERE id = ?", (file_hash, recording_id))
+            self.conn.commit()
+        except sqlite3.IntegrityError:
+            # Inne nagranie ma już ten hash - to duplikat sprzed wprowadzenia odcisków
+            self.conn.rollback()
+            logger.warning(f"[CallCryptorDB] Recording {recording_id} duplicates an existing file hash")
+    
+    def get_recordings_without_hash(self, user_id: str) -> List[Dict]:
+        """Nagrania zapisane tylko z odciskiem (pełny hash nie był potrzebny do deduplikacji)"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id, file_path FROM recordings
+            WHERE user_id = ? AND file_hash IS NULL AND file_fingerprint IS NOT NULL
+              AND file_path IS NOT NULL
+        """, (user_id,))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def update_recording_paths(self, user_id: str, moves: List[Tuple[str, str]]):
+        """
+        Zmień ścieżki nagrań po przeniesieniu plików (jedna transakcja).
+        
+        Args:
+            user_id: ID użytkownika
+            moves: Lista (stara ścieżka, nowa ścieżka)
+        """
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            UPDATE recordings SET file_path = ?, file_name = ?
+            WHERE user_id = ? AND file_path = ?
+        """, [(new_path, os.path.basename(new_path), user_id, old_path) for old_path, new_path in moves])
+        self.conn.commit()
+    
+    # ==================== PROCESSING JOBS ====================
+    
+    def enqueue_jobs(self, user_id: str, jobs: List[Dict]) -> List[int]:
+        """
+        Dodaj zadania do kolejki (jedna transakcja).
+        
+        Podsumowanie nagrania bez transkrypcji czeka na zadanie transkrypcji -
+        dodawane automatycznie, jeśli nie ma go w kolejce.
+        
+        Args:
+            user_id: ID użytkownika
+            jobs: Lista {'recording_id', 'action', 'priority' (opcjonalnie),
+                'provider' (opcjonalnie), 'force_refresh' (opcjonalnie - pomiń cache)}
+            
+        Returns:
+            ID zadań (istniejących, jeśli nagranie już miało aktywne zadanie)
+        """
+        now = datetime.now().isoformat()
+        cursor = self.conn.cursor()
+        
+        def active_job(recording_id: str, action: str) -> Optional[int]:
+            cursor.execute("""
+                SELECT id FROM processing_jobs
+                WHERE recording_id = ? AND action = ? AND status IN ('queued', 'running')
+            """, (recording_id, action))
+            row = cursor.fetchone()
+            return row['id'] if row else None
+        
+        def insert_job(job: Dict, depends_on: Optional[int] = None) -> int:
+            existing = active_job(job['recording_id'], job['action'])
+            if existing:
+                if job.get('force_refresh'):
+                    cursor.execute("UPDATE processing_jobs SET force_refresh = 1 WHERE id = ?", (existing,))
+                return existing
+            cursor.execute("""
+                INSERT INTO processing_jobs
+                    (user_id, recording_id, action, priority, provider, depends_on, force_refresh, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                user_id, job['recording_id'], job['action'], job.get('priority', 0),
+                job.get('provider'), depends_on, bool(job.get('force_refresh')), now
+            ))
+            return cursor.lastrowid
+        
+        try:
+            # Transkrypcje najpierw - podsumowania mogą od nich zależeć
+            ordered = sorted(jobs, key=lambda job: job['action'] != 'transcribe')
+            job_ids = []
+            for job in ordered:
+                depends_on = None
+                if job['action'] == 'summarize':
+                    cursor.execute("SELECT transcription_text FROM recordings WHERE id = ?", (job['recording_id'],))
+                    row = cursor.fetchone()
+                    if not row or not row['transcription_text']:
+                        depends_on = insert_job({
+                            'recording_id': job['recording_id'],
+                            'action': 'transcribe',
+                            'priority': job.get('priority', 0),
+                            'force_refresh': job.get('force_refresh')
+                        })
+                job_ids.append(insert_job(job, depends_on))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        
+        logger.info(f"[CallCryptorDB] Enqueued {len(job_ids)} processing jobs")
+        return job_ids
+    
+    def get_runnable_jobs(self, user_id: str, limit: int = 50) -> List[Dict]:
+        """
+        Zadania gotowe do uruchomienia: w kolejce, po czasie backoffu,
+        z ukończonym zadaniem, od którego zależą. Kolejność: priorytet, potem FIFO.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT j.*
+            FROM processing_jobs AS j
+            LEFT JOIN processing_jobs AS dep ON dep.id = j.depends_on
+            WHERE j.user_id = ? AND j.status = 'queued'
+              AND (j.next_attempt_at IS NULL OR j.next_attempt_at <= ?)
+              AND (j.depends_on IS NULL OR dep.status = 'completed')
+            ORDER BY j.priority DESC, j.id
+            LIMIT ?
+        """, (user_id, datetime.now().isoformat(), limit))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def claim_job(self, job_id: int) -> bool:
+        """Oznacz zadanie jako uruchomione (False, jeśli w międzyczasie zmieniło stan)"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE processing_jobs
+            SET status = 'running', attempts = attempts + 1, started_at = ?
+            WHERE id = ? AND status = 'queued'
+        """, (datetime.now().isoformat(), job_id))
+        self.conn.commit()
+        return cursor.rowcount == 1
+    
+    def finish_job(self, job_id: int, error: Optional[str] = None, retry_at: Optional[str] = None):
+        """
+        Zakończ próbę zadania.
+        
+        Args:
+            job_id: ID zadania
+            error: Opis błędu (None = sukces)
+            retry_at: Czas kolejnej próby (ISO); None przy błędzie = błąd ostateczny -
+                zadania zależne też kończą się błędem
+        """
+        now = datetime.now().isoformat()
+        cursor = self.conn.cursor()
+        if error is None:
+            cursor.execute("""
+                UPDATE processing_jobs
+                SET status = 'completed', last_error = NULL, finished_at = ?
+                WHERE id = ?
+            """, (now, job_id))
+        elif retry_at:
+            cursor.execute("""
+                UPDATE processing_jobs
+                SET status = 'queued', last_error = ?, next_attempt_at = ?
+                WHERE id = ?
+            """, (error, retry_at, job_id))
+        else:
+            cursor.execute("""
+                UPDATE processing_jobs
+                SET status = 'failed', last_error = ?, finished_at = ?
+                WHERE id = ?
+            """, (error, now, job_id))
+            cursor.execute("""
+                UPDATE processing_jobs
+                SET status = 'failed', last_error = ?, finished_at = ?
+                WHERE depends_on = ? AND status = 'queued'
+            """, (f"Dependency failed: {error}", now, job_id))
+        self.conn.commit()
+    
+    def requeue_interrupted_jobs(self, user_id: str) -> int:
+        """Zadania 'running' po zamknięciu/awarii aplikacji wracają do kolejki"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE processing_jobs SET status = 'queued'
+            WHERE user_id = ? AND status = 'running'
+        """, (user_id,))
+        self.conn.commit()
+        return cursor.rowcount
+    
+    def cancel_jobs(self, user_id: str) -> int:
+        """Anuluj zadania czekające w kolejce (uruchomione kończą się normalnie)"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE processing_jobs SET status = 'cancelled', finished_at = ?
+            WHERE user_id = ? AND status = 'queued'
+        """, (datetime.now().isoformat(), user_id))
+        self.conn.commit()
+        return cursor.rowcount
+    
+    def get_jobs(self, user_id: str, since: Optional[str] = None) -> List[Dict]:
+        """
+        Zadania do wyświetlenia: aktywne oraz zakończone od `since` (ISO).
+        
+        Returns:
+            Lista zadań z nazwą pliku nagrania ('file_name')
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT j.*, r.file_name
+            FROM processing_jobs AS j
+            JOIN recordings AS r ON r.id = j.recording_id
+            WHERE j.user_id = ?
+              AND (j.status IN ('queued', 'running') OR j.finished_at >= ?)
+            ORDER BY j.id
+        """, (user_id, since or datetime.now().isoformat()))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    # ==================== AI RESULTS CACHE ====================
+    
+    def get_cached_ai_result(self, kind: str, key: Dict) -> Optional[Dict]:
+        """
+        Pobierz zapisany wynik AI.
+        
+        Args:
+            kind: 'transcription' lub 'summary'
+            key: {'file_hash', 'provider', 'model', 'language', 'prompt_version',
+                'input_hash' (opcjonalnie)}
+            
+        Returns:
+            {'result_text', 'result_tasks', 'created_at'} lub None
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT result_text, result_tasks, created_at
+            FROM ai_results_cache
+            WHERE kind = ? AND file_hash = ? AND provider = ? AND model = ?
+              AND language = ? AND prompt_version = ? AND input_hash = ?
+        """, self._ai_cache_params(kind, key))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def save_ai_result(self, kind: str, key: Dict, result_text: str, result_tasks: Optional[str] = None):
+        """Zapisz wynik AI w cache (nadpisuje poprzedni - np. po wymuszonym odświeżeniu)"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO ai_results_cache
+                (kind, file_hash, provider, model, language, prompt_version, input_hash,
+                 result_text, result_tasks, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, self._ai_cache_params(kind, key) + (result_text, result_tasks, datetime.now().isoformat()))
+        self.conn.commit()
+    
+    @staticmethod
+    def _ai_cache_params(kind: str, key: Dict) -> tuple:
+        return (
+            kind, key['file_hash'], key['provider'], key.get('model') or '',
+            key.get('language') or '', key['prompt_version'], key.get('input_hash') or ''
+        )
+    
+    # ==================== AUDIO METADATA ====================
+    
+    def get_recordings_pending_metadata(self, user_id: str, limit: int = 500) -> List[Dict]:
+        """
+        Nagrania bez sprawdzonych parametrów audio.
+        
+        Returns:
+            Lista {'id', 'file_path', 'cache_key'} - cache_key to hash pliku albo odcisk
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id, file_path, COALESCE(file_hash, file_fingerprint) AS cache_key
+            FROM recordings
+            WHERE user_id = ? AND metadata_probed_at IS NULL
+            LIMIT ?
+        """, (user_id, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def apply_cached_audio_metadata(self, user_id: str) -> int:
+        """
+        Uzupełnij parametry audio nagrań, których plik jest już w audio_metadata_cache.
+        
+        Returns:
+            Liczba uzupełnionych nagrań
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE recordings
+            SET duration = CAST(ROUND(c.duration) AS INTEGER),
+                sample_rate = c.sample_rate,
+                channels = c.channels,
+                audio_codec = c.audio_codec,
+                metadata_probed_at = c.probed_at
+            FROM audio_metadata_cache AS c
+            WHERE recordings.user_id = ?
+              AND recordings.metadata_probed_at IS NULL
+              AND c.cache_key = COALESCE(recordings.file_hash, recordings.file_fingerprint)
+        """, (user_id,))
+        updated = cursor.rowcount
+        self.conn.commit()
+        return updated
+    
+    def save_audio_metadata(self, results: List[Tuple[str, Optional[str], Optional[Dict]]]):
+        """
+        Zapisz parametry audio partii nagrań (jedna transakcja).
+        
+        Args:
+            results: Lista (recording_id, cache_key, metadata) - metadata to
+                {'duration', 'sample_rate', 'channels', 'codec'} albo None, gdy
+                pliku nie dało się odczytać (nagranie nie będzie sprawdzane ponownie)
+        """
+        now = datetime.now().isoformat()
+        cached = []
+        updates = []
+        for recording_id, cache_key, metadata in results:
+            metadata = metadata or {}
+            duration = metadata.get('duration')
+            values = (metadata.get('sample_rate'), metadata.get('channels'), metadata.get('codec'))
+            if cache_key and metadata:
+                cached.append((cache_key, duration, *values, now))
+            updates.append((
+                round(duration) if duration is not None else None,
+                *values, now, recording_id
+            ))
+        
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO audio_metadata_cache
+                    (cache_key, duration, sample_rate, channels, audio_codec, probed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, cached)
+            cursor.executemany("""
+                UPDATE recordings
+                SET duration = COALESCE(?, duration),
+                    sample_rate = ?, channels = ?, audio_codec = ?,
+                    metadata_probed_at = ?
+                WHERE id = ?
+            """, updates)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+    
+    def is_email_message_scanned(self, source_id: str, message_key: str) -> bool:
+        """Sprawdź czy wiadomość email była już przetworzona dla źródła"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT 1 FROM email_scanned_messages
+            WHERE source_id = ? AND message_key = ?
+        """, (source_id, message_key))
+        return cursor.fetchone() is not None
+    
+    def mark_email_messages_scanned(self, source_id: str, message_keys: List[str]):
+        """Zapamiętaj przetworzone wiadomości email (jedna transakcja)"""
+        now = datetime.now().isoformat()
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            INSERT OR IGNORE INTO email_scanned_messages (source_id, message_key, scanned_at)
+            VALUES (?, ?, ?)
+        """, [(source_id, message_key, now) for message_key in message_keys])
+        self.conn.commit()
+    
+    # ==================== FOLDER SCAN MANIFEST ====================
+    
+    def get_scan_manifest(self, source_id: str) -> Dict[str, Dict]:
+        """
+        Pobierz manifest skanowania źródła.
+        
+        Returns:
+            Słownik: file_path -> {'file_size', 'mtime_ns', 'inode', 'file_fingerprint', 'file_hash'}
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT file_path, file_size, mtime_ns, inode, file_fingerprint, file_hash
+            FROM folder_scan_manifest
+            WHERE source_id = ?
+        """, (source_id,))
+        
+        return {
+            row['file_path']: {
+                'file_size': row['file_size'],
+                'mtime_ns': row['mtime_ns'],
+                'inode': row['inode'],
+                'file_fingerprint': row['file_fingerprint'],
+                'file_hash': row['file_hash']
+            }
+            for row in cursor.fetchall()
+        }
+    
+    def update_scan_manifest(
+        self,
+        source_id: str,
+        entries: List[Dict],
+        removed_paths: Optional[List[str]] = None
+    ):
+        """
+        Zapisz zmiany manifestu po skanowaniu (jedna transakcja).
+        
+        Args:
+            source_id: ID źródła
+            entries: Nowe lub zmienione pliki: {'file_path', 'file_size', 'mtime_ns', 'inode',
+                'file_fingerprint', 'file_hash'}
+            removed_paths: Ścieżki plików, których już nie ma w folderze
+        """
+        now = datetime.now().isoformat()
+        cursor = self.conn.cursor()
+        
+        if removed_paths:
+            cursor.executemany("""
+                DELETE FROM folder_scan_manifest
+                WHERE source_id = ? AND file_path = ?
+            """, [(source_id, path) for path in removed_paths])
+        
+        cursor.executemany("""
+            INSERT OR REPLACE INTO folder_scan_manifest (
+                source_id, file_path, file_size, mtime_ns, inode,
+                file_fingerprint, file_hash, scanned_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                source_id,
+                entry['file_path'],
+                entry['file_size'],
+                entry['mtime_ns'],
+                entry.get('inode'),
+                entry['file_fingerprint'],
+                entry.get('file_hash'),
+                now
+            )
+            for entry in entries
+        ])
+        
+        self.conn.commit()
+    
     # ==================== TAGS: CRUD ====================
     
     def add_tag(self, tag_data: Dict, user_id: str) -> str:
@@ -860,6 +1801,124 @@ class CallCryptorDatabase:
         """, (datetime.now().isoformat(), server_id, source_id))
         self.conn.commit()
     
+    def get_dirty_recordings(self, user_id: str, limit: int = 100, after: tuple = None) -> List[Dict]:
+        """
+        Pobierz porcję nagrań zmienionych od ostatniej potwierdzonej synchronizacji.
+        
+        Args:
+            user_id: ID użytkownika
+            limit: Maksymalna liczba nagrań
+            after: (updated_at, id) ostatniego nagrania z poprzedniej porcji
+            
+        Returns:
+            Lista surowych wierszy (pola JSON jako tekst), od najstarszej zmiany
+        """
+        params = [user_id]
+        keyset = ""
+        if after is not None:
+            keyset = "AND (updated_at > ? OR (updated_at = ? AND id > ?))"
+            params.extend([after[0], after[0], after[1]])
+        params.append(limit)
+        
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT * FROM recordings
+            WHERE user_id = ? AND is_synced = 0 {keyset}
+            ORDER BY updated_at, id
+            LIMIT ?
+        """, params)
+        
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def mark_recordings_synced(self, versions: Dict[str, int]) -> int:
+        """
+        Oznacz wysłane nagrania jako zsynchronizowane.
+        
+        Nagranie zmienione w trakcie wysyłki ma już wyższą wersję i pozostaje
+        brudne do następnej synchronizacji.
+        
+        Args:
+            versions: {recording_id: wysłana wersja}
+            
+        Returns:
+            Liczba oznaczonych nagrań
+        """
+        synced_at = datetime.now().isoformat()
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            UPDATE recordings
+            SET is_synced = 1, synced_at = ?
+            WHERE id = ? AND version = ?
+        """, [(synced_at, recording_id, version) for recording_id, version in versions.items()])
+        self.conn.commit()
+        
+        return cursor.rowcount
+    
+    def mark_sources_synced(self, source_ids: List[str]):
+        """Oznacz wysłane źródła jako zsynchronizowane (bez zmiany server_id)"""
+        synced_at = datetime.now().isoformat()
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            UPDATE recording_sources
+            SET is_synced = 1, synced_at = ?
+            WHERE id = ?
+        """, [(synced_at, source_id) for source_id in source_ids])
+        self.conn.commit()
+    
+    def get_recordings_sync_state(self, recording_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Pobierz stan synchronizacji nagrań (bez parsowania pól JSON).
+        
+        Returns:
+            {recording_id: {'updated_at', 'version', 'is_synced'}}
+        """
+        state = {}
+        cursor = self.conn.cursor()
+        # Porcje poniżej limitu parametrów SQLite
+        for start in range(0, len(recording_ids), 500):
+            chunk = recording_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(f"""
+                SELECT id, updated_at, version, is_synced FROM recordings
+                WHERE id IN ({placeholders})
+            """, chunk)
+            for row in cursor.fetchall():
+                state[row['id']] = dict(row)
+        
+        return state
+    
+    def apply_server_recording(self, recording_id: str, fields: Dict, updated_at: str, version: int):
+        """
+        Zapisz wersję nagrania z serwera (Last-Write-Wins wygrał serwer).
+        
+        Ustawia synced_at, więc zmiana nie jest traktowana jako lokalna
+        i nie wraca na serwer przy kolejnej synchronizacji.
+        
+        Args:
+            recording_id: ID nagrania
+            fields: Kolumny lokalne do nadpisania (tylko _SYNCED_RECORDING_COLUMNS)
+            updated_at: Znacznik czasu zmiany z serwera
+            version: Wersja z serwera
+        """
+        updates = {
+            column: value for column, value in fields.items()
+            if column in self._SYNCED_RECORDING_COLUMNS
+        }
+        updates.update({
+            'updated_at': updated_at,
+            'version': version,
+            'is_synced': 1,
+            'synced_at': datetime.now().isoformat()
+        })
+        
+        assignments = ', '.join(f"{column} = ?" for column in updates)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"UPDATE recordings SET {assignments} WHERE id = ?",
+            list(updates.values()) + [recording_id]
+        )
+        self.conn.commit()
+    
     def mark_recording_synced(self, recording_id: str, server_id: str = None):
         """Oznacz nagranie jako zsynchronizowane"""
         cursor = self.conn.cursor()
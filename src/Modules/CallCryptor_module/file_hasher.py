@@ -0,0 +1,163 @@
+"""
+CallCryptor File Hasher
+=======================
+
+Dwuetapowe hashowanie nagrań dla deduplikacji.
+
+Features:
+- Etap 1: tani odcisk pliku (rozmiar + SHA-256 bloku z początku, środka i końca)
+- Etap 2: pełny SHA-256 tylko dla plików, których odcisk koliduje z innym
+  nagraniem (lub gdy wymagana jest kanoniczna tożsamość pliku)
+- Ograniczona pula wątków (hashlib zwalnia GIL - hashowanie skaluje się na rdzenie)
+- Postęp i przepustowość (MB/s) raportowane przez callback skanera
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+FULL_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def fingerprint_bytes(data: bytes, block_size: int = FINGERPRINT_BLOCK_SIZE) -> str:
+    """Odcisk danych w pamięci - ten sam wynik co fingerprint_file dla pliku o tej treści"""
+    size = len(data)
+    if size <= 3 * block_size:
+        sample = data
+    else:
+        middle = (size - block_size) // 2
+        sample = data[:block_size] + data[middle:middle + block_size] + data[-block_size:]
+    return f"{size}:{hashlib.sha256(sample).hexdigest()}"
+
+
+def fingerprint_file(
+    file_path: str,
+    size: Optional[int] = None,
+    block_size: int = FINGERPRINT_BLOCK_SIZE
+) -> Tuple[str, Optional[str], int]:
+    """
+    Odcisk pliku: rozmiar + hash bloków z początku, środka i końca.
+
+    Returns:
+        (odcisk, pełny hash albo None, przeczytane bajty) - mały plik jest
+        czytany w całości, więc od razu dostaje też pełny SHA-256
+    """
+    if size is None:
+        size = os.path.getsize(file_path)
+
+    with open(file_path, 'rb') as f:
+        if size <= 3 * block_size:
+            data = f.read()
+            return fingerprint_bytes(data, block_size), hashlib.sha256(data).hexdigest(), len(data)
+
+        sha256 = hashlib.sha256()
+        read = 0
+        for offset in (0, (size - block_size) // 2, size - block_size):
+            f.seek(offset)
+            block = f.read(block_size)
+            sha256.update(block)
+            read += len(block)
+
+    return f"{size}:{sha256.hexdigest()}", None, read
+
+
+def full_file_hash(file_path: str) -> str:
+    """Pełny SHA-256 pliku (czytany w kawałkach)"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(FULL_HASH_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class FileHasher:
+    """Hashowanie plików w ograniczonej puli wątków"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: Liczba wątków (domyślnie 2 x liczba rdzeni, maks. 8)
+        """
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 2) * 2)
+
+    def fingerprint_files(
+        self,
+        files: Dict[str, int],
+        progress_callback: Optional[Callable[[int, int, str], None]] = None,
+        errors: Optional[List[str]] = None
+    ) -> Dict[str, Tuple[str, Optional[str]]]:
+        """
+        Etap 1: odciski plików.
+
+        Args:
+            files: Ścieżka -> rozmiar w bajtach
+            progress_callback: Callback(current, total, opis)
+            errors: Lista, do której trafiają błędy odczytu
+
+        Returns:
+            Ścieżka -> (odcisk, pełny hash dla małych plików albo None)
+        """
+        def work(path: str):
+            fingerprint, file_hash, read = fingerprint_file(path, files[path])
+            return (fingerprint, file_hash), read
+
+        return self._run(work, list(files), progress_callback, errors, "fingerprint")
+
+    def full_hashes(
+        self,
+        paths: List[str],
+        progress_callback: Optional[Callable[[int, int, str], None]] = None,
+        errors: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """Etap 2: pełne SHA-256 wskazanych plików"""
+        def work(path: str):
+            return full_file_hash(path), os.path.getsize(path)
+
+        return self._run(work, paths, progress_callback, errors, "full hash")
+
+    def _run(
+        self,
+        work: Callable,
+        paths: List[str],
+        progress_callback: Optional[Callable[[int, int, str], None]],
+        errors: Optional[List[str]],
+        stage: str
+    ) -> Dict:
+        results = {}
+        if not paths:
+            return results
+
+        started = time.monotonic()
+        total_bytes = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="callcryptor-hash") as executor:
+            futures = {executor.submit(work, path): path for path in paths}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    result, read = future.result()
+                    results[path] = result
+                    total_bytes += read
+                except Exception as e:
+                    error_msg = f"Błąd hashowania {path}: {e}"
+                    logger.error(f"[FileHasher] {error_msg}")
+                    if errors is not None:
+                        errors.append(error_msg)
+
+                if progress_callback:
+                    elapsed = max(time.monotonic() - started, 1e-6)
+                    throughput = total_bytes / elapsed / (1024 * 1024)
+                    progress_callback(done, len(paths), f"{os.path.basename(path)} ({throughput:.1f} MB/s)")
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"[FileHasher] {stage}: {len(results)}/{len(paths)} files, "
+            f"{total_bytes / (1024 * 1024):.1f} MB in {elapsed:.2f}s ({self.max_workers} workers)"
+        )
+        return results
@@ -0,0 +1,346 @@
+"""
+CallCryptor Folder Watcher
+==========================
+
+Obserwacja źródeł folderowych - nowe nagrania pojawiają się bez ręcznego skanowania.
+
+Features:
+- QFileSystemWatcher na katalogach źródła (inotify na Linuksie,
+  ReadDirectoryChangesW na Windows, kqueue/FSEvents na macOS)
+- Debounce zdarzeń i wykrywanie końca zapisu (stały rozmiar i mtime)
+- Do bazy trafiają tylko zmienione ścieżki (FolderScanner.scan_paths)
+- Duże drzewa (ponad MAX_WATCHED_DIRS katalogów): okresowe porównanie z manifestem
+- Skanowanie w wątku roboczym z własnym połączeniem do bazy
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QThread, QTimer, pyqtSignal
+from loguru import logger
+
+
+MAX_WATCHED_DIRS = 256          # Powyżej - okresowy skan zamiast obserwacji
+DEBOUNCE_MS = 1000              # Zbieranie serii zdarzeń katalogu
+STABILITY_CHECK_MS = 1000       # Co ile sprawdzać rozmiar zapisywanych plików
+STABLE_FOR_SECONDS = 2.0        # Plik bez zmian tak długo uznajemy za zapisany
+FALLBACK_SCAN_INTERVAL_MS = 5 * 60 * 1000
+
+
+def _source_extensions(source: Dict) -> List[str]:
+    """Rozszerzenia źródła (lista albo JSON z bazy), bez kropki"""
+    extensions = source.get('file_extensions') or ["mp3"]
+    if isinstance(extensions, str):
+        extensions = json.loads(extensions)
+    return [ext.lower().strip('.') for ext in extensions]
+
+
+class WatchScanWorker(QThread):
+    """Skan wskazanych ścieżek (albo całego źródła) w tle"""
+
+    scan_finished = pyqtSignal(str, dict)  # source_id, wyniki skanera
+
+    def __init__(self, db_path: str, source: Dict, paths: Optional[List[str]] = None):
+        """
+        Args:
+            db_path: Ścieżka do bazy CallCryptor
+            source: Źródło folderowe z bazy
+            paths: Zmienione ścieżki; None = pełne porównanie z manifestem
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.source = source
+        self.paths = paths
+
+    def run(self):
+        # Połączenie z bazą tworzone w wątku roboczym
+        from .callcryptor_database import CallCryptorDatabase
+        from .source_scanner import FolderScanner
+
+        db_manager = CallCryptorDatabase(self.db_path)
+        scanner = FolderScanner(db_manager)
+        source_id = self.source['id']
+        extensions = _source_extensions(self.source)
+        try:
+            if self.paths is None:
+                results = scanner.scan_folder(
+                    source_id=source_id,
+                    folder_path=self.source['folder_path'],
+                    extensions=extensions,
+                    max_depth=self.source.get('scan_depth', 1)
+                )
+            else:
+                results = scanner.scan_paths(source_id, self.paths, extensions)
+        except Exception as e:
+            logger.error(f"[FolderWatcher] Scan failed for {source_id}: {e}")
+            results = {'found': 0, 'added': 0, 'duplicates': 0, 'removed': 0, 'errors': [str(e)]}
+        finally:
+            db_manager.close()
+
+        self.scan_finished.emit(source_id, results)
+
+
+class FolderWatcher(QObject):
+    """Obserwator źródeł folderowych użytkownika"""
+
+    recordings_changed = pyqtSignal(str, dict)  # source_id, wyniki skanera
+
+    def __init__(self, db_path: str, parent: Optional[QObject] = None):
+        """
+        Args:
+            db_path: Ścieżka do bazy CallCryptor
+            parent: Rodzic Qt (np. CallCryptorView)
+        """
+        super().__init__(parent)
+        self.db_path = db_path
+
+        self.sources: Dict[str, Dict] = {}             # source_id -> źródło
+        self.dir_sources: Dict[str, str] = {}          # katalog -> source_id
+        self.fallback_sources: Set[str] = set()        # źródła skanowane okresowo
+        self.known: Dict[str, tuple] = {}              # plik -> (rozmiar, mtime_ns)
+        self.dirty_dirs: Set[str] = set()
+        self.writing: Dict[str, tuple] = {}            # plik -> (rozmiar, mtime_ns, od kiedy bez zmian)
+        self.queued: Dict[str, Set[str]] = {}          # source_id -> ścieżki czekające na skan
+        self.workers: Dict[str, WatchScanWorker] = {}
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self._process_dirty_dirs)
+
+        self.stability_timer = QTimer(self)
+        self.stability_timer.setInterval(STABILITY_CHECK_MS)
+        self.stability_timer.timeout.connect(self._check_stability)
+
+        self.fallback_timer = QTimer(self)
+        self.fallback_timer.setInterval(FALLBACK_SCAN_INTERVAL_MS)
+        self.fallback_timer.timeout.connect(self._run_fallback_scans)
+
+    # ==================== ŹRÓDŁA ====================
+
+    def set_sources(self, sources: List[Dict], db_manager):
+        """
+        Ustaw obserwowane źródła (wywoływane przy każdym przeładowaniu listy źródeł).
+
+        Args:
+            sources: Źródła użytkownika (tylko folderowe są obserwowane)
+            db_manager: CallCryptorDatabase - manifest ostatniego skanu to stan początkowy plików
+        """
+        folder_sources = {
+            source['id']: source for source in sources
+            if source.get('source_type') == 'folder' and source.get('folder_path')
+            and os.path.isdir(source['folder_path'])
+        }
+        if {
+            source_id: (source['folder_path'], source.get('scan_depth'), source.get('file_extensions'))
+            for source_id, source in folder_sources.items()
+        } == {
+            source_id: (source['folder_path'], source.get('scan_depth'), source.get('file_extensions'))
+            for source_id, source in self.sources.items()
+        }:
+            return
+
+        self.stop_watching()
+        self.sources = folder_sources
+
+        for source_id, source in folder_sources.items():
+            for file_path, entry in db_manager.get_scan_manifest(source_id).items():
+                self.known[os.path.normpath(file_path)] = (entry['file_size'], entry['mtime_ns'])
+
+            directories = self._source_directories(source)
+            if directories is None:
+                self.fallback_sources.add(source_id)
+                logger.info(
+                    f"[FolderWatcher] {source['folder_path']}: more than {MAX_WATCHED_DIRS} "
+                    "directories - periodic scan instead of watching"
+                )
+                continue
+
+            for directory in directories:
+                self.dir_sources[directory] = source_id
+            if directories:
+                self.watcher.addPaths(directories)
+
+        if self.fallback_sources:
+            self.fallback_timer.start()
+        logger.info(
+            f"[FolderWatcher] Watching {len(self.dir_sources)} directories, "
+            f"{len(self.fallback_sources)} sources in periodic mode"
+        )
+
+    def stop_watching(self):
+        """Przestań obserwować (skany w toku kończą się normalnie)"""
+        directories = self.watcher.directories()
+        if directories:
+            self.watcher.removePaths(directories)
+        self.debounce_timer.stop()
+        self.stability_timer.stop()
+        self.fallback_timer.stop()
+        self.sources.clear()
+        self.dir_sources.clear()
+        self.fallback_sources.clear()
+        self.known.clear()
+        self.dirty_dirs.clear()
+        self.writing.clear()
+        self.queued.clear()
+
+    def stop(self):
+        """Zatrzymaj obserwację i poczekaj na skany w toku (przy zamykaniu widoku)"""
+        self.stop_watching()
+        for worker in list(self.workers.values()):
+            worker.wait()
+
+    def _source_directories(self, source: Dict) -> Optional[List[str]]:
+        """Katalogi do obserwacji (do scan_depth) albo None, gdy jest ich za dużo"""
+        root = os.path.normpath(source['folder_path'])
+        max_depth = source.get('scan_depth', 1)
+        directories = []
+        pending = [(root, 0)]
+
+        while pending:
+            directory, depth = pending.pop()
+            directories.append(directory)
+            if len(directories) > MAX_WATCHED_DIRS:
+                return None
+            if depth >= max_depth:
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    pending.extend((entry.path, depth + 1) for entry in entries if entry.is_dir())
+            except OSError as e:
+                logger.warning(f"[FolderWatcher] Cannot list {directory}: {e}")
+
+        return directories
+
+    def _directory_depth(self, source: Dict, directory: str) -> int:
+        relative = os.path.relpath(directory, os.path.normpath(source['folder_path']))
+        return 0 if relative == '.' else relative.count(os.sep) + 1
+
+    # ==================== ZDARZENIA ====================
+
+    def _on_directory_changed(self, directory: str):
+        """Zdarzenie katalogu - zbieraj serię zdarzeń (debounce)"""
+        self.dirty_dirs.add(os.path.normpath(directory))
+        self.debounce_timer.start()
+
+    def _process_dirty_dirs(self):
+        """Porównaj zmienione katalogi ze znanym stanem plików"""
+        dirty_dirs, self.dirty_dirs = self.dirty_dirs, set()
+        now = time.monotonic()
+
+        for directory in dirty_dirs:
+            source_id = self.dir_sources.get(directory)
+            source = self.sources.get(source_id)
+            if not source:
+                continue
+
+            extensions = set(_source_extensions(source))
+            depth = self._directory_depth(source, directory)
+            present = set()
+
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                # Nowy podkatalog w zasięgu scan_depth
+                                if depth < source.get('scan_depth', 1) and entry.path not in self.dir_sources:
+                                    self.dir_sources[entry.path] = source_id
+                                    self.watcher.addPath(entry.path)
+                                    self._on_directory_changed(entry.path)
+                                continue
+                            if os.path.splitext(entry.name)[1].lower().strip('.') not in extensions:
+                                continue
+                            file_stat = entry.stat()
+                        except OSError:
+                            continue
+
+                        present.add(entry.path)
+                        state = (file_stat.st_size, file_stat.st_mtime_ns)
+                        if self.known.get(entry.path) != state and entry.path not in self.writing:
+                            self.writing[entry.path] = (*state, now)
+            except OSError:
+                # Katalog usunięty - jego pliki znikną z manifestu
+                self.watcher.removePath(directory)
+                self.dir_sources.pop(directory, None)
+
+            # Pliki, które zniknęły z katalogu
+            for file_path in [path for path in self.known if os.path.dirname(path) == directory]:
+                if file_path not in present:
+                    del self.known[file_path]
+                    self.writing.pop(file_path, None)
+                    self._queue(source_id, file_path)
+
+        if self.writing and not self.stability_timer.isActive():
+            self.stability_timer.start()
+        self._flush_queues()
+
+    def _check_stability(self):
+        """Plik jest gotowy, gdy rozmiar i mtime nie zmieniły się przez STABLE_FOR_SECONDS"""
+        now = time.monotonic()
+
+        for file_path, (size, mtime_ns, stable_since) in list(self.writing.items()):
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                del self.writing[file_path]
+                continue
+
+            state = (file_stat.st_size, file_stat.st_mtime_ns)
+            if state != (size, mtime_ns):
+                self.writing[file_path] = (*state, now)
+            elif now - stable_since >= STABLE_FOR_SECONDS:
+                del self.writing[file_path]
+                self.known[file_path] = state
+                source_id = self.dir_sources.get(os.path.dirname(file_path))
+                if source_id:
+                    self._queue(source_id, file_path)
+
+        if not self.writing:
+            self.stability_timer.stop()
+        self._flush_queues()
+
+    # ==================== SKANOWANIE ====================
+
+    def _queue(self, source_id: str, file_path: str):
+        self.queued.setdefault(source_id, set()).add(file_path)
+
+    def _flush_queues(self):
+        """Uruchom skan zebranych ścieżek (jeden wątek na źródło naraz)"""
+        for source_id in list(self.queued):
+            if source_id in self.workers or source_id not in self.sources:
+                continue
+            paths = self.queued.pop(source_id)
+            if paths:
+                self._start_worker(source_id, sorted(paths))
+
+    def _run_fallback_scans(self):
+        for source_id in self.fallback_sources:
+            if source_id not in self.workers:
+                self._start_worker(source_id, None)
+
+    def _start_worker(self, source_id: str, paths: Optional[List[str]]):
+        worker = WatchScanWorker(self.db_path, self.sources[source_id], paths)
+        worker.scan_finished.connect(self._on_scan_finished)
+        self.workers[source_id] = worker
+        worker.start()
+
+    def _on_scan_finished(self, source_id: str, results: dict):
+        worker = self.workers.pop(source_id, None)
+        if worker:
+            worker.deleteLater()
+
+        if results.get('added') or results.get('removed'):
+            logger.info(
+                f"[FolderWatcher] {source_id}: +{results.get('added', 0)} recordings, "
+                f"{results.get('removed', 0)} files removed"
+            )
+            self.recordings_changed.emit(source_id, results)
+
+        # Zmiany zebrane w trakcie skanu
+        self._flush_queues()
@@ -0,0 +1,435 @@
+"""
+CallCryptor Job Queue
+=====================
+
+Trwała kolejka transkrypcji i podsumowań AI.
+
+Features:
+- Zadania w tabeli processing_jobs - przetrwają zamknięcie dialogu i restart aplikacji
+- Priorytety, ponowienia z rosnącym odstępem (backoff), błędy ostateczne bez ponowień
+- Limity równoległości: łączny i per provider AI (semafor zapytań providera
+  wspólny z częściami długich transkrypcji - ai_logic.provider_request_slots)
+- Zależności: podsumowanie czeka na transkrypcję tego samego nagrania
+- Cache wyników po hashu pliku, providerze, modelu, języku i wersji promptu
+  (ai_results_cache) - duplikaty nie są wysyłane do AI ponownie, chyba że
+  zadanie ma force_refresh
+- Dialog kolejki (queue_dialog.py) jest tylko podglądem - zadania wykonuje
+  JobQueueExecutor należący do widoku CallCryptor
+"""
+
+import hashlib
+import json
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from loguru import logger
+
+
+MAX_CONCURRENT_JOBS = 6
+STOP_TIMEOUT_SECONDS = 5.0           # Czekanie na uruchomione zadania przy zamykaniu
+DISPATCH_INTERVAL_MS = 2000          # Sprawdzanie zadań po backoffie
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 15 * 60
+
+TRANSCRIPTION_LANGUAGE = "pl"
+# Zmiana promptu (lub sposobu składania transkrypcji) = nowa wersja,
+# wcześniejsze wyniki w cache przestają pasować
+TRANSCRIPTION_PROMPT_VERSION = 1
+SUMMARY_PROMPT_VERSION = 1
+
+SUMMARY_PROMPT = """Przeanalizuj poniższą transkrypcję rozmowy telefonicznej i utwórz jej podsumowanie.
+
+Transkrypcja:
+{transcription_text}
+
+Proszę o:
+1. Krótkie streszczenie (2-3 zdania)
+2. Listę kluczowych punktów
+3. Wyodrębnione zadania do wykonania (jeśli są)
+4. Ewentualne terminy lub ważne daty
+
+Format odpowiedzi:
+**Podsumowanie:**
+[streszczenie]
+
+**Kluczowe punkty:**
+- [punkt 1]
+- [punkt 2]
+
+**Zadania do wykonania:**
+- [zadanie 1]
+- [zadanie 2]
+
+**Terminy:**
+- [termin 1]
+"""
+
+
+class PermanentJobError(Exception):
+    """Błąd, którego ponowienie nie naprawi (brak klucza API, pliku, transkrypcji)"""
+
+
+def resolve_provider(action: str, settings: Dict) -> Optional[str]:
+    """
+    Provider dla zadania: transkrypcja - Gemini albo OpenAI (obsługują audio),
+    podsumowanie - aktywny provider z ustawień AI.
+    """
+    api_keys = settings.get('api_keys', {})
+    if action == 'transcribe':
+        if api_keys.get('gemini'):
+            return 'gemini'
+        if api_keys.get('openai'):
+            return 'openai'
+        return None
+    return settings.get('provider')
+
+
+def _create_ai_manager(provider_key: Optional[str], settings: Dict):
+    """Osobny AIManager zadania - równoległe zadania nie przestawiają wspólnej instancji"""
+    from ...Modules.AI_module.ai_logic import AIProvider, create_ai_manager
+
+    api_key = settings.get('api_keys', {}).get(provider_key) if provider_key else None
+    if not api_key:
+        raise PermanentJobError(f"No API key configured for provider: {provider_key}")
+    try:
+        provider = AIProvider(provider_key)
+    except ValueError:
+        raise PermanentJobError(f"Unknown provider: {provider_key}")
+    return create_ai_manager(provider, api_key, settings.get('models', {}).get(provider_key))
+
+
+def _recording_file_hash(db_manager, recording: Dict) -> Optional[str]:
+    """Pełny hash pliku nagrania - liczony i zapisywany przy pierwszym użyciu"""
+    if recording.get('file_hash'):
+        return recording['file_hash']
+
+    file_path = recording.get('file_path')
+    if not file_path or not Path(file_path).exists():
+        return None
+
+    from .file_hasher import full_file_hash
+    file_hash = full_file_hash(file_path)
+    db_manager.set_recording_hash(recording['id'], file_hash)
+    return file_hash
+
+
+def _cache_key(file_hash: str, provider_key: Optional[str], settings: Dict, prompt_version: int, input_hash: str = '') -> Dict:
+    return {
+        'file_hash': file_hash,
+        'provider': provider_key,
+        'model': settings.get('models', {}).get(provider_key),
+        'language': TRANSCRIPTION_LANGUAGE,
+        'prompt_version': prompt_version,
+        'input_hash': input_hash
+    }
+
+
+def run_transcription(db_manager, recording_id: str, provider_key: Optional[str], settings: Dict, force_refresh: bool = False):
+    """Transkrybuj nagranie i zapisz wynik (wyjątek = błąd zadania)"""
+    recording = db_manager.get_recording(recording_id)
+    if not recording:
+        raise PermanentJobError(f"Recording {recording_id} not found")
+
+    file_path = recording.get('file_path')
+    if not file_path or not Path(file_path).exists():
+        raise PermanentJobError(f"File not found: {file_path}")
+
+    cache_key = None
+    cached = None
+    file_hash = _recording_file_hash(db_manager, recording)
+    if file_hash and provider_key:
+        cache_key = _cache_key(file_hash, provider_key, settings, TRANSCRIPTION_PROMPT_VERSION)
+        if not force_refresh:
+            cached = db_manager.get_cached_ai_result('transcription', cache_key)
+
+    if cached:
+        transcription_text = cached['result_text']
+        logger.info(f"[JobQueue] Transcription for {recording_id} reused from cache")
+    else:
+        ai_manager = _create_ai_manager(provider_key, settings)
+        try:
+            transcription_text = ai_manager.transcribe_audio(file_path, language=TRANSCRIPTION_LANGUAGE)
+        except (ValueError, FileNotFoundError) as e:
+            if "not support" in str(e).lower():
+                raise PermanentJobError(str(e))
+            raise
+
+        if not transcription_text:
+            raise RuntimeError("Transcription returned empty text")
+
+        if cache_key:
+            db_manager.save_ai_result('transcription', cache_key, transcription_text)
+
+    db_manager.update_recording(
+        recording_id=recording_id,
+        updates={
+            'transcription_text': transcription_text,
+            'transcription_status': 'completed',
+            'transcription_date': datetime.now().isoformat(),
+            'transcription_error': None
+        }
+    )
+    logger.info(f"[JobQueue] Transcription saved for {recording_id} ({len(transcription_text)} chars)")
+
+
+def _parse_summary_tasks(summary_result: str) -> List[str]:
+    """Zadania z sekcji 'Zadania do wykonania'"""
+    tasks = []
+    if "**Zadania do wykonania:**" in summary_result:
+        tasks_section = summary_result.split("**Zadania do wykonania:**")[1]
+        if "**" in tasks_section:
+            tasks_section = tasks_section.split("**")[0]
+        tasks = [line.strip("- ").strip() for line in tasks_section.split("\n") if line.strip().startswith("-")]
+    return tasks
+
+
+def run_summary(db_manager, recording_id: str, provider_key: Optional[str], settings: Dict, force_refresh: bool = False):
+    """Podsumuj transkrypcję nagrania i zapisz wynik (wyjątek = błąd zadania)"""
+    recording = db_manager.get_recording(recording_id)
+    if not recording:
+        raise PermanentJobError(f"Recording {recording_id} not found")
+
+    transcription_text = recording.get('transcription_text')
+    if not transcription_text:
+        raise PermanentJobError(f"No transcription available for {recording_id}")
+
+    # Klucz obejmuje też treść transkrypcji - poprawiona ręcznie daje nowe podsumowanie
+    cache_key = None
+    cached = None
+    file_hash = _recording_file_hash(db_manager, recording)
+    if file_hash and provider_key:
+        transcription_hash = hashlib.sha256(transcription_text.encode('utf-8')).hexdigest()
+        cache_key = _cache_key(file_hash, provider_key, settings, SUMMARY_PROMPT_VERSION, transcription_hash)
+        if not force_refresh:
+            cached = db_manager.get_cached_ai_result('summary', cache_key)
+
+    if cached:
+        summary_result = cached['result_text']
+        tasks = json.loads(cached['result_tasks'] or '[]')
+        logger.info(f"[JobQueue] Summary for {recording_id} reused from cache")
+    else:
+        from ...Modules.AI_module.ai_logic import provider_request_slots
+
+        ai_manager = _create_ai_manager(provider_key, settings)
+        with provider_request_slots(provider_key):
+            summary_response = ai_manager.generate(
+                SUMMARY_PROMPT.format(transcription_text=transcription_text),
+                use_cache=False
+            )
+        if summary_response.error:
+            raise RuntimeError(summary_response.error)
+        if not summary_response.text:
+            raise RuntimeError("Summary returned empty result")
+
+        summary_result = summary_response.text
+        tasks = _parse_summary_tasks(summary_result)
+        if cache_key:
+            db_manager.save_ai_result('summary', cache_key, summary_result, json.dumps(tasks, ensure_ascii=False))
+
+    db_manager.update_recording(
+        recording_id=recording_id,
+        updates={
+            'ai_summary_text': summary_result,
+            'ai_summary_tasks': json.dumps(tasks, ensure_ascii=False),
+            'ai_summary_status': 'completed',
+            'ai_summary_date': datetime.now().isoformat(),
+            'ai_summary_error': None
+        }
+    )
+    logger.info(f"[JobQueue] Summary saved for {recording_id} ({len(tasks)} tasks)")
+
+
+JOB_HANDLERS = {
+    'transcribe': run_transcription,
+    'summarize': run_summary
+}
+
+
+class JobQueueExecutor(QObject):
+    """Wykonawca kolejki zadań użytkownika (żyje razem z widokiem CallCryptor)"""
+
+    queue_changed = pyqtSignal()              # Zmiana stanu zadań (dla podglądu)
+    job_finished = pyqtSignal(int, bool, str)  # job_id, sukces, błąd
+    queue_drained = pyqtSignal()              # Nic nie działa i nic nie czeka na start
+
+    _job_done = pyqtSignal(int, str, str)     # job_id, błąd, retry_at - z wątku roboczego
+
+    def __init__(self, db_manager, user_id: str, parent: Optional[QObject] = None, max_workers: int = MAX_CONCURRENT_JOBS):
+        """
+        Args:
+            db_manager: CallCryptorDatabase wątku UI (kolejka: pobieranie i kończenie zadań)
+            user_id: ID użytkownika
+            parent: Rodzic Qt
+            max_workers: Łączny limit równoległych zadań
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.db_path = str(db_manager.db_path)
+        self.user_id = user_id
+        self.max_workers = max_workers
+
+        self.running: Dict[int, str] = {}    # job_id -> provider
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="callcryptor-job")
+        self._futures: Dict[int, Future] = {}
+        self._stopped = False
+
+        self._job_done.connect(self._on_job_done)
+
+        self.dispatch_timer = QTimer(self)
+        self.dispatch_timer.setInterval(DISPATCH_INTERVAL_MS)
+        self.dispatch_timer.timeout.connect(self._dispatch)
+
+    def start(self):
+        """Wznów zadania przerwane zamknięciem aplikacji i zacznij przetwarzanie"""
+        interrupted = self.db_manager.requeue_interrupted_jobs(self.user_id)
+        if interrupted:
+            logger.info(f"[JobQueue] Resuming {interrupted} interrupted jobs")
+        self.dispatch_timer.start()
+        self._dispatch()
+
+    def stop(self, timeout: float = STOP_TIMEOUT_SECONDS):
+        """
+        Zatrzymaj pobieranie zadań i poczekaj na uruchomione (najwyżej timeout
+        sekund). Zadania, które nie zdążyły się zakończyć, wrócą do kolejki
+        przy następnym starcie.
+        """
+        self._stopped = True
+        self.dispatch_timer.stop()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        _, not_done = wait(list(self._futures.values()), timeout=timeout)
+        if not_done:
+            logger.warning(f"[JobQueue] {len(not_done)} jobs still running after {timeout}s, leaving them for next start")
+
+    def enqueue(self, tasks: List[Dict], priority: int = 0, force_refresh: bool = False) -> List[int]:
+        """
+        Dodaj zadania do kolejki.
+
+        Args:
+            tasks: Lista {'action': 'transcribe' | 'summarize', 'recording_id'}
+            priority: Priorytet (większy = wcześniej)
+            force_refresh: Wygeneruj wyniki ponownie, z pominięciem cache
+
+        Returns:
+            ID zadań w kolejce
+        """
+        from ...Modules.AI_module.ai_logic import load_ai_settings
+
+        settings = load_ai_settings()
+        job_ids = self.db_manager.enqueue_jobs(self.user_id, [
+            {
+                'recording_id': task['recording_id'],
+                'action': task['action'],
+                'priority': priority,
+                'provider': resolve_provider(task['action'], settings),
+                'force_refresh': force_refresh
+            }
+            for task in tasks
+        ])
+        self.queue_changed.emit()
+        self._dispatch()
+        return job_ids
+
+    def cancel_pending(self) -> int:
+        """Anuluj zadania czekające w kolejce"""
+        cancelled = self.db_manager.cancel_jobs(self.user_id)
+        self.queue_changed.emit()
+        return cancelled
+
+    def _dispatch(self):
+        """Uruchom gotowe zadania w granicach limitów równoległości"""
+        if self._stopped:
+            return
+        free = self.max_workers - len(self.running)
+        if free <= 0:
+            return
+
+        jobs = self.db_manager.get_runnable_jobs(self.user_id, limit=free * 4)
+        if not jobs:
+            return
+
+        from ...Modules.AI_module.ai_logic import (
+            DEFAULT_PROVIDER_CONCURRENCY, PROVIDER_CONCURRENCY, load_ai_settings
+        )
+
+        settings = load_ai_settings()
+        per_provider: Dict[str, int] = {}
+        for provider in self.running.values():
+            per_provider[provider] = per_provider.get(provider, 0) + 1
+
+        started = 0
+        for job in jobs:
+            provider = job['provider'] or resolve_provider(job['action'], settings)
+            limit = PROVIDER_CONCURRENCY.get(provider, DEFAULT_PROVIDER_CONCURRENCY)
+            if per_provider.get(provider, 0) >= limit:
+                continue
+            if not self.db_manager.claim_job(job['id']):
+                continue
+
+            self.running[job['id']] = provider
+            per_provider[provider] = per_provider.get(provider, 0) + 1
+            self._futures[job['id']] = self.pool.submit(self._run_job, job, provider, settings)
+            started += 1
+            if len(self.running) >= self.max_workers:
+                break
+
+        if started:
+            self.queue_changed.emit()
+
+    def _run_job(self, job: Dict, provider: Optional[str], settings: Dict):
+        """Wykonaj zadanie (wątek puli, własne połączenie z bazą na czas zadania)"""
+        from .callcryptor_database import CallCryptorDatabase
+
+        error = ''
+        retry_at = ''
+        with CallCryptorDatabase(self.db_path) as db_manager:
+            try:
+                JOB_HANDLERS[job['action']](
+                    db_manager, job['recording_id'], provider, settings, bool(job['force_refresh'])
+                )
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+                attempt = job['attempts'] + 1
+                if not isinstance(e, PermanentJobError) and attempt < job['max_attempts']:
+                    delay = min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+                    retry_at = (datetime.now() + timedelta(seconds=delay)).isoformat()
+                    logger.warning(f"[JobQueue] Job {job['id']} attempt {attempt} failed, retry in {delay}s: {error}")
+                else:
+                    logger.error(f"[JobQueue] Job {job['id']} failed: {error}")
+                    self._mark_recording_failed(db_manager, job, error)
+
+            # Po stop() widok może już nie istnieć - zadanie kończy wątek puli
+            if self._stopped:
+                db_manager.finish_job(job['id'], error or None, retry_at or None)
+                return
+
+        try:
+            self._job_done.emit(job['id'], error, retry_at)
+        except RuntimeError:
+            # Obiekt Qt usunięty między sprawdzeniem a emisją - zadanie wróci do kolejki
+            logger.debug(f"[JobQueue] Executor deleted before job {job['id']} finished")
+
+    @staticmethod
+    def _mark_recording_failed(db_manager, job: Dict, error: str):
+        prefix = 'transcription' if job['action'] == 'transcribe' else 'ai_summary'
+        try:
+            db_manager.update_recording(job['recording_id'], {
+                f'{prefix}_status': 'failed',
+                f'{prefix}_error': error
+            })
+        except Exception as e:
+            logger.error(f"[JobQueue] Cannot update recording {job['recording_id']}: {e}")
+
+    def _on_job_done(self, job_id: int, error: str, retry_at: str):
+        """Zakończenie zadania (wątek UI)"""
+        self.running.pop(job_id, None)
+        self._futures.pop(job_id, None)
+        self.db_manager.finish_job(job_id, error or None, retry_at or None)
+        self.job_finished.emit(job_id, not error, error)
+        self.queue_changed.emit()
+
+        self._dispatch()
+        if not self.running:
+            self.queue_drained.emit()
@@ -1,375 +1,72 @@
 """
 Processing Queue Dialog for CallCryptor
 
-Displays a list of tasks being processed with individual and overall progress.
-Supports graceful cancellation during processing.
+Displays jobs from the persistent processing queue with individual and overall progress.
+Jobs are executed by JobQueueExecutor (job_queue.py) - closing the dialog does not
+stop them, the Stop button cancels jobs that have not started yet.
 """
 
+from datetime import datetime
+
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
     QPushButton, QProgressBar, QHeaderView, QLabel
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QThread
+from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QColor
 import logging
 
 logger = logging.getLogger(__name__)
 
-
-class ProcessingWorker(QThread):
-    """Worker thread for processing transcriptions and summaries"""
-    
-    progress_updated = pyqtSignal(int, str)  # row, status
-    task_completed = pyqtSignal(int, bool, str)  # row, success, message
-    all_completed = pyqtSignal()
-    
-    def __init__(self, tasks, db_path, user_id):
-        """
-        Args:
-            tasks: List of dicts with keys: 'row', 'action', 'recording_id', 'file_path'
-            db_path: Path to CallCryptor database
-            user_id: User ID for database queries
-        """
-        super().__init__()
-        self.tasks = tasks
-        self.db_path = db_path
-        self.user_id = user_id
-        self.should_stop = False
-        self.db_manager = None  # Will be created in run() method (same thread)
-        
-    def run(self):
-        """Process all tasks sequentially"""
-        # Create database connection in worker thread (thread-safe)
-        from .callcryptor_database import CallCryptorDatabase
-        self.db_manager = CallCryptorDatabase(self.db_path)
-        logger.info(f"[QueueWorker] Database connection created in thread")
-        
-        for task in self.tasks:
-            if self.should_stop:
-                break
-                
-            row = task['row']
-            action = task['action']
-            recording_id = task['recording_id']
-            
-            try:
-                self.progress_updated.emit(row, 'processing')
-                
-                if action == 'transcribe':
-                    success = self._do_transcription(recording_id)
-                elif action == 'summarize':
-                    success = self._do_summary(recording_id)
-                else:
-                    success = False
-                    
-                if success:
-                    self.task_completed.emit(row, True, 'completed')
-                else:
-                    self.task_completed.emit(row, False, 'failed')
-                    
-            except Exception as e:
-                logger.error(f"Error processing task {row}: {e}")
-                self.task_completed.emit(row, False, str(e))
-                
-        self.all_completed.emit()
-        
-    def _do_transcription(self, recording_id):
-        """
-        Perform transcription
-        
-        Returns:
-            bool: True if successful
-        """
-        try:
-            logger.info(f"[QueueWorker] Starting transcription for {recording_id}")
-            
-            # Get recording data from worker's own db connection
-            recording = self._get_recording(recording_id)
-            if not recording:
-                logger.error(f"[QueueWorker] Recording {recording_id} not found")
-                return False
-            
-            logger.info(f"[QueueWorker] Found recording: {recording.get('file_name')}")
-            
-            # Call parent view's transcription method
-            # Since _transcribe_recording shows dialog, we need to handle it differently
-            # For queue processing, we need direct transcription without UI
-            
-            from pathlib import Path
-            file_path = recording.get('file_path')
-            if not file_path or not Path(file_path).exists():
-                logger.error(f"[QueueWorker] File not found: {file_path}")
-                return False
-            
-            logger.info(f"[QueueWorker] File exists: {file_path}")
-            
-            # Get AI manager and perform transcription
-            from ...Modules.AI_module.ai_logic import get_ai_manager, load_ai_settings, AIProvider
-            ai_manager = get_ai_manager()
-            settings = load_ai_settings()
-            api_keys = settings.get('api_keys', {})
-            
-            # Check available providers supporting transcription
-            if api_keys.get('gemini'):
-                provider_key, provider_enum = 'gemini', AIProvider.GEMINI
-            elif api_keys.get('openai'):
-                provider_key, provider_enum = 'openai', AIProvider.OPENAI
-            else:
-                logger.error("[QueueWorker] No API keys configured for transcription")
-                return False
-            
-            logger.info(f"[QueueWorker] Using provider: {provider_key}")
-            
-            # Configure provider with user's selected model
-            selected_model = settings.get('models', {}).get(provider_key)
-            
-            ai_manager.set_provider(
-                provider=provider_enum,
-                api_key=api_keys.get(provider_key),
-                model=selected_model
-            )
-            
-            # Perform transcription
-            logger.info(f"[QueueWorker] Starting AI transcription with model: {selected_model}...")
-            
-            try:
-                transcription_text = ai_manager.transcribe_audio(file_path, language="pl")
-            except ValueError as e:
-                # Model doesn't support audio transcription
-                logger.error(f"[QueueWorker] Model error: {e}")
-                error_msg = str(e)
-                if "does not support" in error_msg.lower() or "not support" in error_msg.lower():
-                    logger.error(f"[QueueWorker] Model {selected_model} does not support audio transcription")
-                return False
-            except Exception as e:
-                logger.error(f"[QueueWorker] Transcription failed with error: {e}")
-                return False
-            
-            if not transcription_text:
-                logger.error("[QueueWorker] Transcription returned empty text")
-                return False
-            
-            logger.info(f"[QueueWorker] Transcription successful, length: {len(transcription_text)}")
-            
-            # Update database
-            if self.db_manager:
-                self.db_manager.update_recording(
-                    recording_id=recording_id,
-                    updates={
-                        'transcription_text': transcription_text,
-                        'transcription_status': 'completed'
-                    }
-                )
-                logger.info(f"[QueueWorker] Database updated for {recording_id}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"[QueueWorker] Error transcribing {recording_id}: {e}", exc_info=True)
-            return False
-    
-    def _get_recording(self, recording_id):
-        """Get recording from database (thread-safe)"""
-        if not self.db_manager:
-            return None
-        
-        try:
-            # Get all recordings and find the one we need
-            all_recordings = self.db_manager.get_all_recordings(self.user_id)
-            for rec in all_recordings:
-                if str(rec.get('id')) == str(recording_id):
-                    return rec
-        except Exception as e:
-            logger.error(f"[QueueWorker] Error getting recording {recording_id}: {e}")
-        
-        return None
-        
-    def _do_summary(self, recording_id):
-        """
-        Perform AI summary
-        
-        Returns:
-            bool: True if successful
-        """
-        try:
-            logger.info(f"[QueueWorker] Starting summary for {recording_id}")
-            
-            # Get recording data from worker's own db connection
-            recording = self._get_recording(recording_id)
-            if not recording:
-                logger.error(f"[QueueWorker] Recording {recording_id} not found")
-                return False
-            
-            logger.info(f"[QueueWorker] Found recording: {recording.get('file_name')}")
-            
-            # Check if transcription exists
-            transcription_text = recording.get('transcription_text', '')
-            if not transcription_text:
-                logger.error(f"[QueueWorker] No transcription available for {recording_id}")
-                return False
-            
-            logger.info(f"[QueueWorker] Transcription exists, length: {len(transcription_text)}")
-            
-            # Get AI manager and configure with user's active provider
-            from ...Modules.AI_module.ai_logic import get_ai_manager, load_ai_settings, AIProvider
-            ai_manager = get_ai_manager()
-            settings = load_ai_settings()
-            
-            # Get active provider from settings (same as normal summary)
-            active_provider = settings.get('provider')
-            api_keys = settings.get('api_keys', {})
-            
-            if not active_provider:
-                logger.error("[QueueWorker] No active provider configured")
-                return False
-            
-            # Check if API key exists for active provider
-            api_key = api_keys.get(active_provider, '')
-            if not api_key:
-                logger.error(f"[QueueWorker] No API key for provider: {active_provider}")
-                return False
-            
-            # Map provider key to enum
-            provider_map = {
-                'openai': AIProvider.OPENAI,
-                'gemini': AIProvider.GEMINI,
-                'claude': AIProvider.CLAUDE,
-                'grok': AIProvider.GROK,
-                'deepseek': AIProvider.DEEPSEEK
-            }
-            
-            provider_enum = provider_map.get(active_provider)
-            if not provider_enum:
-                logger.error(f"[QueueWorker] Unknown provider: {active_provider}")
-                return False
-            
-            logger.info(f"[QueueWorker] Using active provider: {active_provider}")
-            
-            # Get model from settings
-            selected_model = settings.get('models', {}).get(active_provider, '')
-            
-            # Configure provider with user's selected model
-            ai_manager.set_provider(
-                provider=provider_enum,
-                api_key=api_key,
-                model=selected_model
-            )
-            
-            # Create summary prompt
-            prompt = f"""Przeanalizuj poniższą transkrypcję rozmowy telefonicznej i utwórz jej podsumowanie.
-
-Transkrypcja:
-{transcription_text}
-
-Proszę o:
-1. Krótkie streszczenie (2-3 zdania)
-2. Listę kluczowych punktów
-3. Wyodrębnione zadania do wykonania (jeśli są)
-4. Ewentualne terminy lub ważne daty
-
-Format odpowiedzi:
-**Podsumowanie:**
-[streszczenie]
-
-**Kluczowe punkty:**
-- [punkt 1]
-- [punkt 2]
-
-**Zadania do wykonania:**
-- [zadanie 1]
-- [zadanie 2]
-
-**Terminy:**
-- [termin 1]
-"""
-            
-            # Get summary
-            logger.info(f"[QueueWorker] Requesting AI summary...")
-            summary_response = ai_manager.generate_response(prompt)
-            
-            if not summary_response or not summary_response.text:
-                logger.error("[QueueWorker] Summary returned empty result")
-                return False
-            
-            summary_result = summary_response.text
-            logger.info(f"[QueueWorker] Summary generated, length: {len(summary_result)}")
-            
-            # Extract tasks from summary (simple parsing)
-            tasks = []
-            if "**Zadania do wykonania:**" in summary_result:
-                tasks_section = summary_result.split("**Zadania do wykonania:**")[1]
-                if "**" in tasks_section:
-                    tasks_section = tasks_section.split("**")[0]
-                task_lines = [line.strip("- ").strip() for line in tasks_section.split("\n") if line.strip().startswith("-")]
-                tasks = task_lines
-            
-            logger.info(f"[QueueWorker] Extracted {len(tasks)} tasks from summary")
-            
-            # Update database with summary
-            if self.db_manager:
-                import json
-                self.db_manager.update_recording(
-                    recording_id=recording_id,
-                    updates={
-                        'ai_summary_text': summary_result,
-                        'ai_summary_tasks': json.dumps(tasks, ensure_ascii=False),
-                        'ai_summary_status': 'completed'
-                    }
-                )
-                logger.info(f"[QueueWorker] Summary saved to database for {recording_id}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"[QueueWorker] Error summarizing {recording_id}: {e}", exc_info=True)
-            return False
-        
-    def stop(self):
-        """Request worker to stop processing"""
-        self.should_stop = True
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+STATUS_COLORS = {
+    'completed': QColor(0, 200, 0),      # Green
+    'failed': QColor(255, 0, 0),         # Red
+    'cancelled': QColor(150, 150, 150)   # Gray
+}
 
 
 class ProcessingQueueDialog(QDialog):
-    """Dialog showing processing queue with progress"""
+    """Non-modal view of the processing queue"""
     
-    def __init__(self, tasks, parent_view, theme_manager, t):
+    def __init__(self, executor, parent_view, theme_manager, t, since=None):
         """
         Args:
-            tasks: List of dicts with keys: 'action', 'recording_id', 'file_path'
+            executor: JobQueueExecutor running the jobs
             parent_view: CallCryptorView instance
             theme_manager: ThemeManager instance
             t: Translation function
+            since: ISO time - finished jobs older than this are not shown
+                (defaults to the moment the dialog is opened)
         """
         super().__init__(parent_view)
-        self.tasks = tasks
+        self.executor = executor
         self.parent_view = parent_view
         self.theme_manager = theme_manager
         self.t = t
-        self.worker = None
-        
-        # Get database path and user_id from parent view
-        self.db_path = str(parent_view.db_manager.db_path) if parent_view.db_manager else None
-        self.user_id = parent_view.user_id
+        self.since = since or datetime.now().isoformat()
+        self.jobs = []
         
         self._setup_ui()
         self._apply_theme()
-        self._start_processing()
+        
+        self.executor.queue_changed.connect(self._refresh)
+        self._refresh()
         
     def _setup_ui(self):
         """Setup dialog UI"""
         self.setWindowTitle(self.t('callcryptor.queue.dialog_title'))
         self.setMinimumSize(700, 500)
-        self.setModal(True)
+        self.setModal(False)
         
         layout = QVBoxLayout(self)
         
         # Overall progress
         progress_layout = QHBoxLayout()
-        self.progress_label = QLabel(self.t('callcryptor.queue.progress_total').format(current=0, total=len(self.tasks)))
+        self.progress_label = QLabel(self.t('callcryptor.queue.progress_total').format(current=0, total=0))
         progress_layout.addWidget(self.progress_label)
         
         self.overall_progress = QProgressBar()
-        self.overall_progress.setMaximum(len(self.tasks))
         self.overall_progress.setValue(0)
         progress_layout.addWidget(self.overall_progress, stretch=1)
         
@@ -393,35 +90,6 @@ class ProcessingQueueDialog(QDialog):
         header.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)
         header.resizeSection(3, 150)
         
-        self.table.setRowCount(len(self.tasks))
-        
-        # Populate table
-        for row, task in enumerate(self.tasks):
-            # File name
-            name_item = QTableWidgetItem(task.get('file_path', '').split('/')[-1])
-            name_item.setFlags(name_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.table.setItem(row, 0, name_item)
-            
-            # Action
-            action_text = self.t(f'callcryptor.queue.action_{task["action"]}')
-            action_item = QTableWidgetItem(action_text)
-            action_item.setFlags(action_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.table.setItem(row, 1, action_item)
-            
-            # Status
-            status_item = QTableWidgetItem(self.t('callcryptor.queue.status_waiting'))
-            status_item.setFlags(status_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.table.setItem(row, 2, status_item)
-            
-            # Progress bar
-            progress_bar = QProgressBar()
-            progress_bar.setMaximum(100)
-            progress_bar.setValue(0)
-            self.table.setCellWidget(row, 3, progress_bar)
-            
-            # Store original task data with row index
-            task['row'] = row
-            
         layout.addWidget(self.table)
         
         # Buttons
@@ -433,8 +101,7 @@ class ProcessingQueueDialog(QDialog):
         button_layout.addWidget(self.stop_button)
         
         self.close_button = QPushButton(self.t('callcryptor.queue.button_close'))
-        self.close_button.clicked.connect(self.accept)
-        self.close_button.setEnabled(False)
+        self.close_button.clicked.connect(self.close)
         button_layout.addWidget(self.close_button)
         
         layout.addLayout(button_layout)
@@ -499,91 +166,70 @@ class ProcessingQueueDialog(QDialog):
             }}
         """)
         
-    def _start_processing(self):
-        """Start worker thread to process tasks"""
-        if not self.db_path or not self.user_id:
-            logger.error("[QueueDialog] Cannot start worker - no db_path or user_id")
-            return
-        
-        self.worker = ProcessingWorker(self.tasks, self.db_path, self.user_id)
-        self.worker.progress_updated.connect(self._on_progress_updated)
-        self.worker.task_completed.connect(self._on_task_completed)
-        self.worker.all_completed.connect(self._on_all_completed)
-        self.worker.start()
+    def _refresh(self):
+        """Reload jobs from the queue"""
+        self.jobs = self.executor.db_manager.get_jobs(self.executor.user_id, self.since)
+        
+        self.table.setRowCount(len(self.jobs))
+        for row, job in enumerate(self.jobs):
+            self._set_text(row, 0, job.get('file_name') or '')
+            self._set_text(row, 1, self.t(f'callcryptor.queue.action_{job["action"]}'))
+            
+            status = job['status']
+            status_key = {'queued': 'waiting', 'running': 'processing'}.get(status, status)
+            status_item = self._set_text(row, 2, self.t(f'callcryptor.queue.status_{status_key}'))
+            if status in STATUS_COLORS:
+                status_item.setForeground(STATUS_COLORS[status])
+            tooltip = job.get('last_error') or ''
+            if status == 'queued' and job.get('attempts'):
+                tooltip = f"{job['attempts']}/{job['max_attempts']}: {tooltip}"
+            status_item.setToolTip(tooltip)
+            
+            # Progress bar - indeterminate while running
+            progress_bar = self.table.cellWidget(row, 3)
+            if progress_bar is None:
+                progress_bar = QProgressBar()
+                self.table.setCellWidget(row, 3, progress_bar)
+            progress_bar.setMaximum(0 if status == 'running' else 100)
+            progress_bar.setValue(100 if status == 'completed' else 0)
         
-    def _on_progress_updated(self, row, status):
-        """Update task status in table"""
-        status_text = self.t(f'callcryptor.queue.status_{status}')
-        status_item = self.table.item(row, 2)
-        if status_item:
-            status_item.setText(status_text)
-            
-        # Update progress bar to indeterminate during processing
-        progress_bar = self.table.cellWidget(row, 3)
-        if progress_bar and status == 'processing':
-            progress_bar.setMaximum(0)  # Indeterminate
-            
-    def _on_task_completed(self, row, success, message):
-        """Handle task completion"""
-        # Update status
-        if success:
-            status_text = self.t('callcryptor.queue.status_completed')
-            color = QColor(0, 200, 0)  # Green
-        else:
-            if message == 'cancelled':
-                status_text = self.t('callcryptor.queue.status_cancelled')
-                color = QColor(150, 150, 150)  # Gray
-            else:
-                status_text = self.t('callcryptor.queue.status_failed')
-                color = QColor(255, 0, 0)  # Red
-                
-        status_item = self.table.item(row, 2)
-        if status_item:
-            status_item.setText(status_text)
-            status_item.setForeground(color)
-            
-        # Update progress bar
-        progress_bar = self.table.cellWidget(row, 3)
-        if progress_bar:
-            progress_bar.setMaximum(100)
-            progress_bar.setValue(100 if success else 0)
-            
         # Update overall progress
-        completed = sum(1 for i in range(self.table.rowCount()) 
-                       if self.table.item(i, 2) and 
-                       self.table.item(i, 2).text() in [
-                           self.t('callcryptor.queue.status_completed'),
-                           self.t('callcryptor.queue.status_failed'),
-                           self.t('callcryptor.queue.status_cancelled')
-                       ])
-        self.overall_progress.setValue(completed)
-        self.progress_label.setText(
-            self.t('callcryptor.queue.progress_total').format(
-                current=completed,
-                total=len(self.tasks)
-            )
-        )
-        
-    def _on_all_completed(self):
-        """Handle all tasks completed"""
-        self.stop_button.setEnabled(False)
-        self.close_button.setEnabled(True)
-        
-        # Check if stopped by user
-        if self.worker and self.worker.should_stop:
-            self.progress_label.setText(self.t('callcryptor.queue.stopped_by_user'))
+        finished = sum(1 for job in self.jobs if job['status'] in FINISHED_STATUSES)
+        total = len(self.jobs)
+        self.overall_progress.setMaximum(max(total, 1))
+        self.overall_progress.setValue(finished)
+        
+        active = total - finished
+        self.stop_button.setEnabled(any(job['status'] == 'queued' for job in self.jobs))
+        if total and not active:
+            if any(job['status'] == 'cancelled' for job in self.jobs):
+                self.progress_label.setText(self.t('callcryptor.queue.stopped_by_user'))
+            else:
+                self.progress_label.setText(self.t('callcryptor.queue.completed_all'))
         else:
-            self.progress_label.setText(self.t('callcryptor.queue.completed_all'))
+            self.progress_label.setText(
+                self.t('callcryptor.queue.progress_total').format(current=finished, total=total)
+            )
             
-    def _on_stop_clicked(self):
-        """Handle stop button click"""
-        if self.worker:
-            self.worker.stop()
-            self.stop_button.setEnabled(False)
+    def _set_text(self, row, column, text):
+        """Set read-only cell text"""
+        item = self.table.item(row, column)
+        if item is None:
+            item = QTableWidgetItem()
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            self.table.setItem(row, column, item)
+        item.setText(text)
+        return item
             
+    def _on_stop_clicked(self):
+        """Cancel jobs that have not started yet (running ones finish normally)"""
+        cancelled = self.executor.cancel_pending()
+        logger.info(f"[QueueDialog] Cancelled {cancelled} queued jobs")
+        
     def closeEvent(self, event):
-        """Handle dialog close"""
-        if self.worker and self.worker.isRunning():
-            self.worker.stop()
-            self.worker.wait(3000)  # Wait max 3 seconds
+        """Handle dialog close - jobs keep running in the background"""
+        try:
+            self.executor.queue_changed.disconnect(self._refresh)
+        except TypeError:
+            pass
         event.accept()
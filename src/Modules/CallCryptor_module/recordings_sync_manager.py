@@ -9,11 +9,14 @@ Ten moduł obsługuje:
 - Manual sync trigger (przycisk 📨)
 - Optional auto-sync (co 5 minut)
 - Last-Write-Wins conflict resolution
-- Bulk sync (max 100 nagrań)
+- Bulk sync (max 100 nagrań) - tylko nagrania zmienione od ostatniej
+  potwierdzonej synchronizacji (is_synced/version utrzymywane triggerem bazy)
+- Pobieranie zmian z serwera od znacznika (server_watermark)
 - Background worker z retry logic
 """
 
 import json
+import os
 from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime, timedelta
 from threading import Thread, Event, Lock
@@ -22,6 +25,7 @@ from pathlib import Path
 
 from .recording_api_client import RecordingsAPIClient, APIResponse
 from .callcryptor_database import CallCryptorDatabase
+from .file_hasher import full_file_hash
 
 
 # Import Status LED (optional)
@@ -49,6 +53,16 @@ class RecordingsSyncManager:
     - Retry z exponential backoff
     """
     
+    # Limit bulk_sync po stronie API
+    BATCH_SIZE = 100
+    
+    # Pola API (RecordingSyncItem) -> kolumny lokalne, gdy nazwy się różnią
+    SERVER_FIELD_ALIASES = {
+        'duration_seconds': 'duration',
+        'ai_summary': 'ai_summary_text'
+    }
+    JSON_FIELDS = ('tags', 'ai_summary_tasks', 'ai_key_points', 'ai_action_items')
+    
     def __init__(
         self,
         db_manager: CallCryptorDatabase,
@@ -78,6 +92,8 @@ class RecordingsSyncManager:
         self.auto_sync_enabled = False
         self.sync_interval = 300  # 5 minut w sekundach
         self.last_sync_at: Optional[datetime] = None
+        # Najnowszy updated_at otrzymany z serwera (czas serwera, nie lokalny)
+        self.server_watermark: Optional[datetime] = None
         
         # Threading (tylko gdy auto-sync włączona)
         self._worker_thread: Optional[Thread] = None
@@ -118,6 +134,10 @@ class RecordingsSyncManager:
             if last_sync_str:
                 self.last_sync_at = datetime.fromisoformat(last_sync_str)
             
+            watermark_str = sync_config.get('server_watermark')
+            if watermark_str:
+                self.server_watermark = datetime.fromisoformat(watermark_str)
+            
             logger.info(f"[CallCryptor Sync] Settings loaded: enabled={self.sync_enabled}, auto={self.auto_sync_enabled}")
             
         except Exception as e:
@@ -138,6 +158,7 @@ class RecordingsSyncManager:
                 'auto_sync_enabled': self.auto_sync_enabled,
                 'sync_interval_minutes': self.sync_interval // 60,
                 'last_sync_at': self.last_sync_at.isoformat() if self.last_sync_at else None,
+                'server_watermark': self.server_watermark.isoformat() if self.server_watermark else None,
                 'dont_show_warning': config.get('callcryptor_sync', {}).get('dont_show_warning', False),
                 'exclude_tags': config.get('callcryptor_sync', {}).get('exclude_tags', [])
             }
@@ -270,64 +291,41 @@ class RecordingsSyncManager:
         
         with self._lock:
             try:
-                # 1. Gather local changes (recordings changed since last_sync_at)
-                local_recordings = self._get_local_changes()
-                
-                if not local_recordings and self.last_sync_at:
-                    logger.debug("[CallCryptor Sync] No local changes to sync")
-                    # Pobierz zmiany z serwera anyway
-                    return self._pull_from_server()
+                # 0. Serwer rozpoznaje nagrania po file_hash - uzupełnij go
+                #    nagraniom zapisanym przy skanowaniu tylko z odciskiem
+                self._hash_unhashed_recordings()
                 
-                # 2. Prepare related sources for this batch
-                sources_payload = self._get_sources_payload(local_recordings)
-
-                # 3. Bulk sync with server
-                logger.info(
-                    f"[CallCryptor Sync] Syncing {len(local_recordings)} recordings and "
-                    f"{len(sources_payload)} sources..."
-                )
-                
-                response = self.api_client.bulk_sync(
-                    recordings=local_recordings,
-                    sources=sources_payload,
-                    tags=[],     # TODO: implement tags sync
-                    last_sync_at=self.last_sync_at
-                )
-                
-                if not response.success:
-                    logger.error(f"[CallCryptor Sync] Bulk sync failed: {response.error}")
-                    self.error_count += 1
+                # 1. Wyślij porcjami nagrania zmienione od ostatniej potwierdzonej
+                #    synchronizacji (keyset po updated_at - każde najwyżej raz na cykl)
+                pushed = 0
+                after = None
+                while True:
+                    local_recordings = self._get_local_changes(after)
+                    if not local_recordings:
+                        break
+                    after = (local_recordings[-1]['updated_at'], local_recordings[-1]['id'])
                     
-                    if self.on_sync_complete:
-                        self.on_sync_complete(False, response.error or "Unknown error")
+                    error = self._bulk_sync(local_recordings)
+                    if error:
+                        return self._report_failure(error)
                     
-                    if STATUS_LED_AVAILABLE:
-                        record_sync_error("callcryptor")
-                    
-                    return False
-                
-                # 3. Process server response
-                result = response.data
+                    pushed += len(local_recordings)
+                    if len(local_recordings) < self.BATCH_SIZE:
+                        break
                 
-                recordings_created = result.get('recordings_created', 0)
-                recordings_updated = result.get('recordings_updated', 0)
-                recordings_deleted = result.get('recordings_deleted', 0)
-                conflicts = result.get('conflicts_resolved', 0)
-                
-                logger.info(f"[CallCryptor Sync] Server response: created={recordings_created}, updated={recordings_updated}, deleted={recordings_deleted}, conflicts={conflicts}")
-                
-                # 4. Apply server changes to local DB
-                server_recordings = result.get('server_recordings', [])
-                self._apply_server_changes(server_recordings)
+                # 2. Brak zmian lokalnych - pobierz tylko zmiany z serwera
+                if pushed == 0:
+                    logger.debug("[CallCryptor Sync] No local changes to sync")
+                    if not self._pull_from_server():
+                        return False
                 
-                # 5. Update stats
+                # 3. Update stats
                 self.last_sync_at = datetime.now()
                 self.sync_count += 1
-                self.conflicts_resolved += conflicts
                 self._save_settings()
                 
                 if self.on_sync_complete:
-                    message = f"Zsynchronizowano {len(local_recordings)} nagrań"
+                    message = f"Zsynchronizowano {pushed} nagrań"
                     self.on_sync_complete(True, message)
                 
                 if STATUS_LED_AVAILABLE:
@@ -338,96 +336,151 @@ class RecordingsSyncManager:
                 
             except Exception as e:
                 logger.error(f"[CallCryptor Sync] Sync error: {e}")
-                self.error_count += 1
-                
-                if self.on_sync_complete:
-                    self.on_sync_complete(False, str(e))
-                
-                if STATUS_LED_AVAILABLE:
-                    record_sync_error("callcryptor")
-                
-                return False
+                return self._report_failure(str(e))
     
-    def _get_local_changes(self) -> List[Dict[str, Any]]:
+    def _hash_unhashed_recordings(self):
+        """Policz pełny hash nagrań bez niego (pliki, których już nie ma, są pomijane)"""
+        for rec in self.db_manager.get_recordings_without_hash(self.user_id):
+            if not os.path.exists(rec['file_path']):
+                continue
+            try:
+                file_hash = full_file_hash(rec['file_path'])
+            except OSError as e:
+                logger.warning(f"[CallCryptor Sync] Cannot hash {rec['file_path']}: {e}")
+                continue
+            self.db_manager.set_recording_hash(rec['id'], file_hash)
+    
+    def _report_failure(self, error: str) -> bool:
+        """Zarejestruj nieudaną synchronizację (stats, callback, Status LED)"""
+        self.error_count += 1
+        
+        if self.on_sync_complete:
+            self.on_sync_complete(False, error or "Unknown error")
+        
+        if STATUS_LED_AVAILABLE:
+            record_sync_error("callcryptor")
+        
+        return False
+    
+    def _bulk_sync(self, local_recordings: List[Dict[str, Any]]) -> Optional[str]:
         """
-        Pobierz lokalne zmiany (recordings changed since last_sync_at).
+        Wyślij porcję nagrań i zastosuj odpowiedź serwera.
         
+        Args:
+            local_recordings: Nagrania w formacie API (pusta lista = tylko pobranie zmian)
+            
         Returns:
-            Lista słowników z danymi nagrań
+            None jeśli sukces, komunikat błędu w przeciwnym razie
         """
-        try:
-            # Pobierz wszystkie nagrania użytkownika
-            recordings = self.db_manager.get_all_recordings(self.user_id)
-            
-            # Filtruj tylko te zmienione od last_sync_at
-            if self.last_sync_at:
-                # TODO: Dodać kolumnę updated_at do recordings
-                # Na razie zwracamy wszystkie
-                pass
-            
-            # Konwertuj na format API (RecordingSyncItem)
-            sync_items = []
-            for rec in recordings:
-                # Parse JSON fields (stored as strings in SQLite)
-                tags = self._parse_json_field(rec.get('tags'), [])
-                ai_summary_tasks = self._parse_json_field(rec.get('ai_summary_tasks'), None)
-                ai_key_points = self._parse_json_field(rec.get('ai_key_points'), None)
-                ai_action_items = self._parse_json_field(rec.get('ai_action_items'), None)
-                
-                # DEBUG: Log first item to verify parsing
-                if len(sync_items) == 0:
-                    logger.debug(f"[CallCryptor Sync] Sample parsing - ai_summary_tasks raw: {type(rec.get('ai_summary_tasks'))} = {rec.get('ai_summary_tasks')}")
-                    logger.debug(f"[CallCryptor Sync] Sample parsing - ai_summary_tasks parsed: {type(ai_summary_tasks)} = {ai_summary_tasks}")
-                
-                # UWAGA: NIE dodawaj file_path - to lokalna ścieżka!
-                sync_item = {
-                    'id': rec['id'],
-                    'source_id': rec['source_id'],
-                    'file_name': rec['file_name'],
-                    'file_hash': rec.get('file_hash'),
-                    'file_size': self._safe_int(rec.get('file_size')),
-                    'email_message_id': rec.get('email_message_id'),
-                    'email_subject': rec.get('email_subject'),
-                    'email_sender': rec.get('email_sender'),
-                    'contact_name': rec.get('contact_name'),
-                    'contact_phone': rec.get('contact_phone'),
-                    'duration_seconds': self._safe_int(rec.get('duration')),
-                    'recording_date': rec.get('recording_date'),
-                    'tags': tags,
-                    'notes': rec.get('notes'),
-                    'transcription_status': rec.get('transcription_status', 'pending') or 'pending',
-                    'transcription_text': rec.get('transcription_text'),
-                    'transcription_language': rec.get('transcription_language'),
-                    'transcription_confidence': self._safe_float(rec.get('transcription_confidence')),
-                    'transcription_date': rec.get('transcription_date'),
-                    'transcription_error': rec.get('transcription_error'),
-                    'ai_summary': rec.get('ai_summary_text'),
-                    'ai_summary_status': rec.get('ai_summary_status', 'pending') or 'pending',
-                    'ai_summary_date': rec.get('ai_summary_date'),
-                    'ai_summary_error': rec.get('ai_summary_error'),
-                    'ai_summary_tasks': ai_summary_tasks,
-                    'ai_key_points': ai_key_points,
-                    'ai_action_items': ai_action_items,
-                    'note_id': rec.get('note_id'),
-                    'task_id': rec.get('task_id'),
-                    'is_favorite': self._to_bool(rec.get('is_favorite'), False),
-                    'favorited_at': rec.get('favorited_at'),
-                    'is_archived': self._to_bool(rec.get('is_archived'), False),
-                    'archived_at': rec.get('archived_at'),
-                    'archive_reason': rec.get('archive_reason'),
-                    'created_at': rec.get('created_at'),
-                    'updated_at': rec.get('updated_at'),
-                    'deleted_at': rec.get('deleted_at'),
-                    'version': self._safe_int(rec.get('version'), 1)
-                }
-                sync_items.append(sync_item)
-            
-            logger.debug(f"[CallCryptor Sync] Found {len(sync_items)} local recordings")
-            return sync_items[:100]  # Max 100 per sync
+        # Prepare related sources for this batch
+        sources_payload = self._get_sources_payload(local_recordings)
+        
+        logger.info(
+            f"[CallCryptor Sync] Syncing {len(local_recordings)} recordings and "
+            f"{len(sources_payload)} sources..."
+        )
+        
+        response = self.api_client.bulk_sync(
+            recordings=local_recordings,
+            sources=sources_payload,
+            tags=[],     # TODO: implement tags sync
+            last_sync_at=self.server_watermark
+        )
+        
+        if not response.success:
+            logger.error(f"[CallCryptor Sync] Bulk sync failed: {response.error}")
+            return response.error or "Unknown error"
+        
+        # Process server response
+        result = response.data or {}
+        
+        recordings_created = result.get('recordings_created', 0)
+        recordings_updated = result.get('recordings_updated', 0)
+        recordings_deleted = result.get('recordings_deleted', 0)
+        conflicts = result.get('conflicts_resolved', 0)
+        
+        logger.info(f"[CallCryptor Sync] Server response: created={recordings_created}, updated={recordings_updated}, deleted={recordings_deleted}, conflicts={conflicts}")
+        self.conflicts_resolved += conflicts
+        
+        # Apply server changes to local DB (przed potwierdzeniem wysłanych wersji)
+        server_recordings = result.get('server_recordings', [])
+        self._apply_server_changes(server_recordings)
+        
+        # Potwierdź wysłane wersje - nagrania zmienione w trakcie zostają brudne
+        if local_recordings:
+            self.db_manager.mark_recordings_synced(
+                {rec['id']: rec['version'] for rec in local_recordings}
+            )
+        if sources_payload:
+            self.db_manager.mark_sources_synced([source['id'] for source in sources_payload])
+        
+        return None
+    
+    def _get_local_changes(self, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """
+        Pobierz następną porcję lokalnych zmian (nagrania z is_synced = 0).
+        
+        Args:
+            after: (updated_at, id) ostatniego nagrania z poprzedniej porcji
             
-        except Exception as e:
-            logger.error(f"[CallCryptor Sync] Error getting local changes: {e}")
-            return []
+        Returns:
+            Lista słowników z danymi nagrań (format API, max BATCH_SIZE)
+        """
+        recordings = self.db_manager.get_dirty_recordings(self.user_id, self.BATCH_SIZE, after)
+        sync_items = [self._to_sync_item(rec) for rec in recordings]
+        
+        logger.debug(f"[CallCryptor Sync] Found {len(sync_items)} changed local recordings")
+        return sync_items
+    
+    def _to_sync_item(self, rec: Dict[str, Any]) -> Dict[str, Any]:
+        """Konwertuj wiersz nagrania na format API (RecordingSyncItem)"""
+        # Parse JSON fields (stored as strings in SQLite)
+        tags = self._parse_json_field(rec.get('tags'), [])
+        ai_summary_tasks = self._parse_json_field(rec.get('ai_summary_tasks'), None)
+        ai_key_points = self._parse_json_field(rec.get('ai_key_points'), None)
+        ai_action_items = self._parse_json_field(rec.get('ai_action_items'), None)
+        
+        # UWAGA: NIE dodawaj file_path - to lokalna ścieżka!
+        return {
+            'id': rec['id'],
+            'source_id': rec['source_id'],
+            'file_name': rec['file_name'],
+            'file_hash': rec.get('file_hash'),
+            'file_size': self._safe_int(rec.get('file_size')),
+            'email_message_id': rec.get('email_message_id'),
+            'email_subject': rec.get('email_subject'),
+            'email_sender': rec.get('email_sender'),
+            'contact_name': rec.get('contact_name'),
+            'contact_phone': rec.get('contact_phone'),
+            'duration_seconds': self._safe_int(rec.get('duration')),
+            'recording_date': rec.get('recording_date'),
+            'tags': tags,
+            'notes': rec.get('notes'),
+            'transcription_status': rec.get('transcription_status', 'pending') or 'pending',
+            'transcription_text': rec.get('transcription_text'),
+            'transcription_language': rec.get('transcription_language'),
+            'transcription_confidence': self._safe_float(rec.get('transcription_confidence')),
+            'transcription_date': rec.get('transcription_date'),
+            'transcription_error': rec.get('transcription_error'),
+            'ai_summary': rec.get('ai_summary_text'),
+            'ai_summary_status': rec.get('ai_summary_status', 'pending') or 'pending',
+            'ai_summary_date': rec.get('ai_summary_date'),
+            'ai_summary_error': rec.get('ai_summary_error'),
+            'ai_summary_tasks': ai_summary_tasks,
+            'ai_key_points': ai_key_points,
+            'ai_action_items': ai_action_items,
+            'note_id': rec.get('note_id'),
+            'task_id': rec.get('task_id'),
+            'is_favorite': self._to_bool(rec.get('is_favorite'), False),
+            'favorited_at': rec.get('favorited_at'),
+            'is_archived': self._to_bool(rec.get('is_archived'), False),
+            'archived_at': rec.get('archived_at'),
+            'archive_reason': rec.get('archive_reason'),
+            'created_at': rec.get('created_at'),
+            'updated_at': rec.get('updated_at'),
+            'deleted_at': rec.get('deleted_at'),
+            'version': self._safe_int(rec.get('version'), 1)
+        }
     
     def _parse_json_field(self, value: Any, default: Any = None) -> Any:
         """
@@ -556,51 +609,108 @@ class RecordingsSyncManager:
             return []
     
     def _pull_from_server(self) -> bool:
-        """Pobierz tylko zmiany z serwera (bez wysyłania)"""
+        """Pobierz tylko zmiany z serwera od server_watermark (bez wysyłania)"""
         try:
-            # TODO: Implement pull-only sync
-            # Może być przydatne gdy mamy tylko remote changes
+            error = self._bulk_sync([])
+            if error:
+                return self._report_failure(error)
             return True
         except Exception as e:
             logger.error(f"[CallCryptor Sync] Error pulling from server: {e}")
-            return False
+            return self._report_failure(str(e))
+    
+    def _parse_timestamp(self, value: Any) -> Optional[datetime]:
+        """Parse ISO timestamp (naive lokalny lub ze strefą, np. 'Z' z serwera)."""
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            logger.warning(f"[CallCryptor Sync] Invalid timestamp: {value}")
+            return None
+    
+    def _to_local_naive(self, value: datetime) -> datetime:
+        """Sprowadź znacznik czasu do czasu lokalnego bez strefy (jak w SQLite)."""
+        if value.tzinfo is not None:
+            return value.astimezone().replace(tzinfo=None)
+        return value
+    
+    def _server_to_local_fields(self, server_rec: Dict[str, Any]) -> Dict[str, Any]:
+        """Mapuj nagranie z serwera na kolumny lokalne (listy -> JSON, bool -> int)"""
+        fields = {}
+        for key, value in server_rec.items():
+            if key in ('id', 'updated_at', 'version'):
+                continue
+            column = self.SERVER_FIELD_ALIASES.get(key, key)
+            if column in self.JSON_FIELDS and value is not None and not isinstance(value, str):
+                value = json.dumps(value, ensure_ascii=False)
+            elif isinstance(value, bool):
+                value = int(value)
+            fields[column] = value
+        return fields
     
     def _apply_server_changes(self, server_recordings: List[Dict[str, Any]]):
         """
         Zastosuj zmiany z serwera do lokalnej bazy.
         
         Last-Write-Wins: Porównaj updated_at i zastosuj nowsze.
+        server_watermark przesuwa się dopiero, gdy wszystkie nagrania z odpowiedzi
+        zostały zastosowane lub świadomie pominięte - błąd zapisu przerywa
+        synchronizację (trafia do _report_failure), a kolejna pobierze je ponownie.
         
         Args:
-            server_recordings: Lista nagrań z serwera
+            server_recordings: Lista nagrań z serwera (zmienione od server_watermark)
         """
-        try:
-            for server_rec in server_recordings:
-                rec_id = server_rec['id']
-                
-                # Sprawdź czy istnieje lokalnie
-                local_rec = self.db_manager.get_recording(rec_id)
-                
-                if not local_rec:
-                    # Nowe nagranie z serwera - dodaj
-                    logger.debug(f"[CallCryptor Sync] New recording from server: {rec_id}")
-                    # TODO: Implement add_recording_from_server
-                    continue
-                
+        if not server_recordings:
+            return
+        
+        # Stan lokalny wszystkich nagrań z odpowiedzi jednym zapytaniem
+        local_states = self.db_manager.get_recordings_sync_state(
+            [rec['id'] for rec in server_recordings if rec.get('id')]
+        )
+        applied = 0
+        watermark = self.server_watermark
+        
+        for server_rec in server_recordings:
+            rec_id = server_rec.get('id')
+            server_updated = self._parse_timestamp(server_rec.get('updated_at'))
+            if not rec_id or server_updated is None:
+                continue
+            
+            server_local_time = self._to_local_naive(server_updated)
+            local_state = local_states.get(rec_id)
+            if not local_state:
+                # Nowe nagranie z serwera - brak pliku audio lokalnie
+                logger.debug(f"[CallCryptor Sync] New recording from server: {rec_id}")
+                # TODO: Implement add_recording_from_server
+            else:
                 # Porównaj updated_at (Last-Write-Wins)
-                server_updated = datetime.fromisoformat(server_rec['updated_at']) if isinstance(server_rec['updated_at'], str) else server_rec['updated_at']
-                local_updated = datetime.fromisoformat(local_rec['updated_at']) if isinstance(local_rec['updated_at'], str) else local_rec['updated_at']
-                
-                if server_updated > local_updated:
+                local_updated = self._parse_timestamp(local_state['updated_at'])
+                if local_updated is not None and server_local_time <= self._to_local_naive(local_updated):
+                    logger.debug(f"[CallCryptor Sync] Local version up-to-date for {rec_id}")
+                else:
                     # Server ma nowszą wersję - zaktualizuj lokalnie
                     logger.debug(f"[CallCryptor Sync] Server version newer for {rec_id}, updating local")
-                    # TODO: Implement update_recording_from_server
-                    self.conflicts_resolved += 1
-                else:
-                    logger.debug(f"[CallCryptor Sync] Local version up-to-date for {rec_id}")
-                    
-        except Exception as e:
-            logger.error(f"[CallCryptor Sync] Error applying server changes: {e}")
+                    self.db_manager.apply_server_recording(
+                        rec_id,
+                        self._server_to_local_fields(server_rec),
+                        server_local_time.isoformat(),
+                        self._safe_int(server_rec.get('version'), 1)
+                    )
+                    applied += 1
+                    if not self._to_bool(local_state.get('is_synced'), False):
+                        # Lokalna niewysłana zmiana nadpisana nowszą z serwera
+                        self.conflicts_resolved += 1
+            
+            # Nagranie zastosowane lub pominięte - może przesunąć watermark
+            if watermark is None or server_local_time > self._to_local_naive(watermark):
+                watermark = server_updated
+        
+        self.server_watermark = watermark
+        if applied:
+            logger.info(f"[CallCryptor Sync] Applied {applied} recordings from server")
     
     # =========================================================================
     # STATS
@@ -617,6 +727,7 @@ class RecordingsSyncManager:
             'sync_enabled': self.sync_enabled,
             'auto_sync_enabled': self.auto_sync_enabled,
             'last_sync_at': self.last_sync_at,
+            'server_watermark': self.server_watermark,
             'sync_count': self.sync_count,
             'error_count': self.error_count,
             'conflicts_resolved': self.conflicts_resolved,
@@ -8,31 +8,87 @@ Features:
 - Skanowanie folderów lokalnych (rekurencyjne z kontrolą głębokości)
 - Skanowanie skrzynek email (IMAP + załączniki)
 - Ekstrakcja metadanych audio (duration, format, bitrate)
-- Deduplication przez hash plików
+- Deduplication przez odcisk pliku, pełny hash tylko przy kolizji (file_hasher)
+- Skanowanie przyrostowe (manifest: rozmiar, mtime, inode, hash)
 - Progress reporting
 """
 
 import os
 import hashlib
 from pathlib import Path
-from typing import List, Dict, Optional, Callable
+from typing import List, Dict, Optional, Callable, Tuple
 from datetime import datetime
 from loguru import logger
 import imaplib
 import email
 from email.header import decode_header
 import re
+import uuid
+from collections import Counter
+
+from .file_hasher import FileHasher, fingerprint_bytes, full_file_hash
+
+
+def is_duplicate_recording(
+    db_manager,
+    dedupe_index: Tuple[Dict[str, List[Dict]], Dict[int, set]],
+    fingerprint: str,
+    file_hash: Optional[str]
+) -> bool:
+    """
+    Sprawdź czy nagranie o tym odcisku/hashu już istnieje.
+    
+    Nagranie z tym samym odciskiem, ale bez pełnego hashu, dostaje go teraz
+    (plik czytany w całości tylko przy kolizji odcisków). Sam odcisk nie
+    rozstrzyga - bez pełnych hashy obu plików (np. istniejący plik usunięto
+    lub przeniesiono) nagranie nie jest duplikatem.
+    
+    Args:
+        db_manager: CallCryptorDatabase instance
+        dedupe_index: Wynik CallCryptorDatabase.get_dedupe_index
+        fingerprint: Odcisk nowego pliku
+        file_hash: Pełny hash nowego pliku (None jeśli nie był potrzebny)
+    """
+    by_fingerprint, hashes_by_size = dedupe_index
+    size = int(fingerprint.split(':', 1)[0])
+    if file_hash and file_hash in hashes_by_size.get(size, ()):
+        return True
+    
+    for existing in by_fingerprint.get(fingerprint, []):
+        existing_hash = existing['file_hash']
+        if not existing_hash and existing['file_path'] and os.path.exists(existing['file_path']):
+            try:
+                existing_hash = full_file_hash(existing['file_path'])
+            except OSError as e:
+                logger.warning(f"[FolderScanner] Cannot hash {existing['file_path']}: {e}")
+            else:
+                existing['file_hash'] = existing_hash
+                db_manager.set_recording_hash(existing['id'], existing_hash)
+        
+        if existing_hash and file_hash and existing_hash == file_hash:
+            return True
+    return False
 
 
 class FolderScanner:
     """Scanner dla folderów lokalnych"""
     
-    def __init__(self, db_manager):
+    def __init__(
+        self,
+        db_manager,
+        hasher: Optional[FileHasher] = None,
+        require_full_hash: bool = False
+    ):
         """
         Args:
             db_manager: CallCryptorDatabase instance
+            hasher: Pula hashująca (domyślnie FileHasher z liczbą wątków wg rdzeni)
+            require_full_hash: Licz pełny SHA-256 każdego nowego pliku, nie tylko przy
+                kolizji odcisków (np. gdy hash jest potrzebny jako tożsamość pliku)
         """
         self.db_manager = db_manager
+        self.hasher = hasher or FileHasher()
+        self.require_full_hash = require_full_hash
         self.progress_callback: Optional[Callable] = None
     
     def scan_folder(
@@ -51,13 +107,16 @@ class FolderScanner:
             folder_path: Ścieżka do folderu
             extensions: Lista rozszerzeń (bez kropki, np. ['mp3', 'wav'])
             max_depth: Maksymalna głębokość skanowania (1 = tylko główny folder)
-            progress_callback: Callback(current, total, filename)
+            progress_callback: Callback(current, total, filename) - kolejno dla
+                odcisków, pełnych hashy (z przepustowością MB/s) i dodawania nagrań
             
         Returns:
             Dict z wynikami: {
                 'found': int,
                 'added': int,
                 'duplicates': int,
+                'unchanged': int (pliki bez zmian od ostatniego skanowania),
+                'removed': int (pliki usunięte od ostatniego skanowania),
                 'errors': List[str]
             }
         """
@@ -67,6 +126,8 @@ class FolderScanner:
             'found': 0,
             'added': 0,
             'duplicates': 0,
+            'unchanged': 0,
+            'removed': 0,
             'errors': []
         }
         
@@ -77,8 +138,8 @@ class FolderScanner:
         
         logger.info(f"[FolderScanner] Scanning: {folder_path}, depth={max_depth}, extensions={extensions}")
         
-        # Zbierz wszystkie pliki
-        audio_files = self._find_audio_files(folder_path, extensions, max_depth)
+        # Zbierz pliki wraz z metadanymi z katalogu (bez czytania zawartości)
+        audio_files = self._scan_audio_files(folder_path, extensions, max_depth)
         results['found'] = len(audio_files)
         
         logger.info(f"[FolderScanner] Found {len(audio_files)} audio files")
@@ -91,18 +152,176 @@ class FolderScanner:
         
         user_id = source['user_id']
         
-        # Przetwórz każdy plik
-        for i, file_path in enumerate(audio_files, 1):
+        # Porównaj z manifestem poprzedniego skanowania - hashowane są tylko
+        # pliki nowe lub zmienione (inny rozmiar, mtime albo inode)
+        manifest = self.db_manager.get_scan_manifest(source_id)
+        removed_paths = [path for path in manifest if path not in audio_files]
+        
+        return self._ingest_files(source_id, user_id, audio_files, manifest, removed_paths, results)
+    
+    def scan_paths(
+        self,
+        source_id: str,
+        paths: List[str],
+        extensions: List[str],
+        progress_callback: Optional[Callable[[int, int, str], None]] = None
+    ) -> Dict:
+        """
+        Przetwórz tylko wskazane pliki źródła (np. zgłoszone przez FolderWatcher).
+        
+        Ścieżki, których już nie ma, są usuwane z manifestu; reszta przechodzi
+        przez ten sam przyrostowy proces co scan_folder (manifest, odciski, deduplikacja).
+        
+        Args:
+            source_id: ID źródła w bazie
+            paths: Ścieżki plików (nowych, zmienionych lub usuniętych)
+            extensions: Lista rozszerzeń (bez kropki, np. ['mp3', 'wav'])
+            progress_callback: Callback(current, total, filename)
+            
+        Returns:
+            Dict z wynikami jak scan_folder
+        """
+        self.progress_callback = progress_callback
+        
+        results = {
+            'found': 0,
+            'added': 0,
+            'duplicates': 0,
+            'unchanged': 0,
+            'removed': 0,
+            'errors': []
+        }
+        
+        source = self.db_manager.get_source(source_id)
+        if not source:
+            results['errors'].append(f"Źródło nie znalezione: {source_id}")
+            return results
+        
+        extensions = {ext.lower().strip('.') for ext in extensions}
+        paths = [os.path.normpath(path) for path in paths]
+        audio_files = {}
+        for file_path in paths:
+            if os.path.splitext(file_path)[1].lower().strip('.') not in extensions:
+                continue
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                continue  # Plik usunięty - obsłużony niżej przez manifest
+            audio_files[file_path] = {
+                'file_size': file_stat.st_size,
+                'mtime_ns': file_stat.st_mtime_ns,
+                'inode': file_stat.st_ino or None
+            }
+        results['found'] = len(audio_files)
+        
+        manifest = self.db_manager.get_scan_manifest(source_id)
+        removed_paths = [path for path in paths if path in manifest and path not in audio_files]
+        
+        return self._ingest_files(source_id, source['user_id'], audio_files, manifest, removed_paths, results)
+    
+    def _ingest_files(
+        self,
+        source_id: str,
+        user_id: str,
+        audio_files: Dict[str, Dict],
+        manifest: Dict[str, Dict],
+        removed_paths: List[str],
+        results: Dict
+    ) -> Dict:
+        """
+        Dodaj nowe i zmienione pliki (względem manifestu) do bazy.
+        
+        Args:
+            source_id: ID źródła
+            user_id: ID właściciela źródła
+            audio_files: Ścieżka -> {'file_size', 'mtime_ns', 'inode'}
+            manifest: Wynik get_scan_manifest
+            removed_paths: Ścieżki z manifestu, których już nie ma
+            results: Słownik wyników uzupełniany i zwracany
+        """
+        progress_callback = self.progress_callback
+        results['removed'] = len(removed_paths)
+        
+        # Plik przeniesiony w obrębie źródła (ten sam inode, rozmiar i mtime) to
+        # to samo nagranie - dostaje nową ścieżkę zamiast ponownej deduplikacji
+        moved_files = {
+            self._file_identity(manifest[path]): dict(manifest[path], file_path=path)
+            for path in removed_paths
+            if manifest[path]['inode']
+        }
+        
+        changed_files = {}
+        moved_paths = []
+        manifest_updates = []
+        for file_path, file_stat in audio_files.items():
+            known = manifest.get(file_path)
+            moved = moved_files.get(self._file_identity(file_stat))
+            if known and self._file_identity(known) == self._file_identity(file_stat):
+                results['unchanged'] += 1
+            elif moved:
+                moved_paths.append((moved['file_path'], file_path))
+                manifest_updates.append(dict(
+                    file_stat, file_path=file_path,
+                    file_fingerprint=moved['file_fingerprint'], file_hash=moved['file_hash']
+                ))
+                results['duplicates'] += 1
+            else:
+                changed_files[file_path] = file_stat
+        
+        if moved_paths:
+            self.db_manager.update_recording_paths(user_id, moved_paths)
+            logger.info(f"[FolderScanner] {len(moved_paths)} files moved within the source")
+        
+        if removed_paths:
+            logger.info(f"[FolderScanner] {len(removed_paths)} files removed since last scan")
+        logger.info(
+            f"[FolderScanner] {len(changed_files)} new/changed files, {results['unchanged']} unchanged"
+        )
+        
+        # Etap 1: odciski (rozmiar + początek/środek/koniec) w puli wątków
+        hashes = self.hasher.fingerprint_files(
+            {file_path: file_stat['file_size'] for file_path, file_stat in changed_files.items()},
+            progress_callback, results['errors']
+        )
+        
+        # Etap 2: pełny SHA-256 tylko przy kolizji odcisku (z bazą lub w obrębie skanu)
+        dedupe_index = self.db_manager.get_dedupe_index(user_id)
+        by_fingerprint, hashes_by_size = dedupe_index
+        fingerprint_counts = Counter(fingerprint for fingerprint, _ in hashes.values())
+        needs_full_hash = [
+            file_path for file_path, (fingerprint, file_hash) in hashes.items()
+            if not file_hash and (
+                self.require_full_hash
+                or fingerprint in by_fingerprint
+                or fingerprint_counts[fingerprint] > 1
+                or changed_files[file_path]['file_size'] in hashes_by_size
+            )
+        ]
+        full_hashes = self.hasher.full_hashes(needs_full_hash, progress_callback, results['errors'])
+        for file_path, file_hash in full_hashes.items():
+            hashes[file_path] = (hashes[file_path][0], file_hash)
+        
+        # Przetwórz nowe i zmienione pliki - nagrania trafiają do bazy zbiorczo na końcu
+        pending = []
+        ready_files = [
+            file_path for file_path in changed_files
+            if file_path in hashes and (file_path not in needs_full_hash or file_path in full_hashes)
+        ]
+        for i, file_path in enumerate(ready_files, 1):
+            file_stat = changed_files[file_path]
             if progress_callback:
-                progress_callback(i, len(audio_files), os.path.basename(file_path))
+                progress_callback(i, len(ready_files), os.path.basename(file_path))
             
             try:
-                # Oblicz hash
-                file_hash = self._calculate_file_hash(file_path)
+                fingerprint, file_hash = hashes[file_path]
+                manifest_entry = dict(
+                    file_stat, file_path=file_path, file_fingerprint=fingerprint, file_hash=file_hash
+                )
                 
                 # Sprawdź czy już istnieje
-                if self.db_manager.recording_exists_by_hash(file_hash, user_id):
+                if is_duplicate_recording(self.db_manager, dedupe_index, fingerprint, file_hash):
                     results['duplicates'] += 1
+                    manifest_updates.append(manifest_entry)
                     logger.debug(f"[FolderScanner] Duplicate: {file_path}")
                     continue
                 
@@ -111,11 +330,13 @@ class FolderScanner:
                 
                 # Dodaj do bazy
                 recording_data = {
+                    'id': str(uuid.uuid4()),
                     'source_id': source_id,
                     'file_name': os.path.basename(file_path),
                     'file_path': str(file_path),
-                    'file_size': os.path.getsize(file_path),
+                    'file_size': file_stat['file_size'],
                     'file_hash': file_hash,
+                    'file_fingerprint': fingerprint,
                     'file_format': metadata.get('format'),
                     'duration_seconds': metadata.get('duration'),
                     'contact_name': metadata.get('contact_name'),
@@ -124,84 +345,115 @@ class FolderScanner:
                     'call_type': metadata.get('call_type', 'unknown')
                 }
                 
-                self.db_manager.add_recording(recording_data, user_id)
-                results['added'] += 1
-                logger.debug(f"[FolderScanner] Added: {file_path}")
+                # Wpis indeksu to sam słownik nagrania - hash uzupełniony przy
+                # kolizji z kolejnym plikiem trafi do bazy razem z nagraniem
+                by_fingerprint.setdefault(fingerprint, []).append(recording_data)
+                pending.append((recording_data, manifest_entry))
                 
             except Exception as e:
                 error_msg = f"Błąd przetwarzania {file_path}: {str(e)}"
                 results['errors'].append(error_msg)
                 logger.error(f"[FolderScanner] {error_msg}")
         
+        # Dodaj nagrania do bazy (executemany w porcjach; unikalne indeksy
+        # hashu i odcisku odrzucają duplikaty dodane w międzyczasie)
+        if pending:
+            try:
+                added_ids = self.db_manager.add_recordings_bulk(
+                    [recording_data for recording_data, _ in pending], user_id
+                )
+            except Exception as e:
+                error_msg = f"Błąd zapisu nagrań: {str(e)}"
+                results['errors'].append(error_msg)
+                logger.error(f"[FolderScanner] {error_msg}")
+            else:
+                results['added'] = len(added_ids)
+                results['duplicates'] += len(pending) - len(added_ids)
+                manifest_updates.extend(manifest_entry for _, manifest_entry in pending)
+        
+        # Zapisz manifest (pliki z błędem nie trafiają do niego - kolejny skan je powtórzy)
+        self.db_manager.update_scan_manifest(source_id, manifest_updates, removed_paths)
+        
         # Aktualizuj licznik nagrań w źródle
         self.db_manager.update_source_stats(source_id, results['added'])
         
         logger.success(f"[FolderScanner] Scan complete: {results}")
         return results
     
-    def _find_audio_files(
+    @staticmethod
+    def _file_identity(file_stat: Dict) -> tuple:
+        """Klucz porównania pliku z manifestem (rozmiar, mtime w ns, inode)"""
+        return (file_stat['file_size'], file_stat['mtime_ns'], file_stat['inode'])
+    
+    def _scan_audio_files(
         self,
         folder_path: str,
         extensions: List[str],
-        max_depth: int,
-        current_depth: int = 0
-    ) -> List[str]:
+        max_depth: int
+    ) -> Dict[str, Dict]:
         """
-        Znajdź pliki audio w folderze (rekurencyjnie).
+        Znajdź pliki audio w folderze (os.scandir, bez rekurencji wywołań).
+        
+        Rozmiar, mtime i inode pochodzą z wpisów katalogu - skan nie otwiera plików.
         
         Args:
             folder_path: Ścieżka do folderu
             extensions: Lista rozszerzeń
-            max_depth: Maksymalna głębokość
-            current_depth: Obecna głębokość (0 = główny folder)
+            max_depth: Maksymalna głębokość (0 = tylko główny folder)
             
         Returns:
-            Lista ścieżek do plików audio
+            Słownik: ścieżka -> {'file_size', 'mtime_ns', 'inode'}
         """
-        audio_files = []
+        # Normalizuj rozszerzenia (małe litery, bez kropki)
+        extensions = {ext.lower().strip('.') for ext in extensions}
+        audio_files = {}
+        # Ścieżki znormalizowane jak w FolderWatcher - te same klucze manifestu
+        pending = [(os.path.normpath(folder_path), 0)]
         
-        try:
-            # Normalizuj rozszerzenia (małe litery, bez kropki)
-            extensions = [ext.lower().strip('.') for ext in extensions]
+        while pending:
+            current_path, depth = pending.pop()
+            try:
+                with os.scandir(current_path) as entries:
+                    for entry in entries:
+                        try:
+                            # Plik - sprawdź rozszerzenie
+                            if entry.is_file():
+                                file_ext = os.path.splitext(entry.name)[1].lower().strip('.')
+                                if file_ext in extensions:
+                                    file_stat = entry.stat()
+                                    audio_files[entry.path] = {
+                                        'file_size': file_stat.st_size,
+                                        'mtime_ns': file_stat.st_mtime_ns,
+                                        'inode': entry.inode() or None
+                                    }
+                            
+                            # Folder - skanuj jeśli nie przekroczono głębokości
+                            elif entry.is_dir() and depth < max_depth:
+                                pending.append((entry.path, depth + 1))
+                        except OSError as e:
+                            logger.warning(f"[FolderScanner] Cannot stat {entry.path}: {e}")
             
-            # Iteruj po zawartości folderu
-            for item in os.listdir(folder_path):
-                item_path = os.path.join(folder_path, item)
-                
-                # Plik - sprawdź rozszerzenie
-                if os.path.isfile(item_path):
-                    file_ext = os.path.splitext(item)[1].lower().strip('.')
-                    if file_ext in extensions:
-                        audio_files.append(item_path)
-                
-                # Folder - skanuj rekurencyjnie jeśli nie przekroczono głębokości
-                elif os.path.isdir(item_path) and current_depth < max_depth:
-                    subfolder_files = self._find_audio_files(
-                        item_path,
-                        extensions,
-                        max_depth,
-                        current_depth + 1
-                    )
-                    audio_files.extend(subfolder_files)
-        
-        except PermissionError as e:
-            logger.warning(f"[FolderScanner] Permission denied: {folder_path}")
-        except Exception as e:
-            logger.error(f"[FolderScanner] Error scanning {folder_path}: {e}")
+            except PermissionError:
+                logger.warning(f"[FolderScanner] Permission denied: {current_path}")
+            except Exception as e:
+                logger.error(f"[FolderScanner] Error scanning {current_path}: {e}")
         
         return audio_files
     
+    def _find_audio_files(
+        self,
+        folder_path: str,
+        extensions: List[str],
+        max_depth: int
+    ) -> List[str]:
+        """Znajdź pliki audio w folderze (lista ścieżek)"""
+        return list(self._scan_audio_files(folder_path, extensions, max_depth))
+    
     def _calculate_file_hash(self, file_path: str) -> str:
         """Oblicz SHA256 hash pliku"""
-        sha256 = hashlib.sha256()
-        
         try:
-            with open(file_path, 'rb') as f:
-                # Czytaj plik w kawałkach (nie ładuj całego do pamięci)
-                for chunk in iter(lambda: f.read(8192), b''):
-                    sha256.update(chunk)
-            
-            return sha256.hexdigest()
+            # Czytaj plik w kawałkach (nie ładuj całego do pamięci)
+            return full_file_hash(file_path)
         
         except Exception as e:
             logger.error(f"[FolderScanner] Hash calculation failed for {file_path}: {e}")
@@ -270,8 +522,8 @@ class FolderScanner:
         elif 'outgoing' in filename.lower() or 'wychodzace' in filename.lower():
             metadata['call_type'] = 'outgoing'
         
-        # TODO: Użyj mutagen/tinytag do ekstrakcji duration
-        # Na razie zwróć podstawowe metadane
+        # Czas trwania i parametry audio uzupełnia w tle AudioMetadataWorker
+        # (audio_metadata.py) - skanowanie nie czyta zawartości plików audio
         
         return metadata
 
@@ -352,6 +604,7 @@ class EmailScanner:
             
             user_id = source['user_id']
             pattern = re.compile(attachment_pattern, re.IGNORECASE)
+            dedupe_index = self.db_manager.get_dedupe_index(user_id)
             
             # Określ foldery do przeszukania
             folders_to_scan = []
@@ -610,7 +863,10 @@ class EmailScanner:
                 # Sortuj malejąco po ID (nowsze mają wyższe ID) i weź pierwsze MAX_MESSAGES
                 all_message_ids = sorted(all_message_ids, key=lambda x: int(x[0]), reverse=True)[:MAX_MESSAGES]
             
-            # Przetwórz każdą wiadomość
+            # Przetwórz każdą wiadomość - nagrania i przetworzone wiadomości
+            # trafiają do bazy zbiorczo na końcu (także po przerwaniu)
+            pending = []
+            scanned_keys = []
             for i, (msg_id, folder) in enumerate(all_message_ids, 1):
                 # Upewnij się, że jesteśmy we właściwym folderze
                 mail.select(folder)
@@ -620,10 +876,16 @@ class EmailScanner:
                         progress_callback(i, len(all_message_ids), f"{folder}: Message {i}/{len(all_message_ids)}")
                     except InterruptedError:
                         logger.info("[EmailScanner] Download interrupted by user")
-                        mail.logout()
-                        return results
+                        break
                 
                 try:
+                    # Najpierw sam Message-ID - już przetworzonych wiadomości
+                    # nie pobieramy ponownie w całości (z załącznikami)
+                    message_key = self._fetch_message_key(mail, msg_id)
+                    if message_key and self.db_manager.is_email_message_scanned(source_id, message_key):
+                        results['duplicates'] += 1
+                        continue
+                    
                     # Pobierz wiadomość
                     _, msg_data = mail.fetch(msg_id, '(RFC822)')
                     if not msg_data or not msg_data[0]:
@@ -655,11 +917,13 @@ class EmailScanner:
                             if not isinstance(attachment_data, bytes):
                                 continue
                             
-                            # Oblicz hash
+                            # Oblicz hash (załącznik jest w pamięci - pełny hash jest tani)
                             file_hash = hashlib.sha256(attachment_data).hexdigest()
+                            fingerprint = fingerprint_bytes(attachment_data)
                             
-                            # Sprawdź duplikat
-                            if self.db_manager.recording_exists_by_hash(file_hash, user_id):
+                            # Sprawdź duplikat w indeksie wczytanym raz na skanowanie
+                            # (także z nagraniami z folderów bez pełnego hashu)
+                            if is_duplicate_recording(self.db_manager, dedupe_index, fingerprint, file_hash):
                                 results['duplicates'] += 1
                                 continue
                             
@@ -672,8 +936,10 @@ class EmailScanner:
                             safe_filename = f"{file_hash[:8]}_{filename}"
                             file_path = recordings_dir / safe_filename
                             
-                            with open(file_path, 'wb') as f:
-                                f.write(attachment_data)
+                            # Ten sam plik (np. po usunięciu nagrania z bazy) nie jest zapisywany drugi raz
+                            if not file_path.exists():
+                                with open(file_path, 'wb') as f:
+                                    f.write(attachment_data)
                             
                             # Pobierz datę wiadomości
                             date_str = message.get('Date', '')
@@ -688,13 +954,15 @@ class EmailScanner:
                             # Parsuj nazwę kontaktu z tematu (usuń pomijane słowa)
                             contact_name = self._parse_contact_name(subject, source)
                             
-                            # Dodaj do bazy
+                            # Dodaj do partii
                             recording_data = {
+                                'id': str(uuid.uuid4()),
                                 'source_id': source_id,
                                 'file_name': filename,
                                 'file_path': str(file_path),
                                 'file_size': len(attachment_data),
                                 'file_hash': file_hash,
+                                'file_fingerprint': fingerprint,
                                 'file_format': os.path.splitext(filename)[1].strip('.').upper(),
                                 'duration_seconds': None,  # Nie znamy długości z emaila
                                 'contact_name': contact_name,
@@ -703,9 +971,14 @@ class EmailScanner:
                                 'call_type': 'email'
                             }
                             
-                            self.db_manager.add_recording(recording_data, user_id)
-                            results['added'] += 1
-                            logger.debug(f"[EmailScanner] Added: {filename} -> {file_path}")
+                            # Wpis indeksu to sam słownik nagrania (kolejne załączniki
+                            # tej partii są z nim porównywane)
+                            dedupe_index[0].setdefault(fingerprint, []).append(recording_data)
+                            pending.append(recording_data)
+                            logger.debug(f"[EmailScanner] Queued: {filename} -> {file_path}")
+                    
+                    if message_key:
+                        scanned_keys.append(message_key)
                 
                 except Exception as e:
                     error_msg = f"Błąd przetwarzania wiadomości {msg_id}: {str(e)}"
@@ -715,6 +988,19 @@ class EmailScanner:
             # Wyloguj
             mail.logout()
             
+            # Dodaj nagrania do bazy (executemany w porcjach); wiadomości są
+            # oznaczane jako przetworzone dopiero po zapisaniu ich nagrań
+            try:
+                if pending:
+                    added_ids = self.db_manager.add_recordings_bulk(pending, user_id)
+                    results['added'] = len(added_ids)
+                    results['duplicates'] += len(pending) - len(added_ids)
+                self.db_manager.mark_email_messages_scanned(source_id, scanned_keys)
+            except Exception as e:
+                error_msg = f"Błąd zapisu nagrań: {str(e)}"
+                results['errors'].append(error_msg)
+                logger.error(f"[EmailScanner] {error_msg}")
+            
             # Aktualizuj licznik nagrań w źródle (tylko jeśli nie preview)
             if not preview_only:
                 self.db_manager.update_source_stats(source_id, results['added'])
@@ -728,6 +1014,19 @@ class EmailScanner:
         
         return results
     
+    def _fetch_message_key(self, mail: imaplib.IMAP4_SSL, msg_id) -> Optional[str]:
+        """Pobierz sam nagłówek Message-ID (bez treści i załączników)"""
+        try:
+            _, msg_data = mail.fetch(msg_id, '(BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])')
+            if not msg_data or not msg_data[0] or not isinstance(msg_data[0], tuple):
+                return None
+            header = email.message_from_bytes(msg_data[0][1])
+            message_id = (header.get('Message-ID') or '').strip()
+            return message_id or None
+        except Exception as e:
+            logger.debug(f"[EmailScanner] Could not fetch Message-ID for {msg_id}: {e}")
+            return None
+    
     def _decode_header(self, header_value: str) -> str:
         """Dekoduj nagłówek email"""
         if not header_value:
@@ -0,0 +1,186 @@
+"""
+Test dwuetapowej deduplikacji nagrań: odcisk pliku (rozmiar + 3 bloki),
+pełny SHA-256 liczony dopiero przy kolizji odcisków (is_duplicate_recording)
+i przeniesienie pliku w obrębie źródła (FolderScanner).
+
+Uruchomienie:
+    python src/Modules/CallCryptor_module/test_recording_dedupe.py
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# source_scanner używa importów względnych - ładowany jako część pakietu
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from CallCryptor_module import file_hasher
+from CallCryptor_module import source_scanner
+from CallCryptor_module.callcryptor_database import CallCryptorDatabase
+
+USER_ID = "test-user"
+FILE_SIZE = 1_000_000
+
+
+def write_file(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+def check_fingerprints(tmp_dir: Path):
+    small = os.urandom(10_000)
+    small_path = write_file(tmp_dir / "small.wav", small)
+    fingerprint, full_hash, read = file_hasher.fingerprint_file(str(small_path))
+    # Mały plik jest czytany w całości - od razu ma pełny hash
+    assert fingerprint == file_hasher.fingerprint_bytes(small)
+    assert full_hash == hashlib.sha256(small).hexdigest()
+    assert read == len(small)
+
+    big = os.urandom(FILE_SIZE)
+    big_path = write_file(tmp_dir / "big.wav", big)
+    fingerprint, full_hash, read = file_hasher.fingerprint_file(str(big_path))
+    assert fingerprint == file_hasher.fingerprint_bytes(big)
+    assert fingerprint.startswith(f"{FILE_SIZE}:")
+    assert full_hash is None
+    assert read == 3 * file_hasher.FINGERPRINT_BLOCK_SIZE
+
+    # Zmiana poza próbkowanymi blokami - ten sam odcisk, inny pełny hash
+    changed = bytearray(big)
+    changed[100_000] ^= 0xFF
+    changed_path = write_file(tmp_dir / "big_changed.wav", bytes(changed))
+    assert file_hasher.fingerprint_file(str(changed_path))[0] == fingerprint
+    assert file_hasher.full_file_hash(str(changed_path)) != file_hasher.full_file_hash(str(big_path))
+    print("Odciski: OK")
+    return big_path, changed_path
+
+
+def check_duplicates(tmp_dir: Path, big_path: Path, changed_path: Path):
+    db = CallCryptorDatabase(str(tmp_dir / "callcryptor.db"))
+    source_id = db.add_source({"source_name": "Test", "source_type": "folder",
+                               "folder_path": str(tmp_dir)}, USER_ID)
+
+    fingerprint = file_hasher.fingerprint_file(str(big_path))[0]
+    # Nagranie zapisane tylko z odciskiem (pełny hash nie był potrzebny)
+    existing_id = db.add_recording({
+        "source_id": source_id, "file_name": big_path.name, "file_path": str(big_path),
+        "file_size": FILE_SIZE, "file_fingerprint": fingerprint,
+    }, USER_ID)
+
+    hashed = []
+    original_full_hash = source_scanner.full_file_hash
+
+    def counting_full_hash(path):
+        hashed.append(os.path.basename(path))
+        return original_full_hash(path)
+
+    source_scanner.full_file_hash = counting_full_hash
+    try:
+        # Kolizja odcisków, inna treść - nie jest duplikatem; istniejące nagranie
+        # dostaje pełny hash (jeden odczyt całego pliku)
+        index = db.get_dedupe_index(USER_ID)
+        changed_hash = file_hasher.full_file_hash(str(changed_path))
+        assert not source_scanner.is_duplicate_recording(db, index, fingerprint, changed_hash)
+        assert hashed == [big_path.name]
+        big_hash = file_hasher.full_file_hash(str(big_path))
+        assert db.get_recording(existing_id)["file_hash"] == big_hash
+
+        # Ta sama treść - duplikat, bez ponownego hashowania istniejącego pliku
+        index = db.get_dedupe_index(USER_ID)
+        assert source_scanner.is_duplicate_recording(db, index, fingerprint, big_hash)
+        assert hashed == [big_path.name]
+
+        # Bez pełnego hashu nowego pliku sam odcisk nie rozstrzyga
+        assert not source_scanner.is_duplicate_recording(db, index, fingerprint, None)
+
+        # Inny odcisk - brak kolizji, nic nie jest hashowane
+        other = f"{FILE_SIZE}:{'0' * 64}"
+        assert not source_scanner.is_duplicate_recording(db, index, other, None)
+        assert hashed == [big_path.name]
+    finally:
+        source_scanner.full_file_hash = original_full_hash
+
+    # Nagranie sprzed odcisków (tylko pełny hash) - porównanie po rozmiarze i hashu
+    legacy = os.urandom(50_000)
+    legacy_hash = hashlib.sha256(legacy).hexdigest()
+    db.add_recording({"source_id": source_id, "file_name": "legacy.wav",
+                      "file_size": len(legacy), "file_hash": legacy_hash}, USER_ID)
+    index = db.get_dedupe_index(USER_ID)
+    assert source_scanner.is_duplicate_recording(db, index, file_hasher.fingerprint_bytes(legacy), legacy_hash)
+    assert not source_scanner.is_duplicate_recording(
+        db, index, file_hasher.fingerprint_bytes(os.urandom(50_000)), hashlib.sha256(b"inny").hexdigest()
+    )
+    db.close()
+    print("Duplikaty: OK")
+
+
+def check_missing_existing_file(tmp_dir: Path):
+    db = CallCryptorDatabase(str(tmp_dir / "missing.db"))
+    source_id = db.add_source({"source_name": "Test", "source_type": "folder"}, USER_ID)
+
+    data = os.urandom(FILE_SIZE)
+    gone_path = tmp_dir / "usuniety.wav"
+    fingerprint = file_hasher.fingerprint_bytes(data)
+    # Istniejące nagranie bez pełnego hashu, którego pliku już nie ma
+    existing_id = db.add_recording({
+        "source_id": source_id, "file_name": gone_path.name, "file_path": str(gone_path),
+        "file_size": FILE_SIZE, "file_fingerprint": fingerprint,
+    }, USER_ID)
+
+    # Tego samego odcisku nie da się potwierdzić pełnym hashem - to nie duplikat
+    index = db.get_dedupe_index(USER_ID)
+    new_hash = hashlib.sha256(data).hexdigest()
+    assert not source_scanner.is_duplicate_recording(db, index, fingerprint, new_hash)
+    assert db.get_recording(existing_id)["file_hash"] is None
+
+    # Nowe nagranie z pełnym hashem nie koliduje z indeksem odcisków
+    added = db.add_recordings_bulk([{
+        "source_id": source_id, "file_name": "nowy.wav", "file_size": FILE_SIZE,
+        "file_fingerprint": fingerprint, "file_hash": new_hash,
+    }], USER_ID)
+    assert len(added) == 1
+    db.close()
+    print("Brak istniejącego pliku: OK")
+
+
+def check_moved_file(tmp_dir: Path):
+    folder = tmp_dir / "zrodlo"
+    (folder / "stare").mkdir(parents=True)
+    db = CallCryptorDatabase(str(tmp_dir / "moved.db"))
+    source_id = db.add_source({"source_name": "Folder", "source_type": "folder",
+                               "folder_path": str(folder)}, USER_ID)
+    scanner = source_scanner.FolderScanner(db)
+
+    old_path = write_file(folder / "stare" / "rozmowa.wav", os.urandom(FILE_SIZE))
+    results = scanner.scan_folder(source_id, str(folder), ["wav"], max_depth=2)
+    assert results["added"] == 1, results
+
+    # Przeniesienie w obrębie źródła - to samo nagranie pod nową ścieżką
+    new_path = folder / "rozmowa.wav"
+    os.replace(old_path, new_path)
+    results = scanner.scan_folder(source_id, str(folder), ["wav"], max_depth=2)
+    assert results["added"] == 0 and results["removed"] == 1, results
+    recordings = db.get_recordings_by_source(source_id)
+    assert len(recordings) == 1
+    assert recordings[0]["file_path"] == os.path.normpath(str(new_path))
+    assert recordings[0]["file_name"] == "rozmowa.wav"
+    db.close()
+    print("Przeniesiony plik: OK")
+
+
+def run_test():
+    tmp_dir = Path(tempfile.mkdtemp(prefix="callcryptor_dedupe_"))
+    try:
+        big_path, changed_path = check_fingerprints(tmp_dir)
+        check_duplicates(tmp_dir, big_path, changed_path)
+        check_missing_existing_file(tmp_dir)
+        check_moved_file(tmp_dir)
+        print("OK")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,148 @@
+"""
+Test hurtowego dodawania nagrań (add_recordings_bulk): porcje w transakcjach
+i pomijanie duplikatów przez unikalne indeksy (user_id, file_hash) oraz
+(user_id, file_fingerprint) dla nagrań bez pełnego hashu.
+
+Uruchomienie:
+    python src/Modules/CallCryptor_module/test_recordings_bulk_insert.py
+"""
+
+import shutil
+import sqlite3
+import tempfile
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+
+# Załaduj moduł bezpośrednio (pakiet importuje klienta API synchronizacji)
+spec = spec_from_file_location(
+    "callcryptor_database_module",
+    Path(__file__).parent / "callcryptor_database.py",
+)
+if spec is None or spec.loader is None:
+    raise RuntimeError("Failed to create module spec for callcryptor_database.py")
+mod = module_from_spec(spec)
+spec.loader.exec_module(mod)
+CallCryptorDatabase = mod.CallCryptorDatabase
+
+USER_ID = "test-user"
+OTHER_USER_ID = "other-user"
+
+
+def recording(source_id: str, n: int, file_hash=None, fingerprint=None) -> dict:
+    return {
+        "source_id": source_id,
+        "file_name": f"rozmowa_{n:05d}.wav",
+        "file_path": f"/nagrania/rozmowa_{n:05d}.wav",
+        "file_size": 1000 + n,
+        "file_hash": file_hash,
+        "file_fingerprint": fingerprint,
+    }
+
+
+def count(db, user_id: str) -> int:
+    return db.conn.execute("SELECT COUNT(*) FROM recordings WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+def check_bulk_dedupe(db):
+    source_id = db.add_source({"source_name": "Test", "source_type": "folder"}, USER_ID)
+    existing_id = db.add_recording(recording(source_id, 0, "hash-00000"), USER_ID)
+
+    batch = [recording(source_id, n, f"hash-{n:05d}") for n in range(2500)]
+    batch.append(recording(source_id, 2500, "hash-00010"))   # duplikat w tej samej porcji
+    batch.append(recording(source_id, 2501, "hash-01500"))   # duplikat z wcześniejszej porcji
+    batch += [recording(source_id, 3000 + n) for n in range(3)]  # bez hashu - zawsze dodawane
+    for data in batch[-3:]:
+        data["id"] = f"no-hash-{data['file_name']}"
+
+    added = db.add_recordings_bulk(batch, USER_ID, chunk_size=1000)
+
+    # hash-00000 był już w bazie, dwa duplikaty w partii, 3 nagrania bez hashu
+    assert len(added) == 2500 - 1 + 3, len(added)
+    assert existing_id not in added
+    assert count(db, USER_ID) == 2500 + 3
+    assert {f"no-hash-rozmowa_{3000 + n:05d}.wav" for n in range(3)} <= set(added)
+
+    # Zwracane są tylko ID faktycznie zapisanych nagrań
+    stored = {row[0] for row in db.conn.execute("SELECT id FROM recordings WHERE user_id = ?", (USER_ID,))}
+    assert set(added) <= stored and existing_id in stored
+
+    # Ponowny import tej samej partii niczego nie dodaje (poza nagraniami bez hashu z nowym ID)
+    for data in batch[-3:]:
+        data.pop("id")
+    again = db.add_recordings_bulk(batch, USER_ID, chunk_size=1000)
+    assert len(again) == 3
+    assert count(db, USER_ID) == 2500 + 6
+
+    # Ten sam plik u innego użytkownika nie jest duplikatem
+    other_source = db.add_source({"source_name": "Inny", "source_type": "folder"}, OTHER_USER_ID)
+    other = db.add_recordings_bulk([recording(other_source, 0, "hash-00000")], OTHER_USER_ID)
+    assert len(other) == 1
+    print(f"Partia: dodano {len(added)} z {len(batch)} nagrań")
+
+
+def check_fingerprint_dedupe(db):
+    source_id = db.add_source({"source_name": "Odciski", "source_type": "folder"}, USER_ID)
+    before = count(db, USER_ID)
+
+    # Bez pełnego hashu duplikat rozpoznaje odcisk - także w obrębie partii
+    added = db.add_recordings_bulk([
+        recording(source_id, 1, fingerprint="fp-1"),
+        recording(source_id, 2, fingerprint="fp-1"),
+        recording(source_id, 3, fingerprint="fp-2"),
+    ], USER_ID)
+    assert len(added) == 2
+    assert len(db.add_recordings_bulk([recording(source_id, 4, fingerprint="fp-2")], USER_ID)) == 0
+
+    # Nagranie z pełnym hashem (kolizja odcisków potwierdzona hashami) jest dodawane
+    added = db.add_recordings_bulk([recording(source_id, 5, "hash-fp", fingerprint="fp-1")], USER_ID)
+    assert len(added) == 1
+    assert count(db, USER_ID) == before + 3
+
+    # Inne naruszenie ograniczeń (istniejące id) nie jest pomijane po cichu
+    existing = dict(recording(source_id, 6, "hash-nowy"), id=added[0])
+    try:
+        db.add_recordings_bulk([recording(source_id, 7, "hash-inny"), existing], USER_ID)
+    except sqlite3.IntegrityError:
+        pass
+    else:
+        raise AssertionError("Kolizja klucza głównego powinna zgłosić wyjątek")
+    assert count(db, USER_ID) == before + 3, "Porcja z błędem musi być wycofana w całości"
+    print("Odciski: OK")
+
+
+def check_legacy_duplicates(tmp_dir: Path):
+    db_path = tmp_dir / "legacy.db"
+    db = CallCryptorDatabase(str(db_path))
+    source_id = db.add_source({"source_name": "Stare", "source_type": "folder"}, USER_ID)
+    # Baza sprzed indeksu unikalnego z już zduplikowanymi hashami
+    db.conn.execute("DROP INDEX idx_recordings_user_hash_unique")
+    db.add_recording(recording(source_id, 1, "dup"), USER_ID)
+    db.add_recording(recording(source_id, 2, "dup"), USER_ID)
+    db.close()
+
+    # Migracja nie usuwa nagrań i nie tworzy indeksu, którego dane nie spełniają
+    db = CallCryptorDatabase(str(db_path))
+    index = db.conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_recordings_user_hash_unique'"
+    ).fetchone()
+    assert index is None
+    assert count(db, USER_ID) == 2
+    db.close()
+    print("Migracja z duplikatami: OK")
+
+
+def run_test():
+    tmp_dir = Path(tempfile.mkdtemp(prefix="callcryptor_bulk_"))
+    try:
+        db = CallCryptorDatabase(str(tmp_dir / "callcryptor.db"))
+        check_bulk_dedupe(db)
+        check_fingerprint_dedupe(db)
+        db.close()
+        check_legacy_duplicates(tmp_dir)
+        print("OK")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_test()
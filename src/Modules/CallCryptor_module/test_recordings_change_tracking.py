@@ -0,0 +1,127 @@
+"""
+Test śledzenia zmian nagrań dla synchronizacji: trigger podbijający version
+(trg_recordings_change_tracking) i potwierdzanie wysyłki z kontrolą wersji
+(mark_recordings_synced).
+
+Uruchomienie:
+    python src/Modules/CallCryptor_module/test_recordings_change_tracking.py
+"""
+
+import shutil
+import tempfile
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+
+# Załaduj moduł bezpośrednio (pakiet importuje klienta API synchronizacji)
+spec = spec_from_file_location(
+    "callcryptor_database_module",
+    Path(__file__).parent / "callcryptor_database.py",
+)
+if spec is None or spec.loader is None:
+    raise RuntimeError("Failed to create module spec for callcryptor_database.py")
+mod = module_from_spec(spec)
+spec.loader.exec_module(mod)
+CallCryptorDatabase = mod.CallCryptorDatabase
+
+USER_ID = "test-user"
+
+
+def sync_state(db, recording_id: str) -> dict:
+    return db.get_recordings_sync_state([recording_id])[recording_id]
+
+
+def check_trigger(db, source_id: str):
+    recording_id = db.add_recording({"source_id": source_id, "file_name": "a.wav"}, USER_ID)
+    assert db.mark_recordings_synced({recording_id: 1}) == 1
+    state = sync_state(db, recording_id)
+    assert state["version"] == 1 and state["is_synced"] == 1
+
+    # Zmiana kolumny synchronizowanej bezpośrednim UPDATE (np. kolejka zadań)
+    db.conn.execute("UPDATE recordings SET transcription_status = 'completed' WHERE id = ?", (recording_id,))
+    db.conn.commit()
+    state = sync_state(db, recording_id)
+    assert state["version"] == 2 and state["is_synced"] == 0
+    changed_at = state["updated_at"]
+    assert changed_at
+
+    # Ta sama wartość - to nie jest zmiana
+    db.mark_recordings_synced({recording_id: 2})
+    db.conn.execute("UPDATE recordings SET transcription_status = 'completed' WHERE id = ?", (recording_id,))
+    db.conn.commit()
+    assert sync_state(db, recording_id)["version"] == 2
+    assert sync_state(db, recording_id)["is_synced"] == 1
+
+    # Kolumna lokalna (ścieżka pliku) nie trafia na serwer
+    db.conn.execute("UPDATE recordings SET file_path = '/inna/sciezka.wav' WHERE id = ?", (recording_id,))
+    db.conn.commit()
+    assert sync_state(db, recording_id)["version"] == 2
+
+    # update_recording podaje własne updated_at - trigger go nie nadpisuje
+    db.update_recording(recording_id, {"notes": "oddzwonić", "tags": ["klient"]})
+    state = sync_state(db, recording_id)
+    assert state["version"] == 3 and state["is_synced"] == 0
+
+    # Zapis wersji z serwera ustawia synced_at - nie jest zmianą lokalną
+    db.apply_server_recording(recording_id, {"notes": "z serwera", "file_path": "ignorowane"},
+                              "2030-01-01T00:00:00", 7)
+    state = sync_state(db, recording_id)
+    assert state["version"] == 7 and state["is_synced"] == 1
+    assert state["updated_at"] == "2030-01-01T00:00:00"
+    assert db.get_recording(recording_id)["file_path"] == "/inna/sciezka.wav"
+    print("Trigger: OK")
+
+
+def check_mark_synced_versions(db, source_id: str):
+    ids = [db.add_recording({"source_id": source_id, "file_name": f"r{n}.wav"}, USER_ID) for n in range(5)]
+    dirty = db.get_dirty_recordings(USER_ID, limit=100)
+    sent = {row["id"]: row["version"] for row in dirty if row["id"] in ids}
+    assert len(sent) == 5
+
+    # Nagranie zmienione w trakcie wysyłki ma wyższą wersję - zostaje brudne
+    db.update_recording(ids[0], {"notes": "zmiana w trakcie wysyłki"})
+    assert db.mark_recordings_synced(sent) == 4
+    assert sync_state(db, ids[0])["is_synced"] == 0
+    assert all(sync_state(db, recording_id)["is_synced"] == 1 for recording_id in ids[1:])
+
+    remaining = [row["id"] for row in db.get_dirty_recordings(USER_ID, limit=100)]
+    assert remaining == [ids[0]]
+    assert db.mark_recordings_synced({ids[0]: sync_state(db, ids[0])["version"]}) == 1
+    assert db.get_dirty_recordings(USER_ID) == []
+    print("Potwierdzanie wersji: OK")
+
+
+def check_dirty_paging(db, source_id: str):
+    ids = [db.add_recording({"source_id": source_id, "file_name": f"p{n}.wav"}, USER_ID) for n in range(25)]
+    # Wspólny znacznik czasu - kolejność rozstrzyga id (klucz keyset)
+    db.conn.execute("UPDATE recordings SET updated_at = '2024-01-01T00:00:00' WHERE is_synced = 0")
+    db.conn.commit()
+
+    seen = []
+    after = None
+    while True:
+        page = db.get_dirty_recordings(USER_ID, limit=10, after=after)
+        if not page:
+            break
+        seen.extend(row["id"] for row in page)
+        after = (page[-1]["updated_at"], page[-1]["id"])
+    assert seen == sorted(ids)
+    print("Porcje brudnych nagrań: OK")
+
+
+def run_test():
+    tmp_dir = Path(tempfile.mkdtemp(prefix="callcryptor_sync_"))
+    try:
+        db = CallCryptorDatabase(str(tmp_dir / "callcryptor.db"))
+        source_id = db.add_source({"source_name": "Test", "source_type": "folder"}, USER_ID)
+        db.mark_sources_synced([source_id])
+        check_trigger(db, source_id)
+        check_mark_synced_versions(db, source_id)
+        check_dirty_paging(db, source_id)
+        db.close()
+        print("OK")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_test()
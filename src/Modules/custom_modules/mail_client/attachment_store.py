@@ -0,0 +1,266 @@
+"""
+Magazyn załączników adresowany treścią (SHA-256)
+
+Funkcjonalność:
+- Każdy unikalny plik zapisany na dysku tylko raz (klucz = SHA-256)
+- Podział na podkatalogi wg prefiksu hasha (ab/cd/abcd...)
+- Liczenie referencji przez tabelę powiązań mail <-> załącznik
+- Odśmiecanie plików, do których nie odwołuje się żaden mail
+- Strumieniowy odczyt i kopiowanie (bez ładowania całego pliku do pamięci)
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AttachmentStore:
+    """Deduplikujący magazyn załączników na dysku"""
+
+    def __init__(self, root: Path, db_path: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path))
+
+    def _init_database(self):
+        """Tworzy tabele blobów i powiązań z mailami"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attachment_blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                content_type TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Jedno powiązanie = jedna referencja (mail może wskazywać ten sam plik tylko raz)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attachment_refs (
+                uid TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (uid, sha256)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attachment_refs_hash ON attachment_refs(sha256)")
+
+        conn.commit()
+        conn.close()
+
+    # ==================== ŚCIEŻKI ====================
+
+    def path_for(self, sha256: str) -> Path:
+        """Ścieżka pliku dla hasha: root/ab/cd/abcd..."""
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def exists(self, sha256: str) -> bool:
+        return self.path_for(sha256).exists()
+
+    # ==================== ZAPIS ====================
+
+    def put_bytes(self, data: bytes, content_type: Optional[str] = None,
+                  uid: Optional[str] = None) -> str:
+        """
+        Zapisuje dane (jeśli jeszcze ich nie ma) i zwraca SHA-256.
+
+        Podany uid jest rejestrowany jako referencja w tej samej transakcji co
+        blob - garbage_collect() nie może usunąć pliku przed zapisaniem referencji.
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.path_for(sha256)
+
+        with self._lock:
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Zapis do pliku tymczasowego + rename - brak częściowych plików
+                fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_name, path)
+                except Exception:
+                    if os.path.exists(tmp_name):
+                        os.unlink(tmp_name)
+                    raise
+
+            self._register_blob(sha256, len(data), content_type, uid)
+        return sha256
+
+    def put_stream(self, stream: BinaryIO, content_type: Optional[str] = None,
+                   uid: Optional[str] = None) -> str:
+        """Zapisuje dane ze strumienia (liczy hash w trakcie kopiowania)"""
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=str(self.root), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            sha256 = hasher.hexdigest()
+            path = self.path_for(sha256)
+            # Kopiowanie poza blokadą; przeniesienie i rejestracja atomowo względem GC
+            with self._lock:
+                if path.exists():
+                    os.unlink(tmp_name)
+                else:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp_name, path)
+                self._register_blob(sha256, size, content_type, uid)
+        except Exception:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+        return sha256
+
+    def _register_blob(self, sha256: str, size: int, content_type: Optional[str],
+                       uid: Optional[str] = None):
+        """Rejestruje blob (i opcjonalnie referencję) - wywoływane pod self._lock"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT OR IGNORE INTO attachment_blobs (sha256, size, content_type)
+                VALUES (?, ?, ?)
+            """, (sha256, size, content_type))
+            if uid:
+                conn.execute(
+                    "INSERT OR IGNORE INTO attachment_refs (uid, sha256) VALUES (?, ?)",
+                    (uid, sha256)
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==================== REFERENCJE ====================
+
+    def add_reference(self, uid: str, sha256: str):
+        """Rejestruje, że mail `uid` używa pliku `sha256`"""
+        self.add_references([(uid, sha256)])
+
+    def add_references(self, pairs: Iterable[Tuple[str, str]]):
+        """Rejestruje wiele par (uid, sha256) w jednej transakcji"""
+        pairs = list(pairs)
+        if not pairs:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR IGNORE INTO attachment_refs (uid, sha256) VALUES (?, ?)",
+                pairs
+            )
+            conn.commit()
+            conn.close()
+
+    def release_mails(self, uids: Iterable[str]) -> int:
+        """Usuwa referencje wskazanych maili; zwraca liczbę usuniętych powiązań"""
+        uids = list(uids)
+        if not uids:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.executemany("DELETE FROM attachment_refs WHERE uid = ?", [(uid,) for uid in uids])
+            removed = cursor.rowcount
+            conn.commit()
+            conn.close()
+        return removed
+
+    def refcount(self, sha256: str) -> int:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT COUNT(*) FROM attachment_refs WHERE sha256 = ?", (sha256,)
+        ).fetchone()
+        conn.close()
+        return row[0] if row else 0
+
+    def garbage_collect(self, live_uids_query: Optional[str] = None) -> int:
+        """
+        Usuwa pliki bez referencji.
+
+        Args:
+            live_uids_query: Opcjonalne zapytanie SQL zwracające uid istniejących
+                maili - powiązania do maili spoza tej listy są najpierw usuwane
+
+        Returns:
+            Liczba usuniętych plików
+        """
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+
+            if live_uids_query:
+                cursor.execute(f"DELETE FROM attachment_refs WHERE uid NOT IN ({live_uids_query})")
+
+            cursor.execute("""
+                SELECT sha256 FROM attachment_blobs
+                WHERE sha256 NOT IN (SELECT sha256 FROM attachment_refs)
+            """)
+            orphans: List[str] = [row[0] for row in cursor.fetchall()]
+
+            for sha256 in orphans:
+                try:
+                    self.path_for(sha256).unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Błąd usuwania załącznika {sha256}: {e}")
+                    continue
+                cursor.execute("DELETE FROM attachment_blobs WHERE sha256 = ?", (sha256,))
+
+            conn.commit()
+            conn.close()
+
+        return len(orphans)
+
+    # ==================== ODCZYT ====================
+
+    def open(self, sha256: str) -> BinaryIO:
+        """Otwiera plik załącznika do odczytu strumieniowego"""
+        return open(self.path_for(sha256), "rb")
+
+    def read_bytes(self, sha256: str) -> bytes:
+        return self.path_for(sha256).read_bytes()
+
+    def copy_to(self, sha256: str, destination: str):
+        """Kopiuje załącznik do wskazanego pliku (strumieniowo)"""
+        with self.open(sha256) as src, open(destination, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+    def get_stats(self) -> dict:
+        """Liczba plików, zajętość dysku i bajty zaoszczędzone przez deduplikację"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM attachment_blobs")
+        blobs, stored_bytes = cursor.fetchone()
+        cursor.execute("""
+            SELECT COALESCE(SUM(b.size), 0) FROM attachment_refs r
+            JOIN attachment_blobs b ON b.sha256 = r.sha256
+        """)
+        referenced_bytes = cursor.fetchone()[0]
+        conn.close()
+        return {
+            "blobs": blobs,
+            "stored_bytes": stored_bytes,
+            "deduplicated_bytes": max(0, referenced_bytes - stored_bytes),
+        }
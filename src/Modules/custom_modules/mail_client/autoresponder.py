@@ -1,6 +1,11 @@
 """
 Moduł autorespondera dla klienta pocztowego
 Automatycznie odpowiada na wiadomości na podstawie zdefiniowanych reguł
+
+Reguły są kompilowane raz (CompiledRules) do automatów słów kluczowych -
+mail jest sprawdzany wszystkimi regułami w jednym przebiegu na pole.
+Historia odpowiedzi (komu i ile razy odpowiedziano) jest w SQLite
+(tabela autoresponder_state), zapisywana wsadowo.
 """
 
 from PyQt6.QtWidgets import (
@@ -10,12 +15,21 @@ from PyQt6.QtWidgets import (
     QDialogButtonBox
 )
 from PyQt6.QtCore import Qt
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Optional, Set, Tuple
 import json
+import re
+import sqlite3
+import uuid
 from pathlib import Path
 from datetime import datetime, timedelta
 
 
+# Po tylu dniach od ostatniej odpowiedzi limit odpowiedzi na nadawcę się zeruje
+RESPONSE_RESET_DAYS = 7
+
+_EMAIL_IN_BRACKETS_RE = re.compile(r'<(.+?)>')
+
+
 class AutoresponderRule:
     """Klasa reprezentująca regułę autorespondera"""
     
@@ -23,6 +37,7 @@ class AutoresponderRule:
         if data is None:
             data = {}
         
+        self.rule_id = data.get("id") or uuid.uuid4().hex  # Klucz historii odpowiedzi
         self.enabled = data.get("enabled", True)
         self.name = data.get("name", "Nowa reguła")
         self.condition_type = data.get("condition_type", "sender")  # sender, subject, body, all
@@ -33,11 +48,14 @@ class AutoresponderRule:
         self.active_days = data.get("active_days", [0, 1, 2, 3, 4])  # 0=Pon, 6=Niedz
         self.active_hours_start = data.get("active_hours_start", 0)  # 0-23
         self.active_hours_end = data.get("active_hours_end", 23)  # 0-23
-        self.responded_to = data.get("responded_to", {})  # email -> timestamp ostatniej odpowiedzi
+        # Historia ze starego formatu pliku (email -> lista dat) - przenoszona do
+        # SQLite przez AutoresponderManager, nie jest już zapisywana w JSON
+        self.responded_to = data.get("responded_to", {})
     
     def to_dict(self) -> Dict[str, Any]:
         """Konwertuje regułę do słownika"""
         return {
+            "id": self.rule_id,
             "enabled": self.enabled,
             "name": self.name,
             "condition_type": self.condition_type,
@@ -48,62 +66,138 @@ class AutoresponderRule:
             "active_days": self.active_days,
             "active_hours_start": self.active_hours_start,
             "active_hours_end": self.active_hours_end,
-            "responded_to": self.responded_to
         }
     
-    def matches_mail(self, mail: Dict[str, Any]) -> bool:
-        """Sprawdza czy mail pasuje do warunku reguły"""
+    def is_active_at(self, moment: datetime) -> bool:
+        """Czy reguła działa w danym dniu tygodnia i godzinie"""
         if not self.enabled:
             return False
-        
-        # Sprawdź dzień tygodnia
-        now = datetime.now()
-        if now.weekday() not in self.active_days:
+        if moment.weekday() not in self.active_days:
             return False
-        
-        # Sprawdź godziny
-        current_hour = now.hour
-        if not (self.active_hours_start <= current_hour <= self.active_hours_end):
+        return self.active_hours_start <= moment.hour <= self.active_hours_end
+    
+    def matches_mail(self, mail: Dict[str, Any]) -> bool:
+        """Sprawdza czy mail pasuje do warunku reguły (pojedynczo - patrz CompiledRules)"""
+        if not self.is_active_at(datetime.now()):
             return False
         
         # Sprawdź warunek
         if self.condition_type == "all":
             return True
-        elif self.condition_type == "sender":
-            sender = mail.get("from", "").lower()
-            return self.condition_value.lower() in sender
-        elif self.condition_type == "subject":
-            subject = mail.get("subject", "").lower()
-            return self.condition_value.lower() in subject
-        elif self.condition_type == "body":
-            body = mail.get("body", "").lower()
-            return self.condition_value.lower() in body
-        
-        return False
-    
-    def can_respond_to(self, sender_email: str) -> bool:
-        """Sprawdza czy można wysłać odpowiedź do tego nadawcy"""
-        if sender_email not in self.responded_to:
-            return True
-        
-        responses_count = len(self.responded_to[sender_email])
-        if responses_count >= self.max_responses_per_sender:
-            # Sprawdź czy ostatnia odpowiedź była dawno (> 7 dni)
-            last_response = max(self.responded_to[sender_email])
-            last_date = datetime.fromisoformat(last_response)
-            if datetime.now() - last_date > timedelta(days=7):
-                # Resetuj licznik
-                self.responded_to[sender_email] = []
-                return True
+        field = CompiledRules.FIELDS.get(self.condition_type)
+        if field is None:
             return False
+        return self.condition_value.lower() in (mail.get(field) or "").lower()
+
+
+def _keyword_pattern(keywords: Iterable[str]) -> str:
+    """
+    Wyrażenie regularne z drzewa prefiksów słów kluczowych (automat).
+    
+    Wspólne prefiksy są sprawdzane raz, a dłuższe dopasowanie ma
+    pierwszeństwo (zachłanne części opcjonalne).
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+    
+    def build(node: Dict[str, Any]) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            body = branches[0]
+            return f"(?:{body})?" if terminal else body
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if terminal else body
+    
+    return build(trie)
+
+
+class _FieldMatcher:
+    """Automat słów kluczowych jednego pola maila (nadawca, temat lub treść)"""
+    
+    def __init__(self, keyword_rules: Dict[str, List[int]]):
+        self.keyword_rules = keyword_rules
+        keywords = list(keyword_rules)
+        # Dopasowanie w każdej pozycji (lookahead) zwraca najdłuższe słowo od
+        # tej pozycji - krótsze słowa będące jego fragmentami są dorzucane z mapy
+        self.regex = re.compile(f"(?=({_keyword_pattern(keywords)}))", re.DOTALL)
+        self.contained: Dict[str, List[str]] = {
+            keyword: [other for other in keywords if other != keyword and other in keyword]
+            for keyword in keywords
+        }
+    
+    def matching_rules(self, text: str) -> Set[int]:
+        """Indeksy reguł, których słowo kluczowe występuje w tekście (małe litery)"""
+        found: Set[str] = set()
+        for match in self.regex.finditer(text):
+            keyword = match.group(1)
+            if keyword not in found:
+                found.add(keyword)
+                found.update(self.contained[keyword])
+        result: Set[int] = set()
+        for keyword in found:
+            result.update(self.keyword_rules[keyword])
+        return result
+
+
+class CompiledRules:
+    """Reguły skompilowane do sprawdzania maila jednym przebiegiem na pole"""
+    
+    # condition_type -> pole maila
+    FIELDS = {"sender": "from", "subject": "subject", "body": "body"}
+    
+    def __init__(self, rules: List[AutoresponderRule]):
+        self.rules = list(rules)
+        self.signature = self.signature_of(self.rules)
+        # Reguły pasujące do każdego maila ("all" albo pusty warunek)
+        self.unconditional: Set[int] = set()
+        self.matchers: Dict[str, _FieldMatcher] = {}
+        
+        per_field: Dict[str, Dict[str, List[int]]] = {}
+        for index, rule in enumerate(self.rules):
+            if not rule.enabled:
+                continue
+            if rule.condition_type == "all":
+                self.unconditional.add(index)
+                continue
+            field = self.FIELDS.get(rule.condition_type)
+            if field is None:
+                continue
+            keyword = rule.condition_value.lower()
+            if not keyword:
+                self.unconditional.add(index)
+                continue
+            per_field.setdefault(field, {}).setdefault(keyword, []).append(index)
         
-        return True
+        for field, keyword_rules in per_field.items():
+            self.matchers[field] = _FieldMatcher(keyword_rules)
     
-    def mark_responded(self, sender_email: str):
-        """Oznacza że wysłano odpowiedź do nadawcy"""
-        if sender_email not in self.responded_to:
-            self.responded_to[sender_email] = []
-        self.responded_to[sender_email].append(datetime.now().isoformat())
+    @staticmethod
+    def signature_of(rules: List[AutoresponderRule]) -> Tuple:
+        """Pola reguł wpływające na kompilację - zmiana wymusza ponowną kompilację"""
+        return tuple(
+            (id(rule), rule.enabled, rule.condition_type, rule.condition_value)
+            for rule in rules
+        )
+    
+    def active_rules(self, moment: datetime) -> Set[int]:
+        """Indeksy reguł aktywnych w danej chwili (liczone raz na partię maili)"""
+        return {index for index, rule in enumerate(self.rules) if rule.is_active_at(moment)}
+    
+    def match(self, mail: Dict[str, Any], active: Set[int]) -> List[AutoresponderRule]:
+        """Reguły pasujące do maila, w kolejności z listy reguł"""
+        matched = self.unconditional & active
+        for field, matcher in self.matchers.items():
+            text = mail.get(field) or ""
+            if text:
+                matched |= matcher.matching_rules(str(text).lower()) & active
+        return [self.rules[index] for index in sorted(matched)]
 
 
 class AutoresponderDialog(QDialog):
@@ -415,7 +509,7 @@ class AutoresponderDialog(QDialog):
         original = self.rules[current_row]
         duplicate = AutoresponderRule(original.to_dict())
         duplicate.name = f"{original.name} (kopia)"
-        duplicate.responded_to = {}  # Resetuj historię odpowiedzi
+        duplicate.rule_id = uuid.uuid4().hex  # Nowa reguła - bez historii odpowiedzi
         
         self.rules.append(duplicate)
         self.populate_rules_list()
@@ -429,26 +523,150 @@ class AutoresponderDialog(QDialog):
 class AutoresponderManager:
     """Menadżer autorespondera - zarządza regułami i wysyłaniem odpowiedzi"""
     
-    def __init__(self, config_file: Path):
+    def __init__(self, config_file: Path, state_db: Optional[Path] = None):
         self.config_file = config_file
+        self.state_db = Path(state_db) if state_db else config_file.with_name("autoresponder_state.db")
         self.rules: List[AutoresponderRule] = []
+        self._compiled: Optional[CompiledRules] = None
+        
+        # (id reguły, email) -> [liczba odpowiedzi, data ostatniej]; zmiany czekają na flush()
+        self._state: Dict[Tuple[str, str], List[Any]] = {}
+        self._pending: Set[Tuple[str, str]] = set()
+        self._pending_deletes: Set[Tuple[str, str]] = set()
+        
+        self._init_state_db()
+        self._load_state()
         self.load_rules()
     
+    # ==================== HISTORIA ODPOWIEDZI (SQLite) ====================
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.state_db))
+    
+    def _init_state_db(self):
+        self.state_db.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS autoresponder_state (
+                rule_id TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                response_count INTEGER NOT NULL DEFAULT 0,
+                last_response TEXT NOT NULL,
+                PRIMARY KEY (rule_id, sender)
+            ) WITHOUT ROWID
+        """)
+        conn.commit()
+        conn.close()
+    
+    def _load_state(self):
+        conn = self._connect()
+        for rule_id, sender, count, last_response in conn.execute(
+            "SELECT rule_id, sender, response_count, last_response FROM autoresponder_state"
+        ):
+            self._state[(rule_id, sender)] = [count, last_response]
+        conn.close()
+    
+    def flush(self):
+        """Zapisuje zmiany historii odpowiedzi (jedna transakcja)"""
+        if not (self._pending or self._pending_deletes):
+            return
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "DELETE FROM autoresponder_state WHERE rule_id = ? AND sender = ?",
+                list(self._pending_deletes)
+            )
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO autoresponder_state
+                (rule_id, sender, response_count, last_response) VALUES (?, ?, ?, ?)
+                """,
+                [(rule_id, sender, *self._state[(rule_id, sender)]) for rule_id, sender in self._pending]
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"Błąd zapisu historii autorespondera: {e}")
+            return
+        finally:
+            conn.close()
+        self._pending.clear()
+        self._pending_deletes.clear()
+    
+    def _migrate_legacy_state(self) -> bool:
+        """Przenosi listy responded_to ze starego pliku reguł do SQLite"""
+        migrated = False
+        for rule in self.rules:
+            for sender, timestamps in (rule.responded_to or {}).items():
+                if not timestamps:
+                    continue
+                key = (rule.rule_id, sender.lower())
+                self._state[key] = [len(timestamps), max(timestamps)]
+                self._pending.add(key)
+                migrated = True
+            rule.responded_to = {}
+        if migrated:
+            self.flush()
+        return migrated
+    
+    def can_respond_to(self, rule: AutoresponderRule, sender_email: str, now: Optional[datetime] = None) -> bool:
+        """Sprawdza czy można wysłać odpowiedź do tego nadawcy"""
+        state = self._state.get((rule.rule_id, sender_email.lower()))
+        if state is None or state[0] < rule.max_responses_per_sender:
+            return True
+        # Limit wyczerpany - odpowiedz ponownie, jeśli ostatnia odpowiedź była dawno
+        now = now or datetime.now()
+        return now - datetime.fromisoformat(state[1]) > timedelta(days=RESPONSE_RESET_DAYS)
+    
+    def mark_responded(self, rule: AutoresponderRule, sender_email: str, now: Optional[datetime] = None):
+        """Oznacza że wysłano odpowiedź do nadawcy (zapis przy flush())"""
+        now = now or datetime.now()
+        key = (rule.rule_id, sender_email.lower())
+        state = self._state.get(key)
+        if state is None or state[0] >= rule.max_responses_per_sender:
+            # Pierwsza odpowiedź albo nowy okres po wyzerowaniu licznika
+            state = [0, ""]
+        state[0] += 1
+        state[1] = now.isoformat()
+        self._state[key] = state
+        self._pending.add(key)
+    
+    def _prune_state(self):
+        """Usuwa historię reguł, których już nie ma"""
+        rule_ids = {rule.rule_id for rule in self.rules}
+        stale = [key for key in self._state if key[0] not in rule_ids]
+        for key in stale:
+            del self._state[key]
+            self._pending.discard(key)
+        self._pending_deletes.update(stale)
+    
+    # ==================== REGUŁY ====================
+    
     def load_rules(self):
         """Wczytuje reguły z pliku"""
+        raw: List[Dict[str, Any]] = []
         if self.config_file.exists():
             try:
                 with open(self.config_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.rules = [AutoresponderRule(rule_data) for rule_data in data]
+                    raw = json.load(f)
+                    self.rules = [AutoresponderRule(rule_data) for rule_data in raw]
             except Exception as e:
                 print(f"Błąd wczytywania reguł autorespondera: {e}")
                 self.rules = []
         else:
             self.rules = []
+        self._compiled = None
+        
+        # Stary format: historia w JSON i reguły bez id - zapisz plik raz, po migracji
+        needs_save = self._migrate_legacy_state()
+        if any(not rule_data.get("id") for rule_data in raw if isinstance(rule_data, dict)):
+            needs_save = True
+        if needs_save:
+            self.save_rules()
+        self._prune_state()
+        self.flush()
     
     def save_rules(self):
-        """Zapisuje reguły do pliku"""
+        """Zapisuje reguły do pliku (bez historii odpowiedzi)"""
         try:
             self.config_file.parent.mkdir(parents=True, exist_ok=True)
             data = [rule.to_dict() for rule in self.rules]
@@ -456,46 +674,81 @@ class AutoresponderManager:
                 json.dump(data, f, indent=2, ensure_ascii=False)
         except Exception as e:
             print(f"Błąd zapisywania reguł autorespondera: {e}")
+        self._compiled = None
     
-    def process_mail(self, mail: Dict[str, Any]) -> List[Dict[str, str]]:
-        """
-        Przetwarza mail i zwraca listę odpowiedzi do wysłania
-        Każda odpowiedź to dict z kluczami: to, subject, body
-        """
+    def compiled_rules(self) -> CompiledRules:
+        """Skompilowane reguły - kompilacja tylko po zmianie reguł"""
+        if self._compiled is None or self._compiled.signature != CompiledRules.signature_of(self.rules):
+            self._compiled = CompiledRules(self.rules)
+        return self._compiled
+    
+    # ==================== PRZETWARZANIE ====================
+    
+    def _responses_for(
+        self,
+        mail: Dict[str, Any],
+        compiled: CompiledRules,
+        active: Set[int],
+        now: datetime,
+    ) -> List[Dict[str, str]]:
         responses = []
+        if not active:
+            return responses
         
         sender = mail.get("from", "")
         sender_email = self._extract_email(sender)
-        
         if not sender_email:
             return responses
         
-        for rule in self.rules:
-            if not rule.matches_mail(mail):
-                continue
-            
-            if not rule.can_respond_to(sender_email):
+        for rule in compiled.match(mail, active):
+            if not self.can_respond_to(rule, sender_email, now):
                 continue
             
             # Utwórz odpowiedź
-            response = {
+            responses.append({
                 "to": sender,
                 "subject": rule.response_subject,
                 "body": rule.response_body
-            }
-            
-            responses.append(response)
-            rule.mark_responded(sender_email)
-            
-            # Zapisz zmiany (zaktualizowana historia responded_to)
-            self.save_rules()
+            })
+            self.mark_responded(rule, sender_email, now)
+        
+        return responses
+    
+    def process_mail(self, mail: Dict[str, Any]) -> List[Dict[str, str]]:
+        """
+        Przetwarza mail i zwraca listę odpowiedzi do wysłania
+        Każda odpowiedź to dict z kluczami: to, subject, body
+        """
+        now = datetime.now()
+        compiled = self.compiled_rules()
+        responses = self._responses_for(mail, compiled, compiled.active_rules(now), now)
+        if responses:
+            self.flush()
+        return responses
+    
+    def process_mails(self, mails: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Przetwarza partię maili (np. zaległe po pobraniu) - jedna kompilacja,
+        jedno sprawdzenie harmonogramu i jeden zapis historii na partię.
+        
+        Odpowiedzi mają dodatkowo klucz mail_uid (uid maila źródłowego).
+        """
+        now = datetime.now()
+        compiled = self.compiled_rules()
+        active = compiled.active_rules(now)
+        
+        responses = []
+        for mail in mails:
+            for response in self._responses_for(mail, compiled, active, now):
+                response["mail_uid"] = mail.get("_uid", "")
+                responses.append(response)
         
+        self.flush()
         return responses
     
     def _extract_email(self, from_field: str) -> str:
         """Wydobywa adres email z pola FROM"""
-        import re
-        match = re.search(r'<(.+?)>', from_field)
+        match = _EMAIL_IN_BRACKETS_RE.search(from_field)
         if match:
             return match.group(1).strip()
         return from_field.strip()
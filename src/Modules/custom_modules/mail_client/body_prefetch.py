@@ -0,0 +1,432 @@
+"""
+Pobieranie treści maili w tle (prefetch) z priorytetami
+
+Funkcjonalność:
+- Lista maili pobierana jest bez treści (nagłówki, flagi, rozmiar), treść
+  dociąga BodyPrefetcher i zapisuje w cache na dysku (mail_bodies)
+- Kolejka priorytetowa: zaznaczony mail, jego sąsiedzi na liście,
+  nieprzeczytane w Odebranych, pozostałe
+- Limit równoległych połączeń IMAP i przepustowości (token bucket)
+- Zadania w tle wstrzymywane na czas pobierania listy maili (połączenia
+  są wtedy zajęte); zaznaczony mail i sąsiedzi pobierani zawsze
+- Brak sieci: konto wstrzymane na OFFLINE_BACKOFF sekund, otwarte maile
+  korzystają z treści zapisanych wcześniej w cache
+"""
+
+import heapq
+import imaplib
+import itertools
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from PyQt6.QtCore import QObject, pyqtSignal
+
+try:
+    from .mime_pipeline import parse_message
+except ImportError:
+    from mail_client.mime_pipeline import parse_message
+
+
+PRIORITY_SELECTED = 0
+PRIORITY_NEIGHBOUR = 1
+PRIORITY_UNREAD = 2
+PRIORITY_BACKGROUND = 3
+
+_FETCH_META_RE = re.compile(rb"^(\d+) \(")
+_FETCH_UID_RE = re.compile(rb"\bUID (\d+)")
+_FETCH_SIZE_RE = re.compile(rb"\bRFC822\.SIZE (\d+)")
+_FETCH_FLAGS_RE = re.compile(rb"\bFLAGS \(([^)]*)\)")
+
+
+def parse_header_fetch(fetch_data: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Rozbiera odpowiedź FETCH (UID FLAGS RFC822.SIZE BODY.PEEK[HEADER]).
+
+    Returns:
+        [{"seq", "imap_uid", "flags", "size", "header"}] - kolejność z serwera
+    """
+    results: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    for item in fetch_data:
+        if isinstance(item, tuple) and len(item) == 2:
+            meta, header = item
+            match = _FETCH_META_RE.match(meta or b"")
+            if not match:
+                continue
+            current = {"seq": match.group(1).decode(), "header": header or b"", "meta": meta}
+            results.append(current)
+        elif isinstance(item, bytes) and current is not None:
+            # Część serwerów podaje FLAGS/UID po literale nagłówków
+            current["meta"] += b" " + item
+
+    for entry in results:
+        meta = entry.pop("meta")
+        uid_match = _FETCH_UID_RE.search(meta)
+        size_match = _FETCH_SIZE_RE.search(meta)
+        flags_match = _FETCH_FLAGS_RE.search(meta)
+        entry["imap_uid"] = uid_match.group(1).decode() if uid_match else ""
+        entry["size"] = int(size_match.group(1)) if size_match else len(entry["header"])
+        entry["flags"] = flags_match.group(1).decode(errors="ignore").split() if flags_match else []
+    return results
+
+
+def imap_mail_uid(account: str, mailbox: str, uidvalidity: str, imap_uid: str) -> str:
+    """
+    Klucz maila z serwera w cache: UID IMAP w obrębie UIDVALIDITY skrzynki.
+
+    Numer sekwencyjny zmienia się po każdym EXPUNGE - nie może być kluczem.
+    """
+    return f"{account}:{mailbox}:{uidvalidity}:{imap_uid}"
+
+
+def _size_hint(mail: Dict[str, Any]) -> int:
+    """Rozmiar wiadomości w bajtach (do limitu przepustowości)"""
+    size = mail.get("_imap_size")
+    if isinstance(size, int) and size > 0:
+        return size
+    text = str(mail.get("size", "")).upper()
+    try:
+        if text.endswith("MB"):
+            return int(float(text[:-2]) * 1024 * 1024)
+        if text.endswith("KB"):
+            return int(float(text[:-2]) * 1024)
+    except ValueError:
+        pass
+    return 32 * 1024
+
+
+@dataclass
+class PrefetchJob:
+    """Treść do pobrania"""
+    uid: str
+    account: str
+    imap_uid: str
+    mailbox: str
+    size: int
+    base_priority: int
+    priority: int
+
+
+class BandwidthLimiter:
+    """Token bucket - średnio max_bytes_per_second bajtów na sekundę (0 = bez limitu)"""
+
+    def __init__(self, max_bytes_per_second: int = 0):
+        self.rate = max_bytes_per_second
+        self._allowance = float(max_bytes_per_second)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, nbytes: int, stop_event: threading.Event):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(float(self.rate), self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= nbytes
+            wait = -self._allowance / self.rate if self._allowance < 0 else 0.0
+        if wait > 0:
+            stop_event.wait(wait)
+
+
+class BodyPrefetcher(QObject):
+    """
+    Pobiera treści maili w tle według priorytetów.
+
+    Sygnały są emitowane z wątków roboczych - Qt dostarcza je do wątku GUI.
+    """
+
+    body_ready = pyqtSignal(str, dict)   # uid, {"attachments", "body_preview"}
+    body_failed = pyqtSignal(str, str)   # uid, komunikat błędu
+
+    # Po błędzie połączenia konto jest pomijane przez tyle sekund
+    OFFLINE_BACKOFF = 60
+    # Bezczynne połączenie jest zamykane po tylu sekundach
+    IDLE_TIMEOUT = 120
+    # Co tyle zapisanych treści sprawdzany jest budżet dysku
+    BUDGET_CHECK_INTERVAL = 50
+
+    def __init__(
+        self,
+        cache,
+        accounts: List[Dict[str, Any]],
+        pipeline=None,
+        max_connections: int = 2,
+        max_bytes_per_second: int = 512 * 1024,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.cache = cache
+        self.pipeline = pipeline
+        self.max_connections = max(1, max_connections)
+        self.limiter = BandwidthLimiter(max_bytes_per_second)
+        self._accounts: Dict[str, Dict[str, Any]] = {}
+        self.set_accounts(accounts)
+
+        self._condition = threading.Condition()
+        self._heap: List[Tuple[int, int, str]] = []
+        self._jobs: Dict[str, PrefetchJob] = {}
+        self._in_progress: set = set()
+        self._counter = itertools.count()
+        self._focused: List[str] = []
+        self._offline_until: Dict[str, float] = {}
+        self._background_paused = False
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+        self._stored_since_check = 0
+
+    def set_accounts(self, accounts: List[Dict[str, Any]]):
+        self._accounts = {a.get("email"): a for a in accounts or [] if a.get("email")}
+
+    # ==================== KOLEJKA ====================
+
+    def _job_for(self, mail: Dict[str, Any], priority: int) -> Optional[PrefetchJob]:
+        uid = mail.get("_uid")
+        account = mail.get("_account")
+        imap_uid = mail.get("_imap_uid")
+        if not uid or not imap_uid or account not in self._accounts or "body" in mail:
+            return None
+        return PrefetchJob(
+            uid=uid,
+            account=account,
+            imap_uid=str(imap_uid),
+            mailbox=mail.get("_imap_mailbox", "INBOX"),
+            size=_size_hint(mail),
+            base_priority=priority,
+            priority=priority,
+        )
+
+    def _push(self, job: PrefetchJob):
+        heapq.heappush(self._heap, (job.priority, next(self._counter), job.uid))
+
+    def schedule(self, mails: Iterable[Dict[str, Any]], priority: int = PRIORITY_BACKGROUND):
+        """Dodaje maile do kolejki (tylko te bez treści w cache)"""
+        candidates = {}
+        for mail in mails:
+            job = self._job_for(mail, priority)
+            if job:
+                candidates[job.uid] = job
+        if not candidates:
+            return
+        missing = self.cache.mails_without_body(list(candidates))
+        with self._condition:
+            for uid in missing:
+                job = candidates[uid]
+                existing = self._jobs.get(uid)
+                if existing is not None:
+                    if job.priority < existing.base_priority:
+                        existing.base_priority = job.priority
+                    if job.priority < existing.priority:
+                        existing.priority = job.priority
+                        self._push(existing)
+                    continue
+                self._jobs[uid] = job
+                self._push(job)
+            self._condition.notify_all()
+        self._ensure_workers()
+
+    def focus(self, selected: Optional[Dict[str, Any]], neighbours: Iterable[Dict[str, Any]] = ()):
+        """
+        Przesuwa na początek kolejki zaznaczony mail i jego sąsiadów.
+
+        Poprzednio zaznaczone maile wracają do swojego priorytetu bazowego.
+        """
+        focus_jobs = []
+        if selected is not None:
+            focus_jobs.append((selected, PRIORITY_SELECTED))
+        focus_jobs.extend((mail, PRIORITY_NEIGHBOUR) for mail in neighbours)
+
+        candidates: Dict[str, Tuple[PrefetchJob, int]] = {}
+        for mail, priority in focus_jobs:
+            job = self._job_for(mail, PRIORITY_BACKGROUND)
+            if job and job.uid not in candidates:
+                candidates[job.uid] = (job, priority)
+        missing = set(self.cache.mails_without_body(list(candidates))) if candidates else set()
+
+        with self._condition:
+            for uid in self._focused:
+                job = self._jobs.get(uid)
+                if job and job.priority < job.base_priority and uid not in candidates:
+                    job.priority = job.base_priority
+                    self._push(job)
+            self._focused = []
+            for uid, (job, priority) in candidates.items():
+                if uid not in missing:
+                    continue
+                existing = self._jobs.setdefault(uid, job)
+                existing.priority = priority
+                self._push(existing)
+                self._focused.append(uid)
+            self._condition.notify_all()
+        if self._focused:
+            self._ensure_workers()
+
+    def pause_background(self, paused: bool):
+        """Wstrzymuje zadania w tle (np. na czas pobierania listy maili)"""
+        with self._condition:
+            self._background_paused = paused
+            self._condition.notify_all()
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._jobs)
+
+    def _next_job(self) -> Optional[PrefetchJob]:
+        """Najpilniejsze zadanie (wywoływane z blokadą _condition)"""
+        now = time.monotonic()
+        deferred = []
+        job = None
+        while self._heap:
+            priority, _, uid = self._heap[0]
+            candidate = self._jobs.get(uid)
+            if candidate is None or candidate.priority != priority or uid in self._in_progress:
+                heapq.heappop(self._heap)  # Nieaktualny wpis
+                continue
+            if self._background_paused and priority > PRIORITY_NEIGHBOUR:
+                break
+            heapq.heappop(self._heap)
+            if self._offline_until.get(candidate.account, 0) > now:
+                deferred.append(candidate)
+                continue
+            job = candidate
+            break
+        for item in deferred:
+            self._push(item)
+        return job
+
+    # ==================== WĄTKI ROBOCZE ====================
+
+    def _ensure_workers(self):
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_connections and not self._stop.is_set():
+            worker = threading.Thread(target=self._worker, name="BodyPrefetcher", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _worker(self):
+        connections: Dict[Tuple[str, str], Tuple[imaplib.IMAP4, float]] = {}
+        try:
+            while not self._stop.is_set():
+                with self._condition:
+                    job = self._next_job()
+                    if job is None:
+                        self._condition.wait(timeout=5)
+                        job = self._next_job()
+                    if job is None:
+                        self._close_idle(connections)
+                        continue
+                    self._in_progress.add(job.uid)
+                try:
+                    self._process(job, connections)
+                finally:
+                    with self._condition:
+                        self._in_progress.discard(job.uid)
+        finally:
+            for conn, _ in connections.values():
+                self._logout(conn)
+
+    def _process(self, job: PrefetchJob, connections: Dict[Tuple[str, str], Tuple[imaplib.IMAP4, float]]):
+        if job.priority > PRIORITY_NEIGHBOUR:
+            self.limiter.acquire(job.size, self._stop)
+        try:
+            raw = self._fetch(job, connections)
+        except (OSError, imaplib.IMAP4.error, EOFError) as e:
+            logger.warning(f"[BodyPrefetcher] {job.account} unavailable: {e}")
+            key = (job.account, job.mailbox)
+            if key in connections:
+                self._logout(connections.pop(key)[0])
+            with self._condition:
+                self._offline_until[job.account] = time.monotonic() + self.OFFLINE_BACKOFF
+                self._push(job)
+            if job.priority == PRIORITY_SELECTED:
+                self.body_failed.emit(job.uid, str(e))
+            return
+
+        with self._condition:
+            self._jobs.pop(job.uid, None)
+            self._offline_until.pop(job.account, None)
+        if raw is None:
+            self.body_failed.emit(job.uid, "Wiadomość nie istnieje na serwerze")
+            return
+
+        try:
+            if self.pipeline is not None:
+                parsed = self.pipeline.parse_many([raw])[0]
+            else:
+                parsed = parse_message(raw)
+            if parsed is None:
+                raise ValueError("parse failed")
+            parsed["_uid"] = job.uid
+            self.cache.spill_attachments(parsed)
+            self.cache.store_mail_body(job.uid, parsed, remote=True)
+        except Exception as e:
+            logger.error(f"[BodyPrefetcher] Cannot store body of {job.uid}: {e}")
+            self.body_failed.emit(job.uid, str(e))
+            return
+
+        self.body_ready.emit(job.uid, {
+            "attachments": parsed.get("attachments", []),
+            "body_preview": parsed.get("body_preview", ""),
+        })
+
+        # Licznik współdzielony przez wątki robocze - budżet sprawdza tylko jeden z nich
+        with self._condition:
+            self._stored_since_check += 1
+            check_budget = self._stored_since_check >= self.BUDGET_CHECK_INTERVAL
+            if check_budget:
+                self._stored_since_check = 0
+        if check_budget:
+            self.cache.enforce_body_budget()
+
+    def _fetch(self, job: PrefetchJob, connections: Dict[Tuple[str, str], Tuple[imaplib.IMAP4, float]]) -> Optional[bytes]:
+        key = (job.account, job.mailbox)
+        entry = connections.get(key)
+        conn = entry[0] if entry else self._connect(job.account, job.mailbox)
+        connections[key] = (conn, time.monotonic())
+
+        # BODY.PEEK - pobranie treści nie oznacza maila jako przeczytanego
+        status, data = conn.uid("FETCH", job.imap_uid, "(BODY.PEEK[])")
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"FETCH {job.imap_uid}: {status}")
+        for item in data or []:
+            if isinstance(item, tuple) and len(item) == 2:
+                return item[1]
+        return None
+
+    def _connect(self, account_email: str, mailbox: str) -> imaplib.IMAP4:
+        account = self._accounts[account_email]
+        if account.get("imap_ssl"):
+            conn = imaplib.IMAP4_SSL(account["imap_server"], account.get("imap_port", 993), timeout=15)
+        else:
+            conn = imaplib.IMAP4(account["imap_server"], account.get("imap_port", 143), timeout=15)
+        conn.login(account["email"], account["password"])
+        conn.select(mailbox, readonly=True)
+        return conn
+
+    def _close_idle(self, connections: Dict[Tuple[str, str], Tuple[imaplib.IMAP4, float]]):
+        now = time.monotonic()
+        for key, (conn, last_used) in list(connections.items()):
+            if now - last_used > self.IDLE_TIMEOUT:
+                self._logout(conn)
+                del connections[key]
+
+    @staticmethod
+    def _logout(conn: imaplib.IMAP4):
+        try:
+            conn.logout()
+        except Exception:
+            pass
+
+    def stop(self):
+        """Zatrzymuje wątki robocze (niepobrane treści zostaną pobrane przy otwarciu)"""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=2)
+        self._workers = []
+
@@ -5,45 +5,89 @@ Funkcje:
 - Szybkie wczytywanie maili z cache przy starcie aplikacji
 - Lazy loading - szczegóły maili ładowane na żądanie
 - Automatyczna synchronizacja w tle
-- Progresywne ładowanie danych
+- Progresywne ładowanie danych (pierwsza strona bieżącego folderu, potem porcje)
+- Zapis tylko zmienionych maili (miejsca zmian wywołują mark_dirty)
 """
 
-from typing import Dict, List, Any, Optional
-from PyQt6.QtCore import QThread, pyqtSignal
-from .mail_cache import MailCache, BackgroundSyncManager
+from typing import Dict, List, Any, Optional, Set, Tuple
+import threading
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
+from .mail_cache import MailBody, MailCache, BackgroundSyncManager
 
 
 class CacheLoader(QThread):
-    """Wątek ładujący dane z cache w tle"""
+    """
+    Wątek ładujący dane z cache w tle - strumieniowo.
+    
+    Kolejność: kontakty, pierwsza strona bieżącego folderu (jedyny koszt
+    przed pierwszym widokiem), potem pozostałe maile porcjami folder po
+    folderze (stronicowanie keyset z load_page).
+    """
     
-    mails_loaded = pyqtSignal(dict)  # folder -> mails
+    mails_chunk_loaded = pyqtSignal(str, list)  # folder, maile
     contacts_loaded = pyqtSignal(dict)  # email -> contact_data
     progress = pyqtSignal(str)  # status message
+    progress_count = pyqtSignal(int, int)  # załadowane, wszystkie
     finished = pyqtSignal()
     
-    def __init__(self, cache: MailCache):
+    FIRST_PAGE_SIZE = 100
+    CHUNK_SIZE = 500
+    
+    def __init__(
+        self,
+        cache: MailCache,
+        priority_folder: Optional[str] = None,
+        per_folder_limit: Optional[int] = None,
+    ):
         super().__init__()
         self.cache = cache
+        self.priority_folder = priority_folder
+        # Większe foldery obsługuje okno z cache (MailTableModel), nie pamięć
+        self.per_folder_limit = per_folder_limit
+        self._stop = False
+    
+    def stop(self):
+        """Przerywa ładowanie po bieżącej porcji"""
+        self._stop = True
     
     def run(self):
         """Ładuje dane z cache"""
         try:
-            self.progress.emit("Ładowanie maili z cache...")
-            
-            # Załaduj maile
-            mails = self.cache.load_all_mails_from_cache()
-            if mails:
-                self.mails_loaded.emit(mails)
-                self.progress.emit(f"Załadowano {sum(len(m) for m in mails.values())} maili")
-            
-            # Załaduj kontakty
+            # Kontakty są małe, a kolorują już pierwszą stronę listy
             self.progress.emit("Ładowanie kontaktów z cache...")
             contacts = self.cache.load_all_contacts_from_cache()
             if contacts:
                 self.contacts_loaded.emit(contacts)
-                self.progress.emit(f"Załadowano {len(contacts)} kontaktów")
             
-            self.progress.emit("Cache załadowany pomyślnie")
+            counts = self.cache.folder_counts()
+            if self.per_folder_limit:
+                counts = {f: min(c, self.per_folder_limit) for f, c in counts.items()}
+            total = sum(counts.values())
+            folders = sorted(counts, key=lambda f: f != self.priority_folder)
+            
+            self.progress.emit("Ładowanie maili z cache...")
+            loaded = 0
+            for folder in folders:
+                remaining = counts[folder]
+                after: Optional[Tuple[Any, str]] = None
+                page_size = self.FIRST_PAGE_SIZE if folder == self.priority_folder else self.CHUNK_SIZE
+                while remaining > 0 and not self._stop:
+                    limit = min(page_size, remaining)
+                    mails = self.cache.load_page(folder, limit=limit, after=after)
+                    if not mails:
+                        break
+                    self.mails_chunk_loaded.emit(folder, mails)
+                    loaded += len(mails)
+                    remaining -= len(mails)
+                    self.progress_count.emit(loaded, total)
+                    if len(mails) < limit:
+                        break
+                    after = (mails[-1]["date"], mails[-1]["_uid"])
+                    page_size = self.CHUNK_SIZE
+                if self._stop:
+                    break
+            
+            self.progress.emit(f"Załadowano {loaded} maili i {len(contacts or {})} kontaktów z cache")
             
         except Exception as e:
             self.progress.emit(f"Błąd ładowania cache: {e}")
@@ -55,53 +99,97 @@ class CacheLoader(QThread):
 class MailViewCacheIntegration:
     """Integracja cache z MailViewModule"""
     
+    # Odświeżenie widoku po porcji maili jest opóźniane i łączone
+    REFRESH_DELAY_MS = 200
+    
     def __init__(self, mail_view):
         self.mail_view = mail_view
         self.cache = MailCache()
-        self.sync_manager = BackgroundSyncManager(self.cache, mail_view)
+        self.sync_manager = BackgroundSyncManager(
+            self.cache, mail_view, save_state=self.save_current_state_to_cache
+        )
         self.cache_loader = None
+        
+        # Maile zmienione od ostatniego zapisu (uid -> mail) - oznaczają je
+        # miejsca zmian przez mark_dirty, zapis obejmuje tylko je
+        self._state_lock = threading.Lock()
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._persisted_contacts: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        
+        # uid maili w folderach podczas ładowania: folder -> (lista, uid)
+        self._known_uids: Dict[str, Tuple[int, Set[str]]] = {}
+        self._pending_refresh: Set[str] = set()
+        self._refresh_timer = QTimer()
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(self.REFRESH_DELAY_MS)
+        self._refresh_timer.timeout.connect(self._refresh_loaded_folders)
     
     def load_from_cache_at_startup(self):
-        """Ładuje dane z cache przy starcie aplikacji (asynchronicznie)"""
+        """Ładuje dane z cache przy starcie aplikacji (asynchronicznie, porcjami)"""
+        priority_folder = getattr(self.mail_view, "current_folder", None) or "Odebrane"
+        per_folder_limit = getattr(self.mail_view, "MAX_MAILS_PER_FOLDER", None)
+        
         # Utwórz loader w tle
-        self.cache_loader = CacheLoader(self.cache)
+        self.cache_loader = CacheLoader(self.cache, priority_folder, per_folder_limit)
         
         # Połącz sygnały
-        self.cache_loader.mails_loaded.connect(self._on_mails_loaded)
+        self.cache_loader.mails_chunk_loaded.connect(self._on_mails_chunk_loaded)
         self.cache_loader.contacts_loaded.connect(self._on_contacts_loaded)
         self.cache_loader.progress.connect(self._on_progress)
+        self.cache_loader.progress_count.connect(self._on_progress_count)
         self.cache_loader.finished.connect(self._on_loading_finished)
         
         # Rozpocznij ładowanie
         self.cache_loader.start()
     
-    def _on_mails_loaded(self, mails: Dict[str, List[Dict[str, Any]]]):
-        """Obsługa załadowanych maili z cache"""
-        # Załaduj maile do mail_view
-        if hasattr(self.mail_view, 'sample_mails'):
-            # Merguj z istniejącymi mailami (cache + nowe)
-            for folder, cached_mails in mails.items():
-                if folder not in self.mail_view.sample_mails:
-                    self.mail_view.sample_mails[folder] = []
-                
-                # Dodaj cached maile (jeśli nie istnieją już)
-                existing_uids = {m.get("_uid") for m in self.mail_view.sample_mails[folder] if m.get("_uid")}
-                
-                for mail in cached_mails:
-                    uid = mail.get("_uid")
-                    if uid and uid not in existing_uids:
-                        self.mail_view.sample_mails[folder].append(mail)
-                        existing_uids.add(uid)
-            
-            # Odśwież widok jeśli jest aktywny folder
-            if hasattr(self.mail_view, 'current_folder') and self.mail_view.current_folder:
-                if hasattr(self.mail_view, 'populate_mail_table'):
-                    folder_mails = self.mail_view.sample_mails.get(self.mail_view.current_folder, [])
-                    self.mail_view.populate_mail_table(folder_mails)
-            
-            # Odśwież drzewo folderów (liczniki)
-            if hasattr(self.mail_view, 'populate_folders_tree'):
-                self.mail_view.populate_folders_tree()
+    def _on_mails_chunk_loaded(self, folder: str, mails: List[Dict[str, Any]]):
+        """Dołącza porcję maili z cache do folderu (bez duplikatów)"""
+        if not hasattr(self.mail_view, 'sample_mails'):
+            return
+        
+        folder_mails = self.mail_view.sample_mails.setdefault(folder, [])
+        known = self._known_uids.get(folder)
+        if known is None or known[0] != id(folder_mails):
+            # Folder nowy albo podmieniony (np. przez pobranie z IMAP)
+            known = (id(folder_mails), {m.get("_uid") for m in folder_mails if m.get("_uid")})
+            self._known_uids[folder] = known
+        existing_uids = known[1]
+        
+        added = False
+        for mail in mails:
+            uid = mail.get("_uid")
+            if uid and uid not in existing_uids:
+                folder_mails.append(mail)
+                existing_uids.add(uid)
+                added = True
+        
+        if added:
+            self._pending_refresh.add(folder)
+            self._refresh_timer.start()
+    
+    def _refresh_loaded_folders(self):
+        """Odświeża bieżący folder i liczniki po porcjach maili z cache"""
+        folders, self._pending_refresh = self._pending_refresh, set()
+        mail_view = self.mail_view
+        
+        current_folder = getattr(mail_view, "current_folder", None)
+        if (
+            current_folder in folders
+            and getattr(mail_view, "mail_scope", "folder") == "folder"
+            and hasattr(mail_view, "apply_mail_filters")
+        ):
+            selected_account = None
+            if hasattr(mail_view, "account_filter_combo"):
+                selected_account = mail_view.account_filter_combo.currentData()
+            mail_view.current_folder_mails = [
+                mail for mail in mail_view.sample_mails.get(current_folder, [])
+                if selected_account is None or mail.get("_account") == selected_account
+            ]
+            mail_view.apply_mail_filters()
+        
+        # Odśwież drzewo folderów (liczniki)
+        if hasattr(mail_view, 'populate_folders_tree'):
+            mail_view.populate_folders_tree()
     
     def _on_contacts_loaded(self, contacts: Dict[str, Dict[str, Any]]):
         """Obsługa załadowanych kontaktów z cache"""
@@ -120,6 +208,10 @@ class MailViewCacheIntegration:
                 if contact_data.get("tags"):
                     if hasattr(self.mail_view, 'contact_tags'):
                         self.mail_view.contact_tags[email] = contact_data["tags"]
+                
+                color = self.mail_view.contact_colors.get(email)
+                if color is not None:
+                    self._persisted_contacts[email] = (color.name(), tuple(contact_data.get("tags") or []))
     
     def _on_progress(self, message: str):
         """Obsługa komunikatów o postępie"""
@@ -127,34 +219,138 @@ class MailViewCacheIntegration:
             self.mail_view.statusBar().showMessage(message, 3000)
         print(f"[Cache] {message}")
     
+    def _on_progress_count(self, loaded: int, total: int):
+        """Postęp ładowania maili (bez logowania każdej porcji)"""
+        if hasattr(self.mail_view, 'statusBar'):
+            self.mail_view.statusBar().showMessage(f"Ładowanie maili z cache: {loaded}/{total}", 3000)
+    
     def _on_loading_finished(self):
         """Obsługa zakończenia ładowania"""
         print("[Cache] Ładowanie z cache zakończone")
+        self._known_uids.clear()
         
         # Rozpocznij synchronizację w tle
         self.sync_manager.start_background_sync(interval_minutes=5)
     
+    # ==================== ZAPIS ZMIAN ====================
+    
+    def mark_dirty(self, mails: List[Dict[str, Any]]):
+        """Oznacza maile do zapisu przy najbliższym save_current_state_to_cache"""
+        with self._state_lock:
+            for mail in mails:
+                uid = mail.get("_uid")
+                if uid:
+                    self._dirty[uid] = mail
+    
+    def _take_dirty(self) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """Odbiera maile oznaczone do zapisu: (folder, konto) -> maile"""
+        with self._state_lock:
+            dirty, self._dirty = self._dirty, {}
+        
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for mail in dirty.values():
+            folder = mail.get("_folder")
+            if not folder or folder == "Ulubione":
+                continue
+            groups.setdefault((folder, mail.get("_account") or "local"), []).append(mail)
+        return groups
+    
     def save_current_state_to_cache(self):
-        """Zapisuje aktualny stan do cache"""
+        """Zapisuje do cache tylko maile i kontakty zmienione od ostatniego zapisu"""
         # Zapisz maile
-        if hasattr(self.mail_view, 'sample_mails'):
-            for folder, mails in self.mail_view.sample_mails.items():
-                self.cache.save_mails_to_cache(folder, mails)
+        groups = self._take_dirty()
+        for index, ((folder, account), mails) in enumerate(groups.items()):
+            try:
+                self.cache.save_mails_to_cache(folder, mails, account, replace_memory=False)
+            except Exception:
+                # Niezapisane maile wracają do kolejki
+                for pending in list(groups.values())[index:]:
+                    self.mark_dirty(pending)
+                raise
         
         # Zapisz kontakty
         if hasattr(self.mail_view, 'contact_colors'):
-            for email, color in self.mail_view.contact_colors.items():
+            for email, color in list(self.mail_view.contact_colors.items()):
                 tags = []
                 if hasattr(self.mail_view, 'contact_tags'):
                     tags = self.mail_view.contact_tags.get(email, [])
                 
                 color_str = color.name() if hasattr(color, 'name') else str(color)
+                state = (color_str, tuple(tags))
+                if self._persisted_contacts.get(email) == state:
+                    continue
                 self.cache.save_contact_to_cache(email, "", tags, color_str)
+                self._persisted_contacts[email] = state
     
     def update_mail_cache(self, uid: str, updates: Dict[str, Any]):
         """Aktualizuje mail w cache"""
         self.cache.update_mail_in_cache(uid, updates)
     
+    def bulk_update_mails(self, mails: List[Dict[str, Any]]):
+        """
+        Zapisuje bieżący stan (folder, przeczytany, gwiazdka, tagi, UID IMAP) wielu maili
+        jedną transakcją. Maile spoza cache są oznaczane do okresowego zapisu.
+        """
+        states = {
+            mail["_uid"]: {
+                "folder": mail.get("_folder"),
+                "read": bool(mail.get("read")),
+                "starred": bool(mail.get("starred")),
+                "tags": list(mail.get("tags") or []),
+                "extra": {key: mail.get(key) for key in ("_imap_uid", "_imap_mailbox")},
+            }
+            for mail in mails
+            if mail.get("_uid")
+        }
+        updated = set(self.cache.bulk_update_mails(states))
+        self.mark_dirty([mail for mail in mails if mail.get("_uid") not in updated])
+    
+    def load_mail_body(self, mail: Dict[str, Any]) -> Optional[MailBody]:
+        """Pobiera treść maila z cache (maile z cache nie mają treści w pamięci)"""
+        uid = mail.get("_uid")
+        if not uid:
+            return None
+        return self.cache.load_mail_body(uid)
+    
+    def search_mails(
+        self,
+        query: str,
+        folder: Optional[str] = None,
+        account: Optional[str] = None,
+        limit: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """Wyszukiwanie pełnotekstowe w cache (from:, has:attachment, after:...)"""
+        return self.cache.search_mails(query, folder=folder, account=account, limit=limit)
+    
+    def load_reply_queue(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        newer_than: Optional[str] = None,
+        older_than: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Okno kolejki odpowiedzi (wątki bez odpowiedzi) z cache"""
+        return self.cache.load_reply_queue(offset, limit, newer_than, older_than)
+    
+    def count_reply_queue(self, newer_than: Optional[str] = None, older_than: Optional[str] = None) -> int:
+        """Liczba wątków w kolejce odpowiedzi"""
+        return self.cache.count_reply_queue(newer_than, older_than)
+    
+    def rename_mails(self, renames: Dict[str, str]):
+        """Zmienia klucze maili w cache (np. nowy UID IMAP po przeniesieniu)"""
+        self.cache.rename_mail_uids(renames)
+        with self._state_lock:
+            for old_uid, new_uid in renames.items():
+                if old_uid in self._dirty:
+                    self._dirty[new_uid] = self._dirty.pop(old_uid)
+    
+    def remove_mails(self, uids: List[str]):
+        """Trwale usuwa maile z cache (np. po opróżnieniu z Kosza)"""
+        with self._state_lock:
+            for uid in uids:
+                self._dirty.pop(uid, None)
+        self.cache.remove_mails_from_cache(uids)
+    
     def cleanup_old_cache(self):
         """Czyści stary cache"""
         deleted = self.cache.clear_old_cache(days=30)
@@ -166,6 +362,11 @@ class MailViewCacheIntegration:
     
     def shutdown(self):
         """Zamyka cache i zapisuje dane"""
+        # Przerwij ładowanie (maile jeszcze niewczytane i tak są w cache)
+        if self.cache_loader and self.cache_loader.isRunning():
+            self.cache_loader.stop()
+            self.cache_loader.wait(2000)
+        
         # Zatrzymaj synchronizację w tle
         self.sync_manager.stop_background_sync()
         
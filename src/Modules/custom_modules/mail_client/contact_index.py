@@ -0,0 +1,243 @@
+"""
+Indeks kontaktów do autouzupełniania adresatów
+
+Funkcjonalność:
+- Trwały indeks adresów (tabela contact_index): nazwa, liczba maili, ostatni kontakt
+- Aktualizacja przyrostowa - przy zapisie nowych maili do cache i przy wysyłce
+- Posortowany indeks kluczy (adres, słowa nazwy) w pamięci - wyszukiwanie
+  prefiksu przez bisect, ranking po częstości i dacie ostatniego kontaktu
+- Prefiksy z bardzo wieloma trafieniami (np. jedna litera) przeglądają
+  kontakty w kolejności rankingu i kończą po znalezieniu limitu
+"""
+
+import bisect
+import heapq
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from email.utils import getaddresses
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+_NAME_WORD_RE = re.compile(r"[\w.+-]+", re.UNICODE)
+
+
+def parse_addresses(value: Any) -> List[Tuple[str, str]]:
+    """Lista (nazwa, email małymi literami) z pola From/To/Cc (tekst lub lista)"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(v) for v in value)
+    result = []
+    for name, email in getaddresses([str(value).replace(";", ",")]):
+        email = email.strip().lower()
+        if "@" in email:
+            result.append((name.strip().strip('"'), email))
+    return result
+
+
+def format_address(name: str, email: str) -> str:
+    """Adres w postaci "Nazwa <email>" (albo sam email)"""
+    return f"{name} <{email}>" if name else email
+
+
+class ContactIndex:
+    """
+    Indeks kontaktów z wyszukiwaniem po prefiksie.
+
+    Kluczami są adres email oraz słowa nazwy wyświetlanej, więc
+    "kow" znajdzie "Jan Kowalski <jan@firma.pl>".
+    """
+
+    # Powyżej tylu trafień prefiksu wyniki są szukane w kolejności rankingu
+    DENSE_PREFIX_MATCHES = 2000
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else None
+        self._lock = threading.RLock()
+
+        # email -> [nazwa, liczba maili, ostatni kontakt]
+        self._contacts: Dict[str, List[Any]] = {}
+        # Posortowane pary (klucz, email)
+        self._keys: List[Tuple[str, str]] = []
+        # Kontakty wg rankingu (przeliczane leniwie po zmianach) i ich klucze
+        self._by_rank: List[Tuple[str, List[str]]] = []
+        self._rank_dirty = True
+        self._pending: set = set()
+
+        if self.db_path:
+            self._init_database()
+            self._load()
+
+    # ==================== PERSYSTENCJA ====================
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path))
+
+    def _init_database(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS contact_index (
+                email TEXT PRIMARY KEY,
+                name TEXT,
+                frequency INTEGER DEFAULT 0,
+                last_contacted TEXT
+            ) WITHOUT ROWID
+        """)
+        conn.commit()
+        conn.close()
+
+    def _load(self):
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT email, name, frequency, last_contacted FROM contact_index"
+        ).fetchall()
+        conn.close()
+        with self._lock:
+            for email, name, frequency, last_contacted in rows:
+                self._contacts[email] = [name or "", frequency or 0, last_contacted or ""]
+            self._keys = sorted(
+                (key, email) for email, data in self._contacts.items()
+                for key in self._keys_for(email, data[0])
+            )
+
+    def flush(self):
+        """Zapisuje zmienione kontakty (jedna transakcja)"""
+        with self._lock:
+            if not self._pending:
+                return
+            rows = [(email, *self._contacts[email]) for email in self._pending]
+            self._pending.clear()
+        if not self.db_path:
+            return
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO contact_index (email, name, frequency, last_contacted) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def is_empty(self) -> bool:
+        return not self._contacts
+
+    def __len__(self) -> int:
+        return len(self._contacts)
+
+    # ==================== AKTUALIZACJA ====================
+
+    @staticmethod
+    def _keys_for(email: str, name: str) -> List[str]:
+        keys = {email}
+        for word in _NAME_WORD_RE.findall(name.lower()):
+            if len(word) > 1:
+                keys.add(word)
+        return list(keys)
+
+    def _add(self, name: str, email: str, when: Optional[str], count: int, new_keys: List[Tuple[str, str]]):
+        email = email.strip().lower()
+        if "@" not in email:
+            return
+        when = when or datetime.now().strftime("%Y-%m-%d %H:%M")
+        data = self._contacts.get(email)
+        if data is None:
+            data = [name, 0, ""]
+            self._contacts[email] = data
+            new_keys.extend((key, email) for key in self._keys_for(email, name))
+        elif name and not data[0]:
+            # Nazwa poznana później (np. najpierw tylko adres w polu Do)
+            data[0] = name
+            new_keys.extend((key, email) for key in self._keys_for(email, name) if key != email)
+        data[1] += count
+        if when > data[2]:
+            data[2] = when
+        self._pending.add(email)
+        self._rank_dirty = True
+
+    def _merge_keys(self, new_keys: List[Tuple[str, str]]):
+        if len(new_keys) < 64:
+            for key in new_keys:
+                bisect.insort(self._keys, key)
+        else:
+            self._keys.extend(new_keys)
+            self._keys.sort()
+
+    def add(self, name: str, email: str, when: Optional[str] = None, count: int = 1):
+        """Rejestruje kontakt z adresem (count maili, ostatni w chwili `when`)"""
+        with self._lock:
+            new_keys: List[Tuple[str, str]] = []
+            self._add(name, email, when, count, new_keys)
+            self._merge_keys(new_keys)
+
+    def observe_mails(self, mails: Iterable[Dict[str, Any]]):
+        """Rejestruje nadawców i adresatów maili (from, to, cc) i zapisuje zmiany"""
+        with self._lock:
+            new_keys: List[Tuple[str, str]] = []
+            for mail in mails:
+                when = str(mail.get("date") or "") or None
+                for field in ("from", "to", "cc"):
+                    for name, email in parse_addresses(mail.get(field)):
+                        self._add(name, email, when, 1, new_keys)
+            self._merge_keys(new_keys)
+        self.flush()
+
+    def record_sent(self, *fields: str):
+        """Rejestruje adresatów wysłanej wiadomości (pola Do/DW/UDW)"""
+        for value in fields:
+            for name, email in parse_addresses(value):
+                self.add(name, email)
+        self.flush()
+
+    # ==================== WYSZUKIWANIE ====================
+
+    def _rank_key(self, email: str) -> Tuple[int, str]:
+        data = self._contacts[email]
+        return data[1], data[2]
+
+    def _matches(self, prefix: str, limit: int) -> List[str]:
+        start = bisect.bisect_left(self._keys, (prefix, ""))
+        end = bisect.bisect_left(self._keys, (prefix + "\uffff", ""), start)
+        if start == end:
+            return []
+
+        if end - start <= self.DENSE_PREFIX_MATCHES:
+            emails = {email for _, email in self._keys[start:end]}
+            return heapq.nlargest(limit, emails, key=self._rank_key)
+
+        # Częsty prefiks - pierwsze pasujące kontakty w kolejności rankingu
+        if self._rank_dirty:
+            ranked = sorted(self._contacts, key=self._rank_key, reverse=True)
+            self._by_rank = [(email, self._keys_for(email, self._contacts[email][0])) for email in ranked]
+            self._rank_dirty = False
+        result = []
+        for email, keys in self._by_rank:
+            if any(key.startswith(prefix) for key in keys):
+                result.append(email)
+                if len(result) >= limit:
+                    break
+        return result
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Podpowiedzi adresów dla wpisanego prefiksu.
+
+        Returns:
+            Adresy "Nazwa <email>" - najczęstsze i najświeższe kontakty najpierw
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            return [format_address(self._contacts[email][0], email) for email in self._matches(prefix, limit)]
+
+    def contact(self, email: str) -> Optional[Dict[str, Any]]:
+        """Dane kontaktu z indeksu"""
+        with self._lock:
+            data = self._contacts.get(email.strip().lower())
+            if data is None:
+                return None
+            return {"email": email.strip().lower(), "name": data[0], "frequency": data[1], "last_contacted": data[2]}
@@ -0,0 +1,585 @@
+"""
+Akcje zbiorcze menu kontekstowego listy maili
+
+Funkcjonalność:
+- Oznaczanie (przeczytane, gwiazdka), przenoszenie, archiwizacja, usuwanie
+  i tagowanie wielu zaznaczonych maili naraz
+- Serwer dostaje jedno polecenie na parę konto/folder IMAP: UID STORE lub
+  UID MOVE na zbiorze UID (bez rozszerzenia MOVE: UID COPY + \\Deleted + UID EXPUNGE;
+  bez UIDPLUS wiadomości zostają tylko oznaczone \\Deleted)
+- Zmiany są widoczne od razu (optymistycznie) i zapisywane w cache jedną
+  transakcją; błąd serwera cofa je dla maili z grupy, której dotyczył
+- Tagi są lokalne - nie wymagają serwera
+"""
+
+import imaplib
+import itertools
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtWidgets import QMenu, QMessageBox
+
+try:
+    from .body_prefetch import imap_mail_uid
+    from .mail_cache import MailCache
+except ImportError:
+    from mail_client.body_prefetch import imap_mail_uid
+    from mail_client.mail_cache import MailCache
+
+
+ARCHIVE_FOLDER = "Archiwum"
+TRASH_FOLDER = "Kosz"
+
+# Lokalne foldery -> typowe nazwy folderów IMAP (pierwszy istniejący na serwerze)
+SERVER_MAILBOX_ALIASES: Dict[str, List[str]] = {
+    "Odebrane": ["INBOX"],
+    "Kosz": ["Trash", "Deleted", "Deleted Items", "Deleted Messages", "[Gmail]/Trash", "[Gmail]/Kosz", "INBOX.Trash"],
+    "Spam": ["Junk", "Spam", "Junk E-mail", "[Gmail]/Spam", "INBOX.Junk", "INBOX.Spam"],
+    "Archiwum": ["Archive", "Archiwum", "[Gmail]/All Mail", "[Gmail]/Wszystkie", "INBOX.Archive"],
+    "Wysłane": ["Sent", "Sent Items", "Sent Messages", "[Gmail]/Sent Mail", "INBOX.Sent"],
+    "Szkice": ["Drafts", "[Gmail]/Drafts", "INBOX.Drafts"],
+}
+
+_COPYUID_RE = re.compile(r"^\s*(\d+)\s+(\S+)\s+(\S+)")
+
+
+def imap_uid_set(uids: Iterable[Any]) -> str:
+    """Zwarty zbiór UID dla IMAP: [1, 2, 3, 7, 9, 10] -> "1:3,7,9:10" """
+    values = sorted({int(uid) for uid in uids})
+    parts: List[str] = []
+    start = previous = None
+    for value in values:
+        if previous is not None and value == previous + 1:
+            previous = value
+            continue
+        if start is not None:
+            parts.append(str(start) if start == previous else f"{start}:{previous}")
+        start = previous = value
+    if start is not None:
+        parts.append(str(start) if start == previous else f"{start}:{previous}")
+    return ",".join(parts)
+
+
+def expand_uid_set(uid_set: str) -> List[str]:
+    """Rozwija zbiór UID z odpowiedzi serwera ("4:6,9" -> ["4", "5", "6", "9"])"""
+    uids: List[str] = []
+    for part in uid_set.split(","):
+        if ":" in part:
+            low, high = part.split(":", 1)
+            low_value, high_value = sorted((int(low), int(high)))
+            uids.extend(str(value) for value in range(low_value, high_value + 1))
+        elif part:
+            uids.append(str(int(part)))
+    return uids
+
+
+def quote_mailbox(name: str) -> str:
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def resolve_server_mailbox(local_folder: str, server_folders: Iterable[str]) -> Optional[str]:
+    """Folder IMAP odpowiadający folderowi lokalnemu (None - folder tylko lokalny)"""
+    by_name = {name.lower(): name for name in server_folders or []}
+    for candidate in [local_folder] + SERVER_MAILBOX_ALIASES.get(local_folder, []):
+        found = by_name.get(candidate.lower())
+        if found:
+            return found
+    return None
+
+
+def _check(response: Tuple[str, Any], command: str):
+    typ, data = response
+    if typ != "OK":
+        detail = data[0].decode(errors="replace") if data and isinstance(data[0], bytes) else data
+        raise imaplib.IMAP4.error(f"{command}: {detail}")
+
+
+def _copyuid_map(conn: imaplib.IMAP4) -> Dict[str, Tuple[str, str]]:
+    """
+    Stare UID -> (UIDVALIDITY, nowe UID) w folderze docelowym
+    (odpowiedź COPYUID, RFC 4315)
+    """
+    mapping: Dict[str, Tuple[str, str]] = {}
+    _, data = conn.response("COPYUID")
+    for entry in data or []:
+        if not entry:
+            continue
+        text = entry.decode(errors="replace") if isinstance(entry, bytes) else str(entry)
+        match = _COPYUID_RE.match(text)
+        if not match:
+            continue
+        uidvalidity = match.group(1)
+        source, target = expand_uid_set(match.group(2)), expand_uid_set(match.group(3))
+        if len(source) == len(target):
+            mapping.update((old, (uidvalidity, new)) for old, new in zip(source, target))
+    return mapping
+
+
+def _expunge(conn: imaplib.IMAP4, uid_set: str):
+    """
+    Oznacza wiadomości \\Deleted i usuwa tylko je (UID EXPUNGE).
+
+    Bez UIDPLUS zwykły EXPUNGE usunąłby też wiadomości oznaczone wcześniej
+    przez innych klientów - zostają wtedy tylko oznaczone (pobieranie listy
+    pomija je, opróżni je klient pocztowy lub serwer).
+    """
+    _check(conn.uid("STORE", uid_set, "+FLAGS.SILENT", "(\\Deleted)"), "STORE \\Deleted")
+    if "UIDPLUS" in conn.capabilities:
+        _check(conn.uid("EXPUNGE", uid_set), "UID EXPUNGE")
+    else:
+        logger.info("[ProMail] Server without UIDPLUS - messages marked \\Deleted, EXPUNGE skipped")
+
+
+def run_bulk_command(
+    conn: imaplib.IMAP4, operation: Dict[str, Any], uids: List[str]
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Wykonuje operację na zbiorze UID w wybranym folderze jednym poleceniem.
+    Dla przeniesienia zwraca mapę starych UID na (UIDVALIDITY, nowe UID),
+    jeśli serwer ją podał.
+    """
+    uid_set = imap_uid_set(uids)
+    kind = operation["kind"]
+    if kind == "flag":
+        sign = "+" if operation["enabled"] else "-"
+        _check(conn.uid("STORE", uid_set, f"{sign}FLAGS.SILENT", f"({operation['flag']})"), "UID STORE")
+        return {}
+    if kind == "move":
+        conn.response("COPYUID")  # usuń odpowiedź z poprzedniego polecenia
+        target = quote_mailbox(operation["target_mailbox"])
+        if "MOVE" in conn.capabilities:
+            _check(conn.uid("MOVE", uid_set, target), "UID MOVE")
+        else:
+            _check(conn.uid("COPY", uid_set, target), "UID COPY")
+            _expunge(conn, uid_set)
+        return _copyuid_map(conn)
+    if kind == "delete":
+        _expunge(conn, uid_set)
+        return {}
+    raise ValueError(f"Nieznana operacja: {kind}")
+
+
+class BulkImapWorker(QThread):
+    """Wątek wykonujący operację zbiorczą na serwerach (jedno połączenie na konto)"""
+
+    completed = pyqtSignal(int, object)  # action_id, {"errors": {...}, "uid_maps": {...}}
+
+    def __init__(
+        self,
+        action_id: int,
+        accounts: Dict[str, Dict[str, Any]],
+        groups: Dict[Tuple[str, str], Dict[str, Any]],
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.action_id = action_id
+        self.accounts = accounts
+        # (konto, folder IMAP) -> {"uids": [...], "operation": {...}}
+        self.groups = groups
+
+    def run(self):
+        errors: Dict[Tuple[str, str], str] = {}
+        uid_maps: Dict[Tuple[str, str], Dict[str, Tuple[str, str]]] = {}
+        by_account: Dict[str, List[Tuple[str, str]]] = {}
+        for key in self.groups:
+            by_account.setdefault(key[0], []).append(key)
+
+        for account_email, keys in by_account.items():
+            conn = None
+            try:
+                conn = self._connect(self.accounts[account_email])
+                for key in keys:
+                    group = self.groups[key]
+                    try:
+                        _check(conn.select(quote_mailbox(key[1])), f"SELECT {key[1]}")
+                        uid_maps[key] = run_bulk_command(conn, group["operation"], group["uids"])
+                    except Exception as e:
+                        errors[key] = str(e)
+            except Exception as e:
+                for key in keys:
+                    errors.setdefault(key, str(e))
+            finally:
+                if conn is not None:
+                    try:
+                        conn.logout()
+                    except Exception:
+                        pass
+
+        for key, message in errors.items():
+            logger.error(f"[ProMail] Bulk IMAP action failed for {key[0]}/{key[1]}: {message}")
+        self.completed.emit(self.action_id, {"errors": errors, "uid_maps": uid_maps})
+
+    @staticmethod
+    def _connect(account: Dict[str, Any]) -> imaplib.IMAP4:
+        if account.get("imap_ssl"):
+            conn = imaplib.IMAP4_SSL(account["imap_server"], account.get("imap_port", 993), timeout=30)
+        else:
+            conn = imaplib.IMAP4(account["imap_server"], account.get("imap_port", 143), timeout=30)
+        conn.login(account["email"], account["password"])
+        return conn
+
+
+class MailBulkActions(QObject):
+    """
+    Akcje zbiorcze dla mail_view: zmiana w pamięci i w cache od razu,
+    operacja IMAP w tle, przy błędzie serwera przywrócenie stanu sprzed akcji.
+    """
+
+    def __init__(self, mail_view):
+        super().__init__(mail_view)
+        self.view = mail_view
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._workers: Dict[int, BulkImapWorker] = {}
+
+    # ==================== MENU ====================
+
+    def populate_menu(self, menu: QMenu, mails: List[Dict[str, Any]]):
+        """Dodaje do menu akcje dla zaznaczonych maili"""
+        count = len(mails)
+        menu.addAction(f"✉️ Oznacz jako przeczytane ({count})", lambda: self.set_flag(mails, "read", True))
+        menu.addAction(f"📩 Oznacz jako nieprzeczytane ({count})", lambda: self.set_flag(mails, "read", False))
+        menu.addAction(f"⭐ Dodaj gwiazdkę ({count})", lambda: self.set_flag(mails, "starred", True))
+        menu.addAction(f"☆ Usuń gwiazdkę ({count})", lambda: self.set_flag(mails, "starred", False))
+        menu.addSeparator()
+
+        move_menu = menu.addMenu(f"📁 Przenieś do... ({count})")
+        for folder in sorted(name for name in self.view.sample_mails if name != "Ulubione"):
+            move_menu.addAction(folder, lambda checked=False, f=folder: self.move(mails, f))
+        menu.addAction(f"🗄️ Archiwizuj ({count})", lambda: self.move(mails, ARCHIVE_FOLDER))
+
+        tag_names = [tag.get("name") for tag in getattr(self.view, "mail_tags", []) if tag.get("name")]
+        if tag_names:
+            tag_menu = menu.addMenu(f"🏷️ Tagi ({count})")
+            for name in tag_names:
+                tag_menu.addAction(f"+ {name}", lambda checked=False, n=name: self.set_tag(mails, n, True))
+            tag_menu.addSeparator()
+            for name in tag_names:
+                tag_menu.addAction(f"− {name}", lambda checked=False, n=name: self.set_tag(mails, n, False))
+
+        menu.addSeparator()
+        menu.addAction(f"🗑️ Usuń ({count})", lambda: self.delete(mails))
+
+    # ==================== AKCJE ====================
+
+    def set_flag(self, mails: List[Dict[str, Any]], field: str, value: bool):
+        """Przeczytane/gwiazdka dla wszystkich maili (\\Seen / \\Flagged na serwerze)"""
+        changed = [m for m in mails if bool(m.get(field)) != value]
+        if not changed:
+            return
+        operation = {"kind": "flag", "flag": "\\Seen" if field == "read" else "\\Flagged", "enabled": value}
+
+        def change(state: Dict[str, Any]):
+            state[field] = value
+
+        self._run(changed, change, operation, self._flag_message(field, value, len(changed)))
+
+    def move(self, mails: List[Dict[str, Any]], target_folder: str):
+        """Przenosi maile do folderu (UID MOVE do odpowiadającego folderu IMAP)"""
+        if target_folder == "Ulubione":
+            self.view.show_status_message("Folder 'Ulubione' tworzony jest automatycznie na podstawie gwiazdek.", 2500)
+            return
+        changed = [m for m in mails if m.get("_folder") != target_folder]
+        if not changed:
+            self.view.show_status_message("Wiadomości już znajdują się w tym folderze.", 2000)
+            return
+        operation = {"kind": "move", "target_folder": target_folder}
+
+        def change(state: Dict[str, Any]):
+            state["folder"] = target_folder
+
+        self._run(changed, change, operation, f"Przeniesiono {len(changed)} wiadomości do folderu '{target_folder}'.")
+
+    def delete(self, mails: List[Dict[str, Any]]):
+        """Przenosi maile do kosza; maile już w koszu usuwa na stałe"""
+        reply = QMessageBox.question(
+            self.view,
+            "Potwierdzenie",
+            f"Czy na pewno chcesz usunąć zaznaczone wiadomości ({len(mails)})?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        in_trash = [m for m in mails if m.get("_folder") == TRASH_FOLDER]
+        if in_trash:
+            self._delete_permanently(in_trash)
+        others = [m for m in mails if m.get("_folder") != TRASH_FOLDER]
+        if others:
+            self.move(others, TRASH_FOLDER)
+
+    def set_tag(self, mails: List[Dict[str, Any]], tag: str, add: bool):
+        """Dodaje lub usuwa tag (tylko lokalnie)"""
+        changed = [m for m in mails if (tag in self.view.get_mail_tags(m)) != add]
+        if not changed:
+            return
+
+        def change(state: Dict[str, Any]):
+            tags = [t for t in state["tags"] if t != tag]
+            state["tags"] = tags + [tag] if add else tags
+
+        verb = "Dodano tag" if add else "Usunięto tag"
+        self._run(changed, change, None, f"{verb} '{tag}' ({len(changed)} wiadomości).")
+
+    @staticmethod
+    def _flag_message(field: str, value: bool, count: int) -> str:
+        if field == "read":
+            return f"Oznaczono jako {'przeczytane' if value else 'nieprzeczytane'}: {count} wiadomości."
+        return f"{'Dodano' if value else 'Usunięto'} gwiazdkę: {count} wiadomości."
+
+    # ==================== WYKONANIE ====================
+
+    def pending_states(self) -> Dict[str, Dict[str, bool]]:
+        """Flagi maili z akcją w toku (UID -> read/starred) - ważniejsze niż stan z serwera"""
+        return {
+            self.view.ensure_mail_uid(mail): {"read": bool(mail.get("read")), "starred": bool(mail.get("starred"))}
+            for pending in self._pending.values()
+            for mail in pending["mails"]
+        }
+
+    def _state(self, mail: Dict[str, Any]) -> Dict[str, Any]:
+        state = {
+            "folder": mail.get("_folder"),
+            "read": bool(mail.get("read")),
+            "starred": bool(mail.get("starred")),
+            "tags": list(self.view.get_mail_tags(mail)),
+        }
+        if "flags" in mail:
+            state["flags"] = mail["flags"]
+        return state
+
+    def _run(
+        self,
+        mails: List[Dict[str, Any]],
+        change: Callable[[Dict[str, Any]], None],
+        operation: Optional[Dict[str, Any]],
+        message: str,
+    ):
+        snapshot = {self.view.ensure_mail_uid(mail): self._state(mail) for mail in mails}
+        states = {}
+        for uid, state in snapshot.items():
+            new_state = dict(state)
+            new_state.pop("flags", None)
+            change(new_state)
+            states[uid] = new_state
+
+        # Optymistycznie: pamięć, cache (jedna transakcja) i jedno odświeżenie widoku
+        self._apply_states(mails, states)
+        self._save(mails)
+        moved = any(states[uid]["folder"] != snapshot[uid]["folder"] for uid in states)
+        self._refresh_after(mails, moved)
+        self.view.show_status_message(message, 2500)
+
+        if operation is None:
+            return
+        groups = self._server_groups(mails, operation)
+        if not groups:
+            return
+        action_id = next(self._ids)
+        self._pending[action_id] = {"mails": mails, "snapshot": snapshot, "groups": groups, "kind": operation["kind"]}
+        self._start_worker(action_id, groups)
+
+    def _delete_permanently(self, mails: List[Dict[str, Any]]):
+        """
+        Trwałe usunięcie: maile znikają z widoku od razu, ale z cache są
+        usuwane dopiero po potwierdzeniu serwera (do tego czasu można je przywrócić).
+        """
+        for mail in mails:
+            self.view.ensure_mail_uid(mail)
+        hidden = {id(mail) for mail in mails}
+        trash = self.view.sample_mails.get(TRASH_FOLDER)
+        if trash is not None:
+            trash[:] = [m for m in trash if id(m) not in hidden]
+        self._refresh_view()
+        self.view.show_status_message(f"Usunięto na stałe {len(mails)} wiadomości.", 3000)
+
+        groups = self._server_groups(mails, {"kind": "delete"})
+        on_server = {id(m) for group in groups.values() for m in group["mails"]}
+        local_only = [m for m in mails if id(m) not in on_server]
+        if local_only:
+            self._forget(local_only)
+        if groups:
+            action_id = next(self._ids)
+            self._pending[action_id] = {"mails": mails, "snapshot": {}, "groups": groups, "kind": "delete"}
+            self._start_worker(action_id, groups)
+
+    def _server_groups(
+        self, mails: List[Dict[str, Any]], operation: Dict[str, Any]
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Maile z kontem i UID IMAP pogrupowane po (konto, folder IMAP)"""
+        accounts = self._accounts()
+        groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for mail in mails:
+            account = mail.get("_account")
+            imap_uid = mail.get("_imap_uid")
+            if not imap_uid or account not in accounts:
+                continue
+            group_operation = dict(operation)
+            if operation["kind"] == "move":
+                target = resolve_server_mailbox(
+                    operation["target_folder"], self.view.imap_folders.get(account, [])
+                )
+                if target is None:
+                    continue  # folder tylko lokalny
+                group_operation["target_mailbox"] = target
+            mailbox = mail.get("_imap_mailbox", "INBOX")
+            if group_operation.get("target_mailbox") == mailbox:
+                continue
+            group = groups.setdefault(
+                (account, mailbox), {"uids": [], "mails": [], "operation": group_operation}
+            )
+            group["uids"].append(str(imap_uid))
+            group["mails"].append(mail)
+        return groups
+
+    def _accounts(self) -> Dict[str, Dict[str, Any]]:
+        return {a.get("email"): a for a in getattr(self.view, "mail_accounts", []) or [] if a.get("email")}
+
+    def _start_worker(self, action_id: int, groups: Dict[Tuple[str, str], Dict[str, Any]]):
+        worker_groups = {key: {"uids": g["uids"], "operation": g["operation"]} for key, g in groups.items()}
+        worker = BulkImapWorker(action_id, self._accounts(), worker_groups, parent=self)
+        worker.completed.connect(self._on_completed)
+        worker.finished.connect(worker.deleteLater)
+        self._workers[action_id] = worker
+        worker.start()
+
+    def _on_completed(self, action_id: int, result: Dict[str, Any]):
+        self._workers.pop(action_id, None)
+        pending = self._pending.pop(action_id, None)
+        if pending is None:
+            return
+        errors = result.get("errors", {})
+        uid_maps = result.get("uid_maps", {})
+        failed: List[Dict[str, Any]] = []
+        for key, group in pending["groups"].items():
+            if key in errors:
+                failed.extend(group["mails"])
+                continue
+            if pending["kind"] == "move":
+                mapping = uid_maps.get(key, {})
+                target_mailbox = group["operation"]["target_mailbox"]
+                renames: Dict[str, str] = {}
+                for mail in group["mails"]:
+                    mail["_imap_mailbox"] = target_mailbox
+                    moved = mapping.get(str(mail.get("_imap_uid")))
+                    if moved:
+                        # Klucz jak przy pobraniu folderu docelowego (UIDVALIDITY + UID)
+                        uidvalidity, new_uid = moved
+                        mail["_imap_uid"] = new_uid
+                        renames[mail["_uid"]] = imap_mail_uid(key[0], target_mailbox, uidvalidity, new_uid)
+                    else:
+                        # Bez COPYUID nowy UID poznamy przy następnym pobraniu folderu
+                        mail.pop("_imap_uid", None)
+                self._rename(group["mails"], renames)
+                self._save(group["mails"])
+            elif pending["kind"] == "delete":
+                self._forget(group["mails"])
+
+        if not failed:
+            return
+        if pending["kind"] == "delete":
+            trash = self.view.sample_mails.setdefault(TRASH_FOLDER, [])
+            trash.extend(failed)
+        else:
+            snapshot = pending["snapshot"]
+            self._apply_states(failed, {m["_uid"]: snapshot[m["_uid"]] for m in failed})
+            self._save(failed)
+        self._refresh_after(failed, pending["kind"] != "flag")
+        message = next(iter(errors.values()))
+        self.view.show_status_message(
+            f"Serwer odrzucił operację - przywrócono {len(failed)} wiadomości ({message})", 5000
+        )
+
+    # ==================== STAN ====================
+
+    def _apply_states(self, mails: List[Dict[str, Any]], states: Dict[str, Dict[str, Any]]):
+        """Ustawia stan maili w pamięci; przeniesienia między listami folderów hurtowo"""
+        leaving: Dict[str, set] = {}
+        arriving: Dict[str, List[Dict[str, Any]]] = {}
+        for mail in mails:
+            uid = mail["_uid"]
+            state = states[uid]
+            source, target = mail.get("_folder"), state.get("folder")
+            if target and target != source:
+                leaving.setdefault(source, set()).add(id(mail))
+                arriving.setdefault(target, []).append(mail)
+                mail["_folder"] = target
+                self.view._mail_index[uid] = (target, mail)
+            mail["read"] = state["read"]
+            mail["starred"] = state["starred"]
+            self.view.set_mail_tags(mail, state["tags"])
+            if "flags" in state:
+                mail["flags"] = state["flags"]
+            elif "flags" in mail:
+                mail["flags"] = MailCache._merge_flags(mail["flags"], mail)
+
+        for source, ids in leaving.items():
+            mails_in_source = self.view.sample_mails.get(source)
+            if mails_in_source is not None:
+                mails_in_source[:] = [m for m in mails_in_source if id(m) not in ids]
+        for target, moved in arriving.items():
+            self.view.sample_mails.setdefault(target, []).extend(moved)
+
+    def _save(self, mails: List[Dict[str, Any]]):
+        if hasattr(self.view, "cache_integration"):
+            self.view.cache_integration.bulk_update_mails(mails)
+
+    def _rename(self, mails: List[Dict[str, Any]], renames: Dict[str, str]):
+        """Nadaje mailom nowe klucze w indeksach widoku i w cache"""
+        if not renames:
+            return
+        if hasattr(self.view, "cache_integration"):
+            self.view.cache_integration.rename_mails(renames)
+        for mail in mails:
+            new_uid = renames.get(mail.get("_uid"))
+            if not new_uid:
+                continue
+            old_uid = mail["_uid"]
+            self.view.mail_uid_map.pop(old_uid, None)
+            self.view._mail_index.pop(old_uid, None)
+            mail["_uid"] = new_uid
+            self.view.mail_uid_map[new_uid] = mail
+            self.view._mail_index[new_uid] = (mail.get("_folder"), mail)
+
+    def _forget(self, mails: List[Dict[str, Any]]):
+        """Usuwa maile trwale usunięte na serwerze z indeksów widoku i z cache"""
+        uids = [m["_uid"] for m in mails if m.get("_uid")]
+        for uid in uids:
+            self.view.mail_uid_map.pop(uid, None)
+            self.view._mail_index.pop(uid, None)
+        if hasattr(self.view, "cache_integration"):
+            self.view.cache_integration.remove_mails(uids)
+
+    def _refresh_after(self, mails: List[Dict[str, Any]], moved: bool):
+        """Zmiana samego stanu odświeża wiersze maili; przeniesienie - całą listę"""
+        if moved:
+            self._refresh_view()
+        else:
+            self.view.refresh_mail_rows(mails)
+            self.view.update_favorites_folder_item()
+
+    def _refresh_view(self):
+        """Jedno odświeżenie listy i drzewa folderów po całej operacji"""
+        view = self.view
+        if view.mail_scope == "folder":
+            current_folder = getattr(view, "current_folder", None)
+            view.populate_folders_tree()
+            if current_folder and view.find_folder_item(current_folder):
+                view.select_folder_by_name(current_folder)
+        else:
+            visible = {id(m) for mails in view.sample_mails.values() for m in mails}
+            view.current_folder_mails = [m for m in view.current_folder_mails if id(m) in visible]
+            view.displayed_mails = [m for m in view.displayed_mails if id(m) in visible]
+            view.populate_mail_table(view.displayed_mails)
+            if view.view_mode == "contacts":
+                view.populate_contacts_tree()
+        view.update_favorites_folder_item()
+        current = view.current_mail
+        if current is not None and view.mail_list_model.row_for_uid(current.get("_uid", "")) < 0:
+            view.clear_mail_view()
+
+    def stop(self):
+        """Czeka na zakończenie operacji w toku (zamykanie aplikacji)"""
+        for worker in list(self._workers.values()):
+            worker.wait(5000)
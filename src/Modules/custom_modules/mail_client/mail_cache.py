@@ -7,35 +7,394 @@ Funkcjonalność:
 - Szybkie wczytywanie przy starcie aplikacji
 - Synchronizacja w tle
 - Automatyczne odświeżanie cache
+- Limit pamięci (LRU z budżetem bajtów)
+- Załączniki w magazynie adresowanym treścią (deduplikacja, SHA-256)
+- Trwałe identyfikatory wątków (Message-ID/References, przyrostowo)
 """
 
 import json
+import re
 import sqlite3
+import sys
 import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import pickle
 
+from .attachment_store import AttachmentStore
+from .mail_threading import MailThreader
+from .contact_index import ContactIndex
+from .smart_folders import SmartFolderIndex
+
+
+# Pola wyszukiwania kwalifikowanego (from:, to:...) -> kolumna indeksu FTS5
+SEARCH_FIELDS = {
+    "from": "mail_from",
+    "od": "mail_from",
+    "to": "mail_to",
+    "do": "mail_to",
+    "subject": "subject",
+    "temat": "subject",
+    "body": "body",
+    "filename": "attachment_names",
+    "attachment": "attachment_names",
+    "note": "note",
+}
+
+_SEARCH_TOKEN_RE = re.compile(r'(\w+):("[^"]*"|\S+)|"([^"]*)"|(\S+)')
+
+
+def html_to_text(html: str) -> str:
+    """Usuwa znaczniki HTML (jednorazowo, przy indeksowaniu)"""
+    from html import unescape
+    text = re.sub(r'<(style|script)[^>]*>.*?</\1>', ' ', html or "", flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<[^>]+>', ' ', text)
+    return re.sub(r'\s+', ' ', unescape(text)).strip()
+
+
+def _fts_phrase(term: str) -> str:
+    """Bezpieczna fraza FTS5 z dopasowaniem prefiksu"""
+    term = term.strip().strip('"').replace('"', '""')
+    return f'"{term}"*' if term else ""
+
+
+def parse_search_query(query: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Rozbija zapytanie użytkownika na wyrażenie FTS5 i filtry SQL.
+    
+    Obsługiwane:
+        from:jan to:anna subject:faktura filename:pdf note:pilne
+        has:attachment  is:starred  is:unread  is:read
+        after:2024-01-01  before:2024-02-01  (data w formacie RRRR-MM-DD)
+        pozostałe słowa - wyszukiwanie pełnotekstowe we wszystkich polach
+    
+    Returns:
+        (wyrażenie MATCH lub "", słownik filtrów dla _build_page_filters)
+    """
+    parts: List[str] = []
+    filters: Dict[str, Any] = {}
+    
+    for match in _SEARCH_TOKEN_RE.finditer(query or ""):
+        field, value, quoted, word = match.groups()
+        if field:
+            field = field.lower()
+            value = value.strip('"')
+            if field in SEARCH_FIELDS:
+                phrase = _fts_phrase(value)
+                if phrase:
+                    parts.append(f"{SEARCH_FIELDS[field]} : {phrase}")
+                continue
+            if field == "has" and value.lower() in ("attachment", "attachments", "załącznik"):
+                filters["has_attachments"] = True
+                continue
+            if field == "is":
+                flag = value.lower()
+                if flag in ("starred", "flagged"):
+                    filters["starred"] = True
+                elif flag in ("unread", "nieprzeczytane"):
+                    filters["read"] = False
+                elif flag in ("read", "przeczytane"):
+                    filters["read"] = True
+                continue
+            if field in ("after", "since", "od_daty"):
+                filters["date_from"] = value
+                continue
+            if field in ("before", "until", "do_daty"):
+                filters["date_to"] = value
+                continue
+            # Nieznane pole - traktuj jako zwykły tekst
+            word = f"{field} {value}"
+        phrase = _fts_phrase(quoted if quoted is not None else word or "")
+        if phrase:
+            parts.append(phrase)
+    
+    return " AND ".join(parts), filters
+
+
+def estimate_size(value: Any) -> int:
+    """Szacuje liczbę bajtów zajmowanych przez wartość (treści, załączniki, listy maili)"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 56 + 8 * len(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, MailBody):
+        return (
+            64 + estimate_size(value.body) + estimate_size(value.html_body)
+            + estimate_size(value.display_html)
+        )
+    return sys.getsizeof(value)
+
+
+class MailBody:
+    """Treść maila w body_cache - obiekt wspiera słabe referencje"""
+    
+    __slots__ = ("uid", "body", "html_body", "display_html", "__weakref__")
+    
+    def __init__(self, uid: str, body: str = "", html_body: str = "", display_html: str = ""):
+        self.uid = uid
+        self.body = body
+        self.html_body = html_body
+        # Zsanityzowany HTML do podglądu (z mime_pipeline)
+        self.display_html = display_html
+
+
+class SizedLRUCache:
+    """
+    Cache LRU ograniczony budżetem bajtów.
+    
+    Najdawniej używane wpisy są usuwane, gdy suma rozmiarów przekroczy
+    max_bytes. Wartości wspierające weakref (np. MailBody) są dodatkowo
+    śledzone słabą referencją - wyrzucony wpis, który nadal jest
+    wyświetlany (ktoś trzyma do niego referencję), wraca do cache bez
+    ponownego odczytu z bazy.
+    """
+    
+    def __init__(self, max_bytes: int, sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or estimate_size
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._weak: "weakref.WeakValueDictionary[str, Any]" = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+        
+        # Metryki
+        self.hits = 0
+        self.misses = 0
+        self.weak_hits = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Zwraca wartość i oznacza ją jako ostatnio używaną"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            
+            value = self._weak.get(key)
+            if value is not None:
+                self.weak_hits += 1
+                self._store(key, value)
+                return value
+            
+            self.misses += 1
+            return default
+    
+    def put(self, key: str, value: Any):
+        """Dodaje/aktualizuje wpis i wyrzuca najstarsze ponad budżet"""
+        with self._lock:
+            self._store(key, value)
+    
+    def _store(self, key: str, value: Any):
+        self._discard(key)
+        size = self._sizeof(value)
+        try:
+            self._weak[key] = value
+        except TypeError:
+            pass  # Wartość nie wspiera weakref (dict/list)
+        
+        if size > self.max_bytes:
+            # Pojedynczy wpis większy niż cały budżet - nie trzymamy go
+            self.evictions += 1
+            self.evicted_bytes += size
+            return
+        
+        self._data[key] = value
+        self._sizes[key] = size
+        self.total_bytes += size
+        self._evict()
+    
+    def _discard(self, key: str) -> Any:
+        value = self._data.pop(key, None)
+        self.total_bytes -= self._sizes.pop(key, 0)
+        return value
+    
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._data:
+            key, _ = self._data.popitem(last=False)
+            size = self._sizes.pop(key, 0)
+            self.total_bytes -= size
+            self.evictions += 1
+            self.evicted_bytes += size
+    
+    def resize(self, key: str):
+        """Przelicza rozmiar wpisu po jego modyfikacji w miejscu"""
+        with self._lock:
+            if key in self._data:
+                self._store(key, self._data[key])
+    
+    def set_budget(self, max_bytes: int):
+        """Zmienia budżet i od razu wyrzuca nadmiarowe wpisy"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+    
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._weak.pop(key, None)
+            if key not in self._data:
+                return default
+            return self._discard(key)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._weak = weakref.WeakValueDictionary()
+            self.total_bytes = 0
+    
+    def items(self) -> List[Tuple[str, Any]]:
+        """Migawka wpisów (nie zmienia kolejności LRU)"""
+        with self._lock:
+            return list(self._data.items())
+    
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._data.keys())
+    
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+    
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any):
+        self.put(key, value)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Metryki cache (trafienia, wyrzucenia, zajętość)"""
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "weak_hits": self.weak_hits,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
+
+
+_MISSING = object()
+
 
 class MailCache:
     """Cache dla wiadomości email z SQLite i pamięcią"""
     
-    def __init__(self, db_path: str = "mail_client/mail_cache.db"):
+    # Kolumny dostępne do sortowania w load_page (nazwa publiczna -> kolumna SQL)
+    SORT_COLUMNS = {
+        "date": "date",
+        "subject": "subject",
+        "from": "mail_from",
+        "size": "size_bytes",
+    }
+    
+    # Pola maila przechowywane w osobnych kolumnach lub tabeli treści
+    # (nie trafiają do extra_data)
+    NORMALIZED_FIELDS = {
+        "_uid", "_folder", "_account", "_thread_id", "from", "to", "subject", "date",
+        "size", "starred", "read", "flags", "attachments", "_replied", "_no_reply_needed",
+        "body", "html_body", "display_html", "body_preview", "preview",
+    }
+    
+    # Pola tymczasowe widoku - nie są zapisywane do cache
+    TRANSIENT_FIELDS = {"_expanded", "_is_thread_parent", "_thread_count"}
+    
+    PREVIEW_LENGTH = 500
+    
+    # Rozmiar wiersza mail_bodies w bajtach (UTF-8)
+    _BODY_BYTES_SQL = (
+        "length(CAST(IFNULL({row}.body, '') AS BLOB)) + length(CAST(IFNULL({row}.html_body, '') AS BLOB))"
+        " + length(CAST(IFNULL({row}.display_html, '') AS BLOB))"
+    )
+    
+    # Foldery pomijane w kolejce odpowiedzi
+    QUEUE_EXCLUDED_FOLDERS = ("Kosz", "Spam", "Wysłane", "Szkice")
+    
+    # Liczba najlepszych trafień BM25 przeliczanych ze świeżością w search_mails
+    SEARCH_CANDIDATES = 500
+    
+    # Domyślne budżety pamięci (MB)
+    DEFAULT_MEMORY_BUDGET_MB = 64
+    DEFAULT_BODY_BUDGET_MB = 16
+    # Budżet treści pobranych w tle (mail_bodies.remote = 1) na dysku
+    DEFAULT_BODY_DISK_BUDGET_MB = 256
+    
+    def __init__(
+        self,
+        db_path: str = "mail_client/mail_cache.db",
+        memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB,
+        body_budget_mb: int = DEFAULT_BODY_BUDGET_MB,
+        body_disk_budget_mb: int = DEFAULT_BODY_DISK_BUDGET_MB,
+    ):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.memory_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self.attachments_dir = self.db_path.parent / "attachments"
+        self.attachment_store = AttachmentStore(self.attachments_dir, self.db_path)
+        self.threader = MailThreader(self.db_path)
+        self.threader.on_merge = self._on_threads_merged
+        # Listy maili per "konto:folder" oraz zdekodowane treści per uid
+        self.memory_cache = SizedLRUCache(memory_budget_mb * 1024 * 1024)
+        self.body_cache = SizedLRUCache(body_budget_mb * 1024 * 1024)
+        self.body_disk_budget = body_disk_budget_mb * 1024 * 1024
         self.contacts_cache: Dict[str, Dict[str, Any]] = {}
         self.cache_lock = threading.Lock()
         
         self._init_database()
+        self._migrate_database()
+        
+        # Indeks adresów do autouzupełniania (przy pierwszym uruchomieniu z maili w cache)
+        self.contact_index = ContactIndex(self.db_path)
+        if self.contact_index.is_empty():
+            self._backfill_contact_index()
+        
+        # Inteligentne foldery / zapisane wyszukiwania z członkostwem w bazie
+        self.smart_folders = SmartFolderIndex(self.db_path)
+    
+    def _backfill_contact_index(self):
+        """Buduje indeks kontaktów z nadawców i adresatów maili w cache"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT mail_from, mail_to, date FROM mails").fetchall()
+        finally:
+            conn.close()
+        if rows:
+            self.contact_index.observe_mails(
+                {"from": row["mail_from"], "to": row["mail_to"], "date": row["date"]} for row in rows
+            )
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Otwiera połączenie z bazą cache"""
+        conn = sqlite3.connect(str(self.db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
     
     def _init_database(self):
         """Inicjalizuje bazę danych SQLite"""
         conn = sqlite3.connect(str(self.db_path))
         cursor = conn.cursor()
         
-        # Tabela maili
+        # WAL pozwala czytać stronę listy podczas zapisu w tle
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
+        # Tabela maili - tylko metadane (treść w mail_bodies)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS mails (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -57,6 +416,29 @@ class MailCache:
             )
         """)
         
+        # Tabela treści - ładowana leniwie przy otwarciu wiadomości
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mail_bodies (
+                uid TEXT PRIMARY KEY,
+                body TEXT,
+                html_body TEXT,
+                display_html TEXT,
+                cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Indeks pełnotekstowy (rowid = mails.id)
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS mails_fts USING fts5(
+                subject, mail_from, mail_to, body, attachment_names, note,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        # Wagi BM25: temat > nadawca > załączniki > notatka > adresat > treść
+        cursor.execute(
+            "INSERT INTO mails_fts (mails_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 2.0, 1.0, 3.0, 2.0)')"
+        )
+        
         # Indeksy dla szybszego wyszukiwania
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_folder ON mails(folder)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_uid ON mails(uid)")
@@ -91,80 +473,574 @@ class MailCache:
         conn.commit()
         conn.close()
     
-    def save_mails_to_cache(self, folder: str, mails: List[Dict[str, Any]], account: str = "local"):
-        """Zapisuje maile do cache (pamięć + dysk)"""
+    def _migrate_database(self):
+        """Migruje schemat do znormalizowanych kolumn (bez json_data)"""
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+        
+        cursor.execute("PRAGMA table_info(mails)")
+        columns = {row[1] for row in cursor.fetchall()}
+        
+        new_columns = {
+            "flags": "TEXT",
+            "size_bytes": "INTEGER DEFAULT 0",
+            "thread_key": "TEXT",
+            "has_attachments": "INTEGER DEFAULT 0",
+            "preview": "TEXT",
+            "extra_data": "TEXT",
+            "replied": "INTEGER DEFAULT 0",
+            "no_reply": "INTEGER DEFAULT 0",
+        }
+        for name, definition in new_columns.items():
+            if name not in columns:
+                cursor.execute(f"ALTER TABLE mails ADD COLUMN {name} {definition}")
+        
+        cursor.execute("PRAGMA table_info(mail_bodies)")
+        body_columns = {row[1] for row in cursor.fetchall()}
+        if "display_html" not in body_columns:
+            cursor.execute("ALTER TABLE mail_bodies ADD COLUMN display_html TEXT")
+        # Rozmiar treści (budżet dysku) i znacznik treści pobranej z serwera w tle,
+        # którą można usunąć i pobrać ponownie
+        if "body_bytes" not in body_columns:
+            cursor.execute("ALTER TABLE mail_bodies ADD COLUMN body_bytes INTEGER DEFAULT 0")
+            cursor.execute("ALTER TABLE mail_bodies ADD COLUMN remote INTEGER DEFAULT 0")
+            cursor.execute(f"UPDATE mail_bodies SET body_bytes = {self._BODY_BYTES_SQL.format(row='mail_bodies')}")
+        body_bytes = self._BODY_BYTES_SQL.format(row="NEW")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_body_bytes_insert
+            AFTER INSERT ON mail_bodies BEGIN
+                UPDATE mail_bodies SET body_bytes = {body_bytes} WHERE uid = NEW.uid;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_body_bytes_update
+            AFTER UPDATE OF body, html_body, display_html ON mail_bodies BEGIN
+                UPDATE mail_bodies SET body_bytes = {body_bytes} WHERE uid = NEW.uid;
+            END
+        """)
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_account_folder_date ON mails(account, folder, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_folder_date ON mails(folder, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_thread_key ON mails(thread_key)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_starred_date ON mails(starred, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_read_date ON mails(read, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attachments_date ON mails(has_attachments, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_reply_queue ON mails(replied, no_reply, date)")
+        
+        # Stan odpowiedzi z extra_data (cache sprzed kolumn replied/no_reply)
+        if "replied" not in columns:
+            cursor.execute("""
+                UPDATE mails
+                SET replied = COALESCE(json_extract(extra_data, '$._replied'), 0),
+                    no_reply = COALESCE(json_extract(extra_data, '$._no_reply_needed'), 0)
+                WHERE json_valid(extra_data)
+            """)
+        
+        # Przenieś stare wiersze (json_data) do nowych kolumn i tabeli treści
+        cursor.execute("SELECT uid, folder, account, json_data FROM mails WHERE json_data IS NOT NULL")
+        legacy_rows = cursor.fetchall()
+        if legacy_rows:
+            print(f"[Cache] Migracja {len(legacy_rows)} maili do nowego schematu...")
+        
+        for uid, folder, account, json_data in legacy_rows:
+            try:
+                mail = json.loads(json_data)
+            except (TypeError, ValueError):
+                mail = {}
+            mail["_uid"] = uid
+            row = self._mail_to_row(mail, folder, account)
+            cursor.execute("""
+                UPDATE mails
+                SET flags = ?, size_bytes = ?, thread_key = ?, has_attachments = ?,
+                    preview = ?, extra_data = ?, attachments = ?,
+                    replied = ?, no_reply = ?,
+                    body = NULL, json_data = NULL
+                WHERE uid = ?
+            """, (
+                row["flags"], row["size_bytes"], row["thread_key"], row["has_attachments"],
+                row["preview"], row["extra_data"], row["attachments"],
+                row["replied"] or 0, row["no_reply"] or 0, uid
+            ))
+            if "body" in mail or "html_body" in mail:
+                cursor.execute("""
+                    INSERT OR REPLACE INTO mail_bodies (uid, body, html_body)
+                    VALUES (?, ?, ?)
+                """, (uid, mail.get("body", ""), mail.get("html_body", "")))
+        
+        # Jednorazowe zbudowanie indeksu FTS dla istniejącego cache
+        cursor.execute("SELECT COUNT(*) FROM mails_fts")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                SELECT m.id, m.subject, m.mail_from, m.mail_to, m.attachments, m.extra_data,
+                       b.body, b.html_body
+                FROM mails m LEFT JOIN mail_bodies b ON b.uid = m.uid
+            """)
+            for row in cursor.fetchall():
+                mail_id, subject, mail_from, mail_to, attachments, extra_data, body, html_body = row
+                try:
+                    mail = json.loads(extra_data) if extra_data else {}
+                    mail["attachments"] = json.loads(attachments) if attachments else []
+                except (TypeError, ValueError):
+                    mail = {"attachments": []}
+                mail.update({"subject": subject, "from": mail_from, "to": mail_to})
+                if body or html_body:
+                    mail["body"] = body or ""
+                    mail["html_body"] = html_body or ""
+                self._index_mail(cursor, mail_id, mail)
+        
+        conn.commit()
+        conn.close()
+    
+    # ==================== INDEKS PEŁNOTEKSTOWY ====================
+    
+    @staticmethod
+    def _index_mail(cursor: sqlite3.Cursor, mail_id: int, mail: Dict[str, Any]):
+        """Aktualizuje wpis maila w mails_fts (HTML usuwany raz, tutaj)"""
+        if "body" in mail or "html_body" in mail:
+            body = mail.get("body") or html_to_text(mail.get("html_body", ""))
+        else:
+            # Mail bez treści w pamięci (np. ze strony load_page) - zachowaj zaindeksowaną
+            existing = cursor.execute(
+                "SELECT body FROM mails_fts WHERE rowid = ?", (mail_id,)
+            ).fetchone()
+            body = existing[0] if existing else ""
+        
+        attachment_names = " ".join(
+            str(att.get("filename", "")) for att in mail.get("attachments") or []
+            if isinstance(att, dict)
+        )
+        
+        cursor.execute("DELETE FROM mails_fts WHERE rowid = ?", (mail_id,))
+        cursor.execute("""
+            INSERT INTO mails_fts (rowid, subject, mail_from, mail_to, body, attachment_names, note)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            mail_id, mail.get("subject", ""), mail.get("from", ""), mail.get("to", ""),
+            body, attachment_names, mail.get("note", "")
+        ))
+    
+    def search_mails(
+        self,
+        query: str,
+        folder: Optional[str] = None,
+        account: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Wyszukiwanie pełnotekstowe w całym cache (także w mailach niezaładowanych).
+        
+        Składnia zapytania - patrz parse_search_query. Wyniki sortowane wg
+        BM25 z premią za świeżość; zapytanie z samymi filtrami sortowane po dacie.
+        """
+        fts_query, filters = parse_search_query(query)
+        clauses, params = self._build_page_filters(folder, account, filters, table="m")
+        
+        # Wynik BM25 (rank) jest ujemny - dzielenie przez wiek w miesiącach
+        # przesuwa starsze maile w dół listy
+        recency_rank = (
+            "rank / (1.0 + MAX(0.0, julianday('now') - "
+            "COALESCE(julianday(m.date), julianday('now'))) / 30.0)"
+        )
+        if fts_query and not clauses:
+            # Szybka ścieżka: najlepsze kandydaty wg BM25 liczone w samym FTS5,
+            # dopiero one są łączone z tabelą mails i sortowane ze świeżością
+            candidates = max(self.SEARCH_CANDIDATES, (offset + limit) * 5)
+            sql = f"""
+                SELECT m.* FROM (
+                    SELECT rowid, rank FROM mails_fts
+                    WHERE mails_fts MATCH ?
+                    ORDER BY rank LIMIT ?
+                ) AS f
+                JOIN mails m ON m.id = f.rowid
+                ORDER BY {recency_rank.replace('rank', 'f.rank', 1)}
+                LIMIT ? OFFSET ?
+            """
+            params = [fts_query, candidates]
+        elif fts_query:
+            sql = f"""
+                SELECT m.* FROM mails_fts
+                JOIN mails m ON m.id = mails_fts.rowid
+                WHERE mails_fts MATCH ? AND {' AND '.join(clauses)}
+                ORDER BY {recency_rank}
+                LIMIT ? OFFSET ?
+            """
+            params = [fts_query] + params
+        else:
+            where = " AND ".join(clauses) if clauses else "1"
+            sql = f"SELECT m.* FROM mails m WHERE {where} ORDER BY m.date DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Błąd wyszukiwania: {e}")
+            rows = []
+        finally:
+            conn.close()
+        
+        return [self._row_to_mail(row) for row in rows]
+    
+    # ==================== KONWERSJA WIERSZY ====================
+    
+    @staticmethod
+    def _parse_size_bytes(size: Any) -> int:
+        """Zamienia rozmiar ('245 KB', '1.5 MB', 1024) na bajty"""
+        if isinstance(size, (int, float)):
+            return int(size)
+        if not size:
+            return 0
+        text = str(size).strip().upper()
+        multipliers = {"GB": 1024 ** 3, "MB": 1024 ** 2, "KB": 1024, "B": 1}
+        for unit, factor in multipliers.items():
+            if text.endswith(unit):
+                try:
+                    return int(float(text[:-len(unit)].strip().replace(",", ".")) * factor)
+                except ValueError:
+                    return 0
+        try:
+            return int(float(text))
+        except ValueError:
+            return 0
+    
+    @staticmethod
+    def _safe_attachments(attachments: Any) -> List[Dict[str, Any]]:
+        """Zwraca metadane załączników bez danych binarnych"""
+        if not isinstance(attachments, list):
+            return []
+        safe_attachments = []
+        for att in attachments:
+            if isinstance(att, dict):
+                safe_attachments.append({k: v for k, v in att.items() if not isinstance(v, bytes)})
+            elif not isinstance(att, bytes):
+                safe_attachments.append(att)
+        return safe_attachments
+    
+    @staticmethod
+    def _make_thread_key(subject: str) -> str:
+        """Klucz wątku z tematu bez prefiksów Re:/Fwd:"""
+        normalized = re.sub(r'^((Re|Fwd|RE|FW|Odp|Przekaż):\s*)+', '', subject or "", flags=re.IGNORECASE)
+        return normalized.strip().lower()
+    
+    def _mail_to_row(self, mail: Dict[str, Any], folder: str, account: Optional[str]) -> Dict[str, Any]:
+        """Przygotowuje wartości kolumn dla maila"""
+        attachments = self._safe_attachments(mail.get("attachments", []))
+        
+        preview = mail.get("body_preview") or mail.get("preview") or mail.get("body") or ""
+        preview = re.sub(r'\s+', ' ', str(preview)).strip()[:self.PREVIEW_LENGTH]
+        
+        flags = mail.get("flags")
+        if isinstance(flags, (list, tuple, set)):
+            flags = " ".join(sorted(str(f) for f in flags))
+        elif not flags:
+            derived = []
+            if mail.get("read"):
+                derived.append("\\Seen")
+            if mail.get("starred"):
+                derived.append("\\Flagged")
+            flags = " ".join(derived)
+        
+        # Pola dodatkowe (tagi, notatka, stan odpowiedzi...) bez danych binarnych
+        extra = {}
+        for key, value in mail.items():
+            if key in self.NORMALIZED_FIELDS or key in self.TRANSIENT_FIELDS:
+                continue
+            if isinstance(value, bytes):
+                continue
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                continue
+            extra[key] = value
+        
+        return {
+            "uid": mail.get("_uid") or f"mail-{hash(str(mail))}",
+            "folder": folder,
+            "account": account,
+            "mail_from": mail.get("from", ""),
+            "mail_to": mail.get("to", ""),
+            "subject": mail.get("subject", ""),
+            "date": mail.get("date", ""),
+            "size": str(mail.get("size", "")),
+            "size_bytes": self._parse_size_bytes(mail.get("size")),
+            "starred": 1 if mail.get("starred") else 0,
+            "read": 1 if mail.get("read") else 0,
+            "flags": flags,
+            "thread_key": self.threader.resolve(mail.get("_thread_id")) or self._make_thread_key(mail.get("subject", "")),
+            "has_attachments": 1 if attachments else 0,
+            "attachments": json.dumps(attachments),
+            "preview": preview,
+            "extra_data": json.dumps(extra, ensure_ascii=False),
+            # None = mail bez informacji o stanie odpowiedzi (nie nadpisuje zapisanego)
+            "replied": (1 if mail["_replied"] else 0) if "_replied" in mail else None,
+            "no_reply": (1 if mail["_no_reply_needed"] else 0) if "_no_reply_needed" in mail else None,
+        }
+    
+    @staticmethod
+    def _merge_flags(flags: Optional[str], mail: Dict[str, Any]) -> str:
+        """Synchronizuje \\Seen/\\Flagged z polami read/starred, zachowując pozostałe flagi"""
+        current = set((flags or "").split())
+        for flag, enabled in (("\\Seen", mail.get("read")), ("\\Flagged", mail.get("starred"))):
+            if enabled:
+                current.add(flag)
+            else:
+                current.discard(flag)
+        return " ".join(sorted(current))
+    
+    def _row_to_mail(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Buduje słownik maila z wiersza (bez treści - patrz load_mail_body)"""
+        mail: Dict[str, Any] = {}
+        if row["extra_data"]:
+            try:
+                mail.update(json.loads(row["extra_data"]))
+            except (TypeError, ValueError):
+                pass
+        try:
+            attachments = json.loads(row["attachments"]) if row["attachments"] else []
+        except (TypeError, ValueError):
+            attachments = []
+        mail.update({
+            "_uid": row["uid"],
+            "_folder": row["folder"],
+            "_account": row["account"],
+            "from": row["mail_from"] or "",
+            "to": row["mail_to"] or "",
+            "subject": row["subject"] or "",
+            "date": row["date"] or "",
+            "size": row["size"] or "",
+            "starred": bool(row["starred"]),
+            "read": bool(row["read"]),
+            "flags": row["flags"] or "",
+            "attachments": attachments,
+            "body_preview": row["preview"] or "",
+        })
+        # Tylko stany ustawione - mail bez klucza nie nadpisze stanu przy ponownym zapisie
+        if row["replied"]:
+            mail["_replied"] = True
+        if row["no_reply"]:
+            mail["_no_reply_needed"] = True
+        # Klucze tematowe ze starszych wersji cache zostaną nadane ponownie
+        if row["thread_key"] and self._THREAD_ID_RE.match(row["thread_key"]):
+            mail["_thread_id"] = self.threader.resolve(row["thread_key"])
+        return mail
+    
+    # ==================== WĄTKI ====================
+    
+    _THREAD_ID_RE = re.compile(r'^t[0-9a-f]{16}$')
+    
+    def _on_threads_merged(self, winner: str, losers: List[str]):
+        """Przepisuje thread_key maili ze scalonych wątków"""
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "UPDATE mails SET thread_key = ? WHERE thread_key = ?",
+                [(winner, loser) for loser in losers]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def load_thread_mails(self, thread_id: str) -> List[Dict[str, Any]]:
+        """Wszystkie maile wątku z cache (ze wszystkich folderów), od najnowszego"""
+        thread_id = self.threader.resolve(thread_id)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM mails WHERE thread_key = ? ORDER BY date DESC", (thread_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_mail(row) for row in rows]
+
+    def load_mails_by_uid(self, uids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Maile z cache (bez treści) dla podanych UID: uid -> mail"""
+        if not uids:
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM mails WHERE uid IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(uids)),)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row["uid"]: self._row_to_mail(row) for row in rows}
+
+    def load_legacy_imap_mails(self, account: str, imap_uids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Maile konta zapisane pod starszym kluczem "konto:numer_sekwencyjny"
+        dla podanych UID IMAP skrzynki INBOX: UID IMAP -> mail (do migracji kluczy).
+        """
+        if not imap_uids:
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT * FROM mails
+                WHERE account = ?
+                  AND CAST(json_extract(extra_data, '$._imap_uid') AS TEXT) IN (SELECT value FROM json_each(?))
+                  AND IFNULL(json_extract(extra_data, '$._imap_mailbox'), 'INBOX') = 'INBOX'
+            """, (account, json.dumps([str(uid) for uid in imap_uids]))).fetchall()
+        finally:
+            conn.close()
+        
+        legacy_uid = re.compile(rf"^{re.escape(account)}:\d+$")
+        result = {}
+        for row in rows:
+            if legacy_uid.match(row["uid"]):
+                mail = self._row_to_mail(row)
+                result[str(mail.get("_imap_uid"))] = mail
+        return result
+    
+    def rename_mail_uids(self, renames: Dict[str, str]) -> int:
+        """
+        Zmienia klucze maili (migracja kluczy) z zachowaniem stanu, treści,
+        członkostwa w folderach inteligentnych i załączników.
+        
+        Jeśli klucz docelowy już istnieje, mail pod starym kluczem jest usuwany.
+        Zwraca liczbę przeniesionych maili.
+        """
+        if not renames:
+            return 0
+        duplicates = []
+        renamed = []
+        with self.cache_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            for old_uid, new_uid in renames.items():
+                if old_uid == new_uid:
+                    continue
+                if cursor.execute("SELECT 1 FROM mails WHERE uid = ?", (new_uid,)).fetchone():
+                    duplicates.append(old_uid)
+                    continue
+                cursor.execute("UPDATE mails SET uid = ? WHERE uid = ?", (new_uid, old_uid))
+                if not cursor.rowcount:
+                    continue
+                cursor.execute("UPDATE mail_bodies SET uid = ? WHERE uid = ?", (new_uid, old_uid))
+                cursor.execute(
+                    "UPDATE OR IGNORE smart_folder_members SET uid = ? WHERE uid = ?", (new_uid, old_uid)
+                )
+                cursor.execute(
+                    "UPDATE OR IGNORE attachment_refs SET uid = ? WHERE uid = ?", (new_uid, old_uid)
+                )
+                renamed.append(old_uid)
+            conn.commit()
+            conn.close()
+            
+            uid_set = set(renamed)
+            for cache_key, mails in self.memory_cache.items():
+                if any(m.get("_uid") in uid_set for m in mails):
+                    self.memory_cache.pop(cache_key)
+            for uid in uid_set:
+                self.body_cache.pop(uid)
+        
+        self.remove_mails_from_cache(duplicates)
+        return len(renamed)
+    
+    # ==================== ZAPIS / ODCZYT ====================
+    
+    def save_mails_to_cache(
+        self,
+        folder: str,
+        mails: List[Dict[str, Any]],
+        account: str = "local",
+        replace_memory: bool = True,
+    ):
+        """
+        Zapisuje maile do cache (pamięć + dysk).
+        
+        replace_memory=False - zapis tylko części folderu (np. zmienione maile);
+        lista w pamięci jest wtedy unieważniana zamiast podmieniana.
+        """
         with self.cache_lock:
-            # Zapisz do pamięci
             cache_key = f"{account}:{folder}"
-            self.memory_cache[cache_key] = mails
+            
+            # Dane binarne załączników trafiają na dysk, nie do pamięci, a nowe
+            # maile dostają wątek (przed otwarciem transakcji - magazyn i
+            # threader zapisują do tej samej bazy)
+            for mail in mails:
+                self.spill_attachments(mail)
+            self.threader.assign_many(mails)
             
             # Zapisz do SQLite
-            conn = sqlite3.connect(str(self.db_path))
+            conn = self._connect()
             cursor = conn.cursor()
             
+            new_mails = []
+            saved_uids = []
             for mail in mails:
-                uid = mail.get("_uid", f"mail-{hash(str(mail))}")
-                
                 try:
-                    # Przygotuj kopię maila bez danych binarnych dla JSON
-                    mail_for_json = {}
-                    for key, value in mail.items():
-                        # Pomiń dane binarne
-                        if isinstance(value, bytes):
-                            continue
-                        # Konwertuj inne typy na string jeśli to możliwe
-                        try:
-                            json.dumps(value)  # Test serializacji
-                            mail_for_json[key] = value
-                        except (TypeError, ValueError):
-                            # Nie da się serializować - pomiń
-                            continue
-                    
-                    # Bezpiecznie obsłuż attachments
-                    attachments_json = "[]"
-                    try:
-                        attachments = mail.get("attachments", [])
-                        # Jeśli attachments to lista, spróbuj ją serializować
-                        if isinstance(attachments, list):
-                            # Filtruj elementy z bytes
-                            safe_attachments = []
-                            for att in attachments:
-                                if isinstance(att, dict):
-                                    safe_att = {k: v for k, v in att.items() if not isinstance(v, bytes)}
-                                    safe_attachments.append(safe_att)
-                                elif not isinstance(att, bytes):
-                                    safe_attachments.append(att)
-                            attachments_json = json.dumps(safe_attachments)
-                        else:
-                            attachments_json = json.dumps([])
-                    except:
-                        attachments_json = "[]"
-                    
+                    row = self._mail_to_row(mail, folder, account)
+                    if cursor.execute("SELECT 1 FROM mails WHERE uid = ?", (row["uid"],)).fetchone() is None:
+                        new_mails.append(mail)
+                    # UPSERT zachowuje id wiersza (= rowid w indeksie FTS); last_accessed
+                    # przy aktualizacji bez zmian - odświeża go tylko odczyt (load_mail_body)
                     cursor.execute("""
-                        INSERT OR REPLACE INTO mails 
-                        (uid, folder, account, mail_from, mail_to, subject, date, body, 
-                         size, starred, read, attachments, json_data, last_accessed)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                        INSERT INTO mails 
+                        (uid, folder, account, mail_from, mail_to, subject, date, size,
+                         size_bytes, starred, read, flags, thread_key, has_attachments,
+                         attachments, preview, extra_data, replied, no_reply, last_accessed)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                                COALESCE(?, 0), COALESCE(?, 0), CURRENT_TIMESTAMP)
+                        ON CONFLICT(uid) DO UPDATE SET
+                            folder = excluded.folder, account = excluded.account,
+                            mail_from = excluded.mail_from, mail_to = excluded.mail_to,
+                            subject = excluded.subject, date = excluded.date,
+                            size = excluded.size, size_bytes = excluded.size_bytes,
+                            starred = excluded.starred, read = excluded.read,
+                            flags = excluded.flags, thread_key = excluded.thread_key,
+                            has_attachments = excluded.has_attachments,
+                            attachments = excluded.attachments, preview = excluded.preview,
+                            extra_data = excluded.extra_data,
+                            replied = CASE WHEN ? IS NULL THEN mails.replied ELSE excluded.replied END,
+                            no_reply = CASE WHEN ? IS NULL THEN mails.no_reply ELSE excluded.no_reply END
                     """, (
-                        uid,
-                        folder,
-                        account,
-                        mail.get("from", ""),
-                        mail.get("to", ""),
-                        mail.get("subject", ""),
-                        mail.get("date", ""),
-                        mail.get("body", ""),
-                        mail.get("size", ""),
-                        1 if mail.get("starred") else 0,
-                        1 if mail.get("read") else 0,
-                        attachments_json,
-                        json.dumps(mail_for_json)  # Pełny JSON bez danych binarnych
+                        row["uid"], row["folder"], row["account"], row["mail_from"],
+                        row["mail_to"], row["subject"], row["date"], row["size"],
+                        row["size_bytes"], row["starred"], row["read"], row["flags"],
+                        row["thread_key"], row["has_attachments"], row["attachments"],
+                        row["preview"], row["extra_data"], row["replied"], row["no_reply"],
+                        row["replied"], row["no_reply"]
                     ))
+                    
+                    # Treść zapisujemy tylko gdy jest w pamięci - maile ze strony
+                    # (load_page) nie mają treści i nie mogą jej nadpisać pustą
+                    if "body" in mail or "html_body" in mail:
+                        cursor.execute("""
+                            INSERT OR REPLACE INTO mail_bodies (uid, body, html_body, display_html)
+                            VALUES (?, ?, ?, ?)
+                        """, (
+                            row["uid"], mail.get("body", ""), mail.get("html_body", ""),
+                            mail.get("display_html")
+                        ))
+                    
+                    mail_id = cursor.execute(
+                        "SELECT id FROM mails WHERE uid = ?", (row["uid"],)
+                    ).fetchone()[0]
+                    self._index_mail(cursor, mail_id, mail)
+                    saved_uids.append(row["uid"])
                 except Exception as e:
                     print(f"Błąd zapisu maila do cache: {e}")
             
+            # Członkostwo w inteligentnych folderach - tylko zapisane maile
+            try:
+                self.smart_folders.refresh_members(cursor, saved_uids)
+            except sqlite3.Error as e:
+                print(f"Błąd aktualizacji inteligentnych folderów: {e}")
+            
             conn.commit()
             conn.close()
+            
+            # Kontakty liczone tylko z maili, których jeszcze nie było w cache
+            if new_mails:
+                self.contact_index.observe_mails(new_mails)
+            
+            # Zapisz do pamięci (rozmiar liczony już bez danych załączników)
+            if replace_memory:
+                self.memory_cache[cache_key] = mails
+            else:
+                self.memory_cache.pop(cache_key, None)
     
     def load_mails_from_cache(self, folder: str, account: str = "local") -> Optional[List[Dict[str, Any]]]:
         """Ładuje maile z cache (najpierw pamięć, potem dysk)"""
@@ -176,11 +1052,11 @@ class MailCache:
                 return self.memory_cache[cache_key]
             
             # Załaduj z SQLite
-            conn = sqlite3.connect(str(self.db_path))
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
-                SELECT json_data FROM mails 
+                SELECT * FROM mails 
                 WHERE folder = ? AND account = ?
                 ORDER BY date DESC
             """, (folder, account))
@@ -189,13 +1065,7 @@ class MailCache:
             conn.close()
             
             if rows:
-                mails = []
-                for row in rows:
-                    try:
-                        mail = json.loads(row[0])
-                        mails.append(mail)
-                    except:
-                        pass
+                mails = [self._row_to_mail(row) for row in rows]
                 
                 # Zapisz do pamięci dla przyszłych wywołań
                 self.memory_cache[cache_key] = mails
@@ -207,7 +1077,7 @@ class MailCache:
         """Ładuje wszystkie maile z cache - szybkie wczytanie przy starcie"""
         result = {}
         
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Pobierz listę wszystkich folderów
@@ -216,19 +1086,12 @@ class MailCache:
         
         for folder in folders:
             cursor.execute("""
-                SELECT json_data FROM mails 
+                SELECT * FROM mails 
                 WHERE folder = ?
                 ORDER BY date DESC
             """, (folder,))
             
-            mails = []
-            for row in cursor.fetchall():
-                try:
-                    mail = json.loads(row[0])
-                    mails.append(mail)
-                except:
-                    pass
-            
+            mails = [self._row_to_mail(row) for row in cursor.fetchall()]
             if mails:
                 result[folder] = mails
         
@@ -241,33 +1104,627 @@ class MailCache:
         
         return result
     
+    def folder_counts(self) -> Dict[str, int]:
+        """Liczba maili w każdym folderze (bez wczytywania wierszy)"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT folder, COUNT(*) FROM mails GROUP BY folder").fetchall()
+        finally:
+            conn.close()
+        return {folder: count for folder, count in rows if folder is not None}
+    
+    def _build_page_filters(
+        self,
+        folder: Optional[str],
+        account: Optional[str],
+        filters: Optional[Dict[str, Any]],
+        table: str = "mails",
+    ) -> Tuple[List[str], List[Any]]:
+        """Buduje klauzule WHERE dla load_page/count_mails/search_mails"""
+        clauses: List[str] = []
+        params: List[Any] = []
+        
+        if folder is not None:
+            clauses.append(f"{table}.folder = ?")
+            params.append(folder)
+        
+        if account is not None:
+            clauses.append(f"{table}.account = ?")
+            params.append(account)
+        
+        filters = filters or {}
+        for flag in ("starred", "read", "has_attachments"):
+            if filters.get(flag) is not None:
+                clauses.append(f"{table}.{flag} = ?")
+                params.append(1 if filters[flag] else 0)
+        
+        if filters.get("text"):
+            pattern = f"%{filters['text']}%"
+            clauses.append(f"({table}.subject LIKE ? OR {table}.mail_from LIKE ?)")
+            params.extend([pattern, pattern])
+        
+        if filters.get("tag"):
+            clauses.append(
+                f"EXISTS (SELECT 1 FROM json_each({table}.extra_data, '$.tags') WHERE value = ?)"
+            )
+            params.append(filters["tag"])
+        
+        if filters.get("date_from"):
+            clauses.append(f"{table}.date >= ?")
+            params.append(filters["date_from"])
+        if filters.get("date_to"):
+            clauses.append(f"{table}.date < ?")
+            params.append(filters["date_to"])
+        
+        return clauses, params
+    
+    def load_page(
+        self,
+        folder: str,
+        account: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100,
+        sort: str = "date",
+        descending: bool = True,
+        filters: Optional[Dict[str, Any]] = None,
+        after: Optional[Tuple[Any, str]] = None,
+        threads: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Ładuje jedno okno maili z folderu (bez treści).
+        
+        Args:
+            folder: Nazwa folderu
+            account: Konto (None = wszystkie konta)
+            offset: Przesunięcie (ignorowane gdy podano `after`)
+            limit: Maksymalna liczba maili w oknie
+            sort: Kolumna sortowania: date, subject, from, size
+            descending: Kierunek sortowania
+            filters: starred/read/has_attachments (bool), text, tag, date_from, date_to
+            after: Klucz (wartość_sortowania, uid) ostatniego maila poprzedniego
+                okna - stronicowanie keyset bez kosztu OFFSET
+            threads: Jeden wiersz na wątek (najnowszy mail, z _thread_count) -
+                wątek to wspólny thread_key w obrębie wyniku filtrów
+        
+        Returns:
+            Lista maili; treść dostępna przez load_mail_body()
+        """
+        sort_column = self.SORT_COLUMNS.get(sort, "date")
+        direction = "DESC" if descending else "ASC"
+        comparator = "<" if descending else ">"
+        
+        clauses, params = self._build_page_filters(folder, account, filters)
+        
+        source = "mails"
+        if threads:
+            # Najnowszy mail każdego wątku; okno liczone po filtrach
+            source = f"""(
+                SELECT *,
+                       COUNT(*) OVER thread AS thread_count,
+                       ROW_NUMBER() OVER (thread ORDER BY date DESC, uid DESC) AS thread_rank
+                FROM mails
+                WHERE {' AND '.join(clauses)}
+                WINDOW thread AS (PARTITION BY IFNULL(thread_key, uid))
+            )"""
+            clauses = ["thread_rank = 1"]
+        
+        if after is not None:
+            after_value, after_uid = after
+            clauses.append(
+                f"({sort_column} {comparator} ? OR ({sort_column} = ? AND uid {comparator} ?))"
+            )
+            params.extend([after_value, after_value, after_uid])
+        
+        query = f"""
+            SELECT * FROM {source}
+            WHERE {' AND '.join(clauses)}
+            ORDER BY {sort_column} {direction}, uid {direction}
+            LIMIT ?
+        """
+        params.append(limit)
+        if after is None and offset:
+            query += " OFFSET ?"
+            params.append(offset)
+        
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        
+        mails = [self._row_to_mail(row) for row in rows]
+        if threads:
+            for mail, row in zip(mails, rows):
+                mail["_is_thread_parent"] = True
+                mail["_thread_count"] = row["thread_count"]
+        return mails
+    
+    def count_mails(
+        self,
+        folder: str,
+        account: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        threads: bool = False,
+    ) -> int:
+        """Zwraca liczbę maili (lub wątków gdy threads=True) w folderze spełniających filtry"""
+        clauses, params = self._build_page_filters(folder, account, filters)
+        counted = "COUNT(DISTINCT IFNULL(thread_key, uid))" if threads else "COUNT(*)"
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {counted} FROM mails WHERE {' AND '.join(clauses)}", params
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+    
+    # ==================== KOLEJKA ODPOWIEDZI ====================
+    
+    def _reply_queue_query(
+        self,
+        newer_than: Optional[str],
+        older_than: Optional[str],
+    ) -> Tuple[str, str, List[Any]]:
+        """
+        Klauzule WHERE/HAVING kolejki (maile bez odpowiedzi, grupowane po thread_key).
+        
+        newer_than - wątek ma co najmniej jeden mail od tej daty
+        older_than - wszystkie maile wątku są starsze niż ta data
+        """
+        placeholders = ", ".join("?" for _ in self.QUEUE_EXCLUDED_FOLDERS)
+        where = f"replied = 0 AND no_reply = 0 AND folder NOT IN ({placeholders})"
+        params: List[Any] = list(self.QUEUE_EXCLUDED_FOLDERS)
+        
+        having: List[str] = []
+        having_params: List[Any] = []
+        if newer_than:
+            having.append("MAX(date) >= ?")
+            having_params.append(newer_than)
+        if older_than:
+            having.append("MAX(date) < ?")
+            having_params.append(older_than)
+        having_sql = f"HAVING {' AND '.join(having)}" if having else ""
+        return where, having_sql, params + having_params
+    
+    def count_reply_queue(self, newer_than: Optional[str] = None, older_than: Optional[str] = None) -> int:
+        """Liczba wątków czekających na odpowiedź"""
+        where, having, params = self._reply_queue_query(newer_than, older_than)
+        conn = self._connect()
+        try:
+            row = conn.execute(f"""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM mails WHERE {where}
+                    GROUP BY IFNULL(thread_key, '') {having}
+                )
+            """, params).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+    
+    def load_reply_queue(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        newer_than: Optional[str] = None,
+        older_than: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Ładuje okno kolejki odpowiedzi: wątki od najstarszego, maile w wątku
+        od najnowszego (bez treści - patrz load_mail_body).
+        """
+        where, having, params = self._reply_queue_query(newer_than, older_than)
+        conn = self._connect()
+        try:
+            keys = [row[0] for row in conn.execute(f"""
+                SELECT IFNULL(thread_key, '') AS tkey FROM mails WHERE {where}
+                GROUP BY tkey {having}
+                ORDER BY MIN(date), tkey
+                LIMIT ? OFFSET ?
+            """, params + [limit, offset])]
+            if not keys:
+                return []
+            
+            key_placeholders = ", ".join("?" for _ in keys)
+            null_clause = " OR thread_key IS NULL" if "" in keys else ""
+            rows = conn.execute(f"""
+                SELECT * FROM mails
+                WHERE {where} AND (thread_key IN ({key_placeholders}){null_clause})
+                ORDER BY date DESC
+            """, list(self.QUEUE_EXCLUDED_FOLDERS) + keys).fetchall()
+        finally:
+            conn.close()
+        
+        threads: Dict[str, List[Dict[str, Any]]] = {key: [] for key in keys}
+        for row in rows:
+            threads[row["thread_key"] or ""].append(self._row_to_mail(row))
+        return [threads[key] for key in keys if threads[key]]
+
+    def smart_folder_uids(self, folder_id: str) -> List[str]:
+        """UID maili inteligentnego folderu (z tabeli członkostwa), od najnowszego"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT m.uid FROM smart_folder_members s
+                JOIN mails m ON m.uid = s.uid
+                WHERE s.folder_id = ?
+                ORDER BY m.date DESC
+            """, (folder_id,)).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def load_smart_folder(self, folder_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Ładuje stronę maili inteligentnego folderu (bez treści)"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT m.* FROM smart_folder_members s
+                JOIN mails m ON m.uid = s.uid
+                WHERE s.folder_id = ?
+                ORDER BY m.date DESC
+                LIMIT ? OFFSET ?
+            """, (folder_id, limit, offset)).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_mail(row) for row in rows]
+
+    def load_mail_body(self, uid: str) -> Optional[MailBody]:
+        """Leniwie ładuje treść maila (przez body_cache) lub None"""
+        cached = self.body_cache.get(uid)
+        if cached is not None:
+            return cached
+        
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT body, html_body, display_html FROM mail_bodies WHERE uid = ?", (uid,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE mails SET last_accessed = CURRENT_TIMESTAMP WHERE uid = ?", (uid,)
+                )
+                conn.commit()
+        finally:
+            conn.close()
+        
+        if not row:
+            return None
+        mail_body = MailBody(
+            uid, row["body"] or "", row["html_body"] or "", row["display_html"] or ""
+        )
+        self.body_cache.put(uid, mail_body)
+        return mail_body
+    
+    def mails_without_body(self, uids: List[str]) -> List[str]:
+        """UID (w kolejności podanej listy), dla których brak treści w cache"""
+        if not uids:
+            return []
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT value FROM json_each(?)
+                WHERE value NOT IN (SELECT uid FROM mail_bodies)
+                ORDER BY key
+            """, (json.dumps(list(uids)),)).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+    
+    def store_mail_body(self, uid: str, parsed: Dict[str, Any], remote: bool = True) -> Optional[MailBody]:
+        """
+        Zapisuje treść pobraną później niż nagłówki (np. przez BodyPrefetcher).
+        
+        Uzupełnia też kolumny zależne od treści (podgląd, załączniki), indeks
+        FTS i inteligentne foldery. remote=True oznacza treść, którą można
+        usunąć przy przekroczeniu budżetu dysku i pobrać ponownie z serwera.
+        """
+        body = parsed.get("body", "")
+        html_body = parsed.get("html_body", "")
+        display_html = parsed.get("display_html", "")
+        attachments = self._safe_attachments(parsed.get("attachments", []))
+        
+        with self.cache_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                    INSERT OR REPLACE INTO mail_bodies (uid, body, html_body, display_html, remote)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (uid, body, html_body, display_html, 1 if remote else 0))
+                
+                row = cursor.execute("SELECT * FROM mails WHERE uid = ?", (uid,)).fetchone()
+                if row:
+                    mail = self._row_to_mail(row)
+                    mail.update({
+                        "body": body, "html_body": html_body,
+                        "body_preview": parsed.get("body_preview") or body,
+                        "attachments": attachments,
+                    })
+                    new_row = self._mail_to_row(mail, row["folder"], row["account"])
+                    cursor.execute("""
+                        UPDATE mails SET preview = ?, attachments = ?, has_attachments = ?
+                        WHERE uid = ?
+                    """, (new_row["preview"], new_row["attachments"], new_row["has_attachments"], uid))
+                    self._index_mail(cursor, row["id"], mail)
+                    self.smart_folders.refresh_members(cursor, [uid])
+                conn.commit()
+            finally:
+                conn.close()
+        
+        mail_body = MailBody(uid, body, html_body, display_html)
+        self.body_cache.put(uid, mail_body)
+        return mail_body
+    
+    def enforce_body_budget(self) -> int:
+        """
+        Usuwa najdawniej otwierane treści pobrane w tle ponad budżet dysku.
+        
+        Indeks FTS i metadane zostają (mail jest nadal wyszukiwany), a treść
+        zostanie pobrana ponownie przy otwarciu. Maile z gwiazdką są pomijane.
+        
+        Returns:
+            Liczba usuniętych treści
+        """
+        with self.cache_lock:
+            conn = self._connect()
+            try:
+                used = conn.execute(
+                    "SELECT IFNULL(SUM(body_bytes), 0) FROM mail_bodies WHERE remote = 1"
+                ).fetchone()[0]
+                if used <= self.body_disk_budget:
+                    return 0
+                
+                # Usuwaj do 90% budżetu, żeby nie sprzątać przy każdym zapisie
+                to_free = used - int(self.body_disk_budget * 0.9)
+                evicted = []
+                for uid, size in conn.execute("""
+                    SELECT b.uid, b.body_bytes FROM mail_bodies b
+                    LEFT JOIN mails m ON m.uid = b.uid
+                    WHERE b.remote = 1 AND IFNULL(m.starred, 0) = 0
+                    ORDER BY m.last_accessed, b.cached_at
+                """):
+                    if to_free <= 0:
+                        break
+                    evicted.append((uid,))
+                    to_free -= size or 0
+                conn.executemany("DELETE FROM mail_bodies WHERE uid = ?", evicted)
+                conn.commit()
+            finally:
+                conn.close()
+        
+        for (uid,) in evicted:
+            self.body_cache.pop(uid)
+        if evicted:
+            print(f"[Cache] Usunięto {len(evicted)} treści ponad budżet dysku")
+        return len(evicted)
+    
+    def store_display_html(self, uid: str, display_html: str):
+        """Zapisuje przygotowany w tle HTML podglądu (treść musi już być w cache)"""
+        with self.cache_lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "UPDATE mail_bodies SET display_html = ? WHERE uid = ?", (display_html, uid)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        
+        cached = self.body_cache.get(uid)
+        if cached is not None:
+            cached.display_html = display_html
+            self.body_cache.resize(uid)
+    
+    # ==================== ZAŁĄCZNIKI ====================
+    
+    def spill_attachments(self, mail: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Przenosi dane binarne załączników do magazynu na dysku.
+        
+        Po wywołaniu załącznik ma klucz "sha256" zamiast "data"; identyczne
+        pliki (np. ten sam PDF w całym wątku) są zapisane tylko raz.
+        """
+        attachments = mail.get("attachments")
+        if not isinstance(attachments, list):
+            return mail
+        
+        uid = mail.get("_uid")
+        references = []
+        
+        for attachment in attachments:
+            if not isinstance(attachment, dict):
+                continue
+            data = attachment.get("data")
+            if isinstance(data, (bytes, bytearray)) and data:
+                try:
+                    # Blob i referencja w jednej transakcji (bezpieczne względem GC)
+                    attachment["sha256"] = self.attachment_store.put_bytes(
+                        bytes(data), attachment.get("content_type"), uid
+                    )
+                    attachment["size"] = attachment.get("size") or len(data)
+                    del attachment["data"]
+                except OSError as e:
+                    print(f"Błąd zapisu załącznika na dysk: {e}")
+                    continue
+            if uid and attachment.get("sha256"):
+                references.append((uid, attachment["sha256"]))
+        
+        self.attachment_store.add_references(references)
+        return mail
+    
+    def read_attachment_data(self, attachment: Dict[str, Any]) -> bytes:
+        """Zwraca dane załącznika (z pamięci lub z magazynu na dysku)"""
+        data = attachment.get("data")
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data)
+        sha256 = attachment.get("sha256")
+        if sha256:
+            try:
+                return self.attachment_store.read_bytes(sha256)
+            except OSError as e:
+                print(f"Błąd odczytu załącznika {sha256}: {e}")
+        return b""
+    
+    def copy_attachment(self, attachment: Dict[str, Any], destination: str):
+        """Zapisuje załącznik do pliku - strumieniowo z magazynu, bez kopii w pamięci"""
+        sha256 = attachment.get("sha256")
+        if sha256 and self.attachment_store.exists(sha256):
+            self.attachment_store.copy_to(sha256, destination)
+            return
+        with open(destination, "wb") as f:
+            f.write(self.read_attachment_data(attachment))
+    
+    def remove_mails_from_cache(self, uids: List[str]) -> int:
+        """Trwale usuwa maile z cache i zwalnia ich załączniki"""
+        if not uids:
+            return 0
+        uid_set = set(uids)
+        with self.cache_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            params = [(uid,) for uid in uid_set]
+            cursor.executemany(
+                "DELETE FROM mails_fts WHERE rowid = (SELECT id FROM mails WHERE uid = ?)", params
+            )
+            cursor.executemany("DELETE FROM mails WHERE uid = ?", params)
+            cursor.executemany("DELETE FROM mail_bodies WHERE uid = ?", params)
+            conn.commit()
+            conn.close()
+            
+            for cache_key, mails in self.memory_cache.items():
+                remaining = [m for m in mails if m.get("_uid") not in uid_set]
+                if len(remaining) != len(mails):
+                    self.memory_cache[cache_key] = remaining
+            for uid in uid_set:
+                self.body_cache.pop(uid)
+        
+        self.attachment_store.release_mails(uid_set)
+        self.attachment_store.garbage_collect()
+        return len(uid_set)
+    
+    def bulk_update_mails(self, states: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Zapisuje stan wielu maili jedną transakcją
+    
+        states: uid -> {"folder", "read", "starred", "tags", "extra"} (klucze
+        opcjonalne, brakujące pozostają bez zmian; "extra" to pola extra_data,
+        None usuwa pole). Zwraca uid zaktualizowanych maili - maili spoza
+        cache nie dotyczy.
+        """
+        if not states:
+            return []
+        with self.cache_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            rows = cursor.execute(
+                """
+                SELECT uid, folder, read, starred, flags, extra_data FROM mails
+                WHERE uid IN (SELECT value FROM json_each(?))
+                """,
+                (json.dumps(list(states)),),
+            ).fetchall()
+    
+            params = []
+            for row in rows:
+                state = states[row["uid"]]
+                try:
+                    extra = json.loads(row["extra_data"]) if row["extra_data"] else {}
+                except (TypeError, ValueError):
+                    extra = {}
+                if "tags" in state:
+                    tags = list(state["tags"] or [])
+                    extra["tags"] = tags
+                    extra["tag"] = tags[0] if tags else ""
+                for key, value in (state.get("extra") or {}).items():
+                    if value is None:
+                        extra.pop(key, None)
+                    else:
+                        extra[key] = value
+                read = bool(state.get("read", row["read"]))
+                starred = bool(state.get("starred", row["starred"]))
+                params.append((
+                    state.get("folder") or row["folder"],
+                    1 if read else 0,
+                    1 if starred else 0,
+                    self._merge_flags(row["flags"], {"read": read, "starred": starred}),
+                    json.dumps(extra, ensure_ascii=False),
+                    row["uid"],
+                ))
+    
+            cursor.executemany("""
+                UPDATE mails
+                SET folder = ?, read = ?, starred = ?, flags = ?, extra_data = ?
+                WHERE uid = ?
+            """, params)
+            updated = [p[-1] for p in params]
+            self.smart_folders.refresh_members(cursor, updated)
+            conn.commit()
+            conn.close()
+    
+            # Listy folderów w pamięci z tymi mailami (także folderów docelowych) są nieaktualne
+            uid_set = set(updated)
+            folders = {p[0] for p in params}
+            for cache_key, mails in self.memory_cache.items():
+                if cache_key.split(":", 1)[-1] in folders or any(
+                    m.get("_uid") in uid_set for m in mails
+                ):
+                    self.memory_cache.pop(cache_key)
+        return updated
+    
     def update_mail_in_cache(self, uid: str, updates: Dict[str, Any]):
         """Aktualizuje konkretny mail w cache"""
         with self.cache_lock:
-            conn = sqlite3.connect(str(self.db_path))
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Pobierz aktualny mail
-            cursor.execute("SELECT json_data FROM mails WHERE uid = ?", (uid,))
+            cursor.execute("SELECT * FROM mails WHERE uid = ?", (uid,))
             row = cursor.fetchone()
             
             if row:
                 try:
-                    mail = json.loads(row[0])
+                    mail = self._row_to_mail(row)
                     mail.update(updates)
+                    new_row = self._mail_to_row(mail, row["folder"], row["account"])
                     
                     # Aktualizuj w bazie
                     cursor.execute("""
                         UPDATE mails 
-                        SET starred = ?, read = ?, json_data = ?, last_accessed = CURRENT_TIMESTAMP
+                        SET starred = ?, read = ?, flags = ?, subject = ?, preview = ?,
+                            extra_data = ?, replied = ?, no_reply = ?
                         WHERE uid = ?
                     """, (
-                        1 if mail.get("starred") else 0,
-                        1 if mail.get("read") else 0,
-                        json.dumps(mail),
+                        new_row["starred"],
+                        new_row["read"],
+                        new_row["flags"] if "flags" in updates else self._merge_flags(
+                            row["flags"], mail
+                        ),
+                        new_row["subject"],
+                        new_row["preview"],
+                        new_row["extra_data"],
+                        new_row["replied"],
+                        new_row["no_reply"],
                         uid
                     ))
                     
+                    # Tylko przekazane kolumny - pozostałe (i znacznik remote) bez zmian
+                    body_columns = [
+                        column for column in ("body", "html_body", "display_html")
+                        if column in updates
+                    ]
+                    if body_columns:
+                        values = [updates[column] or "" for column in body_columns]
+                        assignments = ", ".join(
+                            f"{column} = excluded.{column}" for column in body_columns
+                        )
+                        cursor.execute(f"""
+                            INSERT INTO mail_bodies (uid, {", ".join(body_columns)})
+                            VALUES (?, {", ".join("?" * len(body_columns))})
+                            ON CONFLICT(uid) DO UPDATE SET {assignments}
+                        """, [uid] + values)
+                        self.body_cache.pop(uid)
+                    
+                    self._index_mail(cursor, row["id"], mail)
+                    self.smart_folders.refresh_members(cursor, [uid])
                     conn.commit()
                     
                     # Aktualizuj w pamięci
@@ -275,6 +1732,7 @@ class MailCache:
                         for i, m in enumerate(mails):
                             if m.get("_uid") == uid:
                                 mails[i].update(updates)
+                                self.memory_cache.resize(cache_key)
                                 break
                 
                 except Exception as e:
@@ -372,13 +1830,24 @@ class MailCache:
         cursor.execute("SELECT COUNT(DISTINCT folder) FROM mails")
         folder_count = cursor.fetchone()[0]
         
+        cursor.execute("SELECT IFNULL(SUM(body_bytes), 0), IFNULL(SUM(remote), 0) FROM mail_bodies")
+        body_bytes, remote_bodies = cursor.fetchone()
+        
         conn.close()
         
         return {
             "mails": mail_count,
             "contacts": contact_count,
             "folders": folder_count,
-            "memory_cache_size": len(self.memory_cache)
+            "memory_cache_size": len(self.memory_cache),
+            "memory_cache": self.memory_cache.stats(),
+            "body_cache": self.body_cache.stats(),
+            "body_disk": {
+                "bytes": body_bytes,
+                "prefetched": remote_bodies,
+                "budget": self.body_disk_budget,
+            },
+            "attachments": self.attachment_store.get_stats(),
         }
     
     def clear_old_cache(self, days: int = 30):
@@ -394,9 +1863,25 @@ class MailCache:
         """, (cutoff_date,))
         
         deleted = cursor.rowcount
+        
+        # Usuń treści maili, które nie mają już wpisu w tabeli mails
+        cursor.execute("""
+            DELETE FROM mail_bodies
+            WHERE uid NOT IN (SELECT uid FROM mails)
+        """)
+        cursor.execute("""
+            DELETE FROM mails_fts
+            WHERE rowid NOT IN (SELECT id FROM mails)
+        """)
+        
         conn.commit()
         conn.close()
         
+        # Zwolnij załączniki usuniętych maili - pod cache_lock, żeby nie usunąć
+        # referencji maila zapisywanego właśnie przez save_mails_to_cache
+        with self.cache_lock:
+            self.attachment_store.garbage_collect("SELECT uid FROM mails")
+        
         return deleted
     
     def get_last_sync_time(self, account: str = "local") -> Optional[str]:
@@ -430,9 +1915,11 @@ class MailCache:
 class BackgroundSyncManager:
     """Zarządza synchronizacją w tle"""
     
-    def __init__(self, cache: MailCache, mail_view):
+    def __init__(self, cache: MailCache, mail_view, save_state: Optional[Callable[[], None]] = None):
         self.cache = cache
         self.mail_view = mail_view
+        # Zapis stanu przez integrację (tylko zmienione maile); bez niej - pełny zrzut
+        self.save_state = save_state
         self.sync_thread = None
         self.stop_sync = False
     
@@ -470,6 +1957,14 @@ class BackgroundSyncManager:
     
     def _perform_sync(self):
         """Wykonuje synchronizację"""
+        # Foldery typu "ostatnie 7 dni" zmieniają się z upływem czasu
+        self.cache.smart_folders.refresh_relative()
+        
+        if self.save_state:
+            self.save_state()
+            self.cache.set_last_sync_time()
+            return
+        
         # Zapisz aktualne maile do cache
         if hasattr(self.mail_view, 'sample_mails'):
             for folder, mails in self.mail_view.sample_mails.items():
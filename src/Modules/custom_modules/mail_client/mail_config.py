@@ -17,6 +17,7 @@ Data: 2025-11-11
 import json
 import os
 import re
+import uuid
 from pathlib import Path
 from datetime import datetime, timedelta
 from PyQt6.QtWidgets import (
@@ -725,9 +726,9 @@ class MailConfigDialog(QDialog):
         
         self.mail_view_parent.column_order = new_order
         
-        # Przebuduj tabelę z nową kolejnością
-        if hasattr(self.mail_view_parent, 'rebuild_mail_table_with_order'):
-            self.mail_view_parent.rebuild_mail_table_with_order()
+        # Zastosuj nową kolejność w liście maili
+        if hasattr(self.mail_view_parent, 'apply_column_order'):
+            self.mail_view_parent.apply_column_order()
         
         QMessageBox.information(self, "Sukces", "Ustawienia kolumn zostały zastosowane!")
 
@@ -1639,7 +1640,7 @@ class MailConfigDialog(QDialog):
         original = self.autoresponder_rules[current_row]
         duplicate = AutoresponderRule(original.to_dict())
         duplicate.name = f"{original.name} (kopia)"
-        duplicate.responded_to = {}  # Resetuj historię odpowiedzi
+        duplicate.rule_id = uuid.uuid4().hex  # Nowa reguła - bez historii odpowiedzi
         
         self.autoresponder_rules.append(duplicate)
         self.save_autoresponder_rules()
@@ -0,0 +1,427 @@
+"""
+Wirtualizowana lista maili (model/widok Qt) ładowana oknami
+
+Klasy:
+- MailTableModel - QAbstractTableModel ładujący wiersze oknami
+  (z listy w pamięci albo z MailCache.load_page) przez canFetchMore/fetchMore
+- MailItemDelegate - rysuje kolory kontaktów i "chipy" tagów tylko dla
+  widocznych wierszy
+- MailTableView - QTableView ze stałą wysokością wierszy i drag&drop maili
+
+Model nie tworzy obiektów QTableWidgetItem - koszt przełączenia folderu
+nie zależy od liczby maili.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QMimeData, QRectF, Qt
+from PyQt6.QtGui import QColor, QDrag, QPainter, QPen
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QHeaderView,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionViewItem,
+    QTableView,
+)
+
+
+# Logiczne kolumny - zgodne z MailViewModule.column_order
+COLUMN_HEADERS = [
+    "⭐", "Adres mail", "Imię/Nazwisko", "Odpowiedz", "▶️", "Tytuł",
+    "Data", "Rozmiar", "Wątków", "Tag", "Notatka", "🪄",
+]
+
+COL_STAR = 0
+COL_ADDRESS = 1
+COL_NAME = 2
+COL_REPLY = 3
+COL_EXPAND = 4
+COL_SUBJECT = 5
+COL_DATE = 6
+COL_SIZE = 7
+COL_THREADS = 8
+COL_TAG = 9
+COL_NOTE = 10
+COL_MAGIC = 11
+
+MailRole = Qt.ItemDataRole.UserRole + 1
+TagsRole = Qt.ItemDataRole.UserRole + 2
+
+
+class MailTableModel(QAbstractTableModel):
+    """Model listy maili ładowany oknami (page_size wierszy na raz)"""
+
+    def __init__(self, parent_view: Any, page_size: int = 200) -> None:
+        super().__init__(parent_view)
+        self._mail_view = parent_view
+        self.page_size = page_size
+
+        self._rows: List[Dict[str, Any]] = []
+        self._row_by_uid: Dict[str, int] = {}
+
+        # Źródło w pamięci
+        self._source: Optional[List[Dict[str, Any]]] = None
+        # Źródło w cache: (cache, folder, account, filters, threads) + klucz ostatniego wiersza
+        self._cache_source: Optional[Tuple[Any, str, Optional[str], Optional[Dict[str, Any]], bool]] = None
+        self._cache_after: Optional[Tuple[Any, str]] = None
+        self._total = 0
+
+    # ==================== ŹRÓDŁA DANYCH ====================
+
+    def set_mails(self, mails: List[Dict[str, Any]]):
+        """Ustawia listę maili z pamięci (wiersze tworzone leniwie przy przewijaniu)"""
+        self.beginResetModel()
+        self._source = list(mails)
+        self._cache_source = None
+        self._total = len(mails)
+        self._rows = []
+        self._row_by_uid = {}
+        self.endResetModel()
+
+    def set_cache_source(
+        self,
+        cache: Any,
+        folder: str,
+        account: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        threads: bool = False,
+    ):
+        """Ustawia folder z MailCache jako źródło (okna przez load_page, opcjonalnie wątkami)"""
+        self.beginResetModel()
+        self._source = None
+        self._cache_source = (cache, folder, account, filters, threads)
+        self._cache_after = None
+        self._total = cache.count_mails(folder, account, filters, threads=threads)
+        self._rows = []
+        self._row_by_uid = {}
+        self.endResetModel()
+
+    def clear(self):
+        self.set_mails([])
+
+    def total_count(self) -> int:
+        return self._total
+
+    # ==================== STRONICOWANIE ====================
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:  # type: ignore[override]
+        if parent.isValid():
+            return False
+        return len(self._rows) < self._total
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:  # type: ignore[override]
+        if parent.isValid():
+            return
+        start = len(self._rows)
+        batch = self._fetch_batch(start)
+        if not batch:
+            # Źródło skurczyło się (np. maile usunięte w tle)
+            self._total = start
+            return
+
+        self.beginInsertRows(QModelIndex(), start, start + len(batch) - 1)
+        for offset, mail in enumerate(batch):
+            self._rows.append(mail)
+            uid = mail.get("_uid")
+            if uid:
+                self._row_by_uid[uid] = start + offset
+        self.endInsertRows()
+
+    def _fetch_batch(self, start: int) -> List[Dict[str, Any]]:
+        if self._source is not None:
+            return self._source[start:start + self.page_size]
+        if self._cache_source is not None:
+            cache, folder, account, filters, threads = self._cache_source
+            batch = cache.load_page(
+                folder, account=account, limit=self.page_size,
+                filters=filters, after=self._cache_after, threads=threads,
+            )
+            if batch:
+                last = batch[-1]
+                self._cache_after = (last.get("date", ""), last.get("_uid", ""))
+            return [self._loaded_mail(mail) for mail in batch]
+        return []
+
+    def _loaded_mail(self, mail: Dict[str, Any]) -> Dict[str, Any]:
+        """Obiekt maila z pamięci widoku (jeśli jest) - zmiany stanu trafiają w ten sam wiersz"""
+        found = self._mail_view.find_mail_by_uid(mail.get("_uid", ""))
+        if found is None:
+            return mail
+        loaded = found[1]
+        for key in ("_is_thread_parent", "_thread_count"):
+            if key in mail:
+                loaded[key] = mail[key]
+            else:
+                loaded.pop(key, None)
+        return loaded
+
+    # ==================== DOSTĘP DO WIERSZY ====================
+
+    def mail_at(self, row: int) -> Optional[Dict[str, Any]]:
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def row_for_uid(self, uid: str) -> int:
+        return self._row_by_uid.get(uid, -1)
+
+    def update_mail(self, uid: str):
+        """Odświeża jeden wiersz (np. po zmianie gwiazdki/przeczytania/tagu)"""
+        row = self.row_for_uid(uid)
+        if row < 0:
+            return
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMN_HEADERS) - 1))
+
+    def remove_mail(self, uid: str):
+        row = self.row_for_uid(uid)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        mail = self._rows.pop(row)
+        self.endRemoveRows()
+        # Wczytane wiersze są prefiksem listy źródłowej - ten sam indeks
+        if self._source is not None and row < len(self._source) and self._source[row] is mail:
+            del self._source[row]
+        self._total = max(0, self._total - 1)
+        self._row_by_uid = {
+            m.get("_uid"): index for index, m in enumerate(self._rows) if m.get("_uid")
+        }
+
+    # ==================== QAbstractTableModel ====================
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        return 0 if parent.isValid() else len(COLUMN_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            if 0 <= section < len(COLUMN_HEADERS):
+                return COLUMN_HEADERS[section]
+        return None
+
+    def flags(self, index: QModelIndex):  # type: ignore[override]
+        base = super().flags(index)
+        if not index.isValid():
+            return base
+        base |= Qt.ItemFlag.ItemIsDragEnabled
+        if index.column() == COL_NOTE:
+            base |= Qt.ItemFlag.ItemIsEditable
+        return base
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if not index.isValid():
+            return None
+        mail = self.mail_at(index.row())
+        if mail is None:
+            return None
+        column = index.column()
+
+        if role == MailRole:
+            return mail
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self._display_text(mail, column)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if column in (COL_STAR, COL_REPLY, COL_EXPAND, COL_THREADS, COL_MAGIC):
+                return Qt.AlignmentFlag.AlignCenter
+            return None
+        if role == Qt.ItemDataRole.BackgroundRole and column in (COL_ADDRESS, COL_NAME):
+            return self._contact_color(mail)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self._foreground(mail, column)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self._tooltip(mail, column)
+        if role == TagsRole and column == COL_TAG:
+            return self._mail_view.get_mail_tags(mail)
+        if role == Qt.ItemDataRole.FontRole and column == COL_SUBJECT and not mail.get("read", True):
+            font = self._mail_view.font()
+            font.setBold(True)
+            return font
+        return None
+
+    def setData(self, index: QModelIndex, value, role=Qt.ItemDataRole.EditRole) -> bool:  # type: ignore[override]
+        if not index.isValid() or index.column() != COL_NOTE or role != Qt.ItemDataRole.EditRole:
+            return False
+        mail = self.mail_at(index.row())
+        if mail is None:
+            return False
+        mail["note"] = str(value or "")
+        uid = mail.get("_uid")
+        if uid and hasattr(self._mail_view, "cache_integration"):
+            self._mail_view.cache_integration.update_mail_cache(uid, {"note": mail["note"]})
+        self.dataChanged.emit(index, index)
+        return True
+
+    # ==================== DEKORACJE (LENIWE) ====================
+
+    def _sender(self, mail: Dict[str, Any]) -> Tuple[str, str]:
+        from_field = mail.get("from", "")
+        return (
+            self._mail_view.extract_email_address(from_field),
+            self._mail_view.extract_display_name(from_field),
+        )
+
+    def _display_text(self, mail: Dict[str, Any], column: int) -> str:
+        if column == COL_STAR:
+            return "⭐" if mail.get("starred") else ""
+        if column == COL_ADDRESS:
+            return self._sender(mail)[0]
+        if column == COL_NAME:
+            return self._sender(mail)[1]
+        if column == COL_REPLY:
+            return "↩️"
+        if column == COL_EXPAND:
+            return "▶️"
+        if column == COL_SUBJECT:
+            return mail.get("subject", "")
+        if column == COL_DATE:
+            return mail.get("date", "")
+        if column == COL_SIZE:
+            return str(mail.get("size", ""))
+        if column == COL_THREADS:
+            return str(mail.get("_thread_count") or mail.get("conversation_count", 1))
+        if column == COL_TAG:
+            return ""  # Rysowane przez MailItemDelegate
+        if column == COL_NOTE:
+            return mail.get("note", "")
+        if column == COL_MAGIC:
+            return "🪄"
+        return ""
+
+    def _contact_color(self, mail: Dict[str, Any]) -> Optional[QColor]:
+        email_only = self._sender(mail)[0]
+        return self._mail_view.contact_colors.get(email_only)
+
+    def _foreground(self, mail: Dict[str, Any], column: int) -> Optional[QColor]:
+        if column in (COL_ADDRESS, COL_NAME):
+            color = self._contact_color(mail)
+            if color is not None and color.lightness() < 128:
+                return QColor("white")
+        elif column == COL_SIZE and mail.get("attachments"):
+            return QColor("#FF8C00")
+        elif column == COL_THREADS and (mail.get("_thread_count") or 1) > 1:
+            return QColor("#0066CC")
+        return None
+
+    def _tooltip(self, mail: Dict[str, Any], column: int) -> Optional[str]:
+        if column in (COL_ADDRESS, COL_NAME):
+            tags = self._mail_view.contact_tags.get(self._sender(mail)[0])
+            return f"Tagi: {', '.join(tags)}" if tags else None
+        if column == COL_REPLY:
+            return "Kliknij aby odpowiedzieć"
+        if column == COL_EXPAND:
+            return self._mail_view.get_mail_body_preview(mail, self._mail_view.mail_preview_lines)
+        if column == COL_TAG:
+            tags = self._mail_view.get_mail_tags(mail)
+            return ", ".join(tags) if tags else "Brak tagów - kliknij prawym aby dodać"
+        if column == COL_NOTE:
+            return mail.get("note") or None
+        if column == COL_MAGIC:
+            return "Generuj szybką odpowiedź AI"
+        return None
+
+
+class MailItemDelegate(QStyledItemDelegate):
+    """Rysuje tagi maila jako kolorowe etykiety (tylko widoczne wiersze)"""
+
+    CHIP_PADDING = 6
+    CHIP_SPACING = 4
+
+    def __init__(self, parent_view: Any) -> None:
+        super().__init__(parent_view)
+        self._mail_view = parent_view
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):  # type: ignore[override]
+        if index.column() != COL_TAG:
+            super().paint(painter, option, index)
+            return
+
+        # Tło zaznaczenia/naprzemienne jak w pozostałych kolumnach
+        style = option.widget.style() if option.widget else None
+        if style is not None:
+            style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, option.widget)
+
+        tags = index.data(TagsRole) or []
+        if not tags:
+            return
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        metrics = option.fontMetrics
+        x = option.rect.x() + self.CHIP_SPACING
+        height = min(option.rect.height() - 8, metrics.height() + 4)
+        y = option.rect.y() + (option.rect.height() - height) / 2
+
+        for tag in tags:
+            width = metrics.horizontalAdvance(tag) + 2 * self.CHIP_PADDING
+            if x + width > option.rect.right():
+                break
+            color = self._mail_view.get_tag_color(tag) or QColor("#E0E0E0")
+            rect = QRectF(x, y, width, height)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(color)
+            painter.drawRoundedRect(rect, height / 2, height / 2)
+            painter.setPen(QPen(QColor("white") if color.lightness() < 128 else QColor("black")))
+            painter.drawText(rect, int(Qt.AlignmentFlag.AlignCenter), tag)
+            x += width + self.CHIP_SPACING
+
+        painter.restore()
+
+
+class MailTableView(QTableView):
+    """Widok listy maili dla MailTableModel (stała wysokość wierszy, drag&drop)"""
+
+    MIME_TYPE = "application/x-mail-item"
+
+    def __init__(self, parent_view: Any) -> None:
+        super().__init__(parent_view)
+        self._mail_view = parent_view
+        self.setDragEnabled(True)
+        self.setDragDropMode(QAbstractItemView.DragDropMode.DragOnly)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setAlternatingRowColors(True)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked)
+        self.setWordWrap(False)
+
+        # Stała wysokość wierszy - widok nie mierzy treści każdego wiersza
+        vertical_header = self.verticalHeader()
+        if vertical_header is not None:
+            vertical_header.setVisible(False)
+            vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+            vertical_header.setDefaultSectionSize(36)
+
+        header = self.horizontalHeader()
+        if header is not None:
+            header.setStretchLastSection(True)
+            header.setSectionsMovable(True)
+            header.setDefaultAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
+
+        self.setItemDelegate(MailItemDelegate(parent_view))
+
+    def startDrag(self, supported_actions):  # type: ignore[override]
+        index = self.currentIndex()
+        if not index.isValid():
+            return
+        mail = index.data(MailRole)
+        if mail is None:
+            return
+
+        uid = self._mail_view.ensure_mail_uid(mail)
+        mime_data = QMimeData()
+        mime_data.setData(self.MIME_TYPE, uid.encode("utf-8"))
+
+        drag = QDrag(self)
+        drag.setMimeData(mime_data)
+        drag.exec(Qt.DropAction.MoveAction)
+
+    def wheelEvent(self, event):
+        """Obsługa Ctrl+Scroll dla zoomowania tabeli"""
+        if event.modifiers() == Qt.KeyboardModifier.ControlModifier:
+            delta = event.angleDelta().y()
+            self._mail_view.zoom_mail_table(110 if delta > 0 else 90)
+            event.accept()
+        else:
+            super().wheelEvent(event)
@@ -0,0 +1,272 @@
+"""
+Wątkowanie konwersacji wg nagłówków (RFC 5256 REFERENCES / algorytm JWZ)
+
+Funkcjonalność:
+- Łączenie maili w wątki po Message-ID, In-Reply-To i References
+- Fallback po temacie (jak w JWZ): odpowiedź "Re: X" bez nagłówków trafia
+  do wątku "X"; dwa niezależne maile o tym samym temacie NIE są łączone
+- Działanie przyrostowe - nowy mail to kilka odczytów ze słowników,
+  bez przeliczania wszystkich wątków
+- Scalanie wątków, gdy nowy mail spina dwie gałęzie (union-find)
+- Opcjonalny zapis stanu w SQLite (tabele thread_refs, thread_subjects)
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+_REPLY_PREFIX_RE = re.compile(
+    r'^\s*((re|fwd?|odp|przekaż|aw|sv|wg)(\[\d+\])?\s*:\s*)+', re.IGNORECASE
+)
+_MESSAGE_ID_RE = re.compile(r'<[^<>\s]+>')
+
+
+def strip_subject(subject: str) -> Tuple[str, bool]:
+    """
+    Usuwa prefiksy odpowiedzi/przekazania z tematu.
+
+    Returns:
+        (znormalizowany temat małymi literami, czy temat był odpowiedzią)
+    """
+    subject = subject or ""
+    stripped = _REPLY_PREFIX_RE.sub("", subject)
+    is_reply = stripped != subject
+    stripped = re.sub(r'\s+', ' ', stripped).strip().lower()
+    return stripped, is_reply
+
+
+def parse_message_ids(value: Any) -> List[str]:
+    """Wyciąga identyfikatory <...> z nagłówka References/In-Reply-To (lub listy)"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    return [mid.lower() for mid in _MESSAGE_ID_RE.findall(str(value))]
+
+
+class MailThreader:
+    """
+    Przyrostowy threader maili.
+
+    Każdy znany Message-ID (także tylko wspomniany w References) wskazuje
+    na identyfikator wątku. Nowy mail dołącza do wątku któregokolwiek ze
+    swoich identyfikatorów; jeśli wskazują na różne wątki - wątki są
+    scalane (mniejszy do większego).
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else None
+        self._lock = threading.RLock()
+
+        self._ref_to_thread: Dict[str, str] = {}
+        self._thread_refs: Dict[str, Set[str]] = {}
+        # temat -> (wątek, czy wątek ma mail źródłowy bez "Re:")
+        self._subject_to_thread: Dict[str, Tuple[str, bool]] = {}
+        # Scalone wątki: stary identyfikator -> nowy (dla maili już w pamięci)
+        self._merged_into: Dict[str, str] = {}
+
+        # Wywoływane po scaleniu: callback(nowy_id, [stare_id])
+        self.on_merge: Optional[Callable[[str, List[str]], None]] = None
+
+        # Zmiany czekające na zapis (flush)
+        self._pending_refs: Dict[str, str] = {}
+        self._pending_subjects: Dict[str, Tuple[str, bool]] = {}
+        self._pending_merges: List[Tuple[str, str]] = []
+
+        if self.db_path:
+            self._init_database()
+            self._load()
+
+    # ==================== PERSYSTENCJA ====================
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path))
+
+    def _init_database(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS thread_refs (
+                ref_id TEXT PRIMARY KEY,
+                thread_id TEXT NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_thread_refs_thread ON thread_refs(thread_id)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS thread_subjects (
+                subject TEXT PRIMARY KEY,
+                thread_id TEXT NOT NULL,
+                has_root INTEGER DEFAULT 0
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def _load(self):
+        """Wczytuje mapy identyfikatorów (bez przeliczania wątków)"""
+        conn = self._connect()
+        for ref_id, thread_id in conn.execute("SELECT ref_id, thread_id FROM thread_refs"):
+            self._ref_to_thread[ref_id] = thread_id
+            self._thread_refs.setdefault(thread_id, set()).add(ref_id)
+        for subject, thread_id, has_root in conn.execute(
+            "SELECT subject, thread_id, has_root FROM thread_subjects"
+        ):
+            self._subject_to_thread[subject] = (thread_id, bool(has_root))
+        conn.close()
+
+    def flush(self):
+        """Zapisuje oczekujące zmiany do SQLite (jedna transakcja)"""
+        with self._lock:
+            if not self.db_path:
+                self._pending_refs.clear()
+                self._pending_subjects.clear()
+                self._pending_merges.clear()
+                return
+            if not (self._pending_refs or self._pending_subjects or self._pending_merges):
+                return
+            conn = self._connect()
+            cursor = conn.cursor()
+            for winner, loser in self._pending_merges:
+                cursor.execute("UPDATE thread_refs SET thread_id = ? WHERE thread_id = ?", (winner, loser))
+                cursor.execute("UPDATE thread_subjects SET thread_id = ? WHERE thread_id = ?", (winner, loser))
+            cursor.executemany(
+                "INSERT OR REPLACE INTO thread_refs (ref_id, thread_id) VALUES (?, ?)",
+                [(ref, self.resolve(thread_id)) for ref, thread_id in self._pending_refs.items()]
+            )
+            cursor.executemany(
+                "INSERT OR REPLACE INTO thread_subjects (subject, thread_id, has_root) VALUES (?, ?, ?)",
+                [
+                    (subject, self.resolve(thread_id), 1 if has_root else 0)
+                    for subject, (thread_id, has_root) in self._pending_subjects.items()
+                ]
+            )
+            conn.commit()
+            conn.close()
+            self._pending_refs.clear()
+            self._pending_subjects.clear()
+            self._pending_merges.clear()
+
+    # ==================== WĄTKOWANIE ====================
+
+    @staticmethod
+    def message_key(mail: Dict[str, Any]) -> str:
+        """Message-ID maila lub zastępczy klucz z uid (maile bez nagłówków)"""
+        ids = parse_message_ids(mail.get("message_id"))
+        if ids:
+            return ids[0]
+        return f"<uid:{mail.get('_uid') or id(mail)}>"
+
+    @staticmethod
+    def _new_thread_id(seed: str) -> str:
+        return "t" + hashlib.sha1(seed.encode("utf-8", errors="ignore")).hexdigest()[:16]
+
+    def resolve(self, thread_id: Optional[str]) -> Optional[str]:
+        """Zwraca aktualny identyfikator wątku (po ewentualnych scaleniach)"""
+        if not thread_id:
+            return thread_id
+        with self._lock:
+            seen = []
+            while thread_id in self._merged_into:
+                seen.append(thread_id)
+                thread_id = self._merged_into[thread_id]
+            for old in seen[:-1]:
+                self._merged_into[old] = thread_id  # Kompresja ścieżki
+            return thread_id
+
+    def assign(self, mail: Dict[str, Any], flush: bool = True) -> str:
+        """
+        Przypisuje mail do wątku i zapisuje identyfikator w mail["_thread_id"].
+
+        Koszt jest proporcjonalny do liczby nagłówków References tego maila.
+        """
+        with self._lock:
+            own_id = self.message_key(mail)
+            parents = parse_message_ids(mail.get("references")) + parse_message_ids(mail.get("in_reply_to"))
+            related = [own_id] + [p for p in parents if p != own_id]
+
+            subject, is_reply = strip_subject(mail.get("subject", ""))
+            is_root = not is_reply and not parents
+
+            candidates: List[str] = []
+            for ref in related:
+                thread_id = self._ref_to_thread.get(ref)
+                if thread_id and thread_id not in candidates:
+                    candidates.append(thread_id)
+
+            subject_entry = self._subject_to_thread.get(subject) if subject else None
+            if not candidates and subject_entry:
+                subject_thread, has_root = subject_entry
+                # JWZ: łącz po temacie tylko odpowiedzi albo brakujący mail źródłowy
+                if is_reply or (is_root and not has_root):
+                    candidates.append(self.resolve(subject_thread))
+
+            if not candidates:
+                thread_id = self._new_thread_id(own_id)
+            else:
+                # Scal do największego wątku
+                candidates.sort(key=lambda t: len(self._thread_refs.get(t, ())), reverse=True)
+                thread_id = candidates[0]
+                if len(candidates) > 1:
+                    self._merge(thread_id, candidates[1:])
+
+            members = self._thread_refs.setdefault(thread_id, set())
+            for ref in related:
+                if self._ref_to_thread.get(ref) != thread_id:
+                    self._ref_to_thread[ref] = thread_id
+                    members.add(ref)
+                    self._pending_refs[ref] = thread_id
+
+            if subject:
+                if subject_entry is None:
+                    self._set_subject(subject, thread_id, is_root)
+                elif is_root and not subject_entry[1] and self.resolve(subject_entry[0]) == thread_id:
+                    self._set_subject(subject, thread_id, True)
+
+            if flush:
+                self.flush()
+
+            mail["_thread_id"] = thread_id
+            return thread_id
+
+    def assign_many(self, mails: Iterable[Dict[str, Any]]):
+        """Przypisuje wątki wielu mailom (jeden zapis do bazy)"""
+        with self._lock:
+            for mail in mails:
+                if self.is_known(mail):
+                    self.thread_id_for(mail)
+                else:
+                    self.assign(mail, flush=False)
+            self.flush()
+
+    def _set_subject(self, subject: str, thread_id: str, has_root: bool):
+        self._subject_to_thread[subject] = (thread_id, has_root)
+        self._pending_subjects[subject] = (thread_id, has_root)
+
+    def _merge(self, winner: str, losers: List[str]):
+        """Scala wątki; tematy wskazujące na stare id są rozwiązywane przez resolve()"""
+        members = self._thread_refs.setdefault(winner, set())
+        for loser in losers:
+            for ref in self._thread_refs.pop(loser, set()):
+                self._ref_to_thread[ref] = winner
+                members.add(ref)
+            self._merged_into[loser] = winner
+            self._pending_merges.append((winner, loser))
+        if self.on_merge:
+            self.on_merge(winner, list(losers))
+
+    def is_known(self, mail: Dict[str, Any]) -> bool:
+        """Czy mail był już przypisany do wątku przez ten threader"""
+        return self.message_key(mail) in self._ref_to_thread
+
+    def thread_id_for(self, mail: Dict[str, Any]) -> str:
+        """Identyfikator wątku maila - przypisuje go tylko przy pierwszym użyciu"""
+        with self._lock:
+            current = self._ref_to_thread.get(self.message_key(mail))
+            if current:
+                mail["_thread_id"] = current
+                return current
+            return self.assign(mail)
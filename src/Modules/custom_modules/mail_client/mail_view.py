@@ -19,11 +19,8 @@ import os
 import subprocess
 import sys
 import imaplib
-import email
-from email.header import decode_header
 from collections import defaultdict
 from datetime import datetime
-from functools import partial
 from pathlib import Path
 from typing import Any, Dict, List, Optional, cast
 from loguru import logger
@@ -53,9 +50,8 @@ from PyQt6.QtWidgets import (
     QFrame,
     QLineEdit,
     QComboBox,
-    QTableWidget,
-    QTableWidgetItem,
     QTextEdit,
+    QToolTip,
     QMenu,
     QMessageBox,
     QInputDialog,
@@ -98,26 +94,44 @@ if __name__ == '__main__':
     from mail_client.queue_view import QueueView
     from mail_client.cache_integration import integrate_cache_with_mail_view
     from mail_client.mail_widgets import (
-        MailTableWidget,
         FolderTreeWidget,
         FavoritesTreeWidget,
         RecentFavoritesListWidget,
     )
     from mail_client.ai_quick_response_dialog import AIQuickResponseDialog
     from mail_client.truth_sources_dialog import TruthSourcesDialog
+    from mail_client.mail_table_model import MailTableModel, MailTableView, MailRole
+    from mail_client.mime_pipeline import MimePipeline, parse_headers
+    from mail_client.body_prefetch import (
+        BodyPrefetcher,
+        PRIORITY_BACKGROUND,
+        PRIORITY_UNREAD,
+        imap_mail_uid,
+        parse_header_fetch,
+    )
+    from mail_client.context_menu_emails import MailBulkActions
 else:
     # Uruchomienie jako moduł - użyj importów względnych
     from .autoresponder import AutoresponderManager
     from .queue_view import QueueView
     from .cache_integration import integrate_cache_with_mail_view
     from .mail_widgets import (
-        MailTableWidget,
         FolderTreeWidget,
         FavoritesTreeWidget,
         RecentFavoritesListWidget,
     )
     from .ai_quick_response_dialog import AIQuickResponseDialog
     from .truth_sources_dialog import TruthSourcesDialog
+    from .mail_table_model import MailTableModel, MailTableView, MailRole
+    from .mime_pipeline import MimePipeline, parse_headers
+    from .body_prefetch import (
+        BodyPrefetcher,
+        PRIORITY_BACKGROUND,
+        PRIORITY_UNREAD,
+        imap_mail_uid,
+        parse_header_fetch,
+    )
+    from .context_menu_emails import MailBulkActions
 
 
 class MailViewModule(QWidget):
@@ -201,10 +215,13 @@ class MailViewModule(QWidget):
         self.MAX_TOTAL_MAILS = 5000
         
         self.prepare_mail_objects()
+        # Przykładowe maile (jeszcze nie w cache) zapisze pierwszy zapis stanu
+        self.mark_mails_dirty([mail for mails in self.sample_mails.values() for mail in mails])
         self.current_folder_mails = []
         self.displayed_mails = []
         self.current_mail = None
         self.email_fetcher = None  # Referencja do wątku pobierającego maile
+        self._displayed_body = None  # Treść wyświetlanego maila (silna referencja dla LRU)
         self.mail_scope = "folder"
         self.mail_filter_enabled = True
         self.view_mode = "folders"
@@ -221,10 +238,25 @@ class MailViewModule(QWidget):
         # Wątki konwersacji
         self.threads_enabled = True  # Czy grupować w wątki
         self.mail_threads: Dict[str, List[Dict[str, Any]]] = {}  # thread_id -> lista maili
+        # Threader nagłówkowy (Message-ID/References) - wątki zapisane w cache
+        self.mail_threader = self.cache_integration.cache.threader
         self.collapsed_threads: set = set()  # Zwinięte wątki
         
-        # Podgląd maili
-        self.expanded_preview_rows: Dict[int, int] = {}  # mail_row -> preview_row (mapowanie wierszy z podglądem)
+        # Parsowanie MIME i przygotowanie HTML podglądu poza wątkiem GUI
+        self.mime_pipeline = MimePipeline(self)
+        self.mime_pipeline.rendered.connect(self.on_mail_rendered)
+        
+        # Treści maili pobierane w tle (lista maili przychodzi bez treści)
+        self.body_prefetcher = BodyPrefetcher(
+            self.cache_integration.cache, self.mail_accounts, self.mime_pipeline, parent=self
+        )
+        self.body_prefetcher.body_ready.connect(self.on_body_prefetched)
+        self.body_prefetcher.body_failed.connect(self.on_body_prefetch_failed)
+        # Liczba sąsiadów zaznaczonego maila pobieranych z wyprzedzeniem
+        self.PREFETCH_NEIGHBOURS = 3
+        
+        # Akcje zbiorcze na zaznaczonych mailach (jedno polecenie IMAP na zbiór UID)
+        self.bulk_actions = MailBulkActions(self)
         
         # Zoom settings
         self.mail_table_zoom = 100  # Procent (100 = normalny rozmiar)
@@ -281,6 +313,16 @@ class MailViewModule(QWidget):
         autoresponder_file = Path("mail_client/autoresponder_rules.json")
         self.autoresponder = AutoresponderManager(autoresponder_file)
         
+        # Zapisane wyszukiwania (filtry z mail_filters.json i tagi) jako inteligentne foldery
+        self.mail_filters_file = Path("mail_client/mail_filters.json")
+        self.sync_saved_smart_folders()
+        
+        # Liczniki inteligentnych folderów - odczyt z cache tylko gdy się zmieniły
+        self._smart_counts_version = None
+        self.smart_counts_timer = QTimer(self)
+        self.smart_counts_timer.timeout.connect(self.refresh_smart_folder_counts)
+        self.smart_counts_timer.start(2000)
+        
         # Timer do automatycznego odświeżania poczty (co 3 minuty = 180000 ms)
         self.refresh_timer = QTimer(self)
         self.refresh_timer.timeout.connect(self.auto_refresh_mails)
@@ -816,7 +858,7 @@ class MailViewModule(QWidget):
         header_layout.addStretch()
 
         self.mail_search_input = QLineEdit()
-        self.mail_search_input.setPlaceholderText("Filtruj po frazie...")
+        self.mail_search_input.setPlaceholderText("Szukaj (np. from:jan has:attachment faktura)...")
         self.mail_search_input.setClearButtonEnabled(True)
         self.mail_search_input.textChanged.connect(self.on_mail_filter_changed)
         header_layout.addWidget(self.mail_search_input)
@@ -834,21 +876,13 @@ class MailViewModule(QWidget):
         preview_header_layout.setContentsMargins(0, 0, 0, 0)
         preview_header_widget.setLayout(preview_header_layout)
         
-        # Jeden przycisk przełączalny zamiast dwóch osobnych
-        self.toggle_all_previews_btn = QPushButton("🔽 Rozwiń wszystkie")
-        self.toggle_all_previews_btn.setCheckable(True)
-        self.toggle_all_previews_btn.setChecked(False)
-        self.toggle_all_previews_btn.setToolTip("Rozwiń/zwiń podgląd wszystkich maili")
-        self.toggle_all_previews_btn.clicked.connect(self.toggle_all_previews)
-        preview_header_layout.addWidget(self.toggle_all_previews_btn)
-        
         preview_header_layout.addWidget(QLabel("Linie podglądu:"))
         
         self.mail_preview_lines_spinner = QSpinBox()
         self.mail_preview_lines_spinner.setMinimum(1)
         self.mail_preview_lines_spinner.setMaximum(10)
         self.mail_preview_lines_spinner.setValue(3)
-        self.mail_preview_lines_spinner.setToolTip("Liczba linii treści wyświetlanych w podglądzie")
+        self.mail_preview_lines_spinner.setToolTip("Liczba linii treści w podglądzie pod ▶️")
         self.mail_preview_lines_spinner.valueChanged.connect(self.on_preview_lines_changed)
         self.mail_preview_lines = 3  # Domyślna wartość
         preview_header_layout.addWidget(self.mail_preview_lines_spinner)
@@ -857,60 +891,28 @@ class MailViewModule(QWidget):
         
         layout.addWidget(preview_header_widget)
 
-        table = MailTableWidget(self)
-        table.setColumnCount(12)  # Zmieniono na 12 kolumn (dodano 🪄)
-        table.setHorizontalHeaderLabels([
-            "⭐", "Adres mail", "Imię/Nazwisko", "Odpowiedz", "▶️", "Tytuł", 
-            "Data", "Rozmiar", "Wątków", "Tag", "Notatka", "🪄"
-        ])
-
-        table_header = table.horizontalHeader()
-        if table_header:
-            table_header.setStretchLastSection(True)  # Ostatnia kolumna rozciąga się
-            table_header.setDefaultAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-            # Ustaw tryb rozciągania dla kolumn
-            table_header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        # Lista maili (wiersze ładowane oknami z pamięci lub z cache)
+        self.mail_list_model = MailTableModel(self)
+        self.mail_list_virtual = MailTableView(self)
+        self.mail_list_virtual.setModel(self.mail_list_model)
+        virtual_header = self.mail_list_virtual.horizontalHeader()
+        if virtual_header is not None:
+            virtual_header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
             # Kolumny o stałej szerokości (nie można zmieniać)
-            table_header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)  # ⭐
-            table_header.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)  # Odpowiedz
-            table_header.setSectionResizeMode(4, QHeaderView.ResizeMode.Fixed)  # ▶️
-            table_header.setSectionResizeMode(11, QHeaderView.ResizeMode.Fixed)  # 🪄
-            # Kolumny Adres (1), Imię/Nazwisko (2), Tytuł (5) - użytkownik może regulować szerokość
-            table_header.setSectionResizeMode(1, QHeaderView.ResizeMode.Interactive)  # Adres - można zmieniać
-            table_header.setSectionResizeMode(2, QHeaderView.ResizeMode.Interactive)  # Imię/Nazwisko - można zmieniać
-            table_header.setSectionResizeMode(5, QHeaderView.ResizeMode.Interactive)  # Tytuł - można zmieniać
-            
-            # Podłącz sygnał do zapisywania szerokości kolumn
-            table_header.sectionResized.connect(self.on_column_resized)
-            
-            # Podłącz sygnał do zapisywania kolejności kolumn
-            table_header.sectionMoved.connect(self.on_column_moved)
-
-        # Zastosuj szerokości kolumn (domyślne lub załadowane z pliku)
-        for index, width in self.column_widths.items():
-            table.setColumnWidth(index, width)
-        
-        # Zastosuj kolejność kolumn (domyślne lub załadowane z pliku)
-        for visual_idx, logical_idx in enumerate(self.column_order):
-            table_header.moveSection(table_header.visualIndex(logical_idx), visual_idx)
-
-        vertical_header = table.verticalHeader()
-        if vertical_header is not None:
-            vertical_header.setVisible(False)
-        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        table.setAlternatingRowColors(True)
-        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            for index in (0, 3, 4, 11):  # ⭐, Odpowiedz, ▶️, 🪄
+                virtual_header.setSectionResizeMode(index, QHeaderView.ResizeMode.Fixed)
+            for index, width in self.column_widths.items():
+                self.mail_list_virtual.setColumnWidth(index, width)
+            for visual_idx, logical_idx in enumerate(self.column_order):
+                virtual_header.moveSection(virtual_header.visualIndex(logical_idx), visual_idx)
+            virtual_header.sectionResized.connect(self.on_column_resized)
+            virtual_header.sectionMoved.connect(self.on_column_moved)
+        self.mail_list_virtual.clicked.connect(self.on_virtual_mail_clicked)
+        self.mail_list_virtual.selectionModel().currentRowChanged.connect(self.on_virtual_current_row_changed)
+        self.mail_list_virtual.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.mail_list_virtual.customContextMenuRequested.connect(self.show_virtual_mail_context_menu)
+        layout.addWidget(self.mail_list_virtual)
 
-        table.cellClicked.connect(self.on_mail_clicked)
-        table.cellDoubleClicked.connect(self.on_mail_cell_double_clicked)
-        table.itemChanged.connect(self.on_mail_item_changed)
-        table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        table.customContextMenuRequested.connect(self.show_mail_context_menu)
-
-        layout.addWidget(table)
-
-        self.mail_list = table
         self.refresh_tag_filter_options(initial=True)
         self.set_mail_filter_controls_enabled(True)
         
@@ -947,15 +949,6 @@ class MailViewModule(QWidget):
             "Kosz": "🗑️",
         }
         
-        # Inteligentne foldery
-        smart_folder_icon_map = {
-            "Nieodczytane": "📬",
-            "Z załącznikami": "📎",
-            "Ostatnie 7 dni": "📅",
-            "Oznaczone gwiazdką": "⭐",
-            "Duże wiadomości": "📦",
-        }
-        
         # Sekcja: Inteligentne foldery
         smart_section = QTreeWidgetItem(["🔥 INTELIGENTNE FOLDERY"])
         smart_section.setData(0, Qt.ItemDataRole.UserRole, {"type": "section", "name": "smart"})
@@ -965,13 +958,33 @@ class MailViewModule(QWidget):
         smart_section.setFont(0, font)
         self.tree.addTopLevelItem(smart_section)
         
-        # Dodaj predefiniowane inteligentne foldery
-        for smart_name, smart_icon in smart_folder_icon_map.items():
-            mails = self.get_smart_folder_mails(smart_name)
-            item_text = f"{smart_icon} {smart_name} ({len(mails)})"
-            item = QTreeWidgetItem([item_text])
-            item.setData(0, Qt.ItemDataRole.UserRole, {"type": "smart_folder", "name": smart_name})
-            smart_section.addChild(item)
+        # Foldery i liczniki z cache (bez przeglądania maili)
+        smart_index = self.get_smart_folder_index()
+        if smart_index is not None:
+            counts = smart_index.counts()
+            self._smart_counts_version = smart_index.version
+            for smart_folder in smart_index.folders():
+                item = QTreeWidgetItem([self.format_smart_folder_label(smart_folder, counts)])
+                item.setData(0, Qt.ItemDataRole.UserRole, {
+                    "type": "smart_folder",
+                    "name": smart_folder["name"],
+                    "id": smart_folder["id"],
+                })
+                smart_section.addChild(item)
+        else:
+            smart_folder_icon_map = {
+                "Nieodczytane": "📬",
+                "Z załącznikami": "📎",
+                "Ostatnie 7 dni": "📅",
+                "Oznaczone gwiazdką": "⭐",
+                "Duże wiadomości": "📦",
+            }
+            for smart_name, smart_icon in smart_folder_icon_map.items():
+                mails = self.get_smart_folder_mails(smart_name)
+                item_text = f"{smart_icon} {smart_name} ({len(mails)})"
+                item = QTreeWidgetItem([item_text])
+                item.setData(0, Qt.ItemDataRole.UserRole, {"type": "smart_folder", "name": smart_name})
+                smart_section.addChild(item)
         
         # Sekcja: Zwykłe foldery
         folders_section = QTreeWidgetItem(["📁 FOLDERY"])
@@ -1043,10 +1056,82 @@ class MailViewModule(QWidget):
                     starred.append(mail)
         return starred
     
-    def get_smart_folder_mails(self, smart_folder_name: str) -> List[Dict[str, Any]]:
+    def get_smart_folder_index(self):
+        """Indeks inteligentnych folderów z cache (None bez cache)"""
+        cache_integration = getattr(self, "cache_integration", None)
+        cache = getattr(cache_integration, "cache", None)
+        return getattr(cache, "smart_folders", None)
+
+    def format_smart_folder_label(self, smart_folder: Dict[str, Any], counts: Dict[str, tuple]) -> str:
+        """Tekst elementu drzewa: ikona, nazwa i liczniki (nieprzeczytane/wszystkie)"""
+        total, unread = counts.get(smart_folder["id"], (0, 0))
+        counter = f"{unread}/{total}" if unread and unread != total else str(total)
+        return f"{smart_folder['icon']} {smart_folder['name']} ({counter})"
+
+    def refresh_smart_folder_counts(self):
+        """Aktualizuje liczniki inteligentnych folderów w drzewie po zmianie członkostwa"""
+        smart_index = self.get_smart_folder_index()
+        if smart_index is None or not hasattr(self, "tree") or self.view_mode != "folders":
+            return
+        if smart_index.version == self._smart_counts_version:
+            return
+        self._smart_counts_version = smart_index.version
+        
+        folders = {folder["id"]: folder for folder in smart_index.folders()}
+        counts = smart_index.counts()
+        for i in range(self.tree.topLevelItemCount()):
+            section = self.tree.topLevelItem(i)
+            section_data = section.data(0, Qt.ItemDataRole.UserRole) if section else None
+            if not section_data or section_data.get("name") != "smart":
+                continue
+            shown = set()
+            for j in range(section.childCount()):
+                child = section.child(j)
+                data = child.data(0, Qt.ItemDataRole.UserRole) or {}
+                folder = folders.get(data.get("id"))
+                if folder:
+                    child.setText(0, self.format_smart_folder_label(folder, counts))
+                    shown.add(folder["id"])
+            if shown != set(folders):
+                # Dodano lub usunięto folder (np. edycja filtrów) - przebuduj sekcję
+                self.populate_folders_tree()
+            break
+
+    def sync_saved_smart_folders(self):
+        """Synchronizuje zapisane wyszukiwania z filtrami (mail_filters.json) i tagami maili"""
+        smart_index = self.get_smart_folder_index()
+        if smart_index is None:
+            return
+        filters = []
+        if self.mail_filters_file.exists():
+            try:
+                with open(self.mail_filters_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, list):
+                    filters = data
+            except (json.JSONDecodeError, IOError) as e:
+                logger.warning(f"[ProMail] Cannot read mail filters for smart folders: {e}")
+        smart_index.sync_saved_filters(filters)
+        smart_index.sync_tag_folders(
+            tag.get("name") for tag in getattr(self, "mail_tags", []) if isinstance(tag, dict)
+        )
+
+    def get_smart_folder_mails(self, smart_folder_name: str, smart_folder_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Zwraca maile dla danego inteligentnego folderu"""
         from datetime import datetime, timedelta
         
+        # Członkostwo zmaterializowane w cache - tylko mapowanie uid na maile w pamięci
+        smart_index = self.get_smart_folder_index()
+        if smart_index is not None:
+            folder_id = smart_folder_id or smart_index.folder_id_by_name(smart_folder_name)
+            if folder_id:
+                mails = []
+                for uid in self.cache_integration.cache.smart_folder_uids(folder_id):
+                    found = self.find_mail_by_uid(uid)
+                    if found:
+                        mails.append(found[1])
+                return mails
+        
         all_mails = []
         for folder_name, mails in self.sample_mails.items():
             if folder_name == "Kosz":  # Pomiń kosz
@@ -1139,6 +1224,7 @@ class MailViewModule(QWidget):
         mail["_folder"] = target_folder
         if mail not in self.sample_mails[target_folder]:
             self.sample_mails[target_folder].append(mail)
+        self.mark_mails_dirty([mail])
 
         previous_folder = getattr(self, "current_folder", None)
         self.populate_folders_tree()
@@ -1480,8 +1566,8 @@ class MailViewModule(QWidget):
                     mail_item.setForeground(0, self.contact_colors[email])
                 
                 # Tooltip z podglądem treści
-                body_preview = mail.get("body", "")[:100]
-                if len(mail.get("body", "")) > 100:
+                body_preview = mail.get("body", mail.get("body_preview", ""))[:100]
+                if len(mail.get("body", mail.get("body_preview", ""))) > 100:
                     body_preview += "..."
                 mail_item.setToolTip(0, f"{mail.get('subject', '')}\n\n{body_preview}")
                 
@@ -1606,6 +1692,9 @@ class MailViewModule(QWidget):
             return
 
         self.sample_mails[new_name] = self.sample_mails.pop(old_name)
+        for mail in self.sample_mails[new_name]:
+            mail["_folder"] = new_name
+        self.mark_mails_dirty(self.sample_mails[new_name])
         if getattr(self, "current_folder", None) == old_name:
             self.current_folder = new_name
 
@@ -1664,8 +1753,8 @@ class MailViewModule(QWidget):
             self.current_folder = None
             self.current_folder_mails = []
             self.displayed_mails = []
-            if hasattr(self, "mail_list"):
-                self.mail_list.setRowCount(0)
+            if hasattr(self, "mail_list_model"):
+                self.mail_list_model.clear()
             self.clear_mail_view()
 
         self.update_folder_button_states()
@@ -1901,6 +1990,7 @@ class MailViewModule(QWidget):
                 json.dump(self.mail_tags, f, indent=2, ensure_ascii=False)
         except Exception as e:
             QMessageBox.warning(self, "Błąd", f"Nie można zapisać tagów: {e}")
+        self.sync_saved_smart_folders()
     
     def load_contact_tag_definitions(self):
         """Wczytuje definicje tagów kontaktów z pliku"""
@@ -2105,14 +2195,14 @@ class MailViewModule(QWidget):
     
     def save_column_widths(self):
         """Zapisuje szerokości kolumn do pliku"""
-        if not hasattr(self, 'mail_list'):
+        if not hasattr(self, 'mail_list_virtual'):
             return
         
         try:
             self.column_widths_file.parent.mkdir(parents=True, exist_ok=True)
             widths = {}
-            for i in range(self.mail_list.columnCount()):
-                widths[i] = self.mail_list.columnWidth(i)
+            for i in range(self.mail_list_model.columnCount()):
+                widths[i] = self.mail_list_virtual.columnWidth(i)
             
             with open(self.column_widths_file, 'w', encoding='utf-8') as f:
                 json.dump(widths, f, indent=2, ensure_ascii=False)
@@ -2311,11 +2401,11 @@ class MailViewModule(QWidget):
     
     def on_column_moved(self, logical_index: int, old_visual_index: int, new_visual_index: int):
         """Zapisuje kolejność kolumn po przesunięciu przez użytkownika"""
-        if not hasattr(self, 'column_order') or not hasattr(self, 'mail_list'):
+        if not hasattr(self, 'column_order') or not hasattr(self, 'mail_list_virtual'):
             return
         
         # Aktualizuj column_order na podstawie aktualnego stanu nagłówka
-        header = self.mail_list.horizontalHeader()
+        header = self.mail_list_virtual.horizontalHeader()
         if header:
             new_order = []
             for visual_idx in range(header.count()):
@@ -2334,7 +2424,7 @@ class MailViewModule(QWidget):
 
     def apply_mail_filters(self):
         """Stosuje filtry do listy maili"""
-        if not hasattr(self, "mail_list"):
+        if not hasattr(self, "mail_list_virtual"):
             return
         if self.mail_scope != "folder":
             return
@@ -2344,10 +2434,17 @@ class MailViewModule(QWidget):
         tag_filter = None
         if hasattr(self, "mail_tag_filter") and self.mail_tag_filter.isEnabled():
             tag_filter = self.mail_tag_filter.currentData()
+        if not text_filter and self.show_cached_folder_window(tag_filter):
+            return
+        candidates = self.current_folder_mails
+        indexed_uids = None
+        if text_filter:
+            candidates, indexed_uids = self.search_folder_mails(text_filter)
         filtered = []
-        for mail in self.current_folder_mails:
+        for mail in candidates:
             tags = self.get_mail_tags(mail)
-            if text_filter:
+            if text_filter and (indexed_uids is None or mail.get("_uid") not in indexed_uids):
+                # Maile spoza indeksu (jeszcze nie zapisane w cache) - dopasowanie podciągu
                 haystack = " ".join([
                     mail.get("subject", ""),
                     mail.get("from", ""),
@@ -2364,18 +2461,53 @@ class MailViewModule(QWidget):
             filtered.append(mail)
         self.populate_mail_table(filtered)
 
+    def search_folder_mails(self, query: str):
+        """
+        Wyszukuje w bieżącym folderze przez indeks FTS5 cache.
+        
+        Returns:
+            (kandydaci w kolejności trafności, zbiór uid znalezionych w indeksie
+            lub None gdy indeks jest niedostępny)
+        """
+        if not hasattr(self, 'cache_integration'):
+            return self.current_folder_mails, None
+        
+        # Folder i konto zawężają zapytanie FTS - limit wyników dotyczy tylko
+        # bieżącego folderu (Ulubione i foldery inteligentne nie są folderami cache)
+        current_folder = getattr(self, "current_folder", None)
+        folder = None
+        if self.mail_scope == "folder" and current_folder not in (None, "Ulubione"):
+            folder = current_folder
+        account = None
+        if hasattr(self, "account_filter_combo"):
+            account = self.account_filter_combo.currentData()
+        try:
+            hits = self.cache_integration.search_mails(query, folder=folder, account=account)
+        except Exception as e:
+            logger.error(f"[ProMail] Błąd wyszukiwania w indeksie: {e}")
+            return self.current_folder_mails, None
+        
+        loaded_by_uid = {mail.get("_uid"): mail for mail in self.current_folder_mails if mail.get("_uid")}
+        ranked = []
+        for hit in hits:
+            uid = hit.get("_uid")
+            if uid in loaded_by_uid:
+                ranked.append(loaded_by_uid.pop(uid))
+            elif folder is not None:
+                # Mail z cache, który nie został jeszcze załadowany do listy
+                ranked.append(hit)
+        indexed_uids = {hit.get("_uid") for hit in hits}
+        
+        # Pozostałe załadowane maile sprawdzi filtr podciągu (jeśli nie ma ich w indeksie)
+        ranked.extend(loaded_by_uid.values())
+        ranked.extend(mail for mail in self.current_folder_mails if not mail.get("_uid"))
+        return ranked, indexed_uids
+    
     def populate_mail_table(self, mails):
-        """Wypełnia tabelę maili"""
-        if not hasattr(self, "mail_list"):
+        """Pokazuje listę maili z pamięci (wiersze tworzone leniwie przez model)"""
+        if not hasattr(self, "mail_list_model"):
             return
         
-        # Wyczyść mapowanie rozwiniętych wierszy przy odświeżaniu
-        self.expanded_preview_rows = {}
-        
-        # Ustaw domyślną kolejność jeśli nie istnieje
-        if not hasattr(self, 'column_order'):
-            self.column_order = list(range(12))
-        
         # Grupuj maile w wątki jeśli włączone
         if self.threads_enabled:
             self.mail_threads = self.group_mails_into_threads(mails)
@@ -2394,146 +2526,48 @@ class MailViewModule(QWidget):
             self.mail_threads = {}
         
         self.displayed_mails = list(display_mails)
-        
-        # Batch UI updates - wyłącz odświeżanie podczas wypełniania
-        self.mail_list.setUpdatesEnabled(False)
-        self.mail_list.blockSignals(True)
-        self.mail_list.clearContents()
-        self.mail_list.setRowCount(len(display_mails))
-
-        for row, mail in enumerate(display_mails):
-            self.mail_list.setRowHeight(row, 36)  # Zwiększono z 26 na 36 dla lepszej czytelności
+        for mail in display_mails:
             self.ensure_mail_uid(mail)
             if "_folder" not in mail and self.mail_scope == "folder":
                 mail["_folder"] = getattr(self, "current_folder", None)
-            
-            # Inicjalizuj stan rozwinięcia dla tego maila
-            if "_expanded" not in mail:
-                mail["_expanded"] = False
+        self.mail_list_model.set_mails(display_mails)
+        self.mail_list_virtual.clearSelection()
 
-            # Przygotuj dane dla wszystkich kolumn
-            from_address = mail.get("from", "")
-            email_only = self.extract_email_address(from_address)
-            name = self.extract_display_name(from_address)
-            
-            # Wypełnij kolumny według aktualnej kolejności
-            for visual_idx, col_idx in enumerate(self.column_order):
-                self.populate_mail_cell(row, visual_idx, col_idx, mail, email_only, name)
+    def show_cached_folder_window(self, tag_filter: Optional[str] = None) -> bool:
+        """
+        Pokazuje folder bezpośrednio z cache (oknami przez load_page) - również
+        w trybie wątków; w pamięci może być tylko część folderu (MAX_MAILS_PER_FOLDER).
 
-        self.mail_list.blockSignals(False)
-        self.mail_list.setUpdatesEnabled(True)  # Włącz odświeżanie po zakończeniu
-        self.mail_list.clearSelection()
-    
-    def populate_mail_cell(self, row: int, visual_idx: int, col_idx: int, mail: dict, email_only: str, name: str):
-        """Wypełnia pojedynczą komórkę tabeli maili"""
-        if col_idx == 0:  # Gwiazdka
-            star_item = QTableWidgetItem("⭐" if mail.get("starred") else "")
-            star_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            star_item.setFlags(star_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.mail_list.setItem(row, visual_idx, star_item)
-        
-        elif col_idx == 1:  # Adres mail
-            from_item = QTableWidgetItem(email_only)
-            from_item.setFlags(from_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            # Zastosuj kolor kontaktu jeśli ustawiony
-            if email_only in self.contact_colors:
-                from_item.setBackground(self.contact_colors[email_only])
-                if self.contact_colors[email_only].lightness() < 128:
-                    from_item.setForeground(QColor("white"))
-            # Dodaj tagi do tooltipa
-            if email_only in self.contact_tags and self.contact_tags[email_only]:
-                tags_str = ", ".join(self.contact_tags[email_only])
-                from_item.setToolTip(f"Tagi: {tags_str}")
-            self.mail_list.setItem(row, visual_idx, from_item)
-        
-        elif col_idx == 2:  # Imię/Nazwisko
-            name_item = QTableWidgetItem(name)
-            name_item.setFlags(name_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            # Zastosuj kolor kontaktu jeśli ustawiony
-            if email_only in self.contact_colors:
-                name_item.setBackground(self.contact_colors[email_only])
-                if self.contact_colors[email_only].lightness() < 128:
-                    name_item.setForeground(QColor("white"))
-            # Dodaj tagi do tooltipa
-            if email_only in self.contact_tags and self.contact_tags[email_only]:
-                tags_str = ", ".join(self.contact_tags[email_only])
-                name_item.setToolTip(f"Tagi: {tags_str}")
-            self.mail_list.setItem(row, visual_idx, name_item)
-        
-        elif col_idx == 3:  # Emoji Odpowiedz (klikalne)
-            reply_item = QTableWidgetItem("↩️")
-            reply_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            reply_item.setFlags(reply_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            reply_item.setToolTip("Kliknij aby odpowiedzieć")
-            reply_item.setData(Qt.ItemDataRole.UserRole, {"action": "reply", "mail": mail})
-            self.mail_list.setItem(row, visual_idx, reply_item)
-        
-        elif col_idx == 4:  # Emoji strzałki (rozwiń/zwiń) - klikalne
-            expand_item = QTableWidgetItem("▶️" if not mail.get("_expanded") else "🔽")
-            expand_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            expand_item.setFlags(expand_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            expand_item.setToolTip("Kliknij aby rozwinąć/zwinąć podgląd")
-            expand_item.setData(Qt.ItemDataRole.UserRole, {"action": "expand", "row": row})
-            self.mail_list.setItem(row, visual_idx, expand_item)
-        
-        elif col_idx == 5:  # Tytuł
-            subject_item = QTableWidgetItem(mail.get("subject", ""))
-            subject_item.setFlags(subject_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.mail_list.setItem(row, visual_idx, subject_item)
-        
-        elif col_idx == 6:  # Data
-            date_item = QTableWidgetItem(mail.get("date", ""))
-            date_item.setFlags(date_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.mail_list.setItem(row, visual_idx, date_item)
-        
-        elif col_idx == 7:  # Rozmiar
-            size_item = QTableWidgetItem(mail.get("size", ""))
-            size_item.setFlags(size_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            if mail.get("attachments"):
-                size_item.setForeground(QColor("#FF8C00"))  # Pomarańczowy
-            self.mail_list.setItem(row, visual_idx, size_item)
-        
-        elif col_idx == 8:  # Wątki
-            # Jeśli włączone są wątki, pokaż liczbę maili w wątku
-            if self.threads_enabled and mail.get("_is_thread_parent"):
-                conv_count = str(mail.get("_thread_count", 1))
-            else:
-                conv_count = str(mail.get("conversation_count", 1))
-            conv_item = QTableWidgetItem(conv_count)
-            conv_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            conv_item.setFlags(conv_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            # Wyróżnij wątki z wieloma mailami
-            if self.threads_enabled and mail.get("_thread_count", 1) > 1:
-                conv_item.setForeground(QColor("#0066CC"))  # Niebieski
-                conv_item.setToolTip(f"Wątek zawiera {mail['_thread_count']} wiadomości")
-            self.mail_list.setItem(row, visual_idx, conv_item)
-        
-        elif col_idx == 9:  # Tag
-            tags = self.get_mail_tags(mail)
-            if tags:
-                # Utwórz etykietę z tagami oddzielonymi przecinkami
-                tags_text = ", ".join(tags)
-                tag_item = QTableWidgetItem(tags_text)
-            else:
-                tag_item = QTableWidgetItem("")
-            
-            tag_item.setFlags(tag_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            tag_item.setToolTip(tags_text if tags else "Brak tagów - kliknij prawym aby dodać")
-            self.mail_list.setItem(row, visual_idx, tag_item)
-        
-        elif col_idx == 10:  # Notatka
-            note_item = QTableWidgetItem(mail.get("note", ""))
-            note_item.setFlags(note_item.flags() | Qt.ItemFlag.ItemIsEditable)
-            note_item.setToolTip(mail.get("note", ""))
-            self.mail_list.setItem(row, visual_idx, note_item)
-        
-        elif col_idx == 11:  # 🪄 (Magiczna różdżka - AI Quick Response)
-            magic_item = QTableWidgetItem("🪄")
-            magic_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            magic_item.setFlags(magic_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            magic_item.setToolTip("Generuj szybką odpowiedź AI")
-            self.mail_list.setItem(row, visual_idx, magic_item)
+        Returns:
+            True jeśli lista została wyświetlona z cache
+        """
+        if not hasattr(self, "cache_integration") or not hasattr(self, "mail_list_model"):
+            return False
+        # Ulubione zbierają maile z wielu folderów - lista z pamięci
+        if self.current_folder in (None, "Ulubione"):
+            return False
+
+        # Niezapisane zmiany stanu muszą trafić do cache przed odczytem okna
+        self.cache_integration.save_current_state_to_cache()
 
+        account = None
+        if hasattr(self, "account_filter_combo"):
+            account = self.account_filter_combo.currentData()
+        filters = None
+        if tag_filter == "__favorites__":
+            filters = {"starred": True}
+        elif tag_filter:
+            filters = {"tag": tag_filter}
+
+        self.mail_threads = {}
+        self.displayed_mails = []
+        self.mail_list_model.set_cache_source(
+            self.cache_integration.cache, self.current_folder, account,
+            filters, threads=self.threads_enabled,
+        )
+        self.mail_list_virtual.clearSelection()
+        return True
+    
     def extract_display_name(self, from_field: str) -> str:
         """Wyodrębnia nazwę/imię z pola 'from' (np. 'Jan Kowalski <jan@example.com>' → 'Jan Kowalski')"""
         if not from_field:
@@ -2612,112 +2646,44 @@ class MailViewModule(QWidget):
         
         return safe_text
 
-    def toggle_mail_preview(self, row: int):
-        """Rozwija/zwija podgląd treści maila"""
-        if not hasattr(self, "mail_list"):
+    def get_mail_body(self, mail: Dict[str, Any]) -> str:
+        """Zwraca treść maila, w razie potrzeby ładując ją leniwie z cache"""
+        if "body" in mail:
+            return mail.get("body") or ""
+        body_entry = self._load_cached_body(mail)
+        return body_entry.body if body_entry else ""
+    
+    def _load_cached_body(self, mail: Dict[str, Any]):
+        """Zwraca MailBody z cache treści (LRU) lub None"""
+        if not hasattr(self, 'cache_integration'):
+            return None
+        try:
+            return self.cache_integration.load_mail_body(mail)
+        except Exception as e:
+            logger.error(f"[ProMail] Błąd ładowania treści maila z cache: {e}")
+            return None
+    
+    def on_mail_rendered(self, uid: str, result: Dict[str, Any]):
+        """Odbiera HTML podglądu przygotowany przez mime_pipeline"""
+        display_html = result.get("display_html", "")
+        if not display_html:
             return
         
-        mail = self.get_mail_by_row(row)
-        if not mail:
-            return
+        current = getattr(self, "current_mail", None)
+        if current is not None and current.get("_uid") == uid:
+            if "body" in current:
+                current["display_html"] = display_html
+            self.mail_body.setHtml(display_html)
         
-        # Ustaw domyślną kolejność jeśli nie istnieje
-        if not hasattr(self, 'column_order'):
-            self.column_order = list(range(12))
-        
-        # Znajdź wizualny indeks dla kolumny 4 (strzałka)
-        expand_visual_idx = self.column_order.index(4) if 4 in self.column_order else -1
-        
-        # Przełącz stan rozwinięcia
-        is_expanded = mail.get("_expanded", False)
-        mail["_expanded"] = not is_expanded
-        
-        # Zaktualizuj emoji w komórce
-        if expand_visual_idx >= 0:
-            expand_item = self.mail_list.item(row, expand_visual_idx)
-            if expand_item:
-                expand_item.setText("🔽" if mail["_expanded"] else "▶️")
-                expand_item.setData(Qt.ItemDataRole.UserRole, {"action": "expand", "row": row})
-        
-        # Dodaj lub usuń wiersz podglądu
-        if mail["_expanded"]:
-            # Dodaj nowy wiersz pod aktualnym mailem
-            preview_row = row + 1
-            self.mail_list.insertRow(preview_row)
-            
-            # Pobierz liczbę linii z ustawień
-            preview_lines = getattr(self, "mail_preview_lines", 3)
-            
-            # Parsuj treść maila
-            body_preview = self.get_mail_body_preview(mail, preview_lines)
-            
-            # Sprawdź czy jest ciemny motyw
-            is_dark = False
-            if self.theme_manager:
-                try:
-                    is_dark = self.theme_manager.get_current_theme() == "dark"
-                except:
-                    pass
-            
-            # Utwórz widget z podglądem treści (połączone kolumny)
-            preview_widget = QLabel(body_preview)
-            preview_widget.setWordWrap(True)
-            
-            if is_dark:
-                preview_widget.setStyleSheet("""
-                    QLabel {
-                        background-color: #2C2C2C;
-                        padding: 8px;
-                        border-left: 3px solid #64B5F6;
-                        color: #E0E0E0;
-                        font-size: 11px;
-                    }
-                """)
-            else:
-                preview_widget.setStyleSheet("""
-                    QLabel {
-                        background-color: #F5F5F5;
-                        padding: 8px;
-                        border-left: 3px solid #2196F3;
-                        color: #333;
-                        font-size: 11px;
-                    }
-                """)
-            
-            preview_widget.setTextInteractionFlags(
-                Qt.TextInteractionFlag.TextSelectableByMouse | 
-                Qt.TextInteractionFlag.TextSelectableByKeyboard
-            )
-            
-            # Ustaw widget rozciągnięty na wszystkie kolumny
-            self.mail_list.setSpan(preview_row, 0, 1, self.mail_list.columnCount())
-            self.mail_list.setCellWidget(preview_row, 0, preview_widget)
-            
-            # Dostosuj wysokość wiersza do treści
-            content_height = min(preview_lines * 20 + 16, 200)  # max 200px
-            self.mail_list.setRowHeight(preview_row, content_height)
-            
-            # Zapisz mapowanie
-            self.expanded_preview_rows[row] = preview_row
-        else:
-            # Usuń wiersz podglądu jeśli istnieje
-            if row in self.expanded_preview_rows:
-                preview_row = self.expanded_preview_rows[row]
-                self.mail_list.removeRow(preview_row)
-                del self.expanded_preview_rows[row]
-                
-                # Zaktualizuj mapowanie dla pozostałych wierszy
-                updated_mapping = {}
-                for mail_row, prev_row in self.expanded_preview_rows.items():
-                    if prev_row > preview_row:
-                        updated_mapping[mail_row] = prev_row - 1
-                    else:
-                        updated_mapping[mail_row] = prev_row
-                self.expanded_preview_rows = updated_mapping
+        if hasattr(self, 'cache_integration'):
+            try:
+                self.cache_integration.cache.store_display_html(uid, display_html)
+            except Exception as e:
+                logger.error(f"[ProMail] Błąd zapisu HTML podglądu do cache: {e}")
     
     def get_mail_body_preview(self, mail: Dict[str, Any], lines: int = 3) -> str:
         """Zwraca podgląd treści maila z normalizacją białych znaków"""
-        body = mail.get("body", "")
+        body = self.get_mail_body(mail) or mail.get("body_preview", "")
         if not body:
             return "(brak treści)"
         
@@ -2739,82 +2705,25 @@ class MailViewModule(QWidget):
         
         return preview
 
-    def toggle_all_previews(self):
-        """Przełącza stan wszystkich podglądów (rozwiń/zwiń)"""
-        is_expanding = self.toggle_all_previews_btn.isChecked()
-        
-        if is_expanding:
-            # Rozwiń wszystkie
-            self.toggle_all_previews_btn.setText("▶️ Zwiń wszystkie")
-            self.expand_all_previews()
-        else:
-            # Zwiń wszystkie
-            self.toggle_all_previews_btn.setText("🔽 Rozwiń wszystkie")
-            self.collapse_all_previews()
-    
-    def expand_all_previews(self):
-        """Rozwija wszystkie podglądy maili"""
-        # Iteruj od końca, aby uniknąć problemów z dodawaniem wierszy
-        for i in range(len(self.displayed_mails) - 1, -1, -1):
-            mail = self.displayed_mails[i]
-            if not mail.get("_expanded", False):
-                # Znajdź fizyczny wiersz dla tego maila
-                preview_rows_before = sum(1 for mail_row, _ in self.expanded_preview_rows.items() if mail_row <= i)
-                physical_row = i + preview_rows_before
-                self.toggle_mail_preview(physical_row)
-    
-    def collapse_all_previews(self):
-        """Zwija wszystkie podglądy maili"""
-        # Iteruj od końca, aby uniknąć problemów z usuwaniem wierszy
-        expanded_rows = sorted(self.expanded_preview_rows.keys(), reverse=True)
-        for mail_row in expanded_rows:
-            # Znajdź fizyczny wiersz
-            preview_rows_before = sum(1 for mr, _ in self.expanded_preview_rows.items() if mr < mail_row)
-            physical_row = mail_row + preview_rows_before
-            self.toggle_mail_preview(physical_row)
-    
     def on_preview_lines_changed(self, value: int):
         """Reaguje na zmianę liczby linii podglądu"""
         self.mail_preview_lines = value
-        
-        # Odśwież wszystkie rozwinięte podglądy
-        for mail_row, preview_row in list(self.expanded_preview_rows.items()):
-            mail = self.displayed_mails[mail_row] if mail_row < len(self.displayed_mails) else None
-            if not mail:
-                continue
-            
-            # Pobierz widget podglądu
-            preview_widget = self.mail_list.cellWidget(preview_row, 0)
-            if isinstance(preview_widget, QLabel):
-                # Zaktualizuj treść
-                body_preview = self.get_mail_body_preview(mail, value)
-                preview_widget.setText(body_preview)
-                
-                # Zaktualizuj wysokość
-                content_height = min(value * 20 + 16, 200)
-                self.mail_list.setRowHeight(preview_row, content_height)
+
+    def show_mail_body_preview(self, index):
+        """Pokazuje podgląd treści maila pod komórką ▶️ (bez otwierania maila)"""
+        mail = index.data(MailRole)
+        viewport = self.mail_list_virtual.viewport()
+        if mail is None or viewport is None:
+            return
+        rect = self.mail_list_virtual.visualRect(index)
+        preview = self.get_mail_body_preview(mail, self.mail_preview_lines)
+        QToolTip.showText(viewport.mapToGlobal(rect.bottomLeft()), preview, viewport)
 
     def get_mail_by_row(self, row: int) -> Optional[Dict[str, Any]]:
-        """Zwraca maila powiązanego z wierszem tabeli."""
-        # Sprawdź czy to wiersz podglądu
-        if row in self.expanded_preview_rows.values():
-            logger.debug(f"[ProMail] get_mail_by_row - row {row} is a preview row, returning None")
-            return None  # To jest wiersz podglądu, nie mail
-        
-        # Przelicz fizyczny wiersz na indeks w displayed_mails
-        # Musim policzyć ile wierszy podglądu jest przed tym wierszem
-        preview_rows_before = sum(1 for prev_row in self.expanded_preview_rows.values() if prev_row < row)
-        mail_index = row - preview_rows_before
-        
-        logger.debug(f"[ProMail] get_mail_by_row - row={row}, preview_rows_before={preview_rows_before}, calculated mail_index={mail_index}, displayed_mails count={len(self.displayed_mails)}")
-        
-        if 0 <= mail_index < len(self.displayed_mails):
-            mail = self.displayed_mails[mail_index]
-            logger.debug(f"[ProMail] get_mail_by_row - Returning mail at index {mail_index}: subject='{mail.get('subject', 'NO_SUBJECT')[:50]}'")
-            return mail
-        
-        logger.warning(f"[ProMail] get_mail_by_row - mail_index {mail_index} out of range (0-{len(self.displayed_mails)-1})")
-        return None
+        """Zwraca maila powiązanego z wierszem listy."""
+        if not hasattr(self, "mail_list_model"):
+            return None
+        return self.mail_list_model.mail_at(row)
 
     def ensure_mail_uid(self, mail: Dict[str, Any]) -> str:
         """Gwarantuje istnienie identyfikatora dla wiadomości."""
@@ -2846,33 +2755,26 @@ class MailViewModule(QWidget):
         return normalized.lower()
     
     def get_thread_id(self, mail: Dict[str, Any]) -> str:
-        """Generuje identyfikator wątku dla maila na podstawie tematu i uczestników"""
-        subject = self.normalize_subject(mail.get("subject", ""))
-        # Pobierz uczestników (nadawca + odbiorcy)
-        participants = set()
-        from_addr = self.extract_email_address(mail.get("from", "")).lower()
-        if from_addr:
-            participants.add(from_addr)
-        to_addr = mail.get("to", "")
-        if to_addr:
-            participants.add(to_addr.lower())
-        
-        # Posortuj uczestników dla konsystencji
-        participants_str = ",".join(sorted(participants))
-        
-        # Thread ID = hash(subject + participants)
-        import hashlib
-        thread_key = f"{subject}:{participants_str}"
-        thread_id = hashlib.md5(thread_key.encode()).hexdigest()[:16]
-        return thread_id
+        """
+        Zwraca identyfikator wątku maila (JWZ: Message-ID/In-Reply-To/References,
+        z fallbackiem po temacie). Wątek jest nadawany raz i zapamiętywany w cache.
+        """
+        if not self.mail_threader.is_known(mail):
+            self.ensure_mail_uid(mail)
+        return self.mail_threader.thread_id_for(mail)
     
     def group_mails_into_threads(self, mails: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Grupuje maile w wątki konwersacji"""
         threads: Dict[str, List[Dict[str, Any]]] = {}
         
+        # Nowe maile dostają wątek jednym zapisem; pozostałe mają już _thread_id
+        unassigned = [mail for mail in mails if not self.mail_threader.is_known(mail)]
+        for mail in unassigned:
+            self.ensure_mail_uid(mail)
+        self.mail_threader.assign_many(unassigned)
+        
         for mail in mails:
-            thread_id = self.get_thread_id(mail)
-            mail["_thread_id"] = thread_id
+            thread_id = self.mail_threader.thread_id_for(mail)
             
             if thread_id not in threads:
                 threads[thread_id] = []
@@ -2900,52 +2802,6 @@ class MailViewModule(QWidget):
                     return None
         return None
 
-    def build_tag_combobox(self, mail, row):
-        """Tworzy combobox do wyboru tagu dla konkretnego maila"""
-        combo = QComboBox()
-        combo.setEditable(False)
-        combo.setProperty("mail_row", row)
-
-        combo.addItem("Brak tagu", None)
-        known_tags = [tag.get("name") for tag in self.mail_tags if tag.get("name")]
-        for tag_name in known_tags:
-            combo.addItem(tag_name, tag_name)
-
-        current_tags = self.get_mail_tags(mail)
-        for tag_name in current_tags:
-            if tag_name and tag_name not in known_tags:
-                combo.addItem(tag_name, tag_name)
-
-        selected = current_tags[0] if current_tags else None
-        combo.blockSignals(True)
-        index = combo.findData(selected)
-        combo.setCurrentIndex(index if index >= 0 else 0)
-        combo.blockSignals(False)
-
-        combo.currentIndexChanged.connect(partial(self.on_mail_tag_changed, row))
-        return combo
-
-    def update_tag_item_display(self, row, visual_idx, tags):
-        """Aktualizuje wygląd komórki z tagiem"""
-        item = self.mail_list.item(row, visual_idx) if hasattr(self, "mail_list") else None
-        if item is None:
-            return
-
-        tag_text = ", ".join(tags)
-        item.setText(tag_text)
-        item.setToolTip(tag_text or "Brak tagu")
-
-        if tags:
-            color = self.get_tag_color(tags[0])
-            if color:
-                item.setBackground(QBrush(color))
-                text_color = Qt.GlobalColor.white if color.lightness() < 128 else Qt.GlobalColor.black
-                item.setForeground(QBrush(text_color))
-                return
-
-        item.setBackground(QBrush())
-        item.setForeground(QBrush())
-
     def get_mail_tags(self, mail):
         """Zwraca listę tagów wiadomości i normalizuje strukturę danych"""
         tags = mail.get("tags")
@@ -2963,6 +2819,38 @@ class MailViewModule(QWidget):
         cleaned = [str(tag).strip() for tag in tags if str(tag).strip()]
         mail["tags"] = cleaned
         mail["tag"] = cleaned[0] if cleaned else ""
+        self.mark_mails_dirty([mail])
+    
+    def mark_mails_dirty(self, mails: List[Dict[str, Any]]):
+        """Oznacza maile do zapisu w cache - okresowy zapis obejmuje tylko oznaczone"""
+        if hasattr(self, "cache_integration"):
+            self.cache_integration.mark_dirty(mails)
+    
+    def refresh_mail_rows(self, mails: List[Dict[str, Any]]):
+        """
+        Odświeża wiersze listy po zmianie stanu maili (przeczytanie, gwiazdka,
+        tagi, notatka). Listę przebudowuje tylko filtr zależny od tego stanu.
+        """
+        if not hasattr(self, "mail_list_model"):
+            return
+        if self.mail_scope == "folder":
+            tag_filter = None
+            if self.mail_filter_enabled and hasattr(self, "mail_tag_filter"):
+                tag_filter = self.mail_tag_filter.currentData()
+            if tag_filter:
+                # Mail mógł przestać (lub zacząć) spełniać filtr tagu/ulubionych
+                self.apply_mail_filters()
+                return
+        for mail in mails:
+            uid = mail.get("_uid")
+            if not uid:
+                continue
+            if self.current_folder == "Ulubione" and not mail.get("starred"):
+                self.mail_list_model.remove_mail(uid)
+                self.displayed_mails = [m for m in self.displayed_mails if m is not mail]
+                self.current_folder_mails = [m for m in self.current_folder_mails if m is not mail]
+            else:
+                self.mail_list_model.update_mail(uid)
     
     def on_mail_tag_selected(self, index):
         """Obsługuje wybór tagu z listy rozwijanej w nagłówku maila"""
@@ -2993,133 +2881,29 @@ class MailViewModule(QWidget):
         # Odśwież wyświetlanie
         self.display_mail(self.current_mail)
         
-        # Odśwież wiersz w tabeli jeśli mail jest widoczny
-        for row in range(self.mail_list.rowCount()):
-            mail = self.get_mail_by_row(row)
-            if mail and mail.get("_uid") == self.current_mail.get("_uid"):
-                # Znajdź kolumnę tagów (col_idx == 9)
-                if not hasattr(self, 'column_order'):
-                    self.column_order = list(range(12))
-                visual_idx = self.column_order.index(9) if 9 in self.column_order else -1
-                if visual_idx >= 0:
-                    tags_text = ", ".join(current_tags) if current_tags else ""
-                    tag_item = self.mail_list.item(row, visual_idx)
-                    if tag_item:
-                        tag_item.setText(tags_text)
-                        tag_item.setToolTip(tags_text if tags_text else "Brak tagów - kliknij prawym aby dodać")
-                break
+        # Odśwież wiersz na liście jeśli mail jest widoczny
+        self.refresh_mail_rows([self.current_mail])
 
     def toggle_mail_star(self, row: int, mail: Optional[Dict[str, Any]] = None) -> Optional[bool]:
         """Przełącza stan gwiazdki dla wskazanego wiersza."""
-        if not hasattr(self, "mail_list"):
-            return None
-
         if mail is None:
             mail = self.get_mail_by_row(row)
         if mail is None:
             return None
 
         new_state = not mail.get("starred", False)
-        mail["starred"] = new_state
-        
-        # Aktualizuj cache
-        if hasattr(self, 'cache_integration'):
-            uid = mail.get("_uid")
-            if uid:
-                self.cache_integration.update_mail_cache(uid, {"starred": new_state})
+        # Jak akcja zbiorcza: pamięć, cache i wiersz od razu, \Flagged na
+        # serwerze w tle - serwer ustala flagi przy kolejnym pobraniu
+        self.bulk_actions.set_flag([mail], "starred", new_state)
 
-        # Znajdź wizualny indeks kolumny gwiazdki (col_idx == 0)
-        if not hasattr(self, 'column_order'):
-            self.column_order = list(range(12))
-        
-        visual_idx = self.column_order.index(0) if 0 in self.column_order else 0
-        
-        item = self.mail_list.item(row, visual_idx)
-        if item is not None:
-            item.setText("⭐" if new_state else "")
-
-        if self.current_folder == "Ulubione" and not new_state:
-            if 0 <= row < len(self.displayed_mails):
-                self.displayed_mails.pop(row)
-            self.current_folder_mails = [m for m in self.current_folder_mails if m is not mail]
-            if 0 <= row < self.mail_list.rowCount():
-                self.mail_list.removeRow(row)
-            if self.current_mail is mail:
+        if self.current_mail is mail:
+            if self.current_folder == "Ulubione" and not new_state:
                 self.clear_mail_view()
-        else:
-            if self.mail_scope == "folder":
-                self.current_folder_mails = [m if m is not mail else mail for m in self.current_folder_mails]
-            if 0 <= row < len(self.displayed_mails):
-                self.displayed_mails[row] = mail
-            if self.current_mail is mail:
+            else:
                 self.display_mail(mail)
 
-        self.update_favorites_folder_item()
-
         return new_state
 
-    def on_mail_tag_changed(self, row, _index):
-        """Aktualizuje tag maila po zmianie w comboboxie"""
-        if not hasattr(self, "mail_list"):
-            return
-        combo = self.mail_list.cellWidget(row, 6)
-        if not isinstance(combo, QComboBox):
-            return
-
-        new_value = combo.currentData()
-        tags_list = [new_value] if new_value else []
-
-        if not (0 <= row < len(self.displayed_mails)):
-            return
-        mail = self.displayed_mails[row]
-        self.set_mail_tags(mail, tags_list)
-
-        active_tag_filter = None
-        if self.mail_filter_enabled and hasattr(self, "mail_tag_filter"):
-            active_tag_filter = self.mail_tag_filter.currentData()
-
-        if self.mail_scope == "folder" and active_tag_filter and active_tag_filter not in tags_list:
-            if self.current_mail is mail:
-                self.display_mail(mail)
-            self.apply_mail_filters()
-            return
-
-        self.update_tag_item_display(row, tags_list)
-        if self.current_mail is mail:
-            self.display_mail(mail)
-
-    def on_mail_cell_double_clicked(self, row, column):
-        """Pozwala edytować notatkę po dwukrotnym kliknięciu"""
-        if column != 7 or not hasattr(self, "mail_list"):
-            return
-        item = self.mail_list.item(row, column)
-        if item is not None:
-            self.mail_list.openPersistentEditor(item)
-
-    def on_mail_item_changed(self, item):
-        """Zapisuje zmiany w notatce i domyka edytor"""
-        if item is None or not hasattr(self, "mail_list"):
-            return
-        index = self.mail_list.indexFromItem(item)
-        if not index.isValid() or index.column() != 7:
-            return
-
-        row = index.row()
-        if not (0 <= row < len(self.displayed_mails)):
-            return
-
-        note_text = item.text()
-        mail = self.displayed_mails[row]
-        mail["note"] = note_text
-        item.setToolTip(note_text)
-        self.mail_list.closePersistentEditor(item)
-
-        if self.current_mail is mail:
-            if note_text:
-                self.mail_note_label.setText(f"Notatka: {note_text}")
-            else:
-                self.mail_note_label.setText("")
-    
     def populate_favorites_tree(self):
         """Wypełnia drzewo ulubionych plików"""
         self.favorites_tree.clear()
@@ -3635,7 +3419,7 @@ class MailViewModule(QWidget):
     def load_folder_mails(self, folder_name):
         """Ładuje maile z wybranego folderu"""
         # Sprawdź czy interfejs jest w pełni zainicjalizowany
-        if not hasattr(self, 'folder_label') or not hasattr(self, 'mail_list'):
+        if not hasattr(self, 'folder_label') or not hasattr(self, 'mail_list_virtual'):
             return
         
         # Usuń emoji z nazwy folderu
@@ -3677,7 +3461,7 @@ class MailViewModule(QWidget):
     def load_imap_folder_mails(self, folder_name: str, account_email: str):
         """Ładuje maile z folderu IMAP"""
         # Sprawdź czy interfejs jest w pełni zainicjalizowany
-        if not hasattr(self, 'folder_label') or not hasattr(self, 'mail_list'):
+        if not hasattr(self, 'folder_label') or not hasattr(self, 'mail_list_virtual'):
             return
         
         self.current_folder = folder_name
@@ -3705,10 +3489,10 @@ class MailViewModule(QWidget):
         if not self.current_folder_mails:
             self.show_status_message(f"Folder {folder_name} jest pusty lub nie został jeszcze zsynchronizowany")
     
-    def load_smart_folder_mails(self, smart_folder_name: str):
+    def load_smart_folder_mails(self, smart_folder_name: str, smart_folder_id: Optional[str] = None):
         """Ładuje maile z inteligentnego folderu"""
         # Sprawdź czy interfejs jest w pełni zainicjalizowany
-        if not hasattr(self, 'folder_label') or not hasattr(self, 'mail_list'):
+        if not hasattr(self, 'folder_label') or not hasattr(self, 'mail_list_virtual'):
             return
         
         self.current_folder = smart_folder_name
@@ -3719,7 +3503,7 @@ class MailViewModule(QWidget):
         self.set_mail_filter_controls_enabled(False)  # Inteligentne foldery mają swoje własne filtry
         
         # Pobierz maile z inteligentnego folderu
-        mails = self.get_smart_folder_mails(smart_folder_name)
+        mails = self.get_smart_folder_mails(smart_folder_name, smart_folder_id)
         
         # Filtruj według wybranego konta
         selected_account = None
@@ -3793,7 +3577,7 @@ class MailViewModule(QWidget):
                 
                 # Obsługa inteligentnych folderów
                 if item_type == "smart_folder":
-                    self.load_smart_folder_mails(item_name)
+                    self.load_smart_folder_mails(item_name, item_data.get("id"))
                     self.show_status_message(f"Inteligentny folder: {item_name}")
                     return
                 
@@ -3850,65 +3634,87 @@ class MailViewModule(QWidget):
                 # Kliknięto kontakt lub temat - pokaż wszystkie maile
                 self.load_tree_branch_mails(item)
         
-    def on_mail_clicked(self, row, column):
-        """Obsługa kliknięcia w mail"""
-        # Zapisz aktywność użytkownika
+    def on_virtual_mail_clicked(self, index):
+        """Obsługa kliknięcia w wirtualizowanej liście (indeks logicznej kolumny)"""
         self._last_user_activity = datetime.now()
-        
-        # Użyj get_mail_by_row() która uwzględnia rozwinięte podglądy
-        logger.debug(f"[ProMail] on_mail_clicked - row={row}, column={column}, displayed_mails count={len(self.displayed_mails)}, expanded_preview_rows={self.expanded_preview_rows}")
-        mail = self.get_mail_by_row(row)
-        if not mail:
-            # Kliknięto w wiersz podglądu lub poza zakresem
-            logger.warning(f"[ProMail] on_mail_clicked - get_mail_by_row returned None for row={row}")
+
+        mail = index.data(MailRole)
+        if mail is None:
             return
 
-        subject_preview = (mail.get("subject", "NO_SUBJECT") or "")[:50]
-        logger.debug(f"[ProMail] on_mail_clicked - Retrieved mail subject preview: '{subject_preview}'")
+        column = index.column()
+        if column == 0:  # Gwiazdka
+            self.current_mail = mail
+            self.toggle_mail_star(index.row(), mail)
+            return
 
-        # Sprawdź czy kliknięto w emoji z akcją (kolumny 3 lub 4)
-        item = self.mail_list.item(row, column)
-        if item and item.data(Qt.ItemDataRole.UserRole):
-            action_data = item.data(Qt.ItemDataRole.UserRole)
-            if action_data.get("action") == "reply":
-                self.reply_to_mail(action_data["mail"])
-                return
-            elif action_data.get("action") == "expand":
-                self.toggle_mail_preview(action_data["row"])
-                return
+        if column == 3:  # Odpowiedz
+            self.reply_to_mail(mail)
+            return
 
-        # Sprawdź czy kliknięto w kolumnę gwiazdki
-        if not hasattr(self, 'column_order'):
-            self.column_order = list(range(12))
-        
-        # Znajdź logiczny indeks kolumny na podstawie wizualnego indeksu
-        logical_col_idx = self.column_order[column] if column < len(self.column_order) else -1
-        
-        if logical_col_idx == 0:  # Gwiazdka
-            self.current_mail = mail
-            new_state = self.toggle_mail_star(row, mail)
-            if new_state is not None:
-                self.show_status_message(
-                    "Dodano gwiazdkę" if new_state else "Usunięto gwiazdkę",
-                    1500,
-                )
+        if column == 4:  # ▶️
+            self.show_mail_body_preview(index)
             return
-        
-        # Jeśli kliknięto w kolumnę magicznej różdżki (🪄)
-        if logical_col_idx == 11:
-            self.open_ai_quick_response(mail, row)
+
+        if column == 11:  # 🪄
+            self.open_ai_quick_response(mail, index.row())
             return
-        
-        # Jeśli kliknięto w kolumnę wątków i są włączone wątki
-        if logical_col_idx == 8 and self.threads_enabled and mail.get("_is_thread_parent"):
-            thread_count = mail.get("_thread_count", 1)
-            if thread_count > 1:
-                # Pokaż dialog z wszystkimi mailami w wątku
+
+        if column == 8 and self.threads_enabled and mail.get("_is_thread_parent"):
+            if mail.get("_thread_count", 1) > 1:
                 self.show_thread_dialog(mail)
                 return
 
         self.current_mail = mail
         self.display_mail(mail)
+
+    def on_virtual_current_row_changed(self, current, previous):
+        """Nawigacja klawiaturą w wirtualizowanej liście"""
+        if not current.isValid() or not self.mail_list_virtual.hasFocus():
+            return
+        if QApplication.mouseButtons() != Qt.MouseButton.NoButton:
+            return
+        if previous.isValid() and current.row() == previous.row():
+            return
+        mail = current.data(MailRole)
+        if mail is not None and mail is not self.current_mail:
+            self.current_mail = mail
+            self.display_mail(mail)
+
+    def prefetch_around(self, mail: Dict[str, Any]):
+        """Pobiera w pierwszej kolejności treść maila i jego sąsiadów na liście"""
+        neighbours = []
+        index = self.mail_list_model.row_for_uid(mail.get("_uid", ""))
+        if index >= 0:
+            radius = self.PREFETCH_NEIGHBOURS
+            after = range(index + 1, index + 1 + radius)
+            before = range(index - 1, max(0, index - radius) - 1, -1)
+            neighbours = [self.mail_list_model.mail_at(row) for row in [*after, *before]]
+        self.body_prefetcher.focus(mail, [m for m in neighbours if m is not None])
+
+    def schedule_body_prefetch(self, mails: List[Dict[str, Any]]):
+        """Kolejkuje treści: najpierw nieprzeczytane w Odebranych, potem pozostałe"""
+        unread = [m for m in mails if not m.get("read") and m.get("_folder") == "Odebrane"]
+        self.body_prefetcher.schedule(unread, PRIORITY_UNREAD)
+        self.body_prefetcher.schedule(mails, PRIORITY_BACKGROUND)
+
+    def on_body_prefetched(self, uid: str, result: Dict[str, Any]):
+        """Treść pobrana w tle - uzupełnia mail w pamięci i odświeża podgląd"""
+        found = self.find_mail_by_uid(uid)
+        if found:
+            mail = found[1]
+            mail["attachments"] = result.get("attachments", [])
+            if result.get("body_preview"):
+                mail["body_preview"] = result["body_preview"]
+        current = getattr(self, "current_mail", None)
+        if current is not None and current.get("_uid") == uid:
+            self.display_mail(current)
+
+    def on_body_prefetch_failed(self, uid: str, message: str):
+        """Nie udało się pobrać treści otwartego maila (np. brak sieci)"""
+        current = getattr(self, "current_mail", None)
+        if current is not None and current.get("_uid") == uid and self._displayed_body is None:
+            self.mail_body.setPlainText(f"Treść niedostępna offline - spróbuj ponownie później.\n({message})")
             
     def display_mail(self, mail):
         """Wyświetla treść wybranego maila"""
@@ -3954,11 +3760,34 @@ class MailViewModule(QWidget):
             self.mail_note_label.setText("")
         
         # Sanityzuj treść przed wyświetleniem (zapobiega XSS)
-        body_text = mail.get("body", "")
-        logger.debug(f"[ProMail] display_mail - body_text from mail: '{body_text[:100]}...' (len={len(body_text)})")
-        safe_body = self.sanitize_html(body_text)
-        logger.debug(f"[ProMail] display_mail - safe_body after sanitize: '{safe_body[:100]}...' (len={len(safe_body)})")
-        self.mail_body.setPlainText(safe_body)
+        # Silna referencja do wyświetlanej treści - LRU trzyma tylko słabą,
+        # więc otwarty mail nie zniknie z cache treści
+        self._displayed_body = None if "body" in mail else self._load_cached_body(mail)
+        if self._displayed_body is not None:
+            body_text = self._displayed_body.body
+            display_html = self._displayed_body.display_html
+        else:
+            body_text = mail.get("body", "")
+            display_html = mail.get("display_html", "")
+        
+        # Zaznaczony mail i sąsiedzi na początku kolejki pobierania treści
+        self.prefetch_around(mail)
+        
+        if display_html:
+            # HTML przygotowany i zsanityzowany w tle (mime_pipeline) - tylko setHtml
+            self.mail_body.setHtml(display_html)
+        elif self._displayed_body is None and "body" not in mail and mail.get("_imap_uid"):
+            # Treść jeszcze niepobrana - BodyPrefetcher wyświetli ją po pobraniu
+            self.mail_body.setPlainText("⏳ Pobieranie treści...")
+        else:
+            logger.debug(f"[ProMail] display_mail - body_text from mail: '{body_text[:100]}...' (len={len(body_text)})")
+            safe_body = self.sanitize_html(body_text)
+            self.mail_body.setPlainText(safe_body)
+            # Starsze maile z cache - przygotuj HTML w tle i podmień po gotowości
+            html_body = self._displayed_body.html_body if self._displayed_body else mail.get("html_body", "")
+            uid = mail.get("_uid")
+            if uid and (body_text or html_body):
+                self.mime_pipeline.render(uid, body_text, html_body)
         
         # Wyświetl załączniki
         self.display_attachments(mail.get("attachments", []))
@@ -4026,7 +3855,14 @@ class MailViewModule(QWidget):
         if not thread_id:
             return
         
+        thread_id = self.mail_threader.resolve(thread_id)
         thread_mails = self.get_thread_mails(thread_id)
+        # Wątek może obejmować maile z innych folderów (np. Wysłane) - dociągnij z cache
+        cached_thread = self.cache_integration.cache.load_thread_mails(thread_id)
+        if len(cached_thread) > len(thread_mails):
+            known_uids = {mail.get("_uid") for mail in thread_mails}
+            thread_mails = thread_mails + [m for m in cached_thread if m.get("_uid") not in known_uids]
+            thread_mails.sort(key=lambda m: m.get("date", ""), reverse=True)
         if not thread_mails:
             return
         
@@ -4109,7 +3945,7 @@ class MailViewModule(QWidget):
                 mail_layout.addWidget(subject_label)
             
             # Podgląd treści
-            body = mail.get("body", "")
+            body = self.get_mail_body(mail)
             preview = body[:200] + "..." if len(body) > 200 else body
             body_label = QLabel(preview)
             body_label.setWordWrap(True)
@@ -4161,8 +3997,7 @@ class MailViewModule(QWidget):
         
         if filepath:
             try:
-                with open(filepath, "wb") as f:
-                    f.write(attachment.get("data", b""))
+                self.cache_integration.cache.copy_attachment(attachment, filepath)
                 QMessageBox.information(self, "Sukces", f"Załącznik zapisany:\n{filepath}")
             except Exception as e:
                 QMessageBox.critical(self, "Błąd", f"Nie można zapisać załącznika:\n{str(e)}")
@@ -4179,8 +4014,7 @@ class MailViewModule(QWidget):
         
         try:
             # Zapisz do pliku tymczasowego
-            with open(temp_path, "wb") as f:
-                f.write(attachment.get("data", b""))
+            self.cache_integration.cache.copy_attachment(attachment, temp_path)
             
             # Otwórz w domyślnej aplikacji
             if sys.platform == "win32":
@@ -4206,23 +4040,39 @@ class MailViewModule(QWidget):
         self.display_attachments([])  # Wyczyść załączniki
         self.current_mail = None
         
-    def show_mail_context_menu(self, pos):
-        """Wyświetla menu kontekstowe dla maila"""
-        if not hasattr(self, "mail_list"):
-            return
-
-        index = self.mail_list.indexAt(pos)
+    def show_virtual_mail_context_menu(self, pos):
+        """Menu kontekstowe dla wirtualizowanej listy maili"""
+        index = self.mail_list_virtual.indexAt(pos)
         if index.isValid():
-            row = index.row()
-            if 0 <= row < len(self.displayed_mails):
-                self.mail_list.selectRow(row)
-                self.current_mail = self.displayed_mails[row]
-                self.display_mail(self.current_mail)
+            mail = index.data(MailRole)
+            if mail is not None:
+                if not self.mail_list_virtual.selectionModel().isRowSelected(index.row()):
+                    self.mail_list_virtual.selectRow(index.row())
+                self.current_mail = mail
+                self.display_mail(mail)
         elif not self.current_mail:
             return
 
+        viewport = self.mail_list_virtual.viewport()
+        if viewport is not None:
+            self.exec_mail_actions_menu(viewport.mapToGlobal(pos))
+
+    def selected_mails(self) -> List[Dict[str, Any]]:
+        """Maile zaznaczone na liście"""
+        rows = sorted(index.row() for index in self.mail_list_virtual.selectionModel().selectedRows())
+        mails = [self.mail_list_model.mail_at(row) for row in rows]
+        return [mail for mail in mails if mail is not None]
+
+    def exec_mail_actions_menu(self, global_pos):
+        """Wyświetla menu akcji dla bieżącego maila lub zaznaczonych maili"""
         menu = QMenu(self)
 
+        selected = self.selected_mails()
+        if len(selected) > 1:
+            self.bulk_actions.populate_menu(menu, selected)
+            menu.exec(global_pos)
+            return
+
         menu.addAction("📧 Nowy mail", self.new_mail)
         menu.addSeparator()
         menu.addAction("↩️ Odpowiedz", self.reply_mail)
@@ -4233,9 +4083,7 @@ class MailViewModule(QWidget):
         menu.addSeparator()
         menu.addAction("🗑️ Usuń", self.delete_mail)
 
-        viewport = self.mail_list.viewport()
-        if viewport is not None:
-            menu.exec(viewport.mapToGlobal(pos))
+        menu.exec(global_pos)
         
     # === AKCJE ===
     
@@ -4310,12 +4158,12 @@ class MailViewModule(QWidget):
                             "to": thread_mail.get("to", ""),
                             "subject": thread_mail.get("subject", ""),
                             "date": thread_mail.get("date", ""),
-                            "content": thread_mail.get("body", "")
+                            "content": self.get_mail_body(thread_mail)
                         })
             
             # Utwórz dialog
             dialog = AIQuickResponseDialog(
-                email_content=mail.get("body", ""),
+                email_content=self.get_mail_body(mail),
                 email_context=email_context,
                 thread_emails=thread_emails,
                 parent=self
@@ -4415,6 +4263,9 @@ class MailViewModule(QWidget):
                 except ValueError:
                     pass
             self.mail_uid_map.pop(uid, None)
+            if hasattr(self, 'cache_integration'):
+                # Trwałe usunięcie - zwolnij też załączniki w magazynie
+                self.cache_integration.remove_mails([uid])
             self.current_folder_mails = [m for m in self.current_folder_mails if m is not mail]
             self.displayed_mails = [m for m in self.displayed_mails if m is not mail]
 
@@ -4429,8 +4280,8 @@ class MailViewModule(QWidget):
                         self.tree.setCurrentItem(first_item)
                         self.load_folder_mails(first_item.text(0))
                 else:
-                    if hasattr(self, "mail_list"):
-                        self.mail_list.setRowCount(0)
+                    if hasattr(self, "mail_list_model"):
+                        self.mail_list_model.clear()
                     self.clear_mail_view()
             else:
                 self.populate_mail_table(self.displayed_mails)
@@ -4456,23 +4307,8 @@ class MailViewModule(QWidget):
     def mark_mail(self):
         """Oznacza wiadomość"""
         if self.current_mail:
-            try:
-                row = self.displayed_mails.index(self.current_mail)
-            except ValueError:
-                row = -1
-            new_state = self.toggle_mail_star(row) if row >= 0 else None
-            if new_state is None:
-                new_state = not self.current_mail.get("starred", False)
-                self.current_mail["starred"] = new_state
-                if self.mail_scope == "folder":
-                    self.apply_mail_filters()
-                else:
-                    self.populate_mail_table(self.displayed_mails)
-                self.update_favorites_folder_item()
-            self.show_status_message(
-                "Dodano gwiazdkę" if new_state else "Usunięto gwiazdkę",
-                2000,
-            )
+            row = self.mail_list_model.row_for_uid(self.current_mail.get("_uid", ""))
+            self.toggle_mail_star(row, self.current_mail)
             
     def move_mail(self):
         """Przenosi wiadomość do innego folderu"""
@@ -4563,9 +4399,10 @@ class MailViewModule(QWidget):
         class EmailFetcher(QThread):
             finished = pyqtSignal(dict, dict)
 
-            def __init__(self, accounts):
+            def __init__(self, accounts, cache=None):
                 super().__init__()
                 self.accounts = accounts
+                self.cache = cache
                 self.imap_folders = {}
 
             def run(self):
@@ -4587,6 +4424,34 @@ class MailViewModule(QWidget):
                 logger.info(f"[ProMail EmailFetcher] Emitting finished signal with {len(result)} accounts")
                 self.finished.emit(result, self.imap_folders)
 
+            def _migrate_legacy_uids(self, account_email, uids, fetched, cached):
+                """
+                Przenosi maile zapisane pod starszym kluczem (numer sekwencyjny)
+                na klucz z UID IMAP - zgodność sprawdzana po Message-ID.
+                """
+                missing = {
+                    entry["imap_uid"]: (uid, entry) for uid, entry in zip(uids, fetched)
+                    if uid not in cached and entry["imap_uid"]
+                }
+                legacy = self.cache.load_legacy_imap_mails(account_email, list(missing))
+                renames = {}
+                migrated = {}
+                for imap_uid, mail in legacy.items():
+                    uid, entry = missing[imap_uid]
+                    try:
+                        message_id = parse_headers(entry["header"], entry["size"])["message_id"]
+                    except Exception:
+                        continue
+                    if mail.get("message_id", "") != message_id:
+                        continue
+                    renames[mail["_uid"]] = uid
+                    mail["_uid"] = uid
+                    migrated[uid] = mail
+                if renames:
+                    self.cache.rename_mail_uids(renames)
+                    logger.info(f"[ProMail] Migrated {len(renames)} cached mails of {account_email} to IMAP UID keys")
+                return migrated
+
             def fetch_from_account(self, account):
                 """Pobiera maile z pojedynczego konta"""
                 try:
@@ -4629,182 +4494,70 @@ class MailViewModule(QWidget):
                         self.imap_folders[account_email] = ["INBOX"]
                     
                     imap.select("INBOX")
+                    _, validity = imap.response("UIDVALIDITY")
+                    uidvalidity = validity[0].decode() if validity and validity[0] else "0"
 
                     # Pobierz maile (liczba z ustawień konta)
                     fetch_limit = account.get("fetch_limit", 50)
-                    _, messages = imap.search(None, "ALL")
+                    # Bez oznaczonych \Deleted (usunięte bez EXPUNGE - serwer bez UIDPLUS)
+                    _, messages = imap.search(None, "UNDELETED")
                     email_ids = messages[0].split()
                     email_ids = email_ids[-fetch_limit:] if len(email_ids) > fetch_limit else email_ids
 
-                    mails = []
-                    for email_id in reversed(email_ids):
-                        try:
-                            _, msg_data = imap.fetch(email_id, "(RFC822)")
-                            email_body = msg_data[0][1]
-                            message = email.message_from_bytes(email_body)
+                    # Tylko nagłówki, flagi i rozmiar - jedno polecenie FETCH.
+                    # Treść pobiera w tle BodyPrefetcher (BODY.PEEK nie zmienia \Seen)
+                    fetched = []
+                    if email_ids:
+                        _, fetch_data = imap.fetch(
+                            b",".join(email_ids), "(UID FLAGS RFC822.SIZE BODY.PEEK[HEADER])"
+                        )
+                        fetched = parse_header_fetch(fetch_data)
+                    fetched.sort(key=lambda entry: int(entry["seq"]), reverse=True)
 
-                            # Ustal unikalny identyfikator wiadomości na podstawie konta i ID z IMAP
-                            if isinstance(email_id, bytes):
-                                email_id_str = email_id.decode("utf-8", errors="ignore")
-                            else:
-                                email_id_str = str(email_id)
-                            message_uid = f"{account_email}:{email_id_str}"
+                    # Klucz z UID IMAP (stały), nie z numeru sekwencyjnego
+                    uids = [
+                        imap_mail_uid(account_email, "INBOX", uidvalidity, entry["imap_uid"])
+                        for entry in fetched
+                    ]
+                    cached = self.cache.load_mails_by_uid(uids) if self.cache is not None else {}
+                    if self.cache is not None:
+                        cached.update(self._migrate_legacy_uids(account_email, uids, fetched, cached))
 
-                            subject = self.decode_email_header(message.get("Subject", ""))
-                            from_addr = self.decode_email_header(message.get("From", ""))
-                            date_str = message.get("Date", "")
-                            
-                            # Parsuj datę
-                            try:
-                                from email.utils import parsedate_to_datetime
-                                date_obj = parsedate_to_datetime(date_str)
-                                formatted_date = date_obj.strftime("%Y-%m-%d %H:%M")
-                            except Exception:
-                                formatted_date = date_str[:16] if len(date_str) > 16 else date_str
-
-                            # Pobierz treść i załączniki
-                            body = ""
-                            html_body = ""
-                            attachments = []
-                            
-                            if message.is_multipart():
-                                for part in message.walk():
-                                    content_type = part.get_content_type()
-                                    content_disposition = str(part.get("Content-Disposition", ""))
-                                    
-                                    # Treść tekstowa (priorytet)
-                                    if content_type == "text/plain" and "attachment" not in content_disposition:
-                                        if not body:
-                                            try:
-                                                # decode=True automatically handles quoted-printable, base64, etc.
-                                                payload = part.get_payload(decode=True)
-                                                if payload:
-                                                    # Spróbuj różnych kodowań
-                                                    charset = part.get_content_charset() or 'utf-8'
-                                                    try:
-                                                        body = payload.decode(charset, errors="ignore")
-                                                    except (UnicodeDecodeError, LookupError):
-                                                        body = payload.decode("utf-8", errors="ignore")
-                                            except Exception as e:
-                                                logger.warning(f"[ProMail] Error decoding text/plain: {e}")
-                                                pass
-                                    
-                                    # Treść HTML (backup jeśli nie ma plain text)
-                                    elif content_type == "text/html" and "attachment" not in content_disposition:
-                                        if not html_body:
-                                            try:
-                                                # decode=True automatically handles quoted-printable, base64, etc.
-                                                payload = part.get_payload(decode=True)
-                                                if payload:
-                                                    # Spróbuj różnych kodowań
-                                                    charset = part.get_content_charset() or 'utf-8'
-                                                    try:
-                                                        html_body = payload.decode(charset, errors="ignore")
-                                                    except (UnicodeDecodeError, LookupError):
-                                                        html_body = payload.decode("utf-8", errors="ignore")
-                                            except Exception as e:
-                                                logger.warning(f"[ProMail] Error decoding text/html: {e}")
-                                                pass
-                                    
-                                    # Załączniki
-                                    elif "attachment" in content_disposition or part.get_filename():
-                                        filename = part.get_filename()
-                                        if filename:
-                                            filename = self.decode_email_header(filename)
-                                            try:
-                                                attachment_data = part.get_payload(decode=True)
-                                                attachments.append({
-                                                    "filename": filename,
-                                                    "size": len(attachment_data),
-                                                    "data": attachment_data,
-                                                    "content_type": content_type
-                                                })
-                                            except Exception:
-                                                pass
-                            else:
-                                # Non-multipart message
-                                try:
-                                    payload = message.get_payload(decode=True)
-                                    if payload:
-                                        charset = message.get_content_charset() or 'utf-8'
-                                        try:
-                                            text = payload.decode(charset, errors="ignore")
-                                        except (UnicodeDecodeError, LookupError):
-                                            text = payload.decode("utf-8", errors="ignore")
-                                        
-                                        if message.get_content_type() == "text/html":
-                                            html_body = text
-                                        else:
-                                            body = text
-                                    else:
-                                        body = str(message.get_payload())
-                                except Exception as e:
-                                    logger.warning(f"[ProMail] Error decoding non-multipart message: {e}")
-                                    body = str(message.get_payload())
-
-                            # Jeśli nie mamy plain text, ale mamy HTML, konwertuj HTML na plain text
-                            if not body and html_body:
-                                logger.info(f"[ProMail] Converting HTML to text for email: {subject}")
-                                try:
-                                    from html import unescape
-                                    import re
-                                    
-                                    # Usuń style i scripty
-                                    text = re.sub(r'<style[^>]*>.*?</style>', '', html_body, flags=re.DOTALL | re.IGNORECASE)
-                                    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
-                                    
-                                    # Zamień <br>, <p>, <div> na nowe linie
-                                    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
-                                    text = re.sub(r'</p>', '\n\n', text, flags=re.IGNORECASE)
-                                    text = re.sub(r'</div>', '\n', text, flags=re.IGNORECASE)
-                                    text = re.sub(r'</tr>', '\n', text, flags=re.IGNORECASE)
-                                    
-                                    # Usuń pozostałe tagi HTML
-                                    text = re.sub(r'<[^>]+>', '', text)
-                                    
-                                    # Odkoduj encje HTML
-                                    text = unescape(text)
-                                    
-                                    # Usuń nadmiarowe białe znaki, ale zachowaj strukturę
-                                    lines = [line.strip() for line in text.split('\n')]
-                                    lines = [line for line in lines if line]  # Usuń puste linie
-                                    text = '\n'.join(lines)
-                                    
-                                    body = text if text.strip() else ""
-                                    
-                                    if not body:
-                                        logger.warning(f"[ProMail] HTML conversion resulted in empty text for email: {subject}")
-                                    else:
-                                        logger.debug(f"[ProMail] Successfully converted HTML to text ({len(body)} chars)")
-                                        
-                                except Exception as e:
-                                    logger.warning(f"[ProMail] Failed to convert HTML to text for '{subject}': {e}")
-                                    body = ""
-
-                            # Loguj wynik
-                            if not body and not html_body:
-                                logger.warning(f"[ProMail] Email '{subject}' has no body content (neither text nor HTML)")
-                            elif not body:
-                                logger.warning(f"[ProMail] Email '{subject}' only has HTML but conversion failed")
-                            
-                            body_text = body if body else "Plain text version not available"
-                            mails.append({
-                                "subject": subject or "(Bez tematu)",
-                                "from": from_addr,
-                                "date": formatted_date,
-                                "body": body_text,
-                                "body_preview": body_text[:500],
-                                "size": f"{len(email_body) // 1024} KB",
-                                "starred": False,
-                                "conversation_count": 1,
-                                "_folder": "Odebrane",
-                                "_account": account_email,
-                                "_uid": message_uid,
-                                "attachments": attachments,
-                            })
+                    mails = []
+                    stale = []
+                    for uid, entry in zip(uids, fetched):
+                        try:
+                            headers = parse_headers(entry["header"], entry["size"])
                         except Exception as e:
-                            logger.error(f"[ProMail] Error processing email '{subject}': {e}", exc_info=True)
+                            logger.error(f"[ProMail] Error parsing headers of {uid}: {e}")
                             continue
+                        flags = entry["flags"]
+                        # Mail znany z cache zachowuje lokalny stan (tagi, notatki,
+                        # podgląd, załączniki), a flagi \Seen i \Flagged ustala
+                        # serwer (poza mailami z akcją zbiorczą w toku - patrz
+                        # on_real_emails_fetched). Inny Message-ID oznacza inną
+                        # wiadomość pod tym kluczem.
+                        mail_data = cached.get(uid)
+                        if mail_data and mail_data.get("message_id", "") not in ("", headers["message_id"]):
+                            stale.append(uid)
+                            mail_data = None
+                        mail_data = mail_data or headers
+                        mail_data.update({
+                            "read": "\\Seen" in flags,
+                            "starred": "\\Flagged" in flags,
+                            "conversation_count": 1,
+                            "_folder": "Odebrane",
+                            "_account": account_email,
+                            "_uid": uid,
+                            "_imap_uid": entry["imap_uid"],
+                            "_imap_size": entry["size"],
+                        })
+                        mails.append(mail_data)
+
+                    if stale:
+                        # Nieaktualny wpis (stan i treść innej wiadomości) - do usunięcia
+                        logger.warning(f"[ProMail] Dropping {len(stale)} stale cache entries for {account_email}")
+                        self.cache.remove_mails_from_cache(stale)
 
                     imap.logout()
                     if account_email not in self.imap_folders:
@@ -4817,22 +4570,6 @@ class MailViewModule(QWidget):
                         self.imap_folders[account_email] = ["INBOX"]
                     return []
 
-            def decode_email_header(self, header_text):
-                """Dekoduje nagłówek emaila"""
-                if not header_text:
-                    return ""
-                decoded_parts = decode_header(header_text)
-                result = []
-                for part, encoding in decoded_parts:
-                    if isinstance(part, bytes):
-                        try:
-                            result.append(part.decode(encoding or "utf-8", errors="ignore"))
-                        except Exception:
-                            result.append(part.decode("utf-8", errors="ignore"))
-                    else:
-                        result.append(str(part))
-                return " ".join(result)
-
         # Jeśli brak kont, po prostu nie pobieraj - bez denerwującego dialogu
         if not self.mail_accounts:
             logger.info("[ProMail] No email accounts configured - skipping mail fetch")
@@ -4851,10 +4588,14 @@ class MailViewModule(QWidget):
                 pass  # Obiekt już usunięty
             self.email_fetcher = None
 
-        self.email_fetcher = EmailFetcher(self.mail_accounts)
+        cache = self.cache_integration.cache if hasattr(self, 'cache_integration') else None
+        self.email_fetcher = EmailFetcher(self.mail_accounts, cache)
         self.email_fetcher.finished.connect(self.on_real_emails_fetched)
         # Cleanup thread after finishing - use dedicated cleanup method
         self.email_fetcher.finished.connect(self._cleanup_email_fetcher)
+        # Połączenia zajęte pobieraniem listy - treści w tle poczekają
+        self.body_prefetcher.set_accounts(self.mail_accounts)
+        self.body_prefetcher.pause_background(True)
         logger.info("[ProMail] EmailFetcher thread starting...")
         self.email_fetcher.start()
 
@@ -4889,6 +4630,14 @@ class MailViewModule(QWidget):
 
         logger.info(f"[ProMail] Aggregated {len(aggregated_inbox)} unique IMAP mails for inbox")
 
+        # Akcja zbiorcza w toku nie dotarła jeszcze na serwer - jej stan lokalny
+        # ma pierwszeństwo przed pobranymi flagami
+        pending_states = self.bulk_actions.pending_states()
+        for mail in aggregated_inbox:
+            state = pending_states.get(mail["_uid"])
+            if state:
+                mail.update(state)
+
         # Podmień folder "Odebrane" prawdziwymi mailami
         self.sample_mails["Odebrane"] = aggregated_inbox
         
@@ -4900,6 +4649,16 @@ class MailViewModule(QWidget):
 
         # Odśwież widok
         self.prepare_mail_objects()
+        
+        # Zapis pobranych maili (nowe i flagi z serwera) aktualizuje też
+        # członkostwo inteligentnych folderów
+        self.cache_integration.mark_dirty(aggregated_inbox)
+        self.cache_integration.save_current_state_to_cache()
+        
+        # Treści nowych maili pobierane w tle (nagłówki już są)
+        self.body_prefetcher.pause_background(False)
+        self.schedule_body_prefetch(aggregated_inbox)
+        
         if self.view_mode == "folders":
             self.populate_folders_tree()
             if hasattr(self, "current_folder") and self.current_folder == "Odebrane":
@@ -4931,6 +4690,11 @@ class MailViewModule(QWidget):
             
             dialog.exec()
             
+            # Dialog zapisuje reguły autorespondera do pliku - wczytaj je ponownie
+            self.autoresponder.load_rules()
+            # Zmienione filtry - zapisane wyszukiwania przeliczane w tle
+            self.sync_saved_smart_folders()
+            
             logger.info("[ProMail] Opened ProMail configuration dialog")
             self.show_status_message("Zamknięto konfigurację ProMail", 2000)
             
@@ -4946,117 +4710,31 @@ class MailViewModule(QWidget):
         """Otwiera dialog ustawień widoczności i kolejności kolumn - karta Kolumny"""
         self.open_config(tab_index=3)  # Karta 3: Układ kolumn
     
-    def rebuild_mail_table_with_order(self):
-        """Przebudowuje tabelę maili z nową kolejnością kolumn"""
-        if not hasattr(self, "mail_list"):
+    def apply_column_order(self):
+        """Ustawia kolejność kolumn listy maili według column_order"""
+        if not hasattr(self, "mail_list_virtual"):
             return
         
-        # Zapisz aktualnie wyświetlane maile
-        current_mails = self.displayed_mails.copy() if hasattr(self, 'displayed_mails') else []
-        
-        # Usuń starą tabelę
-        old_table = self.mail_list
-        parent_layout = old_table.parent().layout()
-        
-        # Znajdź indeks starej tabeli w layoucie
-        table_index = -1
-        for i in range(parent_layout.count()):
-            if parent_layout.itemAt(i).widget() == old_table:
-                table_index = i
-                break
-        
-        # Usuń starą tabelę
-        parent_layout.removeWidget(old_table)
-        old_table.deleteLater()
-        
-        # Utwórz nową tabelę
-        table = MailTableWidget(self)
-        table.setColumnCount(11)
-        
-        # Utwórz nagłówki według nowej kolejności
-        headers = []
-        for col_idx in self.column_order:
-            headers.append(self.get_column_header_short(col_idx))
-        table.setHorizontalHeaderLabels(headers)
-        
-        table_header = table.horizontalHeader()
-        if table_header:
-            table_header.setStretchLastSection(True)  # Ostatnia kolumna rozciąga się
-            table_header.setDefaultAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-            # Ustaw tryb rozciągania dla kolumn według ich logicznego indeksu
-            table_header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
-            
-            # Znajdź wizualne pozycje dla kolumn które powinny mieć specjalny tryb
-            for visual_idx, col_idx in enumerate(self.column_order):
-                if col_idx == 0:  # ⭐
-                    table_header.setSectionResizeMode(visual_idx, QHeaderView.ResizeMode.Fixed)
-                elif col_idx == 3:  # Odpowiedz
-                    table_header.setSectionResizeMode(visual_idx, QHeaderView.ResizeMode.Fixed)
-                elif col_idx == 4:  # ▶️
-                    table_header.setSectionResizeMode(visual_idx, QHeaderView.ResizeMode.Fixed)
-                elif col_idx in [1, 2, 5]:  # Adres, Imię/Nazwisko, Tytuł
-                    table_header.setSectionResizeMode(visual_idx, QHeaderView.ResizeMode.Stretch)
-        
-        # Ustaw szerokości według nowej kolejności
-        default_widths = {0: 40, 1: 200, 2: 150, 3: 80, 4: 35, 5: 250, 6: 130, 7: 90, 8: 100, 9: 140, 10: 220}
-        for visual_idx, col_idx in enumerate(self.column_order):
-            table.setColumnWidth(visual_idx, default_widths.get(col_idx, 100))
-        
-        vertical_header = table.verticalHeader()
-        if vertical_header is not None:
-            vertical_header.setVisible(False)
-        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        table.setAlternatingRowColors(True)
-        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        
-        table.cellClicked.connect(self.on_mail_clicked)
-        table.cellDoubleClicked.connect(self.on_mail_cell_double_clicked)
-        table.itemChanged.connect(self.on_mail_item_changed)
-        table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        table.customContextMenuRequested.connect(self.show_mail_context_menu)
-        
-        # Wstaw nową tabelę w to samo miejsce
-        if table_index >= 0:
-            parent_layout.insertWidget(table_index, table)
-        else:
-            parent_layout.addWidget(table)
-        
-        self.mail_list = table
+        # Kolejność kolumn listy maili (indeksy logiczne)
+        virtual_header = self.mail_list_virtual.horizontalHeader()
+        if virtual_header is not None:
+            virtual_header.blockSignals(True)
+            for visual_idx, logical_idx in enumerate(self.column_order):
+                virtual_header.moveSection(virtual_header.visualIndex(logical_idx), visual_idx)
+            virtual_header.blockSignals(False)
         
         # Zastosuj widoczność kolumn
         self.apply_column_visibility()
-        
-        # Przywróć maile
-        if current_mails:
-            self.populate_mail_table(current_mails)
-    
-    def get_column_header_short(self, col_idx: int) -> str:
-        """Zwraca krótką nazwę nagłówka dla kolumny"""
-        headers_short = {
-            0: "⭐",
-            1: "Adres mail",
-            2: "Imię/Nazwisko",
-            3: "Odpowiedz",
-            4: "▶️",
-            5: "Tytuł",
-            6: "Data",
-            7: "Rozmiar",
-            8: "Wątków",
-            9: "Tag",
-            10: "Notatka",
-        }
-        return headers_short.get(col_idx, "")
     
     def apply_column_visibility(self):
         """Stosuje ustawienia widoczności kolumn"""
-        if not hasattr(self, "mail_list"):
+        if not hasattr(self, "mail_list_virtual"):
             return
         
-        # Zastosuj widoczność według nowej kolejności
-        for visual_idx, col_idx in enumerate(self.column_order):
+        # Widok wirtualny używa indeksów logicznych kolumn
+        for col_idx in self.column_order:
             visible = self.column_visibility.get(col_idx, True)
-            self.mail_list.setColumnHidden(visual_idx, not visible)
+            self.mail_list_virtual.setColumnHidden(col_idx, not visible)
     
     def zoom_mail_table(self, percentage: int):
         """Zmienia rozmiar czcionki w tabeli maili
@@ -5067,24 +4745,18 @@ class MailViewModule(QWidget):
         self.mail_table_zoom = max(50, min(200, int(self.mail_table_zoom * percentage / 100)))
         
         # Zastosuj nowy rozmiar czcionki
-        font = self.mail_list.font()
+        font = self.mail_list_virtual.font()
         base_size = 9  # Bazowy rozmiar czcionki
         new_size = int(base_size * self.mail_table_zoom / 100)
         font.setPointSize(new_size)
-        self.mail_list.setFont(font)
+        self.mail_list_virtual.setFont(font)
         
-        # Zaktualizuj wysokość wierszy
-        base_height = 26
+        # Stała wysokość wierszy - jedna wartość dla całej listy
+        base_height = 36
         new_height = int(base_height * self.mail_table_zoom / 100)
-        for row in range(self.mail_list.rowCount()):
-            mail = self.get_mail_by_row(row)
-            if mail and mail.get("_expanded"):
-                # Zachowaj proporcje dla rozwiniętych maili
-                preview_lines = getattr(self, "mail_preview_lines", 3)
-                expanded_height = new_height + (preview_lines * 18 * self.mail_table_zoom // 100)
-                self.mail_list.setRowHeight(row, expanded_height)
-            else:
-                self.mail_list.setRowHeight(row, new_height)
+        vertical_header = self.mail_list_virtual.verticalHeader()
+        if vertical_header is not None:
+            vertical_header.setDefaultSectionSize(new_height)
         
         # Pokaż komunikat
         self.show_status_message(f"Zoom tabeli: {self.mail_table_zoom}%", 1000)
@@ -5419,6 +5091,14 @@ class MailViewModule(QWidget):
             except RuntimeError:
                 pass  # Obiekt już usunięty
         
+        if hasattr(self, 'body_prefetcher'):
+            self.body_prefetcher.stop()
+        if hasattr(self, 'bulk_actions'):
+            self.bulk_actions.stop()
+        
+        if hasattr(self, 'mime_pipeline'):
+            self.mime_pipeline.shutdown()
+        
         # Odłącz sygnały
         try:
             if self.i18n and hasattr(self.i18n, 'language_changed'):
@@ -5563,7 +5243,7 @@ class MailViewModule(QWidget):
                 background-color: {colors['bg_secondary']};
             }}
             
-            QTableWidget {{
+            QTableView {{
                 background-color: {colors['bg_main']};
                 color: {colors['text_primary']};
                 gridline-color: {colors['border_light']};
@@ -5571,12 +5251,12 @@ class MailViewModule(QWidget):
                 alternate-background-color: {colors['bg_secondary']};
             }}
             
-            QTableWidget::item:selected {{
+            QTableView::item:selected {{
                 background-color: {colors['accent_primary']};
                 color: white;
             }}
             
-            QTableWidget::item:hover {{
+            QTableView::item:hover {{
                 background-color: {colors['bg_secondary']};
             }}
             
@@ -5636,7 +5316,7 @@ class MailViewModule(QWidget):
         
         # Status
         if hasattr(self, 'status_label') and hasattr(self, 'displayed_mails'):
-            count = len(self.displayed_mails)
+            count = self.mail_list_model.total_count() if hasattr(self, 'mail_list_model') else len(self.displayed_mails)
             text = t('promail.status.mails_count', default='{count} wiadomości')
             self.status_label.setText(text.format(count=count))
         
@@ -0,0 +1,488 @@
+"""
+Potok parsowania MIME poza wątkiem GUI
+
+Funkcjonalność:
+- Parsowanie wiadomości RFC822 (nagłówki, treść, załączniki) w puli procesów
+- Gotowy do wyświetlenia, zsanityzowany HTML (biała lista tagów i atrybutów)
+- Obrazy inline (cid:, data:) zmniejszane do miniatur, zdalne obrazy usuwane
+- Podgląd tekstowy (preview) liczony raz, przy parsowaniu
+- Wyniki przekazywane do GUI sygnałami Qt
+
+Funkcje modułu są czyste (bez stanu) - mogą działać w procesach potomnych.
+"""
+
+import base64
+import email
+import re
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from email.header import decode_header
+from email.message import Message
+from email.utils import parsedate_to_datetime
+from html import escape, unescape
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+PREVIEW_LENGTH = 500
+
+# Maksymalny bok miniatury obrazu inline (px)
+THUMBNAIL_MAX_PX = 480
+# Obrazy mniejsze niż ten rozmiar (bajty) nie są przeliczane
+THUMBNAIL_MIN_BYTES = 32 * 1024
+
+# Biała lista znaczników HTML dla podglądu
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "center", "code", "div", "em", "font",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "li", "ol", "p", "pre",
+    "s", "small", "span", "strong", "sub", "sup", "table", "tbody", "td", "tfoot",
+    "th", "thead", "tr", "u", "ul",
+}
+VOID_TAGS = {"br", "hr", "img"}
+
+# Znaczniki usuwane razem z zawartością
+DROP_CONTENT_TAGS = {
+    "script", "style", "head", "title", "iframe", "object", "embed", "noscript",
+    "template", "svg", "math", "form",
+}
+
+ALLOWED_ATTRIBUTES = {
+    "align", "alt", "bgcolor", "border", "cellpadding", "cellspacing", "color",
+    "colspan", "face", "height", "href", "rowspan", "size", "src", "style",
+    "title", "valign", "width",
+}
+
+_SAFE_HREF_RE = re.compile(r'^\s*(https?:|mailto:|#)', re.IGNORECASE)
+_UNSAFE_CSS_RE = re.compile(r'(expression\s*\(|url\s*\(|javascript:|@import|behavior\s*:)', re.IGNORECASE)
+_DATA_URI_RE = re.compile(r'^data:(image/[\w.+-]+);base64,(.*)$', re.IGNORECASE | re.DOTALL)
+
+
+# ==================== DEKODOWANIE ====================
+
+def decode_header_value(header_text: Any) -> str:
+    """Dekoduje nagłówek (RFC 2047)"""
+    if not header_text:
+        return ""
+    result = []
+    for part, encoding in decode_header(str(header_text)):
+        if isinstance(part, bytes):
+            try:
+                result.append(part.decode(encoding or "utf-8", errors="ignore"))
+            except (LookupError, UnicodeDecodeError):
+                result.append(part.decode("utf-8", errors="ignore"))
+        else:
+            result.append(str(part))
+    return " ".join(result)
+
+
+def _decode_payload(part: Message) -> str:
+    """Dekoduje treść części (transfer-encoding + charset)"""
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ""
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="ignore")
+    except (UnicodeDecodeError, LookupError):
+        return payload.decode("utf-8", errors="ignore")
+
+
+def html_to_plain_text(html: str) -> str:
+    """Konwertuje HTML na tekst z zachowaniem podziału na linie"""
+    text = re.sub(r'<(style|script)[^>]*>.*?</\1>', '', html or "", flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<br\s*/?>', '\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'</p>', '\n\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'</(div|tr)>', '\n', text, flags=re.IGNORECASE)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = unescape(text)
+    lines = [line.strip() for line in text.split('\n')]
+    return '\n'.join(line for line in lines if line)
+
+
+# ==================== MINIATURY ====================
+
+def make_thumbnail(data: bytes, max_px: int = THUMBNAIL_MAX_PX) -> Optional[Tuple[bytes, str]]:
+    """
+    Zmniejsza obraz do miniatury (QImage działa bez QApplication).
+
+    Returns:
+        (dane, typ MIME) lub None, gdy obrazu nie da się wczytać
+    """
+    try:
+        from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+        from PyQt6.QtGui import QImage
+    except ImportError:
+        return None
+
+    image = QImage()
+    if not image.loadFromData(data):
+        return None
+    if len(data) < THUMBNAIL_MIN_BYTES and max(image.width(), image.height()) <= max_px:
+        if data[:4] == b"\x89PNG":
+            return data, "image/png"
+        if data[:4] == b"GIF8":
+            return data, "image/gif"
+        return data, "image/jpeg"
+
+    if max(image.width(), image.height()) > max_px:
+        from PyQt6.QtCore import Qt
+        image = image.scaled(
+            max_px, max_px,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+
+    buffer_data = QByteArray()
+    buffer = QBuffer(buffer_data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    if image.hasAlphaChannel():
+        image.save(buffer, "PNG")
+        content_type = "image/png"
+    else:
+        image.save(buffer, "JPEG", 75)
+        content_type = "image/jpeg"
+    buffer.close()
+    return bytes(buffer_data.data()), content_type
+
+
+def _image_data_uri(data: bytes) -> Optional[str]:
+    thumbnail = make_thumbnail(data)
+    if thumbnail is None:
+        return None
+    thumb_data, content_type = thumbnail
+    return f"data:{content_type};base64,{base64.b64encode(thumb_data).decode('ascii')}"
+
+
+# ==================== SANITYZACJA ====================
+
+class _HtmlSanitizer(HTMLParser):
+    """Przepisuje HTML zostawiając tylko znaczniki i atrybuty z białej listy"""
+
+    def __init__(self, inline_images: Dict[str, bytes]):
+        super().__init__(convert_charrefs=True)
+        self.inline_images = inline_images
+        self._thumbnails: Dict[str, Optional[str]] = {}
+        self._out: List[str] = []
+        self._drop_depth = 0
+        self._open_tags: List[str] = []
+
+    def result(self) -> str:
+        for tag in reversed(self._open_tags):
+            self._out.append(f"</{tag}>")
+        self._open_tags = []
+        return "".join(self._out)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self._drop_depth += 1
+            return
+        if self._drop_depth or tag not in ALLOWED_TAGS:
+            return
+
+        if tag == "img":
+            self._out.append(self._image(dict(attrs)))
+            return
+
+        clean = self._clean_attributes(tag, attrs)
+        self._out.append(f"<{tag}{clean}>")
+        if tag not in VOID_TAGS:
+            self._open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag in self._open_tags and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self._drop_depth = max(0, self._drop_depth - 1)
+            return
+        if self._drop_depth or tag not in self._open_tags:
+            return
+        # Zamknij także niedomknięte znaczniki wewnątrz
+        while self._open_tags:
+            open_tag = self._open_tags.pop()
+            self._out.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self._drop_depth:
+            self._out.append(escape(data, quote=False))
+
+    def _clean_attributes(self, tag: str, attrs) -> str:
+        parts = []
+        for name, value in attrs:
+            name = (name or "").lower()
+            if name not in ALLOWED_ATTRIBUTES or name == "src":
+                continue
+            value = value or ""
+            if name == "href" and not _SAFE_HREF_RE.match(value):
+                continue
+            if name == "style":
+                if _UNSAFE_CSS_RE.search(value):
+                    continue
+            parts.append(f' {name}="{escape(value)}"')
+        return "".join(parts)
+
+    def _image(self, attrs: Dict[str, Optional[str]]) -> str:
+        """Obraz inline -> miniatura data:, obraz zdalny -> tekst alternatywny"""
+        src = (attrs.get("src") or "").strip()
+        alt = attrs.get("alt") or ""
+        data: Optional[bytes] = None
+
+        if src.lower().startswith("cid:"):
+            data = self.inline_images.get(src[4:].strip("<>").lower())
+        else:
+            match = _DATA_URI_RE.match(src)
+            if match:
+                try:
+                    data = base64.b64decode(match.group(2), validate=False)
+                except (ValueError, TypeError):
+                    data = None
+
+        if data is not None:
+            if src not in self._thumbnails:
+                self._thumbnails[src] = _image_data_uri(data)
+            uri = self._thumbnails[src]
+            if uri:
+                return f'<img src="{uri}" alt="{escape(alt)}">'
+
+        # Zdalne obrazy nie są pobierane (prywatność, śledzenie otwarć)
+        return f"[🖼 {escape(alt)}]" if alt else ""
+
+
+def sanitize_display_html(html: str, inline_images: Optional[Dict[str, bytes]] = None) -> str:
+    """
+    Zwraca bezpieczny HTML do QTextEdit.setHtml.
+
+    Args:
+        html: Surowy HTML wiadomości
+        inline_images: Content-ID (małe litery, bez <>) -> dane obrazu
+    """
+    sanitizer = _HtmlSanitizer(inline_images or {})
+    try:
+        sanitizer.feed(html or "")
+        sanitizer.close()
+    except Exception as e:
+        logger.warning(f"[MimePipeline] HTML sanitize error: {e}")
+    return sanitizer.result()
+
+
+def text_to_display_html(text: str) -> str:
+    """Treść tekstowa jako HTML (escape + zachowanie łamania linii)"""
+    return f'<div style="white-space: pre-wrap;">{escape(text or "")}</div>'
+
+
+def render_display(body: str, html_body: str = "", inline_images: Optional[Dict[str, bytes]] = None) -> Dict[str, str]:
+    """Przygotowuje display_html i preview dla już sparsowanej treści"""
+    if html_body:
+        display_html = sanitize_display_html(html_body, inline_images)
+        text = body or html_to_plain_text(html_body)
+    else:
+        display_html = text_to_display_html(body)
+        text = body or ""
+    return {
+        "display_html": display_html,
+        "body_preview": text[:PREVIEW_LENGTH],
+    }
+
+
+# ==================== PARSOWANIE ====================
+
+def parse_message(raw: bytes) -> Dict[str, Any]:
+    """
+    Parsuje pełną wiadomość RFC822 (wywoływane w procesie roboczym).
+
+    Returns:
+        Słownik z polami maila (subject, from, date, body, display_html,
+        body_preview, size, attachments, nagłówki wątkowania)
+    """
+    message = email.message_from_bytes(raw)
+
+    subject = decode_header_value(message.get("Subject", ""))
+    date_str = message.get("Date", "") or ""
+    try:
+        formatted_date = parsedate_to_datetime(date_str).strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError, IndexError):
+        formatted_date = date_str[:16]
+
+    body = ""
+    html_body = ""
+    attachments: List[Dict[str, Any]] = []
+    inline_images: Dict[str, bytes] = {}
+
+    for part in message.walk() if message.is_multipart() else [message]:
+        if part.is_multipart():
+            continue
+        content_type = part.get_content_type()
+        disposition = str(part.get("Content-Disposition", ""))
+        content_id = (part.get("Content-ID") or "").strip().strip("<>").lower()
+
+        try:
+            if content_type == "text/plain" and "attachment" not in disposition:
+                if not body:
+                    body = _decode_payload(part)
+            elif content_type == "text/html" and "attachment" not in disposition:
+                if not html_body:
+                    html_body = _decode_payload(part)
+            elif content_type.startswith("image/") and content_id and "attachment" not in disposition:
+                # Obraz osadzony (cid:) - tylko do miniatury w treści
+                inline_images[content_id] = part.get_payload(decode=True) or b""
+            elif "attachment" in disposition or part.get_filename():
+                filename = part.get_filename()
+                if filename:
+                    data = part.get_payload(decode=True) or b""
+                    attachments.append({
+                        "filename": decode_header_value(filename),
+                        "size": len(data),
+                        "data": data,
+                        "content_type": content_type,
+                    })
+        except Exception as e:
+            logger.warning(f"[MimePipeline] Error decoding {content_type}: {e}")
+
+    if not body and html_body:
+        body = html_to_plain_text(html_body)
+
+    rendered = render_display(body, html_body, inline_images)
+    return {
+        "subject": subject or "(Bez tematu)",
+        "from": decode_header_value(message.get("From", "")),
+        "date": formatted_date,
+        "body": body or "Plain text version not available",
+        "display_html": rendered["display_html"],
+        "body_preview": rendered["body_preview"],
+        "size": f"{len(raw) // 1024} KB",
+        "attachments": attachments,
+        # Nagłówki wątkowania (RFC 5256)
+        "message_id": (message.get("Message-ID") or "").strip(),
+        "in_reply_to": (message.get("In-Reply-To") or "").strip(),
+        "references": " ".join((message.get("References") or "").split()),
+    }
+
+
+def parse_headers(raw_header: bytes, size: int = 0) -> Dict[str, Any]:
+    """
+    Parsuje same nagłówki wiadomości (pobieranie bez treści - BODY.PEEK[HEADER]).
+
+    Treść, podgląd i załączniki uzupełnia później parse_message.
+    """
+    message = email.message_from_bytes(raw_header)
+
+    date_str = message.get("Date", "") or ""
+    try:
+        formatted_date = parsedate_to_datetime(date_str).strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError, IndexError):
+        formatted_date = date_str[:16]
+
+    return {
+        "subject": decode_header_value(message.get("Subject", "")) or "(Bez tematu)",
+        "from": decode_header_value(message.get("From", "")),
+        "to": decode_header_value(message.get("To", "")),
+        "date": formatted_date,
+        "size": f"{size // 1024} KB",
+        "attachments": [],
+        "message_id": (message.get("Message-ID") or "").strip(),
+        "in_reply_to": (message.get("In-Reply-To") or "").strip(),
+        "references": " ".join((message.get("References") or "").split()),
+    }
+
+
+# ==================== PULA ROBOCZA ====================
+
+class MimePipeline(QObject):
+    """
+    Pula procesów parsująca wiadomości i przygotowująca HTML do podglądu.
+
+    Sygnały są emitowane z wątku puli - Qt dostarcza je do wątku GUI
+    (połączenie kolejkowane).
+    """
+
+    parsed = pyqtSignal(str, dict)     # klucz, wynik parse_message
+    rendered = pyqtSignal(str, dict)   # uid, wynik render_display
+    failed = pyqtSignal(str, str)      # klucz, komunikat błędu
+
+    def __init__(self, parent: Optional[QObject] = None, max_workers: Optional[int] = None):
+        super().__init__(parent)
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        # _pending zmieniają wątek GUI (_submit) i wątek puli (callback zakończenia)
+        self._pending: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError, ImportError) as e:
+                # Środowiska bez multiprocessing (np. część aplikacji zamrożonych)
+                logger.warning(f"[MimePipeline] Process pool unavailable, using threads: {e}")
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _submit(self, key: str, signal, fn, *args):
+        with self._pending_lock:
+            if key in self._pending:
+                return
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except RuntimeError as e:
+                # Pula zamknięta lub uszkodzona (BrokenProcessPool)
+                future = None
+                error = str(e)
+            else:
+                self._pending[key] = future
+        if future is None:
+            self.failed.emit(key, error)
+            return
+
+        def _done(done_future: Future, key=key):
+            with self._pending_lock:
+                if self._pending.get(key) is done_future:
+                    del self._pending[key]
+            try:
+                signal.emit(key, done_future.result())
+            except Exception as e:
+                logger.warning(f"[MimePipeline] Task {key} failed: {e}")
+                self.failed.emit(key, str(e))
+
+        future.add_done_callback(_done)
+
+    def parse(self, key: str, raw: bytes):
+        """Asynchronicznie parsuje wiadomość; wynik w sygnale parsed"""
+        self._submit(key, self.parsed, parse_message, raw)
+
+    def render(self, uid: str, body: str, html_body: str = ""):
+        """Asynchronicznie przygotowuje display_html; wynik w sygnale rendered"""
+        self._submit(uid, self.rendered, render_display, body, html_body)
+
+    def parse_many(self, raws: List[bytes]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Parsuje wiele wiadomości równolegle (blokująco - dla wątków roboczych).
+
+        Wiadomości, których nie udało się sparsować, mają wynik None.
+        """
+        if not raws:
+            return []
+        futures = [self._get_executor().submit(parse_message, raw) for raw in raws]
+        results: List[Optional[Dict[str, Any]]] = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.warning(f"[MimePipeline] Message parse failed: {e}")
+                results.append(None)
+        return results
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        with self._pending_lock:
+            self._pending.clear()
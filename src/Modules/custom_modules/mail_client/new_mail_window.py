@@ -20,9 +20,9 @@ import json
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from PyQt6.QtCore import Qt, QMimeData, QUrl, QTimer, pyqtSignal
+from PyQt6.QtCore import Qt, QMimeData, QStringListModel, QUrl, QTimer, pyqtSignal
 from PyQt6.QtGui import QAction, QBrush, QColor, QDrag, QFont, QTextCursor
 from PyQt6.QtWidgets import (
     QAbstractItemView,
@@ -48,6 +48,11 @@ from PyQt6.QtWidgets import (
     QSizePolicy,
 )
 
+try:
+    from .contact_index import ContactIndex
+except ImportError:
+    from contact_index import ContactIndex
+
 
 class AttachmentListWidget(QListWidget):
     """Lista załączników obsługująca przeciąganie plików."""
@@ -163,6 +168,51 @@ class ComposeRecentFavoritesListWidget(QListWidget):
         drag.exec(Qt.DropAction.CopyAction)
 
 
+class RecipientCompleter(QCompleter):
+    """Podpowiedzi adresatów z indeksu kontaktów dla pola z wieloma adresami (po przecinku)."""
+
+    def __init__(self, contact_index: ContactIndex, line_edit: QLineEdit, limit: int = 10) -> None:
+        super().__init__(line_edit)
+        self.contact_index = contact_index
+        self.limit = limit
+        self._line_edit = line_edit
+        self._model = QStringListModel(self)
+        self.setModel(self._model)
+        self.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        # Model zawiera już przefiltrowane i posortowane wyniki z indeksu
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setWidget(line_edit)
+        line_edit.textEdited.connect(self._update_suggestions)
+        self.activated.connect(self._insert_address)
+
+    def _token_bounds(self) -> Tuple[int, int]:
+        """Zakres (początek, koniec) adresu pod kursorem"""
+        text = self._line_edit.text()
+        cursor = self._line_edit.cursorPosition()
+        start = text.rfind(",", 0, cursor) + 1
+        end = text.find(",", cursor)
+        return start, len(text) if end < 0 else end
+
+    def _update_suggestions(self, text: str) -> None:
+        start, end = self._token_bounds()
+        prefix = text[start:end].strip()
+        suggestions = self.contact_index.suggest(prefix, self.limit) if prefix else []
+        self._model.setStringList(suggestions)
+        if suggestions:
+            self.complete()
+        else:
+            self.popup().hide()
+
+    def _insert_address(self, address: str) -> None:
+        text = self._line_edit.text()
+        start, end = self._token_bounds()
+        before = text[:start].rstrip()
+        after = text[end:].lstrip(", ")
+        new_text = (f"{before} " if before else "") + f"{address}, "
+        self._line_edit.setText(new_text + after)
+        self._line_edit.setCursorPosition(len(new_text))
+
+
 class NewMailWindow(QDialog):
     """Okno tworzenia nowej wiadomości email"""
     
@@ -180,7 +230,7 @@ class NewMailWindow(QDialog):
         self.attachments: List[str] = []
         self._attachment_lookup: set[str] = set()
         self.signatures = self.load_signatures()
-        self.email_addresses = self.collect_email_addresses()  # Zbierz adresy do autouzupełniania
+        self.contact_index = self.load_contact_index()  # Indeks adresów do autouzupełniania
         
         # Auto-zapisywanie szkiców
         self.draft_file = Path("mail_client/drafts") / f"draft_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -343,10 +393,7 @@ class NewMailWindow(QDialog):
         self.to_field = QLineEdit()
         self.to_field.setPlaceholderText("adresat@email.com (oddziel przecinkiem dla wielu)")
         # Autouzupełnianie dla pola Do
-        to_completer = QCompleter(self.email_addresses)
-        to_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        to_completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        self.to_field.setCompleter(to_completer)
+        self.to_completer = RecipientCompleter(self.contact_index, self.to_field)
         to_layout.addWidget(self.to_field)
         
         # Przycisk rozwijania DW/UDW
@@ -378,10 +425,7 @@ class NewMailWindow(QDialog):
         self.cc_label = QLabel("DW:")
         self.cc_field = QLineEdit()
         self.cc_field.setPlaceholderText("kopia@email.com")
-        cc_completer = QCompleter(self.email_addresses)
-        cc_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        cc_completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        self.cc_field.setCompleter(cc_completer)
+        self.cc_completer = RecipientCompleter(self.contact_index, self.cc_field)
         self.cc_label.setVisible(False)
         self.cc_field.setVisible(False)
         form_layout.addRow(self.cc_label, self.cc_field)
@@ -390,10 +434,7 @@ class NewMailWindow(QDialog):
         self.bcc_label = QLabel("UDW:")
         self.bcc_field = QLineEdit()
         self.bcc_field.setPlaceholderText("ukryta.kopia@email.com")
-        bcc_completer = QCompleter(self.email_addresses)
-        bcc_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        bcc_completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        self.bcc_field.setCompleter(bcc_completer)
+        self.bcc_completer = RecipientCompleter(self.contact_index, self.bcc_field)
         self.bcc_label.setVisible(False)
         self.bcc_field.setVisible(False)
         form_layout.addRow(self.bcc_label, self.bcc_field)
@@ -1195,6 +1236,11 @@ class NewMailWindow(QDialog):
             )
             if reply == QMessageBox.StandardButton.No:
                 return
+        
+        # Adresaci trafiają do indeksu kontaktów (częstość, ostatni kontakt)
+        self.contact_index.record_sent(
+            self.to_field.text(), self.cc_field.text(), self.bcc_field.text()
+        )
                 
         # Symulacja wysyłania
         QMessageBox.information(
@@ -1289,6 +1335,17 @@ class NewMailWindow(QDialog):
                 return []
         return []
     
+    def load_contact_index(self) -> ContactIndex:
+        """Indeks kontaktów z cache; bez cache - indeks w pamięci z adresów z kont i maili"""
+        cache_integration = getattr(self.mail_view_parent, "cache_integration", None)
+        if cache_integration is not None:
+            return cache_integration.cache.contact_index
+        
+        contact_index = ContactIndex()
+        for email in self.collect_email_addresses():
+            contact_index.add("", email)
+        return contact_index
+    
     def collect_email_addresses(self):
         """Zbiera wszystkie unikalne adresy email z różnych źródeł"""
         emails = set()
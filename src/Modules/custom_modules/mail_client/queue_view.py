@@ -2,13 +2,14 @@
 Widok kolejki wiadomości - pozwala na szybką obsługę nieopowiedzianej poczty
 """
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QScrollArea,
-    QLabel, QComboBox, QCheckBox, QTextEdit, QFrame, QLineEdit
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListView,
+    QLabel, QComboBox, QCheckBox, QTextEdit, QFrame, QLineEdit,
+    QStyledItemDelegate, QAbstractItemView
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QAbstractListModel, QModelIndex, QPoint, QSize
 from PyQt6.QtGui import QColor, QPalette
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from pathlib import Path
 import json
 
@@ -21,13 +22,22 @@ class MailQueueCard(QFrame):
     spam_clicked = pyqtSignal(dict)  # mail
     replied_changed = pyqtSignal(dict, bool)  # mail, is_replied
     note_changed = pyqtSignal(dict, str)  # mail, note_text
-    
-    def __init__(self, thread_mails: List[Dict[str, Any]], parent=None):
+    size_changed = pyqtSignal()  # rozwinięcie/zwinięcie - lista przelicza wysokość
+    
+    def __init__(
+        self,
+        thread_mails: List[Dict[str, Any]],
+        parent=None,
+        body_loader: Optional[Callable[[Dict[str, Any]], str]] = None,
+    ):
         super().__init__(parent)
         self.thread_mails = sorted(thread_mails, key=lambda m: m.get("date", ""), reverse=True)
         self.newest_mail = self.thread_mails[0]
         self.expanded = False
         self.reply_widget = None
+        # Treść ładowana dopiero przy pierwszym rozwinięciu (maile z cache nie mają body)
+        self.body_loader = body_loader
+        self._body_loaded = "body" in self.newest_mail
         
         self.setFrameStyle(QFrame.Shape.StyledPanel | QFrame.Shadow.Raised)
         self.setLineWidth(2)
@@ -171,7 +181,9 @@ class MailQueueCard(QFrame):
         self.body_edit = QTextEdit()
         self.body_edit.setReadOnly(True)
         self.body_edit.setMaximumHeight(200)
-        self.body_edit.setPlainText(self.newest_mail.get("body", "(brak treści)"))
+        self.body_edit.setPlainText(
+            self.newest_mail.get("body") or self.newest_mail.get("body_preview") or "(brak treści)"
+        )
         self.body_edit.setStyleSheet("background-color: #FAFAFA; color: #212121; border: 1px solid #E0E0E0; padding: 8px;")
         self.content_layout.addWidget(self.body_edit)
         
@@ -224,6 +236,11 @@ class MailQueueCard(QFrame):
         self.expanded = not self.expanded
         
         if self.expanded:
+            if not self._body_loaded and self.body_loader is not None:
+                self._body_loaded = True
+                body = self.body_loader(self.newest_mail)
+                if body:
+                    self.body_edit.setPlainText(body)
             self.content_widget.show()
             self.expand_btn.setText("▲ Zwiń")
         else:
@@ -232,6 +249,7 @@ class MailQueueCard(QFrame):
             # Ukryj okno odpowiedzi przy zwijaniu
             if self.reply_container:
                 self.reply_container.hide()
+        self.size_changed.emit()
     
     def on_reply_clicked(self):
         """Obsługa kliknięcia przycisku Odpowiedz"""
@@ -265,6 +283,7 @@ class MailQueueCard(QFrame):
             
             self.reply_container_layout.addWidget(reply_window)
             self.reply_container.show()
+            self.size_changed.emit()
             
         except Exception as e:
             print(f"Błąd podczas tworzenia okna odpowiedzi: {e}")
@@ -283,6 +302,7 @@ class MailQueueCard(QFrame):
         self.expanded = False
         self.content_widget.hide()
         self.expand_btn.setText("▼ Rozwiń")
+        self.size_changed.emit()
         
         # Emit sygnał
         self.reply_clicked.emit(self.newest_mail)
@@ -323,13 +343,147 @@ class MailQueueCard(QFrame):
         self.tag_label.setStyleSheet(f"color: {color}; font-style: italic; font-size: 9pt; font-weight: bold;")
 
 
+
+
+class ReplyQueueModel(QAbstractListModel):
+    """Model kolejki - jeden wiersz = jeden wątek; wątki z cache ładowane oknami"""
+    
+    ThreadRole = Qt.ItemDataRole.UserRole + 1
+    KeyRole = Qt.ItemDataRole.UserRole + 2
+    
+    PAGE_SIZE = 50
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._threads: List[List[Dict[str, Any]]] = []
+        self._total = 0
+        # (cache_integration, newer_than, older_than) lub None dla listy w pamięci
+        self._cache_source: Optional[Tuple[Any, Optional[str], Optional[str]]] = None
+        self._next_offset = 0
+    
+    def set_threads(self, threads: List[List[Dict[str, Any]]]):
+        """Ustawia gotową listę wątków (widok bez cache)"""
+        self.beginResetModel()
+        self._cache_source = None
+        self._threads = list(threads)
+        self._total = len(self._threads)
+        self.endResetModel()
+    
+    def set_cache_source(self, cache_integration, newer_than: Optional[str], older_than: Optional[str]):
+        """Kolejka z zapytania do cache - kolejne okna przez fetchMore"""
+        self.beginResetModel()
+        self._cache_source = (cache_integration, newer_than, older_than)
+        self._threads = []
+        self._next_offset = 0
+        self._total = cache_integration.count_reply_queue(newer_than, older_than)
+        self.endResetModel()
+    
+    def total_count(self) -> int:
+        return self._total
+    
+    @staticmethod
+    def thread_key(thread: List[Dict[str, Any]]) -> str:
+        newest = thread[0] if thread else {}
+        return newest.get("_uid") or str(id(newest))
+    
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        if parent.isValid() or self._cache_source is None:
+            return False
+        return len(self._threads) < self._total
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._cache_source is None:
+            return
+        cache_integration, newer_than, older_than = self._cache_source
+        batch = cache_integration.load_reply_queue(
+            self._next_offset, self.PAGE_SIZE, newer_than, older_than
+        )
+        self._next_offset += self.PAGE_SIZE
+        if not batch:
+            self._total = len(self._threads)
+            return
+        start = len(self._threads)
+        self.beginInsertRows(QModelIndex(), start, start + len(batch) - 1)
+        self._threads.extend(batch)
+        self.endInsertRows()
+    
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._threads)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._threads):
+            return None
+        thread = self._threads[index.row()]
+        if role == self.ThreadRole:
+            return thread
+        if role == self.KeyRole:
+            return self.thread_key(thread)
+        if role == Qt.ItemDataRole.DisplayRole:
+            return thread[0].get("subject", "")
+        return None
+    
+    def row_for_key(self, key: str) -> int:
+        for row, thread in enumerate(self._threads):
+            if self.thread_key(thread) == key:
+                return row
+        return -1
+    
+    def remove_thread(self, key: str) -> bool:
+        """Usuwa jeden wątek (po odpowiedzi/oznaczeniu) bez przeładowania kolejki"""
+        row = self.row_for_key(key)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._threads.pop(row)
+        self.endRemoveRows()
+        self._total = max(0, self._total - 1)
+        # Kolejne okno z cache jest przesunięte o usunięty wątek
+        if self._cache_source is not None:
+            self._next_offset = max(0, self._next_offset - 1)
+        return True
+
+
+class _QueueCardDelegate(QStyledItemDelegate):
+    """Wysokość wiersza = wysokość karty (lub domyślna dla wierszy bez karty)"""
+    
+    COLLAPSED_HEIGHT = 150
+    
+    def __init__(self, queue_view: "QueueView"):
+        super().__init__(queue_view)
+        self.queue_view = queue_view
+    
+    def sizeHint(self, option, index) -> QSize:
+        width = self.queue_view.list_view.viewport().width()
+        card = self.queue_view.cards.get(index.data(ReplyQueueModel.KeyRole))
+        if card is None:
+            return QSize(width, self.COLLAPSED_HEIGHT)
+        if card.hasHeightForWidth():
+            return QSize(width, card.heightForWidth(width))
+        return QSize(width, card.sizeHint().height())
+    
+    def paint(self, painter, option, index):
+        # Widoczne wiersze rysuje karta (index widget)
+        pass
+
+
 class QueueView(QWidget):
     """Główny widok kolejki wiadomości"""
     
+    # Ile wierszy poza ekranem utrzymywać z gotowymi kartami
+    CARD_MARGIN_ROWS = 2
+    
     def __init__(self, parent_view):
         super().__init__()
         self.parent_view = parent_view
-        self.cards: List[MailQueueCard] = []
+        # Karty istnieją tylko dla widocznych wierszy: klucz wątku -> karta
+        self.cards: Dict[str, MailQueueCard] = {}
+        self.age_colors: Optional[Dict[str, str]] = None
+        # Notatki zapisywane z opóźnieniem (nie przy każdym znaku)
+        self._pending_notes: Dict[str, str] = {}
+        self._note_timer = QTimer(self)
+        self._note_timer.setSingleShot(True)
+        self._note_timer.setInterval(800)
+        self._note_timer.timeout.connect(self.flush_notes)
         
         # ThemeManager (będzie pełna integracja w ETAPIE 3)
         try:
@@ -373,8 +527,8 @@ class QueueView(QWidget):
             /* Odśwież karty z nowymi kolorami */
         """)
         
-        # Odśwież kolory wszystkich istniejących kart
-        for card in self.cards:
+        # Odśwież kolory istniejących (widocznych) kart
+        for card in self.cards.values():
             card.update_background_color_themed(self.age_colors)
     
     def init_ui(self):
@@ -411,60 +565,72 @@ class QueueView(QWidget):
         
         layout.addLayout(top_panel)
         
-        # === OBSZAR PRZEWIJANIA Z KARTAMI ===
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        
-        self.cards_container = QWidget()
-        self.cards_layout = QVBoxLayout(self.cards_container)
-        self.cards_layout.setSpacing(12)
-        self.cards_layout.addStretch()
-        
-        scroll.setWidget(self.cards_container)
-        layout.addWidget(scroll)
+        # === WIRTUALIZOWANA LISTA KART ===
+        self.model = ReplyQueueModel(self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(_QueueCardDelegate(self))
+        self.list_view.setSpacing(6)
+        self.list_view.setUniformItemSizes(False)
+        self.list_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.list_view.setFrameShape(QFrame.Shape.NoFrame)
+        
+        # Karty tworzone/usuwane przy przewijaniu i zmianach modelu
+        self._sync_timer = QTimer(self)
+        self._sync_timer.setSingleShot(True)
+        self._sync_timer.setInterval(0)
+        self._sync_timer.timeout.connect(self.sync_visible_cards)
+        self.list_view.verticalScrollBar().valueChanged.connect(self._sync_timer.start)
+        self.model.rowsInserted.connect(self._sync_timer.start)
+        self.model.rowsRemoved.connect(self._on_rows_removed)
+        self.model.modelReset.connect(self._on_model_reset)
+        
+        layout.addWidget(self.list_view)
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._sync_timer.start()
+    
+    # ==================== ŁADOWANIE ====================
     
     def load_queue(self):
-        """Ładuje wiadomości do kolejki"""
-        # Pobierz wszystkie wątki z nieopowiedzianymi wiadomościami
-        threads = self.get_unanswered_threads()
-        
-        # Wyczyść obecne karty
-        self.clear_cards()
+        """Ładuje kolejkę (zapytanie do cache; karty powstają dopiero przy wyświetleniu)"""
+        self.flush_notes()
+        newer_than, older_than = self.get_time_range()
         
-        # Utwórz karty dla każdego wątku
-        for thread_mails in threads:
-            card = MailQueueCard(thread_mails)
-            
-            # Połącz sygnały
-            card.reply_clicked.connect(self.on_card_reply)
-            card.no_reply_needed_clicked.connect(self.on_card_no_reply)
-            card.spam_clicked.connect(self.on_card_spam)
-            card.replied_changed.connect(self.on_card_replied_changed)
-            card.note_changed.connect(self.on_card_note_changed)
-            
-            # Ustaw tagi autora
-            from_email = card.extract_email_address(card.newest_mail.get("from", ""))
-            if hasattr(self.parent_view, 'contact_tags') and from_email in self.parent_view.contact_tags:
-                tags = self.parent_view.contact_tags[from_email]
-                if tags:
-                    card.set_tag_text(", ".join(tags))
-            
-            self.cards_layout.insertWidget(self.cards_layout.count() - 1, card)
-            self.cards.append(card)
+        cache_integration = getattr(self.parent_view, "cache_integration", None)
+        if cache_integration is not None:
+            self.model.set_cache_source(cache_integration, newer_than, older_than)
+        else:
+            # Bez cache - grupowanie maili z pamięci
+            self.model.set_threads(self.get_unanswered_threads())
         
-        # Aktualizuj licznik
-        self.count_label.setText(f"Wiadomości: {len(threads)}")
+        self.update_count_label()
     
-    def clear_cards(self):
-        """Usuwa wszystkie karty"""
-        for card in self.cards:
-            card.deleteLater()
-        self.cards.clear()
+    def update_count_label(self):
+        self.count_label.setText(f"Wiadomości: {self.model.total_count()}")
+    
+    def get_time_range(self) -> Tuple[Optional[str], Optional[str]]:
+        """Zakres filtra jako (nowsze niż, starsze niż) w formacie dat maili"""
+        filter_text = self.time_filter.currentText()
+        now = datetime.now()
+        cutoffs = {
+            "Dzisiaj": now.replace(hour=0, minute=0, second=0, microsecond=0),
+            "Ostatnie 3 dni": now - timedelta(days=3),
+            "Ostatni tydzień": now - timedelta(days=7),
+            "Ostatnie 2 tygodnie": now - timedelta(days=14),
+            "Ostatni miesiąc": now - timedelta(days=30),
+        }
+        if filter_text == "Starsze niż miesiąc":
+            return None, (now - timedelta(days=30)).strftime("%Y-%m-%d %H:%M")
+        cutoff = cutoffs.get(filter_text)
+        return (cutoff.strftime("%Y-%m-%d %H:%M") if cutoff else None), None
     
     def get_unanswered_threads(self) -> List[List[Dict[str, Any]]]:
-        """Pobiera wątki z nieopowiedzianymi wiadomościami"""
-        # Grupuj maile w wątki
+        """Pobiera wątki z nieopowiedzianymi wiadomościami (z pamięci - bez cache)"""
         threads_dict = {}
         
         for folder_name, mails in self.parent_view.sample_mails.items():
@@ -478,23 +644,22 @@ class QueueView(QWidget):
                 
                 # Grupuj po temacie (normalizowanym)
                 subject = self.normalize_subject(mail.get("subject", ""))
-                if subject not in threads_dict:
-                    threads_dict[subject] = []
-                threads_dict[subject].append(mail)
+                threads_dict.setdefault(subject, []).append(mail)
         
-        # Konwertuj na listę i sortuj każdy wątek po dacie
-        threads = []
-        for subject, mails in threads_dict.items():
-            sorted_mails = sorted(mails, key=lambda m: m.get("date", ""), reverse=True)
-            threads.append(sorted_mails)
+        threads = [
+            sorted(mails, key=lambda m: m.get("date", ""), reverse=True)
+            for mails in threads_dict.values()
+        ]
         
         # Sortuj wątki według najstarszej wiadomości (od najstarszych)
         threads.sort(key=lambda thread: self.get_oldest_date(thread))
         
-        # Filtruj według wybranego zakresu czasu
-        filtered_threads = self.filter_by_time_range(threads)
-        
-        return filtered_threads
+        newer_than, older_than = self.get_time_range()
+        if newer_than:
+            threads = [t for t in threads if max(m.get("date", "") for m in t) >= newer_than]
+        if older_than:
+            threads = [t for t in threads if max(m.get("date", "") for m in t) < older_than]
+        return threads
     
     def normalize_subject(self, subject: str) -> str:
         """Normalizuje temat usuwając Re:, Fwd: itp."""
@@ -509,67 +674,120 @@ class QueueView(QWidget):
         dates = [m.get("date", "") for m in thread if m.get("date")]
         return min(dates) if dates else ""
     
-    def filter_by_time_range(self, threads: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
-        """Filtruje wątki według wybranego zakresu czasu"""
-        filter_text = self.time_filter.currentText()
-        
-        if filter_text == "Wszystkie":
-            return threads
-        
-        now = datetime.now()
-        cutoff_date = None
-        
-        if filter_text == "Dzisiaj":
-            cutoff_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif filter_text == "Ostatnie 3 dni":
-            cutoff_date = now - timedelta(days=3)
-        elif filter_text == "Ostatni tydzień":
-            cutoff_date = now - timedelta(days=7)
-        elif filter_text == "Ostatnie 2 tygodnie":
-            cutoff_date = now - timedelta(days=14)
-        elif filter_text == "Ostatni miesiąc":
-            cutoff_date = now - timedelta(days=30)
-        elif filter_text == "Starsze niż miesiąc":
-            cutoff_date = now - timedelta(days=30)
-            # Odwrotna logika
-            return [
-                thread for thread in threads
-                if self.is_thread_older_than(thread, cutoff_date)
-            ]
-        
-        if cutoff_date:
-            return [
-                thread for thread in threads
-                if self.is_thread_newer_than(thread, cutoff_date)
-            ]
+    # ==================== WIRTUALIZACJA KART ====================
+    
+    def visible_row_range(self) -> Tuple[int, int]:
+        """Zakres wierszy na ekranie (z marginesem), (-1, -1) gdy lista pusta"""
+        rows = self.model.rowCount()
+        if rows == 0:
+            return -1, -1
+        viewport = self.list_view.viewport()
+        first_index = self.list_view.indexAt(QPoint(1, 1))
+        last_index = self.list_view.indexAt(QPoint(1, viewport.height() - 2))
+        first = first_index.row() if first_index.isValid() else 0
+        last = last_index.row() if last_index.isValid() else rows - 1
+        return (
+            max(0, first - self.CARD_MARGIN_ROWS),
+            min(rows - 1, last + self.CARD_MARGIN_ROWS),
+        )
+    
+    def sync_visible_cards(self):
+        """Tworzy karty dla widocznych wierszy i usuwa karty, które wyszły poza ekran"""
+        first, last = self.visible_row_range()
+        visible_keys = set()
+        created = False
+        
+        if first >= 0:
+            for row in range(first, last + 1):
+                index = self.model.index(row)
+                key = index.data(ReplyQueueModel.KeyRole)
+                visible_keys.add(key)
+                if key not in self.cards:
+                    card = self.create_card(index.data(ReplyQueueModel.ThreadRole))
+                    self.cards[key] = card
+                    self.list_view.setIndexWidget(index, card)
+                    created = True
+        
+        for key in [k for k in self.cards if k not in visible_keys]:
+            card = self.cards.pop(key)
+            row = self.model.row_for_key(key)
+            if row >= 0:
+                self.list_view.setIndexWidget(self.model.index(row), None)
+            else:
+                card.deleteLater()
+        
+        if created:
+            # Nowe karty mogą mieć inną wysokość niż domyślna
+            self.list_view.doItemsLayout()
+    
+    def create_card(self, thread_mails: List[Dict[str, Any]]) -> MailQueueCard:
+        """Tworzy kartę wątku i podłącza sygnały"""
+        card = MailQueueCard(thread_mails, body_loader=self._load_body)
+        if self.age_colors:
+            card.update_background_color_themed(self.age_colors)
         
-        return threads
+        card.reply_clicked.connect(self.on_card_reply)
+        card.no_reply_needed_clicked.connect(self.on_card_no_reply)
+        card.spam_clicked.connect(self.on_card_spam)
+        card.replied_changed.connect(self.on_card_replied_changed)
+        card.note_changed.connect(self.on_card_note_changed)
+        card.size_changed.connect(lambda c=card: self.on_card_size_changed(c))
+        
+        # Ustaw tagi autora
+        from_email = card.extract_email_address(card.newest_mail.get("from", ""))
+        contact_tags = getattr(self.parent_view, 'contact_tags', {})
+        if contact_tags.get(from_email):
+            card.set_tag_text(", ".join(contact_tags[from_email]))
+        return card
+    
+    def _load_body(self, mail: Dict[str, Any]) -> str:
+        if hasattr(self.parent_view, 'get_mail_body'):
+            return self.parent_view.get_mail_body(mail)
+        return mail.get("body", "")
+    
+    def on_card_size_changed(self, card: MailQueueCard):
+        """Karta rozwinięta/zwinięta - przelicz wysokość jednego wiersza"""
+        row = self.model.row_for_key(ReplyQueueModel.thread_key(card.thread_mails))
+        if row >= 0:
+            self.list_view.itemDelegate().sizeHintChanged.emit(self.model.index(row))
+    
+    def _on_rows_removed(self, *_args):
+        # Karty usuniętych wierszy są zwalniane przez widok
+        self.cards = {k: c for k, c in self.cards.items() if self.model.row_for_key(k) >= 0}
+        self.update_count_label()
+        self._sync_timer.start()
+    
+    def _on_model_reset(self):
+        for card in self.cards.values():
+            card.deleteLater()
+        self.cards.clear()
+        self._sync_timer.start()
     
-    def is_thread_newer_than(self, thread: List[Dict[str, Any]], cutoff: datetime) -> bool:
-        """Sprawdza czy wątek ma przynajmniej jedną wiadomość nowszą niż cutoff"""
-        for mail in thread:
-            date_str = mail.get("date", "")
-            try:
-                if date_str:
-                    mail_date = datetime.strptime(date_str[:16], "%Y-%m-%d %H:%M")
-                    if mail_date >= cutoff:
-                        return True
-            except:
-                pass
-        return False
+    def clear_cards(self):
+        """Usuwa wszystkie karty"""
+        self._on_model_reset()
     
-    def is_thread_older_than(self, thread: List[Dict[str, Any]], cutoff: datetime) -> bool:
-        """Sprawdza czy wszystkie wiadomości w wątku są starsze niż cutoff"""
-        for mail in thread:
-            date_str = mail.get("date", "")
-            try:
-                if date_str:
-                    mail_date = datetime.strptime(date_str[:16], "%Y-%m-%d %H:%M")
-                    if mail_date >= cutoff:
-                        return False
-            except:
-                pass
-        return True
+    # ==================== AKCJE KART ====================
+    
+    def update_mail_state(self, mail: Dict[str, Any], updates: Dict[str, Any]):
+        """Zapisuje stan maila w cache i w kopii w pamięci (jeśli załadowana)"""
+        uid = mail.get("_uid")
+        if not uid:
+            return
+        mail.update(updates)
+        if hasattr(self.parent_view, 'find_mail_by_uid'):
+            found = self.parent_view.find_mail_by_uid(uid)
+            if found and found[1] is not mail:
+                found[1].update(updates)
+        cache_integration = getattr(self.parent_view, "cache_integration", None)
+        if cache_integration is not None:
+            cache_integration.update_mail_cache(uid, updates)
+    
+    def remove_card_for(self, mail: Dict[str, Any]):
+        """Usuwa z kolejki wątek, którego najnowszym mailem jest `mail`"""
+        key = mail.get("_uid") or str(id(mail))
+        # Po powrocie z sygnału karty - karta może być w trakcie obsługi zdarzenia
+        QTimer.singleShot(0, lambda: self.model.remove_thread(key))
     
     def on_filter_changed(self):
         """Obsługa zmiany filtra czasu"""
@@ -577,13 +795,13 @@ class QueueView(QWidget):
     
     def on_card_reply(self, mail):
         """Obsługa odpowiedzi na wiadomość"""
-        # Odśwież kolejkę po pewnym czasie (aby mail zniknął)
-        QTimer.singleShot(500, self.load_queue)
+        self.update_mail_state(mail, {"_replied": True})
+        self.remove_card_for(mail)
     
     def on_card_no_reply(self, mail):
         """Obsługa oznaczenia 'Bez odpowiedzi'"""
-        # Odśwież kolejkę
-        QTimer.singleShot(500, self.load_queue)
+        self.update_mail_state(mail, {"_no_reply_needed": True})
+        self.remove_card_for(mail)
     
     def on_card_spam(self, mail):
         """Obsługa oznaczenia jako spam"""
@@ -593,20 +811,30 @@ class QueueView(QWidget):
             self.add_to_spam_list(from_email)
         
         # Usuń mail z kolejki
-        self.load_queue()
+        self.remove_card_for(mail)
     
     def on_card_replied_changed(self, mail, is_replied):
         """Obsługa zmiany statusu odpowiedzi"""
-        # Jeśli zaznaczono jako odpowiedziano, odśwież kolejkę
+        self.update_mail_state(mail, {"_replied": is_replied})
         if is_replied:
-            QTimer.singleShot(500, self.load_queue)
+            self.remove_card_for(mail)
     
     def on_card_note_changed(self, mail, note_text):
         """Obsługa zmiany notatki"""
+        uid = mail.get("_uid")
+        if uid:
+            self._pending_notes[uid] = note_text
+            self._note_timer.start()
         # Zapisz notatkę w mail_view
         if hasattr(self.parent_view, 'save_mail_note'):
             self.parent_view.save_mail_note(mail, note_text)
     
+    def flush_notes(self):
+        """Zapisuje oczekujące notatki do cache"""
+        pending, self._pending_notes = self._pending_notes, {}
+        for uid, note_text in pending.items():
+            self.update_mail_state({"_uid": uid}, {"note": note_text})
+    
     def extract_email_address(self, from_field: str) -> str:
         """Wyodrębnia adres email"""
         import re
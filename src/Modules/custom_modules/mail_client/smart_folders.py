@@ -0,0 +1,496 @@
+"""
+Inteligentne foldery i zapisane wyszukiwania zmaterializowane w cache
+
+Funkcjonalność:
+- Definicja folderu to warunki w formacie filtrów z mail_filters.json
+  (field / operator / value) plus pola flag, tagów, rozmiaru i daty
+- Członkostwo w tabeli smart_folder_members, aktualizowane przyrostowo
+  przy zapisie i zmianie maila (tylko dotknięte uid)
+- Liczniki (wszystkie / nieprzeczytane) w smart_folder_counts, utrzymywane
+  przez triggery - odczyt liczników nie przegląda maili
+- Zmiana definicji przelicza folder w tle; foldery z datą względną
+  ("ostatnie 7 dni") są przeliczane okresowo (refresh_relative)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Wbudowane foldery: id -> (nazwa, ikona, definicja)
+BUILTIN_SMART_FOLDERS: Dict[str, Tuple[str, str, Dict[str, Any]]] = {
+    "builtin:unread": ("Nieodczytane", "📬", {
+        "conditions": [{"field": "read", "operator": "is_false"}],
+    }),
+    "builtin:attachments": ("Z załącznikami", "📎", {
+        "conditions": [{"field": "has_attachments", "operator": "is_true"}],
+    }),
+    "builtin:last7days": ("Ostatnie 7 dni", "📅", {
+        "conditions": [{"field": "date", "operator": "within_days", "value": 7}],
+    }),
+    "builtin:starred": ("Oznaczone gwiazdką", "⭐", {
+        "conditions": [{"field": "starred", "operator": "is_true"}],
+        "exclude_folders": ["Kosz", "Ulubione"],
+    }),
+    "builtin:large": ("Duże wiadomości", "📦", {
+        "conditions": [{"field": "size_bytes", "operator": "gte", "value": 1024 * 1024}],
+    }),
+}
+
+DEFAULT_EXCLUDED_FOLDERS = ["Kosz"]
+
+_TEXT_COLUMNS = {
+    "from": "mails.mail_from",
+    "to": "mails.mail_to",
+    "subject": "mails.subject",
+    "folder": "mails.folder",
+    "account": "mails.account",
+}
+_FLAG_COLUMNS = {"read": "mails.read", "starred": "mails.starred", "has_attachments": "mails.has_attachments"}
+_NUMBER_COLUMNS = {"size_bytes": "mails.size_bytes"}
+_NUMBER_OPERATORS = {"gte": ">=", "lte": "<=", "gt": ">", "lt": "<"}
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _text_clause(column: str, operator: str, value: str) -> Tuple[str, List[Any]]:
+    """Warunek tekstowy (bez rozróżniania wielkości liter, jak LIKE w SQLite)"""
+    escaped = _escape_like(value)
+    if operator == "equals":
+        return f"{column} = ? COLLATE NOCASE", [value]
+    if operator == "starts_with":
+        return f"{column} LIKE ? ESCAPE '\\'", [f"{escaped}%"]
+    if operator == "ends_with":
+        return f"{column} LIKE ? ESCAPE '\\'", [f"%{escaped}"]
+    if operator == "not_contains":
+        return f"IFNULL({column}, '') NOT LIKE ? ESCAPE '\\'", [f"%{escaped}%"]
+    return f"{column} LIKE ? ESCAPE '\\'", [f"%{escaped}%"]
+
+
+def compile_definition(definition: Dict[str, Any], now: Optional[datetime] = None) -> Tuple[str, List[Any], bool]:
+    """
+    Kompiluje definicję folderu do warunku WHERE na tabeli mails.
+
+    Returns:
+        (sql, parametry, czy warunek zależy od bieżącej daty)
+    """
+    now = now or datetime.now()
+    clauses: List[str] = []
+    params: List[Any] = []
+    relative = False
+
+    for condition in definition.get("conditions", []):
+        field = condition.get("field", "subject")
+        operator = condition.get("operator", "contains")
+        value = condition.get("value", "")
+
+        if field in _TEXT_COLUMNS:
+            if not str(value):
+                continue
+            sql, values = _text_clause(_TEXT_COLUMNS[field], operator, str(value))
+        elif field == "body":
+            if not str(value):
+                continue
+            negate = operator == "not_contains"
+            inner, values = _text_clause("b.body", "contains" if negate else operator, str(value))
+            sql = f"{'NOT ' if negate else ''}EXISTS (SELECT 1 FROM mail_bodies b WHERE b.uid = mails.uid AND {inner})"
+        elif field in _FLAG_COLUMNS:
+            sql, values = f"{_FLAG_COLUMNS[field]} = ?", [0 if operator == "is_false" else 1]
+        elif field == "tag":
+            exists = "EXISTS (SELECT 1 FROM json_each(mails.extra_data, '$.tags') WHERE value = ?)"
+            sql, values = (f"NOT {exists}" if operator == "not_contains" else exists), [str(value)]
+        elif field in _NUMBER_COLUMNS and operator in _NUMBER_OPERATORS:
+            sql, values = f"{_NUMBER_COLUMNS[field]} {_NUMBER_OPERATORS[operator]} ?", [float(value)]
+        elif field == "date" and operator == "within_days":
+            cutoff = now - timedelta(days=float(value or 0))
+            sql, values = "mails.date >= ?", [cutoff.strftime("%Y-%m-%d %H:%M")]
+            relative = True
+        else:
+            raise ValueError(f"Nieobsługiwany warunek: {field} {operator}")
+
+        clauses.append(f"({sql})")
+        params.extend(values)
+
+    joiner = " OR " if definition.get("match") == "any" else " AND "
+    where = joiner.join(clauses) if clauses else "1"
+
+    scope: List[str] = [f"({where})"]
+    excluded = definition.get("exclude_folders", DEFAULT_EXCLUDED_FOLDERS)
+    if excluded:
+        scope.append(f"mails.folder NOT IN ({', '.join('?' for _ in excluded)})")
+        params.extend(excluded)
+    if definition.get("account_email"):
+        scope.append("mails.account = ?")
+        params.append(definition["account_email"])
+
+    return " AND ".join(scope), params, relative
+
+
+def definition_from_filter(filter_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Definicja zapisanego wyszukiwania z filtra mail_filters.json (także starego formatu)"""
+    conditions = filter_data.get("conditions")
+    if not conditions and filter_data.get("field"):
+        conditions = [{
+            "field": filter_data.get("field"),
+            "operator": filter_data.get("operator", "contains"),
+            "value": filter_data.get("value", ""),
+        }]
+    definition: Dict[str, Any] = {
+        "conditions": [dict(c) for c in conditions or [] if isinstance(c, dict)],
+    }
+    account = filter_data.get("account_email") or filter_data.get("account")
+    if account:
+        definition["account_email"] = account
+    return definition
+
+
+def _definition_hash(definition: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(definition, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SmartFolderIndex:
+    """Zmaterializowane inteligentne foldery i zapisane wyszukiwania"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        # id -> {"name", "icon", "kind", "definition"}
+        self._folders: Dict[str, Dict[str, Any]] = {}
+        # Zwiększane po każdej zmianie członkostwa - widok sprawdza tylko ten licznik
+        self.version = 0
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._rebuild_queue: List[str] = []
+
+        self._init_database()
+        self._load()
+        self._ensure_builtin()
+
+    # ==================== PERSYSTENCJA ====================
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _init_database(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS smart_folders (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                icon TEXT,
+                kind TEXT DEFAULT 'smart',
+                definition TEXT NOT NULL,
+                evaluated_hash TEXT
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS smart_folder_members (
+                folder_id TEXT NOT NULL,
+                uid TEXT NOT NULL,
+                PRIMARY KEY (folder_id, uid)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_smart_members_uid ON smart_folder_members(uid)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS smart_folder_counts (
+                folder_id TEXT PRIMARY KEY,
+                total INTEGER NOT NULL DEFAULT 0,
+                unread INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+        # Liczniki utrzymywane przez triggery (członkostwo, zmiana read, usunięcie maila)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_smart_member_insert
+            AFTER INSERT ON smart_folder_members BEGIN
+                INSERT OR IGNORE INTO smart_folder_counts (folder_id, total, unread)
+                VALUES (NEW.folder_id, 0, 0);
+                UPDATE smart_folder_counts
+                SET total = total + 1,
+                    unread = unread + COALESCE((SELECT 1 - read FROM mails WHERE uid = NEW.uid), 0)
+                WHERE folder_id = NEW.folder_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_smart_member_delete
+            AFTER DELETE ON smart_folder_members BEGIN
+                UPDATE smart_folder_counts
+                SET total = total - 1,
+                    unread = unread - COALESCE((SELECT 1 - read FROM mails WHERE uid = OLD.uid), 0)
+                WHERE folder_id = OLD.folder_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_smart_mail_read
+            AFTER UPDATE OF read ON mails WHEN OLD.read IS NOT NEW.read BEGIN
+                UPDATE smart_folder_counts
+                SET unread = unread + (OLD.read - NEW.read)
+                WHERE folder_id IN (SELECT folder_id FROM smart_folder_members WHERE uid = NEW.uid);
+            END
+        """)
+        # BEFORE - trigger członkostwa musi jeszcze widzieć stan read maila
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_smart_mail_delete
+            BEFORE DELETE ON mails BEGIN
+                DELETE FROM smart_folder_members WHERE uid = OLD.uid;
+            END
+        """)
+        conn.commit()
+        conn.close()
+
+    def _load(self):
+        conn = self._connect()
+        rows = conn.execute("SELECT id, name, icon, kind, definition FROM smart_folders ORDER BY rowid").fetchall()
+        conn.close()
+        with self._lock:
+            for folder_id, name, icon, kind, definition in rows:
+                try:
+                    parsed = json.loads(definition)
+                except (TypeError, ValueError):
+                    continue
+                self._folders[folder_id] = {"name": name, "icon": icon or "🔎", "kind": kind, "definition": parsed}
+
+    def _ensure_builtin(self):
+        """Dodaje brakujące wbudowane foldery i przelicza foldery bez aktualnego wyniku"""
+        for folder_id, (name, icon, definition) in BUILTIN_SMART_FOLDERS.items():
+            if folder_id not in self._folders:
+                self.save_folder(folder_id, name, definition, icon=icon, kind="builtin", rebuild=False)
+
+        conn = self._connect()
+        evaluated = dict(conn.execute("SELECT id, evaluated_hash FROM smart_folders").fetchall())
+        conn.close()
+        stale = [
+            folder_id for folder_id, folder in self._folders.items()
+            if evaluated.get(folder_id) != _definition_hash(folder["definition"])
+        ]
+        self.rebuild_in_background(stale + self.relative_folder_ids())
+
+    # ==================== DEFINICJE ====================
+
+    def folders(self) -> List[Dict[str, Any]]:
+        """Lista folderów: id, name, icon, kind (builtin / smart / filter)"""
+        with self._lock:
+            return [{"id": folder_id, **{k: v for k, v in folder.items() if k != "definition"}}
+                    for folder_id, folder in self._folders.items()]
+
+    def folder_id_by_name(self, name: str) -> Optional[str]:
+        with self._lock:
+            for folder_id, folder in self._folders.items():
+                if folder["name"] == name:
+                    return folder_id
+        return None
+
+    def save_folder(
+        self,
+        folder_id: str,
+        name: str,
+        definition: Dict[str, Any],
+        icon: str = "🔎",
+        kind: str = "smart",
+        rebuild: bool = True,
+    ):
+        """Zapisuje definicję folderu; członkostwo przeliczane w tle"""
+        compile_definition(definition)  # Walidacja przed zapisem
+        conn = self._connect()
+        conn.execute(
+            """
+            INSERT INTO smart_folders (id, name, icon, kind, definition) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET name = excluded.name, icon = excluded.icon,
+                kind = excluded.kind, definition = excluded.definition
+            """,
+            (folder_id, name, icon, kind, json.dumps(definition, ensure_ascii=False))
+        )
+        conn.execute("INSERT OR IGNORE INTO smart_folder_counts (folder_id) VALUES (?)", (folder_id,))
+        conn.commit()
+        conn.close()
+        with self._lock:
+            previous = self._folders.get(folder_id)
+            self._folders[folder_id] = {"name": name, "icon": icon, "kind": kind, "definition": definition}
+        if rebuild and (previous is None or previous["definition"] != definition):
+            self.rebuild_in_background([folder_id])
+        self.version += 1
+
+    def remove_folder(self, folder_id: str):
+        """Usuwa folder wraz z członkostwem i licznikami"""
+        with self._lock:
+            self._folders.pop(folder_id, None)
+        conn = self._connect()
+        conn.execute("DELETE FROM smart_folder_members WHERE folder_id = ?", (folder_id,))
+        conn.execute("DELETE FROM smart_folder_counts WHERE folder_id = ?", (folder_id,))
+        conn.execute("DELETE FROM smart_folders WHERE id = ?", (folder_id,))
+        conn.commit()
+        conn.close()
+        self.version += 1
+
+    def _sync_kind(self, kind: str, wanted: Dict[str, Tuple[str, str, Dict[str, Any]]]):
+        """Ustawia foldery danego rodzaju na `wanted` (id -> nazwa, ikona, definicja)"""
+        with self._lock:
+            existing = {fid for fid, f in self._folders.items() if f["kind"] == kind}
+        for folder_id in existing - set(wanted):
+            self.remove_folder(folder_id)
+        for folder_id, (name, icon, definition) in wanted.items():
+            with self._lock:
+                current = self._folders.get(folder_id)
+            if current and (current["name"], current["icon"], current["definition"]) == (name, icon, definition):
+                continue
+            try:
+                self.save_folder(folder_id, name, definition, icon=icon, kind=kind)
+            except ValueError as e:
+                print(f"[SmartFolders] Pominięto {name}: {e}")
+
+    def sync_saved_filters(self, filters: Iterable[Dict[str, Any]]):
+        """Odwzorowuje włączone filtry z mail_filters.json na zapisane wyszukiwania"""
+        wanted: Dict[str, Tuple[str, str, Dict[str, Any]]] = {}
+        for filter_data in filters:
+            if not isinstance(filter_data, dict) or not filter_data.get("enabled", True):
+                continue
+            name = filter_data.get("name") or "Filtr"
+            definition = definition_from_filter(filter_data)
+            if not any(str(c.get("value", "")) for c in definition["conditions"]):
+                continue
+            wanted[f"filter:{name}"] = (name, "🔎", definition)
+        self._sync_kind("filter", wanted)
+
+    def sync_tag_folders(self, tag_names: Iterable[str]):
+        """Widoki tagów maili jako foldery (tag:<nazwa>)"""
+        wanted = {
+            f"tag:{name}": (name, "🏷️", {"conditions": [{"field": "tag", "operator": "contains", "value": name}]})
+            for name in tag_names if name
+        }
+        self._sync_kind("tag", wanted)
+
+    def relative_folder_ids(self) -> List[str]:
+        """Foldery zależne od bieżącej daty"""
+        with self._lock:
+            items = list(self._folders.items())
+        result = []
+        for folder_id, folder in items:
+            try:
+                if compile_definition(folder["definition"])[2]:
+                    result.append(folder_id)
+            except ValueError:
+                continue
+        return result
+
+    # ==================== CZŁONKOSTWO ====================
+
+    def _compiled(self) -> List[Tuple[str, str, List[Any]]]:
+        with self._lock:
+            items = list(self._folders.items())
+        compiled = []
+        for folder_id, folder in items:
+            try:
+                where, params, _ = compile_definition(folder["definition"])
+            except ValueError as e:
+                print(f"[SmartFolders] {folder['name']}: {e}")
+                continue
+            compiled.append((folder_id, where, params))
+        return compiled
+
+    def refresh_members(self, cursor: sqlite3.Cursor, uids: Iterable[str]):
+        """
+        Przelicza członkostwo podanych maili we wszystkich folderach.
+
+        Wywoływane w transakcji zapisu maila (kursor MailCache) - koszt
+        zależy od liczby zmienionych maili, nie od rozmiaru cache.
+        """
+        uids = [(uid,) for uid in set(uids) if uid]
+        if not uids:
+            return
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS smart_touched (uid TEXT PRIMARY KEY)")
+        cursor.execute("DELETE FROM smart_touched")
+        cursor.executemany("INSERT OR IGNORE INTO smart_touched (uid) VALUES (?)", uids)
+
+        for folder_id, where, params in self._compiled():
+            matching = f"SELECT mails.uid FROM mails JOIN smart_touched t ON t.uid = mails.uid WHERE {where}"
+            cursor.execute(
+                f"""
+                DELETE FROM smart_folder_members
+                WHERE folder_id = ? AND uid IN (SELECT uid FROM smart_touched)
+                  AND uid NOT IN ({matching})
+                """,
+                [folder_id, *params]
+            )
+            cursor.execute(
+                f"INSERT OR IGNORE INTO smart_folder_members (folder_id, uid) SELECT ?, uid FROM ({matching})",
+                [folder_id, *params]
+            )
+        cursor.execute("DELETE FROM smart_touched")
+        self.version += 1
+
+    def rebuild(self, folder_ids: Optional[Iterable[str]] = None):
+        """Przelicza całe członkostwo folderów (domyślnie wszystkich)"""
+        wanted = set(folder_ids) if folder_ids is not None else None
+        conn = self._connect()
+        try:
+            for folder_id, where, params in self._compiled():
+                if wanted is not None and folder_id not in wanted:
+                    continue
+                with self._lock:
+                    definition = self._folders.get(folder_id, {}).get("definition")
+                conn.execute("DELETE FROM smart_folder_members WHERE folder_id = ?", (folder_id,))
+                conn.execute(
+                    f"INSERT OR IGNORE INTO smart_folder_members (folder_id, uid) SELECT ?, mails.uid FROM mails WHERE {where}",
+                    [folder_id, *params]
+                )
+                # Pełne przeliczenie koryguje liczniki niezależnie od triggerów
+                conn.execute(
+                    f"""
+                    INSERT OR REPLACE INTO smart_folder_counts (folder_id, total, unread)
+                    SELECT ?, COUNT(*), IFNULL(SUM(1 - read), 0) FROM mails WHERE {where}
+                    """,
+                    [folder_id, *params]
+                )
+                conn.execute(
+                    "UPDATE smart_folders SET evaluated_hash = ? WHERE id = ?",
+                    (_definition_hash(definition) if definition is not None else None, folder_id)
+                )
+                conn.commit()
+                self.version += 1
+        finally:
+            conn.close()
+
+    def rebuild_in_background(self, folder_ids: Iterable[str]):
+        """Przelicza foldery w wątku w tle (kolejne żądania są dołączane do kolejki)"""
+        with self._lock:
+            for folder_id in folder_ids:
+                if folder_id not in self._rebuild_queue:
+                    self._rebuild_queue.append(folder_id)
+            if not self._rebuild_queue or (self._rebuild_thread and self._rebuild_thread.is_alive()):
+                return
+            self._rebuild_thread = threading.Thread(target=self._rebuild_worker, daemon=True)
+            self._rebuild_thread.start()
+
+    def _rebuild_worker(self):
+        while True:
+            with self._lock:
+                if not self._rebuild_queue:
+                    return
+                batch, self._rebuild_queue = self._rebuild_queue, []
+            try:
+                self.rebuild(batch)
+            except Exception as e:
+                print(f"[SmartFolders] Błąd przeliczania folderów: {e}")
+
+    def refresh_relative(self):
+        """Przelicza foldery z datą względną (wywoływane okresowo)"""
+        relative = self.relative_folder_ids()
+        if relative:
+            self.rebuild_in_background(relative)
+
+    # ==================== ODCZYT ====================
+
+    def counts(self) -> Dict[str, Tuple[int, int]]:
+        """Liczniki folderów: id -> (wszystkie, nieprzeczytane) - bez przeglądania maili"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT folder_id, total, unread FROM smart_folder_counts").fetchall()
+        finally:
+            conn.close()
+        return {folder_id: (total, unread) for folder_id, total, unread in rows}
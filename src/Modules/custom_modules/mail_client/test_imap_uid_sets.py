@@ -0,0 +1,111 @@
+"""
+Test zbiorów UID dla poleceń IMAP (imap_uid_set / expand_uid_set) i mapowania
+UID po przeniesieniu z odpowiedzi COPYUID - z serwerem-atrapą (bez sieci).
+
+Uruchomienie:
+    python src/Modules/custom_modules/mail_client/test_imap_uid_sets.py
+"""
+
+import sys
+from pathlib import Path
+
+# context_menu_emails używa importów względnych - ładowany jako część pakietu mail_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mail_client import context_menu_emails as actions
+
+
+class FakeImapConnection:
+    """Atrapa imaplib.IMAP4: zapisuje polecenia UID, zwraca zadane COPYUID"""
+
+    def __init__(self, capabilities, copyuid=None):
+        self.capabilities = tuple(capabilities)
+        self.commands = []
+        self._copyuid = copyuid
+        self._pending_copyuid = None
+
+    def uid(self, command, *args):
+        self.commands.append((command,) + args)
+        if command in ("MOVE", "COPY") and self._copyuid is not None:
+            self._pending_copyuid = self._copyuid
+        return "OK", [b""]
+
+    def response(self, code):
+        # Jak imaplib: odpowiedź nietagowana jest zwracana raz i usuwana
+        assert code == "COPYUID"
+        data, self._pending_copyuid = self._pending_copyuid, None
+        return code, data if data is not None else [None]
+
+
+def check_uid_sets():
+    assert actions.imap_uid_set([]) == ""
+    assert actions.imap_uid_set(["7"]) == "7"
+    assert actions.imap_uid_set([10, 9, 1, 2, 3, 7, 3]) == "1:3,7,9:10"
+    assert actions.imap_uid_set(["100", "101", "102", "200"]) == "100:102,200"
+
+    assert actions.expand_uid_set("4:6,9") == ["4", "5", "6", "9"]
+    assert actions.expand_uid_set("6:4") == ["4", "5", "6"]  # zakres w odwrotnej kolejności (RFC 3501)
+    assert actions.expand_uid_set("") == []
+
+    uids = [str(u) for u in (5, 6, 7, 8, 20, 22, 23, 1000)]
+    assert actions.expand_uid_set(actions.imap_uid_set(uids)) == uids
+    print("Zbiory UID: OK")
+
+
+def check_copyuid_map():
+    conn = FakeImapConnection(["IMAP4REV1", "UIDPLUS"], copyuid=[
+        b"777 4:6,9 100:102,103",
+        "777 12 200",
+        b"777 30:31 300",  # różne długości zbiorów - odpowiedź pominięta
+        b"niepoprawna odpowiedz",
+        None,
+    ])
+    conn.uid("COPY", "4:6,9,12", '"Archive"')
+    mapping = actions._copyuid_map(conn)
+    assert mapping == {
+        "4": ("777", "100"),
+        "5": ("777", "101"),
+        "6": ("777", "102"),
+        "9": ("777", "103"),
+        "12": ("777", "200"),
+    }, mapping
+
+    # Bez COPYUID (serwer bez UIDPLUS) - pusta mapa
+    assert actions._copyuid_map(FakeImapConnection(["IMAP4REV1"])) == {}
+    print("COPYUID: OK")
+
+
+def check_bulk_move():
+    copyuid = [b"555 4:6 40:42"]
+
+    # MOVE - jedno polecenie, UID z COPYUID
+    conn = FakeImapConnection(["IMAP4REV1", "MOVE", "UIDPLUS"], copyuid=copyuid)
+    mapping = actions.run_bulk_command(conn, {"kind": "move", "target_mailbox": "Archive"}, ["6", "4", "5"])
+    assert [c[0] for c in conn.commands] == ["MOVE"]
+    assert conn.commands[0][1] == "4:6"
+    assert mapping["4"] == ("555", "40") and mapping["6"] == ("555", "42")
+
+    # Bez MOVE, z UIDPLUS - COPY + \Deleted + UID EXPUNGE tylko tych UID
+    conn = FakeImapConnection(["IMAP4REV1", "UIDPLUS"], copyuid=copyuid)
+    mapping = actions.run_bulk_command(conn, {"kind": "move", "target_mailbox": "Archive"}, ["4", "5", "6"])
+    assert [c[0] for c in conn.commands] == ["COPY", "STORE", "EXPUNGE"]
+    assert conn.commands[2] == ("EXPUNGE", "4:6")
+    assert len(mapping) == 3
+
+    # Bez UIDPLUS - brak EXPUNGE (nie usuwa cudzych \Deleted) i brak mapy UID
+    conn = FakeImapConnection(["IMAP4REV1"])
+    mapping = actions.run_bulk_command(conn, {"kind": "move", "target_mailbox": "Archive"}, ["4", "5", "6"])
+    assert [c[0] for c in conn.commands] == ["COPY", "STORE"]
+    assert mapping == {}
+    print("Przenoszenie: OK")
+
+
+def run_test():
+    check_uid_sets()
+    check_copyuid_map()
+    check_bulk_move()
+    print("OK")
+
+
+if __name__ == "__main__":
+    run_test()
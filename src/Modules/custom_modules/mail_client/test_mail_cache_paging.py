@@ -0,0 +1,132 @@
+"""
+Test stronicowania cache maili: okna keyset (load_page z `after`) i kolejka
+odpowiedzi (load_reply_queue / count_reply_queue) na tymczasowej bazie.
+
+Uruchomienie:
+    python src/Modules/custom_modules/mail_client/test_mail_cache_paging.py
+"""
+
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# mail_cache używa importów względnych - ładowany jako część pakietu mail_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mail_client.mail_cache import MailCache
+
+
+def make_mails(count: int):
+    """Maile z unikalnymi datami i dwiema parami o tej samej dacie (remis klucza)"""
+    mails = []
+    for i in range(count):
+        mails.append({
+            "_uid": f"m{i:03d}",
+            "from": f"nadawca{i}@example.com",
+            "subject": f"Wiadomość {i}",
+            "date": f"2024-03-{1 + i // 24:02d} {i % 24:02d}:00",
+            "message_id": f"<m{i}@example.com>",
+        })
+    mails[10]["date"] = mails[11]["date"]
+    mails[40]["date"] = mails[41]["date"]
+    return mails
+
+
+def check_keyset_paging(cache: MailCache):
+    mails = make_mails(95)
+    cache.save_mails_to_cache("Odebrane", mails)
+    expected = [m["_uid"] for m in sorted(mails, key=lambda m: (m["date"], m["_uid"]), reverse=True)]
+
+    seen = []
+    after = None
+    while True:
+        page = cache.load_page("Odebrane", limit=20, after=after)
+        if not page:
+            break
+        seen.extend(m["_uid"] for m in page)
+        after = (page[-1]["date"], page[-1]["_uid"])
+
+    assert seen == expected, "Okna keyset muszą dać pełną listę bez duplikatów i luk"
+    assert cache.count_mails("Odebrane") == 95
+
+    # OFFSET i keyset dają to samo okno
+    by_offset = [m["_uid"] for m in cache.load_page("Odebrane", offset=40, limit=20)]
+    assert by_offset == expected[40:60]
+
+    # Rosnąco - porównanie odwraca się razem z kierunkiem
+    first = cache.load_page("Odebrane", limit=30, descending=False)
+    rest = cache.load_page("Odebrane", limit=100, descending=False,
+                           after=(first[-1]["date"], first[-1]["_uid"]))
+    assert [m["_uid"] for m in first + rest] == expected[::-1]
+    print(f"Keyset: {len(seen)} maili w {len(seen) // 20 + 1} oknach")
+
+
+def check_reply_queue(cache: MailCache):
+    threads = [
+        # (klucz, daty, folder) - wątki bez odpowiedzi
+        ("q1", ["2024-01-05 10:00", "2024-01-07 10:00"], "Odebrane"),
+        ("q2", ["2024-01-01 09:00"], "Odebrane"),
+        ("q3", ["2024-02-10 08:00", "2024-02-11 08:00", "2024-02-12 08:00"], "Odebrane"),
+        ("q4", ["2024-01-20 12:00"], "Archiwum"),
+    ]
+    mails = []
+    for key, dates, folder in threads:
+        for n, date in enumerate(dates):
+            mail = {
+                "_uid": f"{key}-{n}",
+                "_folder": folder,
+                "from": "klient@example.com",
+                "subject": f"{'Re: ' if n else ''}Sprawa {key}",
+                "date": date,
+                "message_id": f"<{key}-{n}@example.com>",
+            }
+            if n:
+                mail["in_reply_to"] = f"<{key}-0@example.com>"
+            mails.append(mail)
+
+    # Wykluczone z kolejki: odpowiedziano, "nie wymaga odpowiedzi", Wysłane
+    mails.append({"_uid": "done", "subject": "Załatwione", "date": "2023-12-01 10:00",
+                  "message_id": "<done@example.com>", "_replied": True})
+    mails.append({"_uid": "skip", "subject": "Newsletter", "date": "2023-12-02 10:00",
+                  "message_id": "<skip@example.com>", "_no_reply_needed": True})
+    sent = {"_uid": "sent", "subject": "Wysłana", "date": "2023-11-01 10:00",
+            "message_id": "<sent@example.com>"}
+
+    for folder in ("Odebrane", "Archiwum"):
+        cache.save_mails_to_cache(folder, [m for m in mails if m.get("_folder", "Odebrane") == folder])
+    cache.save_mails_to_cache("Wysłane", [sent])
+
+    assert cache.count_reply_queue() == 4
+
+    # Wątki od najstarszego, maile w wątku od najnowszego
+    queue = cache.load_reply_queue(limit=10)
+    order = [thread[0]["subject"].replace("Re: ", "") for thread in queue]
+    assert order == ["Sprawa q2", "Sprawa q1", "Sprawa q4", "Sprawa q3"], order
+    q3 = queue[-1]
+    assert [m["_uid"] for m in q3] == ["q3-2", "q3-1", "q3-0"]
+
+    # Okna kolejki sklejają się w całość
+    windows = cache.load_reply_queue(offset=0, limit=3) + cache.load_reply_queue(offset=3, limit=3)
+    assert [t[0]["_uid"] for t in windows] == [t[0]["_uid"] for t in queue]
+
+    # Filtry dat działają na najnowszym mailu wątku
+    assert cache.count_reply_queue(newer_than="2024-01-07 00:00") == 3
+    assert cache.count_reply_queue(older_than="2024-01-07 00:00") == 1
+    older = cache.load_reply_queue(older_than="2024-01-07 00:00")
+    assert [t[0]["_uid"] for t in older] == ["q2-0"]
+    print(f"Kolejka odpowiedzi: {len(queue)} wątków")
+
+
+def run_test():
+    tmp_dir = Path(tempfile.mkdtemp(prefix="mail_cache_paging_"))
+    try:
+        check_keyset_paging(MailCache(str(tmp_dir / "paging.db")))
+        check_reply_queue(MailCache(str(tmp_dir / "queue.db")))
+        print("OK")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,324 @@
+"""
+Wirtualizowana lista nagrań CallCryptor (model/widok Qt)
+
+Klasy:
+- RecordingsTableModel - QAbstractTableModel ładujący nagrania stronami
+  z CallCryptorDatabase.query_recordings (keyset) przez canFetchMore/fetchMore
+
+Filtrowanie (źródło, tag, ulubione, archiwum, daty, status, tekst) odbywa się
+w SQL. Przyciski akcji są rysowane jako tekst (emoji) z tłem statusu, a
+kliknięcia obsługuje CallCryptorView (sygnał clicked + numer kolumny) - widok
+nie tworzy widgetów dla każdego wiersza, więc koszt otwarcia listy nie zależy
+od liczby nagrań.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtGui import QColor
+
+from ..utils.i18n_manager import t
+
+
+COL_FAVORITE = 0
+COL_CONTACT = 1
+COL_DURATION = 2
+COL_DATE = 3
+COL_TAG = 4
+COL_PLAY = 5
+COL_TRANSCRIBE = 6
+COL_SUMMARY = 7
+COL_NOTE = 8
+COL_TASK = 9
+COL_ARCHIVE = 10
+COL_DELETE = 11
+
+COLUMN_COUNT = 12
+ACTION_COLUMNS = (COL_PLAY, COL_TRANSCRIBE, COL_SUMMARY, COL_NOTE, COL_TASK, COL_ARCHIVE, COL_DELETE)
+QUEUE_COLUMNS = (COL_TRANSCRIBE, COL_SUMMARY)
+
+ACTION_EMOJI = {
+    COL_PLAY: "▶️",
+    COL_TRANSCRIBE: "📝",
+    COL_SUMMARY: "🪄",
+    COL_NOTE: "📒",
+    COL_TASK: "✅",
+    COL_ARCHIVE: "📦",
+    COL_DELETE: "🗑️"
+}
+
+RecordingRole = Qt.ItemDataRole.UserRole + 1
+
+SUCCESS_BACKGROUND = QColor(76, 175, 80, 51)  # Light green (ukończone akcje)
+
+
+def format_duration(seconds: Optional[int]) -> str:
+    """Formatuj czas trwania (sekundy -> MM:SS)"""
+    if not seconds:
+        return "0:00"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def format_date(date_str: Optional[str]) -> str:
+    """Formatuj datę do czytelnej formy"""
+    if not date_str:
+        return ""
+    try:
+        return datetime.fromisoformat(date_str).strftime("%Y-%m-%d %H:%M")
+    except ValueError:
+        return date_str[:16]
+
+
+class RecordingsTableModel(QAbstractTableModel):
+    """Model listy nagrań ładowany stronami (page_size wierszy na raz)"""
+
+    def __init__(self, parent=None, page_size: int = 200):
+        super().__init__(parent)
+        self.page_size = page_size
+
+        self.db_manager = None
+        self.user_id: Optional[str] = None
+        self.filters: Dict[str, Any] = {}
+
+        self._rows: List[Dict[str, Any]] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._after = None
+        self._total = 0
+
+        # Tryb kolejki - kolumny transkrypcji/podsumowania jako checkboxy
+        self.queue_mode = False
+        self.selected_items: Dict[str, Set[str]] = {'transcribe': set(), 'summarize': set()}
+
+        self.tag_colors: Dict[str, str] = {}
+        self.colors: Dict[str, str] = {}
+
+    # ==================== ŹRÓDŁO DANYCH ====================
+
+    def set_query(self, db_manager, user_id: str, filters: Optional[Dict[str, Any]] = None):
+        """Ustaw filtry listy (wiersze ładowane przy przewijaniu)"""
+        self.beginResetModel()
+        self.db_manager = db_manager
+        self.user_id = user_id
+        self.filters = dict(filters or {})
+        self._rows = []
+        self._row_by_id = {}
+        self._after = None
+        self._total = db_manager.count_recordings(user_id, self.filters) if db_manager and user_id else 0
+        self.endResetModel()
+
+    def reload(self):
+        """Przeładuj listę z bieżącymi filtrami"""
+        self.set_query(self.db_manager, self.user_id, self.filters)
+
+    def total_count(self) -> int:
+        return self._total
+
+    def set_queue_mode(self, active: bool, selected_items: Dict[str, Set[str]]):
+        self.queue_mode = active
+        self.selected_items = selected_items
+        self._emit_all_changed()
+
+    def set_colors(self, colors: Dict[str, str], tag_colors: Dict[str, str]):
+        self.colors = colors
+        self.tag_colors = tag_colors
+        self._emit_all_changed()
+
+    # ==================== STRONICOWANIE ====================
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:  # type: ignore[override]
+        if parent.isValid():
+            return False
+        return len(self._rows) < self._total
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:  # type: ignore[override]
+        if parent.isValid() or self.db_manager is None:
+            return
+        batch = self.db_manager.query_recordings(self.user_id, self.filters, self.page_size, self._after)
+        start = len(self._rows)
+        if not batch:
+            # Lista skurczyła się (np. nagrania usunięte w tle)
+            self._total = start
+            return
+
+        last = batch[-1]
+        self._after = (last['sort_key'], last['id'])
+        self.beginInsertRows(QModelIndex(), start, start + len(batch) - 1)
+        for offset, recording in enumerate(batch):
+            self._rows.append(recording)
+            self._row_by_id[recording['id']] = start + offset
+        self.endInsertRows()
+
+    # ==================== DOSTĘP DO WIERSZY ====================
+
+    def recording_at(self, row: int) -> Optional[Dict[str, Any]]:
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def row_for_id(self, recording_id: str) -> int:
+        return self._row_by_id.get(recording_id, -1)
+
+    def update_recording(self, recording_id: str, fields: Dict[str, Any]):
+        """Zmień pola wczytanego wiersza (np. gwiazdka, tag, czas trwania)"""
+        row = self.row_for_id(recording_id)
+        if row < 0:
+            return
+        self._rows[row].update(fields)
+        self._rows[row].pop('_tags', None)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, COLUMN_COUNT - 1))
+
+    def _emit_all_changed(self):
+        if self._rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, COLUMN_COUNT - 1))
+
+    # ==================== QAbstractTableModel ====================
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        return 0 if parent.isValid() else COLUMN_COUNT
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if orientation != Qt.Orientation.Horizontal or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        headers = [
+            "⭐",
+            t('callcryptor.table.contact'),
+            t('callcryptor.table.duration'),
+            t('callcryptor.table.date'),
+            t('callcryptor.table.tag'),
+            "▶️",
+            t('callcryptor.table.transcribe'),
+            t('callcryptor.table.ai_summary'),
+            t('callcryptor.table.note'),
+            t('callcryptor.table.task'),
+            t('callcryptor.table.archive'),
+            t('callcryptor.table.delete')
+        ]
+        return headers[section] if 0 <= section < len(headers) else None
+
+    def flags(self, index: QModelIndex):  # type: ignore[override]
+        base = super().flags(index)
+        if index.isValid() and self.queue_mode and index.column() in QUEUE_COLUMNS:
+            base |= Qt.ItemFlag.ItemIsUserCheckable
+        return base
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
+        if not index.isValid():
+            return None
+        recording = self.recording_at(index.row())
+        if recording is None:
+            return None
+        column = index.column()
+
+        if role == RecordingRole:
+            return recording
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._display_text(recording, column)
+        if role == Qt.ItemDataRole.CheckStateRole and self.queue_mode and column in QUEUE_COLUMNS:
+            action = 'transcribe' if column == COL_TRANSCRIBE else 'summarize'
+            checked = recording['id'] in self.selected_items[action]
+            return Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if column in (COL_CONTACT, COL_TAG):
+                return None
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.ForegroundRole and column == COL_FAVORITE:
+            if recording.get('is_favorite'):
+                return QColor(self.colors.get('warning_bg', '#FFD700'))
+            return QColor(self.colors.get('disabled_text', '#CCCCCC'))
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return self._background(recording, column)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self._tooltip(column)
+        return None
+
+    def setData(self, index: QModelIndex, value, role=Qt.ItemDataRole.EditRole) -> bool:  # type: ignore[override]
+        if role != Qt.ItemDataRole.CheckStateRole or not self.queue_mode or index.column() not in QUEUE_COLUMNS:
+            return False
+        recording = self.recording_at(index.row())
+        if recording is None:
+            return False
+        action = 'transcribe' if index.column() == COL_TRANSCRIBE else 'summarize'
+        if value in (Qt.CheckState.Checked, Qt.CheckState.Checked.value):
+            self.selected_items[action].add(recording['id'])
+        else:
+            self.selected_items[action].discard(recording['id'])
+        self.dataChanged.emit(index, index)
+        return True
+
+    # ==================== DEKORACJE (LENIWE) ====================
+
+    def recording_tags(self, recording: Dict[str, Any]) -> List[str]:
+        """Tagi nagrania (JSON parsowany tylko dla wyświetlanych wierszy)"""
+        if '_tags' not in recording:
+            tags = recording.get('tags') or []
+            if isinstance(tags, str):
+                try:
+                    tags = json.loads(tags)
+                except json.JSONDecodeError:
+                    tags = []
+            recording['_tags'] = tags if isinstance(tags, list) else []
+        return recording['_tags']
+
+    def _display_text(self, recording: Dict[str, Any], column: int) -> str:
+        if column == COL_FAVORITE:
+            return "★"
+        if column == COL_CONTACT:
+            return recording.get('contact_name') or recording.get('file_name') or "Unknown"
+        if column == COL_DURATION:
+            return format_duration(recording.get('duration'))
+        if column == COL_DATE:
+            return format_date(recording.get('sort_key'))
+        if column == COL_TAG:
+            tags = self.recording_tags(recording)
+            return f"🏷️ {tags[0]}" if tags else "-- Brak tagu --"
+        if self.queue_mode and column in QUEUE_COLUMNS:
+            return ""
+        return ACTION_EMOJI.get(column, "")
+
+    def _background(self, recording: Dict[str, Any], column: int) -> Optional[QColor]:
+        if column == COL_TAG:
+            tags = self.recording_tags(recording)
+            color = self.tag_colors.get(tags[0]) if tags else None
+            return QColor(color) if color else None
+        if self.queue_mode:
+            return None
+        if column == COL_TRANSCRIBE and recording.get('transcription_status') == 'completed':
+            return SUCCESS_BACKGROUND
+        if column == COL_SUMMARY and recording.get('ai_summary_status') == 'completed':
+            return SUCCESS_BACKGROUND
+        if column == COL_NOTE and recording.get('note_id') is not None:
+            return SUCCESS_BACKGROUND
+        if column == COL_TASK and self._has_ai_tasks(recording):
+            return SUCCESS_BACKGROUND
+        return None
+
+    @staticmethod
+    def _has_ai_tasks(recording: Dict[str, Any]) -> bool:
+        """Podświetl 'Utwórz zadanie', jeśli podsumowanie AI ma zadania"""
+        ai_summary_tasks = recording.get('ai_summary_tasks')
+        if not ai_summary_tasks:
+            return False
+        try:
+            tasks_list = json.loads(ai_summary_tasks) if isinstance(ai_summary_tasks, str) else ai_summary_tasks
+        except (json.JSONDecodeError, TypeError):
+            return False
+        return isinstance(tasks_list, list) and len(tasks_list) > 0
+
+    def _tooltip(self, column: int) -> Optional[str]:
+        tooltips = {
+            COL_FAVORITE: 'callcryptor.tooltip.favorite',
+            COL_PLAY: 'callcryptor.play_recording',
+            COL_TRANSCRIBE: 'callcryptor.tooltip.transcribe',
+            COL_SUMMARY: 'callcryptor.tooltip.ai_summary',
+            COL_NOTE: 'callcryptor.tooltip.create_note',
+            COL_TASK: 'callcryptor.tooltip.create_task',
+            COL_ARCHIVE: 'callcryptor.tooltip.archive',
+            COL_DELETE: 'callcryptor.tooltip.delete'
+        }
+        key = tooltips.get(column)
+        return t(key) if key else None
@@ -17,8 +17,8 @@ Integracja:
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QComboBox, QTableWidget, QTableWidgetItem,
-    QHeaderView, QMessageBox, QLineEdit, QFrame, QDialog, QCheckBox
+    QPushButton, QComboBox, QTableView, QAbstractItemView, QMenu,
+    QHeaderView, QMessageBox, QLineEdit, QFrame, QDialog
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QFont, QIcon
@@ -28,6 +28,11 @@ import json
 from .tag_manager_dialog import TagManagerDialog
 from .transcription_dialog import TranscriptionDialog
 from .ai_summary_dialog import AISummaryDialog
+from .callcryptor_table_model import (
+    RecordingsTableModel, COL_FAVORITE, COL_CONTACT, COL_DURATION,
+    COL_DATE, COL_TAG, COL_PLAY, COL_TRANSCRIBE, COL_SUMMARY, COL_NOTE, COL_TASK,
+    COL_ARCHIVE, COL_DELETE, ACTION_COLUMNS, QUEUE_COLUMNS
+)
 from ..Modules.CallCryptor_module.recorder_dialog import RecorderDialog
 from typing import Optional, Dict, List
 from pathlib import Path
@@ -59,6 +64,16 @@ class CallCryptorView(QWidget):
         self.user_id = None
         self.current_source_id = None
         
+        # Parametry audio uzupełniane w tle (AudioMetadataWorker)
+        self.metadata_worker = None
+        
+        # Obserwacja źródeł folderowych (FolderWatcher)
+        self.folder_watcher = None
+        
+        # Trwała kolejka transkrypcji i podsumowań (JobQueueExecutor)
+        self.job_queue = None
+        self.queue_dialog = None
+        
         # Sync infrastructure
         self.api_client = None
         self.sync_manager = None
@@ -97,6 +112,69 @@ class CallCryptorView(QWidget):
         
         # Załaduj źródła
         self._load_sources()
+        
+        # Uzupełnij czas trwania nagrań dodanych wcześniej bez parametrów audio
+        self._start_metadata_worker()
+        
+        # Wznów zadania kolejki z poprzedniej sesji
+        self._start_job_queue()
+    
+    def _start_job_queue(self):
+        """Uruchom wykonawcę kolejki zadań AI dla bieżącego użytkownika"""
+        try:
+            from ..Modules.CallCryptor_module.job_queue import JobQueueExecutor
+            
+            if self.job_queue is not None:
+                self.job_queue.stop()
+            
+            self.job_queue = JobQueueExecutor(self.db_manager, self.user_id, self)
+            self.job_queue.queue_drained.connect(self._refresh_table)
+            self.job_queue.start()
+        except Exception as e:
+            logger.error(f"[CallCryptor] Error starting job queue: {e}")
+    
+    def _update_folder_watcher(self, sources: List[Dict]):
+        """Obserwuj aktywne źródła folderowe (zmiana listy źródeł restartuje obserwację)"""
+        try:
+            if self.folder_watcher is None:
+                from ..Modules.CallCryptor_module.folder_watcher import FolderWatcher
+                
+                self.folder_watcher = FolderWatcher(str(self.db_manager.db_path), self)
+                self.folder_watcher.recordings_changed.connect(self._on_watched_recordings_changed)
+            
+            self.folder_watcher.set_sources(sources, self.db_manager)
+        except Exception as e:
+            logger.error(f"[CallCryptor] Error starting folder watcher: {e}")
+    
+    def _on_watched_recordings_changed(self, source_id: str, results: dict):
+        """Nowe nagrania wykryte przez FolderWatcher"""
+        if self.current_source_id in (None, source_id):
+            self._load_recordings()
+        
+        if results.get('added'):
+            self._start_metadata_worker()
+            self._set_status(
+                f"{t('callcryptor.status.scan_complete')}: {results['added']} {t('callcryptor.scanning.new')}",
+                success=True
+            )
+    
+    def _start_metadata_worker(self):
+        """Uruchom w tle odczyt parametrów audio nagrań, które ich jeszcze nie mają"""
+        if not self.db_manager or not self.user_id:
+            return
+        if self.metadata_worker and self.metadata_worker.isRunning():
+            return
+        
+        from ..Modules.CallCryptor_module.audio_metadata import AudioMetadataWorker
+        
+        self.metadata_worker = AudioMetadataWorker(str(self.db_manager.db_path), self.user_id)
+        self.metadata_worker.batch_saved.connect(self._on_metadata_batch_saved)
+        self.metadata_worker.start()
+    
+    def _on_metadata_batch_saved(self, updates: List[Dict]):
+        """Wpisz czas trwania do wczytanych wierszy (bez przeładowania tabeli)"""
+        for update in updates:
+            self.recordings_model.update_recording(update['id'], {'duration': update['duration']})
     
     def _init_sync_infrastructure(self, config):
         """Inicjalizuj API client i sync manager"""
@@ -348,6 +426,12 @@ class CallCryptorView(QWidget):
         self.search_input.setMinimumWidth(300)
         search_layout.addWidget(self.search_input)
         
+        # Wyszukiwanie w SQL - odczekaj aż użytkownik skończy pisać
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(300)
+        self._search_timer.timeout.connect(self._apply_filters)
+        
         search_layout.addSpacing(20)
         
         # Filtr tagów
@@ -389,42 +473,40 @@ class CallCryptorView(QWidget):
         layout.addWidget(separator)
         
         # === TABELA NAGRAŃ ===
-        self.recordings_table = QTableWidget()
-        self.recordings_table.setColumnCount(12)
-        self.recordings_table.setHorizontalHeaderLabels([
-            "⭐",  # Favorite
-            t('callcryptor.table.contact'),
-            t('callcryptor.table.duration'),
-            t('callcryptor.table.date'),
-            t('callcryptor.table.tag'),
-            "▶️",  # Play button - przeniesiony za Tag
-            t('callcryptor.table.transcribe'),
-            t('callcryptor.table.ai_summary'),
-            t('callcryptor.table.note'),
-            t('callcryptor.table.task'),
-            t('callcryptor.table.archive'),
-            t('callcryptor.table.delete')
-        ])
+        # Model ładuje nagrania stronami z bazy (keyset), widok rysuje tylko
+        # widoczne wiersze - brak widgetów w komórkach
+        self.recordings_model = RecordingsTableModel(self)
+        self.recordings_model.selected_items = self.selected_items
+        
+        self.recordings_table = QTableView()
+        self.recordings_table.setModel(self.recordings_model)
         
         # Konfiguracja tabeli
         self.recordings_table.setAlternatingRowColors(True)
-        self.recordings_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.recordings_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.recordings_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.recordings_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.recordings_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.recordings_table.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
         self.recordings_table.verticalHeader().setVisible(False)
         
-        # Zwiększ wysokość wierszy aby pomieścić gwiazdki i combobox
+        # Stała wysokość wierszy - widok nie mierzy zawartości każdego wiersza
+        self.recordings_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.recordings_table.verticalHeader().setDefaultSectionSize(45)
         
-        # Rozciągnij kolumny
+        # Stałe szerokości kolumn (ResizeToContents przeliczałby wszystkie wczytane wiersze)
         header = self.recordings_table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)  # Favorite
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)  # Contact
-        for i in range(2, 12):
-            header.setSectionResizeMode(i, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(COL_CONTACT, QHeaderView.ResizeMode.Stretch)
+        for column, width in ((COL_DURATION, 80), (COL_DATE, 140), (COL_TAG, 160)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Interactive)
+            self.recordings_table.setColumnWidth(column, width)
+        for column in (COL_FAVORITE,) + ACTION_COLUMNS:
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Fixed)
+            self.recordings_table.setColumnWidth(column, 50)
         
         # Podłącz sygnały
-        self.recordings_table.itemSelectionChanged.connect(self._on_recording_selected)
-        self.recordings_table.itemDoubleClicked.connect(self._on_recording_double_clicked)
+        self.recordings_table.clicked.connect(self._on_table_clicked)
+        self.recordings_table.doubleClicked.connect(self._on_recording_double_clicked)
+        self.recordings_table.selectionModel().currentRowChanged.connect(self._on_recording_selected)
         
         layout.addWidget(self.recordings_table)
         
@@ -464,6 +546,9 @@ class CallCryptorView(QWidget):
         # Pobierz źródła z bazy
         sources = self.db_manager.get_all_sources(self.user_id, active_only=True)
 
+        # Nowe nagrania w źródłach folderowych pojawiają się bez ręcznego skanowania
+        self._update_folder_watcher(sources)
+
         # Dodaj źródła użytkownika do combo boxa
         for source in sources:
             display_name = source.get('source_name', 'Unknown')
@@ -489,6 +574,9 @@ class CallCryptorView(QWidget):
         # Zapisz aktualny wybór
         current_tag = self.tag_filter_combo.currentData()
         
+        # Przebudowa combo nie powinna wyzwalać filtrowania dla każdego elementu
+        self.tag_filter_combo.blockSignals(True)
+        
         # Wyczyść combo tagów
         self.tag_filter_combo.clear()
         self.tag_filter_combo.addItem(t('callcryptor.filter.all_tags'), None)
@@ -496,34 +584,8 @@ class CallCryptorView(QWidget):
         # Dodaj opcję "Ulubione"
         self.tag_filter_combo.addItem("⭐ " + t('callcryptor.folder.favorites'), "favorites")
         
-        # Pobierz wszystkie unikalne tagi z nagrań
-        recordings = self.db_manager.get_all_recordings(self.user_id)
-        if not recordings:
-            recordings = []
-        
-        all_tags = set()
-        
-        for recording in recordings:
-            tags = recording.get('tags', [])
-            # Jeśli tags jest JSON stringiem, sparsuj
-            if isinstance(tags, str):
-                try:
-                    tags = json.loads(tags)
-                except:
-                    tags = []
-            
-            # Upewnij się, że tags jest listą
-            if not tags:
-                tags = []
-            if not isinstance(tags, list):
-                tags = []
-            
-            for tag in tags:
-                if tag:
-                    all_tags.add(tag)
-        
-        # Dodaj tagi do combo (posortowane alfabetycznie)
-        for tag in sorted(all_tags):
+        # Unikalne tagi z tabeli powiązań (posortowane alfabetycznie)
+        for tag in self.db_manager.get_recording_tag_names(self.user_id):
             self.tag_filter_combo.addItem(f"🏷️ {tag}", tag)
         
         # Przywróć poprzedni wybór jeśli istnieje
@@ -531,6 +593,8 @@ class CallCryptorView(QWidget):
             index = self.tag_filter_combo.findData(current_tag)
             if index >= 0:
                 self.tag_filter_combo.setCurrentIndex(index)
+        
+        self.tag_filter_combo.blockSignals(False)
     
     def _ensure_recordings_folder_source(self):
         """
@@ -561,8 +625,10 @@ class CallCryptorView(QWidget):
             if recordings_source_exists:
                 # Sprawdź czy folder ma jakieś nagrania w bazie
                 if recordings_source_id:
-                    recordings = self.db_manager.get_recordings_by_source(recordings_source_id)
-                    if len(recordings) == 0 and recordings_folder.exists():
+                    recordings_count = self.db_manager.count_recordings(
+                        self.user_id, {'source_id': recordings_source_id, 'archived': None}
+                    )
+                    if recordings_count == 0 and recordings_folder.exists():
                         # Źródło istnieje, ale nie ma nagrań - może wymaga skanowania
                         audio_files = list(recordings_folder.glob('*.[wW][aA][vV]')) + \
                                      list(recordings_folder.glob('*.[mM][pP]3')) + \
@@ -625,6 +691,8 @@ class CallCryptorView(QWidget):
             if results:
                 logger.info(f"[CallCryptor] Auto-scan completed: "
                            f"{results.get('added', 0)} added, {results.get('updated', 0)} updated")
+                if results.get('added'):
+                    self._start_metadata_worker()
             
         except Exception as e:
             logger.error(f"[CallCryptor] Error auto-scanning Nagrania folder: {e}")
@@ -675,42 +743,31 @@ class CallCryptorView(QWidget):
         # Załaduj tagi do filtra przed załadowaniem nagrań
         self._load_tags_filter()
         
-        # Pobierz nagrania według źródła
-        if self.current_source_id == "favorites":
-            recordings = self.db_manager.get_favorite_recordings(self.user_id)
-        elif self.current_source_id:
-            recordings = self.db_manager.get_recordings_by_source(self.current_source_id)
-        else:
-            recordings = self.db_manager.get_all_recordings(self.user_id)
-        
-        # Wypełnij tabelę
-        self._populate_table(recordings)
-        
-        # Aktualizuj licznik
-        self._update_count_label(len(recordings))
+        # Źródło, tag, data i tekst są filtrowane w SQL
+        self._apply_filters()
     
-    def _on_recording_selected(self):
+    def _on_recording_selected(self, current, previous):
         """Obsługa wyboru nagrania"""
-        selected_rows = self.recordings_table.selectedItems()
-        if selected_rows:
-            row = selected_rows[0].row()
-            # ID jest w kolumnie 1 (Contact) - po Favorite
-            recording_id = self.recordings_table.item(row, 1).data(Qt.ItemDataRole.UserRole)
-            self.recording_selected.emit(recording_id)
+        recording = self.recordings_model.recording_at(current.row())
+        if recording:
+            self.recording_selected.emit(recording['id'])
     
-    def _on_recording_double_clicked(self, item):
+    def _on_recording_double_clicked(self, index):
         """
         Obsługa podwójnego kliknięcia - otwórz folder z plikiem.
         
         Args:
-            item: QTableWidgetItem który został kliknięty
+            index: QModelIndex klikniętej komórki
         """
         if not self.db_manager:
             return
         
-        row = item.row()
-        # Pobierz ID nagrania z kolumny Contact
-        recording_id = self.recordings_table.item(row, 1).data(Qt.ItemDataRole.UserRole)
+        # Kolumny z akcjami obsługuje pojedyncze kliknięcie
+        if index.column() not in (COL_CONTACT, COL_DURATION, COL_DATE):
+            return
+        
+        row_data = self.recordings_model.recording_at(index.row())
+        recording_id = row_data.get('id') if row_data else None
         
         if not recording_id:
             return
@@ -802,15 +859,8 @@ class CallCryptorView(QWidget):
             )
     
     def _on_search(self, text: str):
-        """Filtrowanie tabeli na podstawie wyszukiwania"""
-        for row in range(self.recordings_table.rowCount()):
-            match = False
-            for col in range(4):  # Szukaj w pierwszych 4 kolumnach
-                item = self.recordings_table.item(row, col)
-                if item and text.lower() in item.text().lower():
-                    match = True
-                    break
-            self.recordings_table.setRowHidden(row, not match)
+        """Wyszukiwanie (kontakt, telefon, plik, temat e-maila) - filtrowane w SQL"""
+        self._search_timer.start()
     
     def _add_source(self):
         """Dodaj nowe źródło nagrań"""
@@ -962,7 +1012,6 @@ class CallCryptorView(QWidget):
         
         from ..Modules.CallCryptor_module.source_scanner import FolderScanner, EmailScanner
         from PyQt6.QtWidgets import QProgressDialog
-        from PyQt6.QtCore import Qt
         
         # Dialog postępu
         progress = QProgressDialog(
@@ -1129,6 +1178,9 @@ class CallCryptorView(QWidget):
         
         # Pokaż wyniki
         if results:
+            # Czas trwania nowych nagrań - w tle, po skanowaniu
+            self._start_metadata_worker()
+            
             # Odśwież listę źródeł (zaktualizuj liczniki)
             self._load_sources()
             
@@ -1300,27 +1352,6 @@ class CallCryptorView(QWidget):
                 f"Błąd synchronizacji: {str(e)}"
             )
     
-    def _format_duration(self, seconds: int) -> str:
-        """Formatuj czas trwania (sekundy -> MM:SS)"""
-        if not seconds:
-            return "0:00"
-        
-        minutes = seconds // 60
-        secs = seconds % 60
-        return f"{minutes}:{secs:02d}"
-    
-    def _format_date(self, date_str: str) -> str:
-        """Formatuj datę do czytelnej formy"""
-        if not date_str:
-            return ""
-        
-        try:
-            from datetime import datetime
-            dt = datetime.fromisoformat(date_str)
-            return dt.strftime("%Y-%m-%d %H:%M")
-        except:
-            return date_str[:16]  # Fallback
-    
     def _update_count_label(self, count: int):
         """Aktualizuj licznik nagrań"""
         self.count_label.setText(
@@ -1347,14 +1378,14 @@ class CallCryptorView(QWidget):
         
         # Style dla tabeli
         table_style = f"""
-            QTableWidget {{
+            QTableView {{
                 background-color: {colors.get('bg_main', '#FFFFFF')};
                 alternate-background-color: {colors.get('bg_secondary', '#F5F5F5')};
                 gridline-color: {colors.get('border_light', '#CCCCCC')};
                 color: {colors.get('text_primary', '#000000')};
                 border: 1px solid {colors.get('border_light', '#CCCCCC')};
             }}
-            QTableWidget::item:selected {{
+            QTableView::item:selected {{
                 background-color: {colors.get('accent_primary', '#2196F3')};
                 color: white;
             }}
@@ -1367,6 +1398,7 @@ class CallCryptorView(QWidget):
             }}
         """
         self.recordings_table.setStyleSheet(table_style)
+        self.recordings_model.set_colors(colors, self._get_available_tags())
         
         # Style dla przycisków
         btn_style = f"""
@@ -1411,7 +1443,7 @@ class CallCryptorView(QWidget):
         # Odśwież przycisk synchronizacji
         self._update_sync_button_state()
         
-        # Odśwież tabelę aby zastosować nowe kolory do widgetów
+        # Odśwież tabelę aby zastosować nowe kolory
         self._refresh_table()
     
     def _transcribe_recording(self, recording: dict):
@@ -1981,39 +2013,49 @@ class CallCryptorView(QWidget):
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                # Przygotuj zadania
-                tasks = []
+                # Przygotuj zadania (podsumowanie bez transkrypcji dostanie
+                # zadanie transkrypcji w kolejce automatycznie)
+                tasks = [
+                    {'action': action, 'recording_id': rec_id}
+                    for action in ('transcribe', 'summarize')
+                    for rec_id in self.selected_items[action]
+                ]
                 
-                # Dodaj zadania transkrypcji
-                for rec_id in self.selected_items['transcribe']:
-                    recording = self._get_recording_by_id(rec_id)
-                    if recording:
-                        tasks.append({
-                            'action': 'transcribe',
-                            'recording_id': rec_id,
-                            'file_path': recording.get('file_path', '')
-                        })
-                
-                # Dodaj zadania podsumowania
-                for rec_id in self.selected_items['summarize']:
-                    recording = self._get_recording_by_id(rec_id)
-                    if recording:
-                        tasks.append({
-                            'action': 'summarize',
-                            'recording_id': rec_id,
-                            'file_path': recording.get('file_path', '')
-                        })
+                # Wyniki są zapisywane po treści pliku - przy ponownym przetwarzaniu
+                # zapytaj, czy pominąć zapisane wyniki
+                force_refresh = False
+                has_results = any(
+                    (self._get_recording_by_id(task['recording_id']) or {}).get(
+                        'transcription_status' if task['action'] == 'transcribe' else 'ai_summary_status'
+                    ) == 'completed'
+                    for task in tasks
+                )
+                if has_results:
+                    force_refresh = QMessageBox.question(
+                        self,
+                        t('callcryptor.queue.confirm_title'),
+                        t('callcryptor.queue.force_refresh_question'),
+                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                        QMessageBox.StandardButton.No
+                    ) == QMessageBox.StandardButton.Yes
                 
                 # Wyłącz tryb kolejki
                 self._toggle_queue_mode(False)
                 
-                # Uruchom dialog przetwarzania
+                if self.job_queue is None:
+                    self._start_job_queue()
+                
+                # Zadania trafiają do trwałej kolejki - dialog jest tylko podglądem,
+                # a tabela odświeża się po opróżnieniu kolejki (queue_drained)
+                from datetime import datetime
                 from ..Modules.CallCryptor_module.queue_dialog import ProcessingQueueDialog
-                dialog = ProcessingQueueDialog(tasks, self, self.theme_manager, t)
-                dialog.exec()
+                since = datetime.now().isoformat()
+                self.job_queue.enqueue(tasks, force_refresh=force_refresh)
                 
-                # Odśwież listę po zakończeniu
-                self._refresh_table()
+                if self.queue_dialog is not None:
+                    self.queue_dialog.close()
+                self.queue_dialog = ProcessingQueueDialog(self.job_queue, self, self.theme_manager, t, since)
+                self.queue_dialog.show()
     
     def _toggle_queue_mode(self, active: bool):
         """
@@ -2035,19 +2077,12 @@ class CallCryptorView(QWidget):
             self.selected_items['summarize'].clear()
             
             # Ukryj zbędne kolumny w trybie kolejki
-            # Kolumny: 0-⭐, 1-Contact, 2-Duration, 3-Date, 4-Tag, 5-Play, 6-Transcribe, 7-AI, 8-Note, 9-Task, 10-Archive, 11-Delete
-            self.recordings_table.setColumnHidden(5, True)   # Play
-            self.recordings_table.setColumnHidden(8, True)   # Note
-            self.recordings_table.setColumnHidden(9, True)   # Task
-            self.recordings_table.setColumnHidden(10, True)  # Archive
-            self.recordings_table.setColumnHidden(11, True)  # Delete
-            
-            # Ustaw stałą szerokość dla kolumn z checkboxami
-            header = self.recordings_table.horizontalHeader()
-            header.setSectionResizeMode(6, QHeaderView.ResizeMode.Fixed)  # Transcribe checkbox
-            header.setSectionResizeMode(7, QHeaderView.ResizeMode.Fixed)  # Summarize checkbox
-            self.recordings_table.setColumnWidth(6, 80)  # 80px dla checkboxa transkrypcji
-            self.recordings_table.setColumnWidth(7, 80)  # 80px dla checkboxa podsumowania
+            for column in (COL_PLAY, COL_NOTE, COL_TASK, COL_ARCHIVE, COL_DELETE):
+                self.recordings_table.setColumnHidden(column, True)
+            
+            # Szersze kolumny z checkboxami
+            for column in QUEUE_COLUMNS:
+                self.recordings_table.setColumnWidth(column, 80)
         else:
             # Dezaktywuj tryb kolejki
             self.queue_btn.setText("👥")
@@ -2058,29 +2093,23 @@ class CallCryptorView(QWidget):
             self.selected_items['summarize'].clear()
             
             # Pokaż wszystkie kolumny z powrotem
-            self.recordings_table.setColumnHidden(5, False)   # Play
-            self.recordings_table.setColumnHidden(8, False)   # Note
-            self.recordings_table.setColumnHidden(9, False)   # Task
-            self.recordings_table.setColumnHidden(10, False)  # Archive
-            self.recordings_table.setColumnHidden(11, False)  # Delete
-            
-            # Przywróć automatyczne dopasowanie szerokości kolumn
-            header = self.recordings_table.horizontalHeader()
-            header.setSectionResizeMode(6, QHeaderView.ResizeMode.ResizeToContents)  # Transcribe
-            header.setSectionResizeMode(7, QHeaderView.ResizeMode.ResizeToContents)  # AI Summary
-        
-        # Przeładuj tabelę z nowymi kolumnami
-        self._refresh_table()
+            for column in (COL_PLAY, COL_NOTE, COL_TASK, COL_ARCHIVE, COL_DELETE):
+                self.recordings_table.setColumnHidden(column, False)
+            
+            for column in QUEUE_COLUMNS:
+                self.recordings_table.setColumnWidth(column, 50)
+        
+        # Przerysuj kolumny akcji (checkboxy / przyciski)
+        self.recordings_model.set_queue_mode(active, self.selected_items)
     
     def _refresh_table(self):
-        """Odśwież tabelę z obecnymi nagraniami"""
-        if not self.db_manager or not self.current_source_id:
-            logger.warning("[CallCryptor] Cannot refresh - no db_manager or current_source_id")
+        """Odśwież tabelę z obecnymi filtrami"""
+        if not self.db_manager or not self.user_id:
             return
         
         try:
-            recordings = self.db_manager.get_recordings_by_source(self.current_source_id)
-            self._populate_table(recordings)
+            self.recordings_model.reload()
+            self._update_count_label(self.recordings_model.total_count())
         except Exception as e:
             logger.error(f"[CallCryptor] Error refreshing table: {e}")
     
@@ -2098,11 +2127,7 @@ class CallCryptorView(QWidget):
             return None
         
         try:
-            # Szukaj w całej bazie, nie tylko w aktualnym źródle
-            all_recordings = self.db_manager.get_all_recordings(self.user_id)
-            for rec in all_recordings:
-                if str(rec.get('id')) == str(recording_id):
-                    return rec
+            return self.db_manager.get_recording(recording_id)
         except Exception as e:
             logger.error(f"[CallCryptor] Error getting recording {recording_id}: {e}")
         
@@ -2126,8 +2151,11 @@ class CallCryptorView(QWidget):
             # Przełącz status w bazie danych
             new_status = self.db_manager.toggle_favorite(recording_id)
             
-            # Odśwież tabelę
-            self._load_recordings()
+            # Odśwież tylko ten wiersz (chyba że filtr ulubionych go ukrywa)
+            if "favorites" in (self.current_source_id, self.tag_filter_combo.currentData()):
+                self._apply_filters()
+            else:
+                self.recordings_model.update_recording(recording_id, {'is_favorite': new_status})
             
             # Pokaż subtelne powiadomienie w status bar
             if new_status:
@@ -2145,13 +2173,33 @@ class CallCryptorView(QWidget):
                 t('callcryptor.error.favorite_failed')
             )
     
-    def _on_tag_changed(self, recording: dict, tag_combo: QComboBox):
+    def _show_tag_menu(self, index, recording: dict):
+        """
+        Pokaż menu wyboru tagu pod klikniętą komórką.
+        
+        Args:
+            index: QModelIndex komórki tagu
+            recording: Dict z danymi nagrania
+        """
+        menu = QMenu(self)
+        no_tag_action = menu.addAction("-- Brak tagu --")
+        no_tag_action.setData(None)
+        for tag_name in self._get_available_tags():
+            action = menu.addAction(f"🏷️ {tag_name}")
+            action.setData(tag_name)
+        
+        rect = self.recordings_table.visualRect(index)
+        chosen = menu.exec(self.recordings_table.viewport().mapToGlobal(rect.bottomLeft()))
+        if chosen is not None:
+            self._on_tag_changed(recording, chosen.data())
+    
+    def _on_tag_changed(self, recording: dict, selected_tag: Optional[str]):
         """
         Obsługa zmiany tagu dla nagrania.
         
         Args:
             recording: Dict z danymi nagrania
-            tag_combo: QComboBox z którego zmieniono tag
+            selected_tag: Wybrany tag lub None (usuń tag)
         """
         if not self.db_manager:
             return
@@ -2161,41 +2209,20 @@ class CallCryptorView(QWidget):
             if not recording_id:
                 return
             
-            # Pobierz wybrany tag
-            selected_tag = tag_combo.currentData()
+            # Zapisz tag jako JSON array z jednym elementem
+            tags = [selected_tag] if selected_tag else []
+            self.db_manager.update_recording(recording_id, {'tags': tags})
+            
+            if self.tag_filter_combo.currentData() not in (None, "favorites"):
+                # Aktywny filtr tagu - wiersz może wypaść z listy
+                self._load_recordings()
+            else:
+                self.recordings_model.update_recording(recording_id, {'tags': json.dumps(tags)})
+                self._load_tags_filter()
             
-            # Zaktualizuj tag w bazie danych
             if selected_tag:
-                # Zapisz tag jako JSON array z jednym elementem
-                tags_json = json.dumps([selected_tag])
-                # TODO: Zaimplementuj metodę update_recording_tags w db_manager
-                # self.db_manager.update_recording_tags(recording_id, tags_json)
-                
-                # Zmień kolor tła comboboxa
-                available_tags = self._get_available_tags()
-                colors = self.theme_manager.get_current_colors() if self.theme_manager else {}
-                tag_color = available_tags.get(selected_tag, colors.get('bg_main', '#FFFFFF'))
-                tag_combo.setStyleSheet(f"""
-                    QComboBox {{
-                        background-color: {tag_color};
-                        border: 1px solid #999;
-                        padding: 3px;
-                        border-radius: 3px;
-                    }}
-                    QComboBox:hover {{
-                        border: 2px solid #666;
-                    }}
-                """)
-                
                 self._set_status(f"🏷️ Tag zmieniony: {selected_tag}", success=True)
             else:
-                # Usuń tag
-                # TODO: Zaimplementuj metodę update_recording_tags w db_manager
-                # self.db_manager.update_recording_tags(recording_id, json.dumps([]))
-                
-                # Resetuj styl
-                tag_combo.setStyleSheet("")
-                
                 self._set_status("🏷️ Tag usunięty", success=True)
             
             logger.info(f"Recording tag changed: {recording_id} -> {selected_tag}")
@@ -2209,453 +2236,108 @@ class CallCryptorView(QWidget):
             )
     
     def _apply_filters(self):
-        """Zastosuj filtry daty i tagów do listy nagrań"""
+        """Zastosuj filtry źródła, daty, tagów i wyszukiwania (w SQL)"""
         if not self.db_manager or not self.user_id:
             return
         
-        # Pobierz wybrane filtry
-        date_filter = self.date_filter_combo.currentData()
-        tag_filter = self.tag_filter_combo.currentData()
+        filters = {}
         
-        # Pobierz nagrania według źródła
+        # Źródło
         if self.current_source_id == "favorites":
-            recordings = self.db_manager.get_favorite_recordings(self.user_id)
+            filters['favorite'] = True
         elif self.current_source_id:
-            recordings = self.db_manager.get_recordings_by_source(self.current_source_id)
-        else:
-            recordings = self.db_manager.get_all_recordings(self.user_id)
+            filters['source_id'] = self.current_source_id
+        
+        # Tag / ulubione
+        tag_filter = self.tag_filter_combo.currentData()
+        if tag_filter == "favorites":
+            filters['favorite'] = True
+        elif tag_filter:
+            filters['tag'] = tag_filter
         
-        # Filtruj po dacie
+        # Data
+        date_filter = self.date_filter_combo.currentData()
         if date_filter:
-            recordings = self._filter_by_date(recordings, date_filter)
+            filters['date_from'], filters['date_to'] = self._date_range(date_filter)
         
-        # Filtruj po tagu
-        if tag_filter:
-            recordings = self._filter_by_tag(recordings, tag_filter)
+        # Wyszukiwanie
+        search_text = self.search_input.text().strip()
+        if search_text:
+            filters['text'] = search_text
         
-        # Zaktualizuj tabelę
-        self._populate_table(recordings)
+        self.recordings_model.tag_colors = self._get_available_tags()
+        self.recordings_model.set_query(self.db_manager, self.user_id, filters)
+        self._update_count_label(self.recordings_model.total_count())
     
-    def _filter_by_date(self, recordings: List[Dict], date_filter: str) -> List[Dict]:
+    def _date_range(self, date_filter: str) -> tuple:
         """
-        Filtruj nagrania po dacie.
+        Zakres dat (ISO) dla filtra daty.
         
         Args:
-            recordings: Lista nagrań
             date_filter: Typ filtra ('today', 'yesterday', 'last_7_days', etc.)
             
         Returns:
-            Przefiltrowana lista nagrań
+            (date_from, date_to) - date_from włącznie, date_to wyłącznie (None = bez limitu)
         """
-        from datetime import datetime, timedelta
-        
-        today = datetime.now().date()
-        filtered = []
-        
-        for recording in recordings:
-            recording_date_str = recording.get('recording_date') or recording.get('created_at')
-            if not recording_date_str:
-                continue
-            
-            try:
-                # Parse ISO datetime
-                recording_date = datetime.fromisoformat(recording_date_str.replace('Z', '+00:00')).date()
-                
-                if date_filter == 'today':
-                    if recording_date == today:
-                        filtered.append(recording)
-                elif date_filter == 'yesterday':
-                    if recording_date == today - timedelta(days=1):
-                        filtered.append(recording)
-                elif date_filter == 'last_7_days':
-                    if recording_date >= today - timedelta(days=7):
-                        filtered.append(recording)
-                elif date_filter == 'last_30_days':
-                    if recording_date >= today - timedelta(days=30):
-                        filtered.append(recording)
-                elif date_filter == 'this_month':
-                    if recording_date.year == today.year and recording_date.month == today.month:
-                        filtered.append(recording)
-                elif date_filter == 'last_month':
-                    last_month = today.replace(day=1) - timedelta(days=1)
-                    if recording_date.year == last_month.year and recording_date.month == last_month.month:
-                        filtered.append(recording)
-            except (ValueError, AttributeError) as e:
-                logger.debug(f"Error parsing date: {e}")
-                continue
-        
-        return filtered
+        from datetime import date, timedelta
+        
+        today = date.today()
+        first_of_month = today.replace(day=1)
+        
+        ranges = {
+            'today': (today, today + timedelta(days=1)),
+            'yesterday': (today - timedelta(days=1), today),
+            'last_7_days': (today - timedelta(days=7), None),
+            'last_30_days': (today - timedelta(days=30), None),
+            'this_month': (first_of_month, None),
+            'last_month': ((first_of_month - timedelta(days=1)).replace(day=1), first_of_month)
+        }
+        date_from, date_to = ranges.get(date_filter, (None, None))
+        return (
+            date_from.isoformat() if date_from else None,
+            date_to.isoformat() if date_to else None
+        )
     
-    def _filter_by_tag(self, recordings: List[Dict], tag_name: str) -> List[Dict]:
+    def _on_table_clicked(self, index):
         """
-        Filtruj nagrania po tagu.
+        Obsługa kliknięcia w komórkę - akcje są rysowane przez model,
+        więc kolumna wyznacza akcję.
         
         Args:
-            recordings: Lista nagrań
-            tag_name: Nazwa tagu lub "favorites" dla ulubionych
-            
-        Returns:
-            Przefiltrowana lista nagrań
+            index: QModelIndex klikniętej komórki
         """
-        filtered = []
-        
-        # Filtr dla ulubionych
-        if tag_name == "favorites":
-            for recording in recordings:
-                if recording.get('is_favorite'):
-                    filtered.append(recording)
-            return filtered
-        
-        # Filtr dla tagów
-        for recording in recordings:
-            tags = recording.get('tags', [])
-            # Jeśli tags jest JSON stringiem, sparsuj
-            if isinstance(tags, str):
-                try:
-                    tags = json.loads(tags)
-                except:
-                    tags = []
-            
-            if tag_name in tags:
-                filtered.append(recording)
-        
-        return filtered
-    
-    def _populate_table(self, recordings: List[Dict]):
-        """
-        Wypełnij tabelę nagraniami (helper dla filtrowania).
+        row_data = self.recordings_model.recording_at(index.row())
+        if not row_data:
+            return
+        column = index.column()
         
-        Args:
-            recordings: Lista nagrań do wyświetlenia
-        """
-        self.recordings_table.setRowCount(len(recordings))
-        
-        # Pobierz dostępne tagi RAZ przed pętlą (optymalizacja)
-        available_tags = self._get_available_tags()
-        
-        for row, recording in enumerate(recordings):
-            # Przycisk Ulubione (Gwiazdka) - KOLUMNA 0
-            is_favorite = recording.get('is_favorite', False)
-            favorite_btn = QPushButton("\u2605")  # Unicode star character
-            favorite_btn.setToolTip(t('callcryptor.tooltip.favorite'))
-            favorite_btn.setMaximumWidth(40)
-            favorite_btn.setMinimumHeight(30)
-            favorite_btn.setFlat(True)
-            favorite_btn.setCursor(Qt.CursorShape.PointingHandCursor)
-            
-            # Pobierz kolory z motywu
-            colors = self.theme_manager.get_current_colors() if self.theme_manager else {}
-            warning_bg = colors.get('warning_bg', '#FFD700')  # Złoty/pomarańczowy
-            warning_hover = colors.get('warning_hover', '#FFA500')
-            disabled_text = colors.get('disabled_text', '#CCCCCC')
-            
-            # Ustaw kolor gwiazdki - złota dla ulubionego, szara dla zwykłego
-            if is_favorite:
-                favorite_btn.setStyleSheet(f"""
-                    QPushButton {{
-                        font-size: 22px;
-                        font-weight: bold;
-                        border: none;
-                        background: transparent;
-                        color: {warning_bg};  /* Gold */
-                        padding: 0;
-                    }}
-                    QPushButton:hover {{
-                        color: {warning_hover};  /* Orange on hover */
-                        background: rgba(255, 215, 0, 0.1);
-                    }}
-                    QPushButton:pressed {{
-                        color: {warning_hover};  /* Dark orange on press */
-                    }}
-                """)
-            else:
-                favorite_btn.setStyleSheet(f"""
-                    QPushButton {{
-                        font-size: 22px;
-                        font-weight: bold;
-                        border: none;
-                        background: transparent;
-                        color: {disabled_text};  /* Light gray */
-                        padding: 0;
-                    }}
-                    QPushButton:hover {{
-                        color: {warning_bg};  /* Gold on hover */
-                        background: rgba(255, 215, 0, 0.1);
-                    }}
-                    QPushButton:pressed {{
-                        color: {warning_hover};
-                    }}
-                """)
-            
-            favorite_btn.clicked.connect(lambda checked, r=recording: self._toggle_favorite(r))
-            self.recordings_table.setCellWidget(row, 0, favorite_btn)
-            
-            # Kontakt - KOLUMNA 1
-            contact = recording.get('contact_name') or recording.get('file_name') or "Unknown"
-            contact_item = QTableWidgetItem(contact)
-            contact_item.setData(Qt.ItemDataRole.UserRole, recording['id'])
-            self.recordings_table.setItem(row, 1, contact_item)
-            
-            # Czas trwania - KOLUMNA 2
-            duration = recording.get('duration_seconds', 0)
-            duration_str = self._format_duration(duration)
-            self.recordings_table.setItem(row, 2, QTableWidgetItem(duration_str))
-            
-            # Data - KOLUMNA 3
-            date = recording.get('call_date', '') or recording.get('created_at', '')
-            date_str = self._format_date(date)
-            self.recordings_table.setItem(row, 3, QTableWidgetItem(date_str))
-            
-            # Tagi - KOLUMNA 4 (QComboBox z kolorowym tłem)
-            tags = recording.get('tags', [])
-            # Jeśli tags jest JSON stringiem, sparsuj
-            if isinstance(tags, str):
-                try:
-                    tags = json.loads(tags) if tags else []
-                except:
-                    tags = []
-            
-            # Stwórz QComboBox z tagami
-            tag_combo = QComboBox()
-            tag_combo.setMinimumHeight(35)
-            tag_combo.addItem("-- Brak tagu --", None)
-            
-            # Użyj wcześniej pobranych tagów (optymalizacja)
-            for tag_name, tag_color in available_tags.items():
-                tag_combo.addItem(f"🏷️ {tag_name}", tag_name)
-            
-            # Ustaw aktualny tag jeśli istnieje
-            current_tag = tags[0] if tags else None
-            if current_tag:
-                index = tag_combo.findData(current_tag)
-                if index >= 0:
-                    tag_combo.setCurrentIndex(index)
-                    # Ustaw kolor tła komórki
-                    colors = self.theme_manager.get_current_colors() if self.theme_manager else {}
-                    tag_color = available_tags.get(current_tag, colors.get('bg_main', '#FFFFFF'))
-                    tag_combo.setStyleSheet(f"""
-                        QComboBox {{
-                            background-color: {tag_color};
-                            border: 1px solid #999;
-                            padding: 3px;
-                            border-radius: 3px;
-                        }}
-                        QComboBox:hover {{
-                            border: 2px solid #666;
-                        }}
-                    """)
-            
-            # Połącz sygnał zmiany
-            tag_combo.currentIndexChanged.connect(
-                lambda idx, r=recording, combo=tag_combo: self._on_tag_changed(r, combo)
-            )
-            
-            self.recordings_table.setCellWidget(row, 4, tag_combo)
-            
-            # Przycisk Play - KOLUMNA 5 (przeniesiony za Tag)
-            play_btn = self._create_emoji_button(
-                "▶️",
-                t('callcryptor.play_recording'),
-                lambda: self._play_recording(recording)
-            )
-            self.recordings_table.setCellWidget(row, 5, play_btn)
-            
-            # Przyciski akcji (kolumny 6-11)
-            self._add_action_buttons(row, recording)
-    
-    def _create_emoji_button(self, emoji: str, tooltip: str, callback, success=False) -> QPushButton:
-        """
-        Stwórz przycisk z emoji bez ramki, dobrze dopasowany do komórki.
+        if column == COL_FAVORITE:
+            self._toggle_favorite(row_data)
+            return
+        if column == COL_TAG:
+            self._show_tag_menu(index, row_data)
+            return
+        if column not in ACTION_COLUMNS:
+            return
+        # W trybie kolejki kolumny 6-7 to checkboxy (obsługuje model)
+        if self.queue_mode_active and column in QUEUE_COLUMNS:
+            return
         
-        Args:
-            emoji: Znak emoji
-            tooltip: Tekst tooltipa
-            callback: Funkcja wywoływana przy kliknięciu
-            success: Czy przycisk ma zielone tło (dla ukończonych akcji)
-            
-        Returns:
-            QPushButton: Skonfigurowany przycisk
-        """
-        btn = QPushButton(emoji)
-        btn.setToolTip(tooltip)
-        btn.setFlat(True)
-        btn.setCursor(Qt.CursorShape.PointingHandCursor)
-        btn.setFixedSize(35, 35)  # Stały rozmiar przycisku aby zmieścił się w komórce
+        # Akcje potrzebują pełnego rekordu (transkrypcja, podsumowanie AI itd.)
+        recording = self._get_recording_by_id(row_data['id'])
+        if not recording:
+            return
         
-        if success:
-            btn.setStyleSheet("""
-                QPushButton {
-                    font-size: 18px;
-                    border: none;
-                    background: rgba(76, 175, 80, 0.2);  /* Light green */
-                    padding: 0;
-                    margin: 0;
-                    border-radius: 4px;
-                }
-                QPushButton:hover {
-                    background: rgba(76, 175, 80, 0.3);
-                }
-                QPushButton:pressed {
-                    background: rgba(76, 175, 80, 0.4);
-                }
-            """)
-        else:
-            btn.setStyleSheet("""
-                QPushButton {
-                    font-size: 18px;
-                    border: none;
-                    background: transparent;
-                    padding: 0;
-                    margin: 0;
-                }
-                QPushButton:hover {
-                    background: rgba(0, 0, 0, 0.05);
-                    border-radius: 4px;
-                }
-                QPushButton:pressed {
-                    background: rgba(0, 0, 0, 0.1);
-                }
-            """)
-        btn.clicked.connect(callback)
-        return btn
-    
-    def _add_action_buttons(self, row: int, recording: dict):
-        """Dodaj przyciski akcji lub checkboxy do wiersza tabeli"""
-        
-        if self.queue_mode_active:
-            # Tryb kolejki - pokaż checkboxy zamiast przycisków
-            
-            # Kolumna 6: Checkbox transkrypcji
-            transcribe_checkbox = QCheckBox()
-            transcribe_checkbox.setStyleSheet("""
-                QCheckBox {
-                    margin-left: 10px;
-                }
-                QCheckBox::indicator {
-                    width: 20px;
-                    height: 20px;
-                }
-            """)
-            recording_id = recording.get('id')
-            transcribe_checkbox.setChecked(recording_id in self.selected_items['transcribe'])
-            transcribe_checkbox.stateChanged.connect(
-                lambda state, rid=recording_id: self._on_transcribe_checkbox_changed(rid, state)
-            )
-            
-            widget = QWidget()
-            layout = QHBoxLayout(widget)
-            layout.addWidget(transcribe_checkbox)
-            layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            layout.setContentsMargins(0, 0, 0, 0)
-            self.recordings_table.setCellWidget(row, 6, widget)
-            
-            # Kolumna 7: Checkbox podsumowania AI
-            summarize_checkbox = QCheckBox()
-            summarize_checkbox.setStyleSheet("""
-                QCheckBox {
-                    margin-left: 10px;
-                }
-                QCheckBox::indicator {
-                    width: 20px;
-                    height: 20px;
-                }
-            """)
-            summarize_checkbox.setChecked(recording_id in self.selected_items['summarize'])
-            summarize_checkbox.stateChanged.connect(
-                lambda state, rid=recording_id: self._on_summarize_checkbox_changed(rid, state)
-            )
-            
-            widget2 = QWidget()
-            layout2 = QHBoxLayout(widget2)
-            layout2.addWidget(summarize_checkbox)
-            layout2.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            layout2.setContentsMargins(0, 0, 0, 0)
-            self.recordings_table.setCellWidget(row, 7, widget2)
-            
-            # Kolumny 8-11: Puste w trybie kolejki
-            for col in range(8, 12):
-                self.recordings_table.setCellWidget(row, col, None)
-        else:
-            # Normalny tryb - przyciski akcji
-            
-            # Kolumna 6: Transkrypcja
-            has_transcription = recording.get('transcription_status') == 'completed'
-            transcribe_btn = self._create_emoji_button(
-                "📝",
-                t('callcryptor.tooltip.transcribe'),
-                lambda: self._transcribe_recording(recording),
-                success=has_transcription
-            )
-            self.recordings_table.setCellWidget(row, 6, transcribe_btn)
-            
-            # Kolumna 7: AI Summary
-            has_ai_summary = recording.get('ai_summary_status') == 'completed'
-            ai_btn = self._create_emoji_button(
-                "🪄",
-                t('callcryptor.tooltip.ai_summary'),
-                lambda: self._ai_summary(recording),
-                success=has_ai_summary
-            )
-            self.recordings_table.setCellWidget(row, 7, ai_btn)
-            
-            # Kolumna 8: Utwórz notatkę
-            has_note = recording.get('note_id') is not None
-            note_btn = self._create_emoji_button(
-                "📒",
-                t('callcryptor.tooltip.create_note'),
-                lambda: self._create_note(recording),
-                success=has_note
-            )
-            self.recordings_table.setCellWidget(row, 8, note_btn)
-            
-            # Kolumna 9: Utwórz zadanie
-            # Sprawdź czy są zadania w podsumowaniu AI
-            has_ai_tasks = False
-            ai_summary_tasks = recording.get('ai_summary_tasks')
-            if ai_summary_tasks:
-                try:
-                    tasks_list = json.loads(ai_summary_tasks) if isinstance(ai_summary_tasks, str) else ai_summary_tasks
-                    has_ai_tasks = isinstance(tasks_list, list) and len(tasks_list) > 0
-                except (json.JSONDecodeError, TypeError):
-                    pass
-            
-            task_btn = self._create_emoji_button(
-                "✅",
-                t('callcryptor.tooltip.create_task'),
-                lambda: self._create_task(recording),
-                success=has_ai_tasks  # Podświetl na zielono jeśli są zadania
-            )
-            self.recordings_table.setCellWidget(row, 9, task_btn)
-            
-            # Kolumna 10: Archiwizuj
-            archive_btn = self._create_emoji_button(
-                "📦",
-                t('callcryptor.tooltip.archive'),
-                lambda: self._archive_recording(recording)
-            )
-            self.recordings_table.setCellWidget(row, 10, archive_btn)
-            
-            # Kolumna 11: Usuń
-            delete_btn = self._create_emoji_button(
-                "🗑️",
-                t('callcryptor.tooltip.delete'),
-                lambda: self._delete_recording(recording)
-            )
-            self.recordings_table.setCellWidget(row, 11, delete_btn)
-    
-    def _on_transcribe_checkbox_changed(self, recording_id: str, state: int):
-        """Obsługa zmiany checkboxa transkrypcji"""
-        if state == Qt.CheckState.Checked.value:
-            self.selected_items['transcribe'].add(recording_id)
-        else:
-            self.selected_items['transcribe'].discard(recording_id)
-    
-    def _on_summarize_checkbox_changed(self, recording_id: str, state: int):
-        """Obsługa zmiany checkboxa podsumowania"""
-        if state == Qt.CheckState.Checked.value:
-            self.selected_items['summarize'].add(recording_id)
-        else:
-            self.selected_items['summarize'].discard(recording_id)
+        actions = {
+            COL_PLAY: self._play_recording,
+            COL_TRANSCRIBE: self._transcribe_recording,
+            COL_SUMMARY: self._ai_summary,
+            COL_NOTE: self._create_note,
+            COL_TASK: self._create_task,
+            COL_ARCHIVE: self._archive_recording,
+            COL_DELETE: self._delete_recording
+        }
+        actions[column](recording)
     
     def update_translations(self):
         """Odśwież tłumaczenia"""